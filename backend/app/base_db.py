@@ -34,6 +34,11 @@ class BaseDatabase(ABC):
         """Tüm projeleri listeler."""
         pass
     
+    @abstractmethod
+    def delete_project(self, project_id: str):
+        """Projeyi ve görevlerini siler (iş yükü sayaçları düşürülür)."""
+        pass
+    
     @abstractmethod
     def set_active_project(self, session_id: str, project_id: str):
         """Aktif projeyi ayarlar."""
@@ -55,6 +60,47 @@ class BaseDatabase(ABC):
         """Proje görevlerini getirir."""
         pass
     
+    @abstractmethod
+    def delete_tasks(self, project_id: str, task_ids: List[str]):
+        """Görevleri siler (iş yükü sayaçları düşürülür)."""
+        pass
+    
+    # --- TASK CHANGE LISTENERS ---
+    # Dinleyiciler süreç geneli tutulur: her router kendi istemcisini oluşturduğundan,
+    # hangi örnek üzerinden yazılırsa yazılsın tüm önbellekler bildirim almalıdır.
+    _task_listeners: List = []
+    
+    def add_task_listener(self, callback):
+        """
+        Görev değişikliklerini dinleyecek fonksiyonu kaydeder (aynı fonksiyon bir kez).
+        callback(project_id, task_id, changes) şeklinde çağrılır; toplu kayıtlarda task_id None'dır.
+        """
+        if callback not in BaseDatabase._task_listeners:
+            BaseDatabase._task_listeners.append(callback)
+    
+    def _notify_task_changed(self, project_id: str, task_id: Optional[str], changes: Optional[Dict[str, Any]] = None):
+        """Kayıtlı dinleyicilere görev değişikliğini bildirir; dinleyici hataları yazmayı bozmaz."""
+        for callback in list(BaseDatabase._task_listeners):
+            try:
+                callback(project_id, task_id, changes)
+            except Exception as e:
+                print(f"[BaseDatabase] Görev dinleyicisi hatası: {e}")
+    
+    # --- WORKLOAD METHODS ---
+    @abstractmethod
+    def get_employee_workloads(self) -> Dict[str, Dict[str, Any]]:
+        """Atamalardan türetilen iş yükü sayaçları: {employee_id: {open_tasks, remaining_hours, critical_tasks}}"""
+        pass
+    
+    # --- BATCH WRITE ---
+    def apply_batch(self, write_set: List[Dict[str, Any]]):
+        """
+        Yazma kümesini uygular: [{"op": "reassign_task", "args": {...}}, ...]
+        Varsayılan uygulama sırayla yazar; toplu yazma destekleyen veritabanları geçersiz kılar.
+        """
+        for operation in write_set:
+            getattr(self, operation["op"])(**operation.get("args", {}))
+    
     # --- COMPANY STRUCTURE METHODS ---
     @abstractmethod
     def save_company_structure(self, company_data: Dict[str, Any]):
@@ -82,6 +128,11 @@ class BaseDatabase(ABC):
         """Tüm sözleşmeleri listeler."""
         pass
     
+    @abstractmethod
+    def find_contract_by_fingerprint(self, field: str, value: str) -> Optional[Dict[str, Any]]:
+        """İçerik parmak izi (content_hash / text_hash) aynı olan sözleşmeyi getirir (analiz edilmiş olan öncelikli)."""
+        pass
+    
     # --- SPRINT METHODS (NEW) ---
     @abstractmethod
     def save_sprint(self, project_id: str, sprint_data: Dict[str, Any]):
@@ -101,4 +152,20 @@ class BaseDatabase(ABC):
     @abstractmethod
     def update_sprint_status(self, sprint_id: str, status: str):
         """Sprint durumunu günceller."""
-        pass
\ No newline at end of file
+        pass
+    
+    # --- CONFIRMATION METHODS ---
+    @abstractmethod
+    def save_pending_confirmation(self, token: str, pending_action: Dict[str, Any]):
+        """Onay bekleyen aksiyonu token ile kaydeder."""
+        pass
+    
+    @abstractmethod
+    def get_pending_confirmation(self, token: str) -> Optional[Dict[str, Any]]:
+        """Onay bekleyen aksiyonu getirir."""
+        pass
+    
+    @abstractmethod
+    def delete_pending_confirmation(self, token: str):
+        """Onay bekleyen aksiyonu siler."""
+        pass
@@ -1,4 +1,5 @@
 import os
+import tempfile
 from dotenv import load_dotenv
 
 # .env dosyasındaki değişkenleri yükler
@@ -13,6 +14,53 @@ LLAMAPARSE_API_KEY = os.getenv("LLAMAPARSE_API_KEY")
 if not LLAMAPARSE_API_KEY:
     print("Uyarı: LLAMAPARSE_API_KEY bulunamadı. Lütfen .env dosyanızı kontrol edin.")
 
+# --- PDF Ayrıştırma Ayarları ---
+# remote: LlamaParse, local: yerel pypdf, auto: önce yerel, taranmış PDF'lerde LlamaParse
+PDF_PARSER_MODE = os.getenv("PDF_PARSER_MODE", "remote").lower()
+if PDF_PARSER_MODE not in ("remote", "local", "auto"):
+    print(f"Uyarı: Geçersiz PDF_PARSER_MODE '{PDF_PARSER_MODE}', 'remote' kullanılıyor.")
+    PDF_PARSER_MODE = "remote"
+
+# Yerel ayrıştırmada sayfaları işleyen süreç sayısı
+PDF_PARSE_WORKERS = int(os.getenv("PDF_PARSE_WORKERS", "4"))
+
+# Ayrıştırılmış metinlerin içerik hash'i ile saklandığı dizin
+PDF_CACHE_DIR = os.getenv("PDF_CACHE_DIR", os.path.join(tempfile.gettempdir(), "pm_assistant_pdf_cache"))
+
+# --- Sözleşme Yükleme Ayarları ---
+# Yüklenen sözleşmelerin içerik hash'i ile yerel olarak saklandığı dizin (analizde yeniden indirme yapılmaz)
+CONTRACT_SPOOL_DIR = os.getenv("CONTRACT_SPOOL_DIR", os.path.join(tempfile.gettempdir(), "pm_assistant_contracts"))
+
+# Kabul edilen en büyük sözleşme dosyası (MB)
+MAX_CONTRACT_UPLOAD_MB = int(os.getenv("MAX_CONTRACT_UPLOAD_MB", "100"))
+
+# Sözleşme maddelerinin BM25 arama indeksinin (sözleşme başına segment dosyası) saklandığı dizin
+CLAUSE_INDEX_DIR = os.getenv("CLAUSE_INDEX_DIR", os.path.join(tempfile.gettempdir(), "pm_assistant_clause_index"))
+
+# Analiz öncesi sözleşme metni sadeleştirme (üst/alt bilgi, sayfa numarası, imza bloğu, standart maddeler)
+CONTRACT_PREPROCESS = os.getenv("CONTRACT_PREPROCESS", "true").lower() == "true"
+
+# Görev üretimi: single (tek çağrı) veya parallel (kapsam maddesi/grup başına paralel çağrılar)
+TASK_GENERATION_MODE = os.getenv("TASK_GENERATION_MODE", "single").lower()
+
+# Paralel görev üretiminde aynı anda yapılan LLM çağrısı sayısı
+TASK_GENERATION_WORKERS = int(os.getenv("TASK_GENERATION_WORKERS", "4"))
+
+# Üretilen görevlerde yakın kopya tespiti: başlık (ağırlıklı) ve detay kelime MinHash benzerlik eşiği (0 kapatır)
+TASK_DEDUP_THRESHOLD = float(os.getenv("TASK_DEDUP_THRESHOLD", "0.65"))
+
+# flag: kopyalar korunur ve duplicate_of ile işaretlenir, merge: tek göreve birleştirilip çıkarılır
+# (merge gerçek işi silebileceğinden yalnızca yüksek eşikle, örn. 0.85+, önerilir)
+TASK_DEDUP_MODE = os.getenv("TASK_DEDUP_MODE", "flag").lower()
+
+# Toplu sözleşme aktarımında her aşamada aynı anda işlenen doküman sayısı
+CONTRACT_PIPELINE_LIMITS = {
+    "parse": int(os.getenv("PIPELINE_PARSE_CONCURRENCY", "2")),
+    "analyze": int(os.getenv("PIPELINE_ANALYZE_CONCURRENCY", "2")),
+    "tasks": int(os.getenv("PIPELINE_TASKS_CONCURRENCY", "2")),
+    "assign": int(os.getenv("PIPELINE_ASSIGN_CONCURRENCY", "1")),
+}
+
 DEFAULT_MODEL = "meta-llama/llama-4-maverick-17b-128e-instruct"
 
 # --- Agent Ayarları ---
@@ -0,0 +1,89 @@
+import hashlib
+import json
+import uuid
+from datetime import datetime, timedelta
+from typing import Dict, Any, List, Optional
+
+# Onay bekleyen bir aksiyonun geçerlilik süresi
+CONFIRMATION_TTL_MINUTES = 15
+
+# Onay sonrası uygulanmasına izin verilen DB yazma operasyonları
+APPLICABLE_OPERATIONS = {
+    "reassign_task",
+    "update_task_dates",
+    "update_task_status",
+    "update_employee_availability",
+    "save_sprint",
+}
+
+
+def compute_content_hash(tool_name: str, tool_args: Dict[str, Any], write_set: List[Dict[str, Any]]) -> str:
+    """
+    Önerilen aksiyonun içerik özetini (SHA-256) hesaplar.
+    Kullanıcının onayladığı öneri ile uygulanan değişikliğin aynı olduğunu garanti eder.
+    """
+    canonical = json.dumps(
+        {"tool_name": tool_name, "tool_args": tool_args, "write_set": write_set},
+        sort_keys=True,
+        ensure_ascii=False,
+        default=str
+    )
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def create_pending_action(session_id: str, tool_name: str, tool_args: Dict[str, Any],
+                          tool_result: Dict[str, Any], write_set: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Onay bekleyen aksiyon kaydını oluşturur (token, içerik özeti ve son geçerlilik tarihi ile).
+    """
+    now = datetime.utcnow()
+    return {
+        "confirmation_token": f"confirm_{uuid.uuid4().hex}",
+        "session_id": session_id,
+        "tool_name": tool_name,
+        "tool_args": tool_args,
+        "tool_result": tool_result,
+        "write_set": write_set,
+        "content_hash": compute_content_hash(tool_name, tool_args, write_set),
+        "created_at": now.isoformat(),
+        "expires_at": (now + timedelta(minutes=CONFIRMATION_TTL_MINUTES)).isoformat()
+    }
+
+
+def is_expired(pending_action: Dict[str, Any], now: Optional[datetime] = None) -> bool:
+    """Onay kaydının süresinin dolup dolmadığını kontrol eder."""
+    expires_at = pending_action.get("expires_at")
+    if not expires_at:
+        return True
+    return (now or datetime.utcnow()) >= datetime.fromisoformat(expires_at)
+
+
+def verify_pending_action(pending_action: Dict[str, Any], expected_hash: Optional[str] = None) -> bool:
+    """
+    Saklanan önerinin bozulmadığını ve (verildiyse) istemcinin onayladığı özetle eşleştiğini doğrular.
+    """
+    content_hash = compute_content_hash(
+        pending_action.get("tool_name"),
+        pending_action.get("tool_args", {}),
+        pending_action.get("write_set", [])
+    )
+    if content_hash != pending_action.get("content_hash"):
+        return False
+    return expected_hash is None or expected_hash == content_hash
+
+
+def apply_write_set(db, write_set: List[Dict[str, Any]]):
+    """
+    Onaylanan yazma kümesini veritabanına uygular. Yeniden hesaplama yapmaz.
+
+    Args:
+        db: Veritabanı istemcisi
+        write_set: [{"op": "reassign_task", "args": {...}}, ...]
+    """
+    for operation in write_set:
+        op_name = operation.get("op")
+        if op_name not in APPLICABLE_OPERATIONS:
+            raise ValueError(f"Desteklenmeyen yazma operasyonu: {op_name}")
+
+    # Tüm değişiklikler tek bir toplu yazma olarak uygulanır
+    db.apply_batch(write_set)
@@ -1,11 +1,22 @@
 import firebase_admin
 from firebase_admin import credentials, firestore, storage
 from app.base_db import BaseDatabase
-from typing import List, Dict, Any, Optional
+from app.services.workload import workload_deltas, count_workloads, WORKLOAD_FIELDS
+from typing import List, Dict, Any, Optional, Callable
 from datetime import datetime
 import os
+import threading
 import uuid
 
+# Firestore'un tek batch/işlemde kabul ettiği en fazla yazma sayısı
+BATCH_WRITE_LIMIT = 500
+
+# save_tasks/delete_tasks'ta tek batch'e giren görev sayısı (görev + iş yükü sayacı yazmaları sınırı aşmaz)
+TASK_WRITE_CHUNK = 200
+
+# Storage'a resumable yüklemede parça boyutu (256 KB'ın katı olmalı)
+STORAGE_CHUNK_SIZE = 8 * 1024 * 1024
+
 class FirebaseDatabase(BaseDatabase):
     """
     Firebase Firestore implementation of BaseDatabase
@@ -15,6 +26,7 @@ class FirebaseDatabase(BaseDatabase):
         self._db = None
         self._bucket = None
         self._initialized = False
+        self._local = threading.local()
         print("[FirebaseDB Info] FirebaseDatabase instance created (lazy loading)")
     
     def _ensure_initialized(self):
@@ -78,6 +90,131 @@ class FirebaseDatabase(BaseDatabase):
             self._ensure_initialized()
         return self._bucket
     
+    # --- BATCH WRITE ---
+    def _update(self, ref, data: Dict[str, Any]):
+        """İşlem (transaction) sırasında işleme, aksi halde doğrudan yazar."""
+        transaction = getattr(self._local, "transaction", None)
+        if transaction is None:
+            ref.update(data)
+            return
+        transaction.update(ref, data)
+        self._count_batch_write()
+    
+    def _set_merge(self, ref, data: Dict[str, Any]):
+        transaction = getattr(self._local, "transaction", None)
+        if transaction is None:
+            ref.set(data, merge=True)
+            return
+        transaction.set(ref, data, merge=True)
+        self._count_batch_write()
+    
+    def _delete(self, ref):
+        transaction = getattr(self._local, "transaction", None)
+        if transaction is None:
+            ref.delete()
+            return
+        transaction.delete(ref)
+        self._count_batch_write()
+    
+    def _count_batch_write(self):
+        # İşlem parça parça commit edilmez; sınırı aşan yazma kümesi hiçbir şey yazılmadan reddedilir
+        self._local.writes += 1
+        if self._local.writes > BATCH_WRITE_LIMIT:
+            raise ValueError(
+                f"Toplu yazma {BATCH_WRITE_LIMIT} işlem sınırını aşıyor; değişiklik uygulanmadı. "
+                "Lütfen işlemi daha küçük parçalara bölün."
+            )
+    
+    def _atomic(self, body: Callable[[], Any]) -> Any:
+        """
+        body'yi tek bir Firestore işleminde (transaction) çalıştırır; zaten bir işlem içindeyse ona katılır.
+        Okumalar işlem içinden yapılır, yazmalar commit'e kadar tamponlanır; eşzamanlı bir yazmayla
+        çakışmada body baştan yeniden çalıştırılır.
+        """
+        if getattr(self._local, "transaction", None) is not None:
+            return body()
+        
+        @firestore.transactional
+        def run(transaction):
+            self._local.transaction = transaction
+            self._local.writes = 0
+            self._local.tasks = {}
+            return body()
+        
+        try:
+            return run(self.db.transaction())
+        finally:
+            self._local.transaction = None
+            self._local.tasks = None
+    
+    def _task_ref(self, project_id: str, task_id: str):
+        return self.db.collection("projects").document(project_id).collection("tasks").document(task_id)
+    
+    def _read_tasks(self, refs: List[Any]) -> Dict[str, Optional[Dict[str, Any]]]:
+        """
+        Görev belgelerini aktif işlemin içinden okur: {belge yolu: görev veya None}.
+        Aynı işlemde daha önce yazılmış görevlerin yazılmış hali döner; böylece bir yazma kümesindeki
+        ardışık işlemler sayaç farkını bir öncekinin sonucuna göre hesaplar.
+        """
+        state = self._local.tasks
+        missing = [ref for ref in refs if ref.path not in state]
+        if missing:
+            # Firestore işlemde yazmadan sonra okumaya izin vermez; apply_batch görevleri baştan okur
+            transaction = self._local.transaction if not self._local.writes else None
+            for snapshot in self.db.get_all(missing, transaction=transaction):
+                state[snapshot.reference.path] = snapshot.to_dict() if snapshot.exists else None
+        return {ref.path: state[ref.path] for ref in refs}
+    
+    def _write_task_state(self, ref, task: Optional[Dict[str, Any]]):
+        """İşlem içindeki görev halini, aynı işlemdeki sonraki okumalar için günceller."""
+        self._local.tasks[ref.path] = task
+    
+    def _batch_task_refs(self, write_set: List[Dict[str, Any]]) -> List[Any]:
+        """Yazma kümesinin dokunduğu görev belgeleri (işlem başında topluca okunur)."""
+        refs = {}
+        for operation in write_set:
+            args = operation.get("args", {})
+            project_id = args.get("project_id")
+            if not project_id:
+                continue
+            task_ids = [args["task_id"]] if args.get("task_id") else list(args.get("task_ids") or [])
+            task_ids += [t["task_id"] for t in args.get("tasks") or [] if t.get("task_id")]
+            for task_id in task_ids:
+                ref = self._task_ref(project_id, task_id)
+                refs[ref.path] = ref
+        return list(refs.values())
+    
+    def _notify_task_changed(self, project_id: str, task_id: Optional[str], changes: Optional[Dict[str, Any]] = None):
+        # Toplu yazmada bildirimler commit sonrasına ertelenir
+        deferred = getattr(self._local, "deferred", None)
+        if deferred is not None:
+            deferred.append((project_id, task_id, changes))
+            return
+        super()._notify_task_changed(project_id, task_id, changes)
+    
+    def apply_batch(self, write_set: List[Dict[str, Any]]):
+        """
+        Yazma kümesini tek bir Firestore işlemi (transaction) ile atomik olarak uygular.
+        BATCH_WRITE_LIMIT'i aşan kümeler ValueError ile reddedilir (hiçbir yazma yapılmaz).
+        """
+        refs = self._batch_task_refs(write_set)
+        
+        def body():
+            self._local.deferred = []
+            self._read_tasks(refs)
+            for operation in write_set:
+                getattr(self, operation["op"])(**operation.get("args", {}))
+            return self._local.deferred
+        
+        try:
+            deferred = self._atomic(body)
+        finally:
+            self._local.deferred = None
+        
+        print(f"[FirebaseDB] Toplu yazma uygulandı: {len(write_set)} işlem")
+        for notification in deferred:
+            super()._notify_task_changed(*notification)
+    
     # --- CHAT HISTORY METHODS ---
     def get_chat_history(self, session_id: str) -> List[Dict[str, Any]]:
         """Verilen ID'ye ait tüm konuşma geçmişini getirir."""
@@ -115,6 +252,24 @@ class FirebaseDatabase(BaseDatabase):
                 "messages": firestore.ArrayUnion([message_with_timestamp])
             })
     
+    # --- CONFIRMATION METHODS ---
+    def save_pending_confirmation(self, token: str, pending_action: Dict[str, Any]):
+        """Onay bekleyen aksiyonu token ile kaydeder."""
+        self.db.collection("pending_confirmations").document(token).set(pending_action)
+        print(f"[FirebaseDB] Onay bekleyen aksiyon kaydedildi: {token}")
+    
+    def get_pending_confirmation(self, token: str) -> Optional[Dict[str, Any]]:
+        """Onay bekleyen aksiyonu getirir."""
+        doc = self.db.collection("pending_confirmations").document(token).get()
+        
+        if doc.exists:
+            return doc.to_dict()
+        return None
+    
+    def delete_pending_confirmation(self, token: str):
+        """Onay bekleyen aksiyonu siler."""
+        self.db.collection("pending_confirmations").document(token).delete()
+    
     # --- PROJECT METHODS ---
     def save_project(self, project_id: str, project_data: Dict[str, Any]):
         """Proje verisini kaydeder."""
@@ -153,6 +308,13 @@ class FirebaseDatabase(BaseDatabase):
             return doc.to_dict()
         return None
     
+    def delete_project(self, project_id: str):
+        """Projeyi ve görevlerini siler; görevlerin iş yükü sayaçları düşürülür."""
+        task_ids = [t["task_id"] for t in self.get_tasks(project_id) if t.get("task_id")]
+        self.delete_tasks(project_id, task_ids)
+        self.db.collection("projects").document(project_id).delete()
+        print(f"[FirebaseDB] Proje silindi: {project_id}, {len(task_ids)} görev")
+    
     def list_projects(self) -> List[Dict[str, Any]]:
         """Tüm projeleri listeler."""
         try:
@@ -195,35 +357,81 @@ class FirebaseDatabase(BaseDatabase):
     def save_tasks(self, project_id: str, tasks: List[Dict[str, Any]]):
         """Görevleri kaydeder."""
         # Her görevi ayrı bir belge olarak kaydet
-        tasks_collection = self.db.collection("projects").document(project_id).collection("tasks")
+        keyed = [(task.get("task_id") or f"task_{uuid.uuid4().hex[:8]}", task) for task in tasks]
         
-        for task in tasks:
-            task_id = task.get("task_id", f"task_{uuid.uuid4().hex[:8]}")
+        # İş yükü sayaçları, işlem içinde okunan eski hal ile yeni hal arasındaki farkla güncellenir;
+        # yalnızca kaydedilen görevlerin belgeleri okunur. Her parça kendi sayaç farklarıyla birlikte yazılır.
+        for i in range(0, len(keyed), TASK_WRITE_CHUNK):
+            chunk = keyed[i:i + TASK_WRITE_CHUNK]
             
-            # Field name mapping: Groq service'den gelen field isimlerini frontend'in beklediği isimlere dönüştür
-            task_stack = task.get("task_stack", task.get("required_stack", []))
-            # Eğer string ise, virgülle ayırarak array'e çevir
-            if isinstance(task_stack, str):
-                task_stack = [tech.strip() for tech in task_stack.split(",") if tech.strip()]
+            def body(chunk=chunk):
+                deltas: Dict[str, Dict[str, float]] = {}
+                self._read_tasks([self._task_ref(project_id, task_id) for task_id, _ in chunk])
+                for task_id, task in chunk:
+                    self._save_task(project_id, task_id, task, deltas)
+                self._increment_workloads(deltas)
             
-            normalized_task = {
-                "task_id": task_id,
-                "project_id": project_id,
-                "title": task.get("task_title", task.get("title", "")),
-                "detail": task.get("task_detail", task.get("detail", "")),
-                "required_stack": task_stack if isinstance(task_stack, list) else [],
-                "department": task.get("department", ""),
-                "source": task.get("source", ""),
-                "status": task.get("status", "pending"),
-                "assigned_to": task.get("assigned_to"),
-                "task_attended_to": task.get("task_attended_to", ""),
-                "created_at": datetime.utcnow().isoformat(),
-                "updated_at": datetime.utcnow().isoformat()
-            }
-            
-            tasks_collection.document(task_id).set(normalized_task, merge=True)
+            self._atomic(body)
         
         print(f"[FirebaseDB] Görevler kaydedildi: {project_id}, toplam {len(tasks)} görev")
+        self._notify_task_changed(project_id, None)
+    
+    def _save_task(self, project_id: str, task_id: str, task: Dict[str, Any], deltas: Dict[str, Dict[str, float]]):
+        """Tek görevi (aktif işlem içinde) normalize ederek yazar ve iş yükü farkını `deltas`a ekler."""
+        # Field name mapping: Groq service'den gelen field isimlerini frontend'in beklediği isimlere dönüştür
+        task_stack = task.get("task_stack", task.get("required_stack", []))
+        # Eğer string ise, virgülle ayırarak array'e çevir
+        if isinstance(task_stack, str):
+            task_stack = [tech.strip() for tech in task_stack.split(",") if tech.strip()]
+        
+        normalized_task = {
+            "task_id": task_id,
+            "project_id": project_id,
+            "title": task.get("task_title", task.get("title", "")),
+            "detail": task.get("task_detail", task.get("detail", "")),
+            "required_stack": task_stack if isinstance(task_stack, list) else [],
+            "department": task.get("department", ""),
+            "source": task.get("source", ""),
+            "status": task.get("status", "pending"),
+            "assigned_to": task.get("assigned_to"),
+            "task_attended_to": task.get("task_attended_to", ""),
+            "created_at": datetime.utcnow().isoformat(),
+            "updated_at": datetime.utcnow().isoformat()
+        }
+        
+        # Planlama için gerekli opsiyonel alanları (varsa) koru
+        for key in ("estimated_hours", "priority", "dependencies", "assigned_employee_id", "start_date", "due_date",
+                    "merged_from", "duplicate_of"):
+            if task.get(key) is not None:
+                normalized_task[key] = task[key]
+        
+        task_ref = self._task_ref(project_id, task_id)
+        old_task = self._read_tasks([task_ref])[task_ref.path]
+        new_task = {**(old_task or {}), **normalized_task}
+        self._set_merge(task_ref, normalized_task)
+        self._write_task_state(task_ref, new_task)
+        workload_deltas(old_task, new_task, deltas)
+    
+    def delete_tasks(self, project_id: str, task_ids: List[str]):
+        """Görevleri siler; sorumlularının iş yükü sayaçları düşürülür."""
+        if not task_ids:
+            return
+        for i in range(0, len(task_ids), TASK_WRITE_CHUNK):
+            refs = [self._task_ref(project_id, task_id) for task_id in task_ids[i:i + TASK_WRITE_CHUNK]]
+            
+            def body(refs=refs):
+                deltas: Dict[str, Dict[str, float]] = {}
+                old_tasks = self._read_tasks(refs)
+                for ref in refs:
+                    self._delete(ref)
+                    self._write_task_state(ref, None)
+                    workload_deltas(old_tasks[ref.path], None, deltas)
+                self._increment_workloads(deltas)
+            
+            self._atomic(body)
+        
+        print(f"[FirebaseDB] Görevler silindi: {project_id}, {len(task_ids)} görev")
+        self._notify_task_changed(project_id, None)
     
     def get_tasks(self, project_id: str) -> List[Dict[str, Any]]:
         """Proje görevlerini getirir."""
@@ -245,7 +453,7 @@ class FirebaseDatabase(BaseDatabase):
             "updated_at": datetime.utcnow().isoformat()
         }
         
-        self.db.collection("settings").document("company_structure").set(company_with_meta, merge=True)
+        self._set_merge(self.db.collection("settings").document("company_structure"), company_with_meta)
         print(f"[FirebaseDB] Şirket yapısı kaydedildi")
     
     def get_company_structure(self) -> Optional[Dict[str, Any]]:
@@ -288,6 +496,25 @@ class FirebaseDatabase(BaseDatabase):
         
         return contracts
     
+    def find_contract_by_fingerprint(self, field: str, value: str) -> Optional[Dict[str, Any]]:
+        """
+        İçerik parmak izi aynı olan sözleşmeyi getirir.
+        Analiz edilmiş ve başka bir kayda bağlı olmayan (asıl) sözleşme önceliklidir.
+        """
+        docs = self.db.collection("contracts").where(field, "==", value).stream()
+        matches = [doc.to_dict() for doc in docs]
+        if not matches:
+            return None
+        matches.sort(key=lambda c: (c.get("status") != "analyzed", bool(c.get("duplicate_of")), c.get("created_at", "")))
+        return matches[0]
+    
+    def delete_file(self, file_path: str):
+        """Storage'daki dosyayı siler (yoksa sessizce geçer)."""
+        try:
+            self.bucket.blob(file_path).delete()
+        except Exception as e:
+            print(f"[FirebaseDB] Dosya silinemedi ({file_path}): {e}")
+    
     def upload_file(self, file_path: str, file_content: bytes, content_type: str) -> str:
         """
         Dosyayı Firebase Storage'a yükler ve public URL'ini döner.
@@ -317,7 +544,31 @@ class FirebaseDatabase(BaseDatabase):
         except Exception as e:
             print(f"[FirebaseDB ERROR] Dosya yükleme hatası: {e}")
             raise
-    
+
+    def open_file_writer(self, file_path: str, content_type: str):
+        """
+        Storage'a parça parça (resumable) yazan dosya nesnesi açar.
+        Yazma bitince close() çağrılmalı, ardından publish_file ile public URL alınır.
+        """
+        blob = self.bucket.blob(file_path)
+        return blob.open("wb", content_type=content_type, chunk_size=STORAGE_CHUNK_SIZE)
+
+    def publish_file(self, file_path: str) -> str:
+        """Yüklenmiş dosyayı public yapar ve URL'ini döner."""
+        blob = self.bucket.blob(file_path)
+        blob.make_public()
+        print(f"[FirebaseDB] Dosya yüklendi: {file_path}")
+        return blob.public_url
+
+    def download_file(self, file_path: str, local_path: str):
+        """Storage'daki dosyayı storage istemcisiyle doğrudan yerel dosyaya indirir."""
+        try:
+            self.bucket.blob(file_path).download_to_filename(local_path)
+            print(f"[FirebaseDB] Dosya indirildi: {file_path}")
+        except Exception as e:
+            print(f"[FirebaseDB ERROR] Dosya indirme hatası: {e}")
+            raise
+
     # --- SPRINT METHODS (NEW) ---
     def save_sprint(self, project_id: str, sprint_data: Dict[str, Any]):
         """Sprint planını kaydeder."""
@@ -331,10 +582,12 @@ class FirebaseDatabase(BaseDatabase):
         }
         
         # Sprint'i hem projects/project_id/sprints altına hem de sprints koleksiyonuna kaydet
-        self.db.collection("projects").document(project_id).collection("sprints").document(sprint_id).set(sprint_with_meta, merge=True)
-        self.db.collection("sprints").document(sprint_id).set(sprint_with_meta, merge=True)
+        self._set_merge(self.db.collection("projects").document(project_id).collection("sprints").document(sprint_id), sprint_with_meta)
+        self._set_merge(self.db.collection("sprints").document(sprint_id), sprint_with_meta)
         
         print(f"[FirebaseDB] Sprint kaydedildi: {sprint_id} (project: {project_id})")
+        # Sprint tarihleri görev zamanlamasını etkilediğinden proje genelinde bildirilir
+        self._notify_task_changed(project_id, None)
     
     def get_sprints(self, project_id: str) -> List[Dict[str, Any]]:
         """Projeye ait tüm sprintleri getirir."""
@@ -435,6 +688,53 @@ class FirebaseDatabase(BaseDatabase):
         else:
             raise ValueError(f"Çalışan bulunamadı: {employee_id}")
     
+    # --- WORKLOAD COUNTERS ---
+    def _increment_workloads(self, deltas: Dict[str, Dict[str, float]]):
+        """Çalışan iş yükü sayaçlarını firestore.Increment ile (aktif batch içinde) günceller."""
+        for employee_id, fields in deltas.items():
+            self._set_merge(self.db.collection("employee_workload").document(employee_id), {
+                **{field: firestore.Increment(value) for field, value in fields.items()},
+                "employee_id": employee_id,
+                "updated_at": datetime.utcnow().isoformat()
+            })
+    
+    def get_employee_workloads(self) -> Dict[str, Dict[str, Any]]:
+        """Tüm çalışanların iş yükü sayaçlarını getirir: {employee_id: {open_tasks, remaining_hours, critical_tasks}}"""
+        workloads = {}
+        for doc in self.db.collection("employee_workload").stream():
+            data = doc.to_dict()
+            workloads[doc.id] = {field: data.get(field, 0) for field in WORKLOAD_FIELDS}
+        return workloads
+    
+    def rebuild_employee_workloads(self) -> Dict[str, Dict[str, Any]]:
+        """Sayaçları tüm projelerin görevlerinden baştan hesaplar (ilk kurulum veya onarım için)."""
+        tasks = []
+        for project in self.list_projects():
+            if project.get("project_id"):
+                tasks.extend(self.get_tasks(project["project_id"]))
+        counters = count_workloads(tasks)
+        
+        writes = [
+            (doc.reference, {field: 0 for field in WORKLOAD_FIELDS})
+            for doc in self.db.collection("employee_workload").stream()
+            if doc.id not in counters
+        ]
+        for employee_id, fields in counters.items():
+            writes.append((self.db.collection("employee_workload").document(employee_id), {
+                **{field: fields.get(field, 0) for field in WORKLOAD_FIELDS},
+                "employee_id": employee_id,
+                "updated_at": datetime.utcnow().isoformat()
+            }))
+        # Mutlak değer yazıldığından parçalı commit güvenlidir; yarıda kalan onarım tekrar çalıştırılabilir
+        for i in range(0, len(writes), BATCH_WRITE_LIMIT):
+            def body(chunk=writes[i:i + BATCH_WRITE_LIMIT]):
+                for ref, data in chunk:
+                    self._set_merge(ref, data)
+            
+            self._atomic(body)
+        print(f"[FirebaseDB] İş yükü sayaçları yeniden hesaplandı: {len(counters)} çalışan")
+        return {employee_id: {field: fields.get(field, 0) for field in WORKLOAD_FIELDS} for employee_id, fields in counters.items()}
+    
     def get_employee_tasks(self, employee_id: str) -> List[Dict[str, Any]]:
         """
         Bir çalışana atanmış tüm görevleri getirir.
@@ -479,8 +779,9 @@ class FirebaseDatabase(BaseDatabase):
         if due_date:
             update_data["due_date"] = due_date
         
-        task_ref.update(update_data)
+        self._update(task_ref, update_data)
         print(f"[FirebaseDB] Görev tarihleri güncellendi: {task_id}")
+        self._notify_task_changed(project_id, task_id, update_data)
     
     def update_task_status(self, task_id: str, project_id: str, status: str, blocked_reason: Optional[str] = None):
         """
@@ -502,8 +803,17 @@ class FirebaseDatabase(BaseDatabase):
         if blocked_reason:
             update_data["blocked_reason"] = blocked_reason
         
-        task_ref.update(update_data)
+        self._atomic(lambda: self._update_task_counted(task_ref, update_data))
         print(f"[FirebaseDB] Görev durumu güncellendi: {task_id} -> {status}")
+        self._notify_task_changed(project_id, task_id, update_data)
+    
+    def _update_task_counted(self, task_ref, update_data: Dict[str, Any]):
+        """Görevi günceller; iş yükü farkı aynı işlemde okunan eski hale göre hesaplanır."""
+        old_task = self._read_tasks([task_ref])[task_ref.path] or {}
+        new_task = {**old_task, **update_data}
+        self._update(task_ref, update_data)
+        self._write_task_state(task_ref, new_task)
+        self._increment_workloads(workload_deltas(old_task, new_task))
     
     def reassign_task(self, task_id: str, project_id: str, new_employee_id: str, new_employee_name: str, reassignment_reason: str):
         """
@@ -517,16 +827,21 @@ class FirebaseDatabase(BaseDatabase):
             reassignment_reason: Yeniden atama nedeni
         """
         task_ref = self.db.collection("projects").document(project_id).collection("tasks").document(task_id)
-        
-        task_ref.update({
+        update_data = {
             "assigned_employee_id": new_employee_id,
             "task_attended_to": new_employee_name,
             "assignment_reason": reassignment_reason,
             "reassigned_at": datetime.utcnow().isoformat(),
             "updated_at": datetime.utcnow().isoformat()
-        })
+        }
+        
+        self._atomic(lambda: self._update_task_counted(task_ref, update_data))
         
         print(f"[FirebaseDB] Görev yeniden atandı: {task_id} -> {new_employee_name}")
+        self._notify_task_changed(project_id, task_id, {
+            "assigned_employee_id": new_employee_id,
+            "task_attended_to": new_employee_name
+        })
     
     def get_sprint_by_number(self, project_id: str, sprint_number: int) -> Optional[Dict[str, Any]]:
         """
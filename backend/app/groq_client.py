@@ -1,13 +1,18 @@
 from langchain_groq import ChatGroq
 from langchain_core.messages import HumanMessage, AIMessage, SystemMessage, ToolMessage
 from app.config import GROQ_API_KEY, DEFAULT_MODEL
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
+from collections import OrderedDict
+import threading
 
 class GroqAgent:
     """
     LangChain ChatGroq ile iletişimi yöneten sınıf.
     Daha yapılandırılmış ve temiz bir yaklaşım sunar.
     """
+    # Bellekte dönüştürülmüş geçmişi tutulacak en fazla session sayısı
+    MAX_CACHED_SESSIONS = 256
+
     def __init__(self, model: str = DEFAULT_MODEL):
         if not GROQ_API_KEY:
             raise ValueError("GROQ_API_KEY ortam değişkeni ayarlanmamış!")
@@ -20,9 +25,65 @@ class GroqAgent:
             max_tokens=1024
         )
         self.model = model
+        
+        # Tool'lara bağlanmış runnable'lar (tool isimleri -> runnable)
+        self._bound_llms: Dict[tuple, Any] = {}
+        # Session bazında LangChain formatına dönüştürülmüş mesaj geçmişi
+        self._session_histories: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
         print(f"[Agent Info] GroqAgent (LangChain) başlatıldı. Model: {self.model}")
 
-    def get_response(self, messages: List[Dict[str, Any]], use_tools: bool = True, tools=None):
+    def prepare_tools(self, tools) -> Any:
+        """
+        Tool şemalarını bir kez üretip bağlı runnable'ı saklar.
+        Aynı tool listesi için sonraki çağrılar önbellekten döner.
+        """
+        key = tuple(t.name for t in tools)
+        bound = self._bound_llms.get(key)
+        if bound is None:
+            bound = self.llm.bind_tools(tools)
+            self._bound_llms[key] = bound
+            print(f"[Agent Info] {len(tools)} tool bağlandı (şemalar önbelleğe alındı).")
+        return bound
+
+    def _get_session_messages(self, session_id: str, messages: List[Dict[str, Any]], offset: int = 0) -> List:
+        """
+        Session geçmişini artımlı olarak dönüştürür: yalnızca son çağrıdan
+        bu yana eklenen mesajlar LangChain nesnesine çevrilir.
+        
+        Args:
+            offset: messages[0]'ın tüm geçmişteki sırası (kayan pencere için)
+        """
+        end = offset + len(messages)
+        with self._lock:
+            cached = self._session_histories.get(session_id)
+            if cached is None or offset < cached["offset"] or end < cached["end"] or offset > cached["end"]:
+                cached = {"converted": [], "offset": offset, "end": offset}
+            
+            # Pencereden çıkan mesajları at
+            if offset > cached["offset"]:
+                cached["converted"] = cached["converted"][offset - cached["offset"]:]
+                cached["offset"] = offset
+            
+            # Mesaj başına dönüştürülür, böylece pencere kaydıkça hizalama korunur
+            for msg in messages[cached["end"] - offset:]:
+                cached["converted"].append(self._convert_to_langchain_messages([msg]))
+            cached["end"] = end
+            
+            self._session_histories[session_id] = cached
+            self._session_histories.move_to_end(session_id)
+            while len(self._session_histories) > self.MAX_CACHED_SESSIONS:
+                self._session_histories.popitem(last=False)
+            
+            return [converted for group in cached["converted"] for converted in group]
+
+    def reset_session(self, session_id: str):
+        """Session'ın dönüştürülmüş geçmişini bellekten siler."""
+        with self._lock:
+            self._session_histories.pop(session_id, None)
+
+    def get_response(self, messages: List[Dict[str, Any]], use_tools: bool = True, tools=None,
+                     session_id: Optional[str] = None, history_offset: int = 0):
         """
         Mesaj geçmişini alır ve LangChain ChatGroq'tan yanıt ister.
         
@@ -30,18 +91,23 @@ class GroqAgent:
             messages: Konuşma geçmişi (dict formatında)
             use_tools: Tool kullanılıp kullanılmayacağı
             tools: LangChain tool nesneleri listesi
+            session_id: Verilirse geçmiş bu session için artımlı dönüştürülür
+            history_offset: messages listesinin tüm geçmişteki başlangıç sırası
         
         Returns:
             Yanıt mesajı (dict formatında)
         """
         try:
             # Dict mesajlarını LangChain message nesnelerine dönüştür
-            langchain_messages = self._convert_to_langchain_messages(messages)
+            if session_id:
+                langchain_messages = self._get_session_messages(session_id, messages, history_offset)
+            else:
+                langchain_messages = self._convert_to_langchain_messages(messages)
             
-            # Tool'ları bağla (eğer varsa)
+            # Tool'ları bağla (eğer varsa) - şemalar önbellekten gelir
             llm_with_tools = self.llm
             if use_tools and tools:
-                llm_with_tools = self.llm.bind_tools(tools)
+                llm_with_tools = self.prepare_tools(tools)
             
             # LLM'i çağır
             response = llm_with_tools.invoke(langchain_messages)
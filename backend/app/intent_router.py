@@ -0,0 +1,167 @@
+import re
+import time
+from typing import Dict, Any, Optional, List
+
+# Türkçe karakterleri ASCII karşılıklarına indirger (eşleştirme için)
+_TR_ASCII = str.maketrans({
+    "ç": "c", "ğ": "g", "ı": "i", "ö": "o", "ş": "s", "ü": "u",
+    "â": "a", "î": "i", "û": "u"
+})
+
+# Bu kelimelerden biri geçiyorsa istek salt okuma değildir, LLM'e bırakılır
+_ACTION_KEYWORDS = re.compile(
+    r"\b(ata|atama|atay|yeniden|olustur|guncelle|revize|degistir|sil|ekle|planla|"
+    r"optimize|oncelik|acil|izin|hastalan|tahmin|risk|analiz|hesapla|kontrol|neden|nasil)\w*"
+)
+
+_LIST_TASKS_PATTERNS = [
+    re.compile(r"\b(tum|butun)\s+gorev\w*\s+(listele|goster|getir)\w*"),
+    re.compile(r"\bgorev\w*\s+(listele|goster|getir)\w*"),
+    re.compile(r"\bgorev\s+listesi\w*"),
+    re.compile(r"\bgorevler\w*\s+(neler|nedir|ne)\b"),
+]
+
+_LIST_EMPLOYEES_PATTERNS = [
+    re.compile(r"\bhangi\s+calisan\w*\s+musait\w*"),
+    re.compile(r"\bmusait\s+(olan\s+)?calisan\w*"),
+    re.compile(r"\b(tum|butun)?\s*calisan\w*\s+(listele|goster|getir)\w*"),
+    re.compile(r"\bcalisan\s+listesi\w*"),
+]
+
+_DEPARTMENT_WORKLOAD_PATTERNS = [
+    re.compile(r"\bhangi\s+departman\w*\s+yogun\w*"),
+    re.compile(r"\bdepartman\w*\s+(is\s*yuku|yogunlug)\w*"),
+    re.compile(r"\bis\s*yuku\s+dagilim\w*"),
+]
+
+_AVAILABILITY_KEYWORD = re.compile(r"\bmusait\w*")
+
+
+def normalize_text(text: str) -> str:
+    """
+    Metni karşılaştırma için normalize eder: Türkçe küçük harf, ASCII, tek boşluk.
+    """
+    lowered = text.replace("İ", "i").replace("I", "ı").lower()
+    ascii_text = lowered.translate(_TR_ASCII)
+    ascii_text = re.sub(r"[^\w\s]", " ", ascii_text)
+    return re.sub(r"\s+", " ", ascii_text).strip()
+
+
+class IntentRouter:
+    """
+    Salt okuma amaçlı yaygın chat isteklerini LLM'e gitmeden tanıyan hafif sınıflandırıcı.
+    Anahtar kelime/regex eşleşmesi ile proje, çalışan ve departman isimleri üzerinden
+    varlık (entity) eşleştirmesi yapar. Emin olmadığı her durumda None döner.
+    """
+    VOCAB_TTL_SECONDS = 60
+
+    def __init__(self, db_client):
+        self.db = db_client
+        self._vocab = None
+        self._vocab_loaded_at = 0.0
+
+    def _get_vocabulary(self) -> Dict[str, Any]:
+        """Proje/çalışan/departman isimlerini kısa süreli önbellekle getirir."""
+        now = time.monotonic()
+        if self._vocab is not None and now - self._vocab_loaded_at < self.VOCAB_TTL_SECONDS:
+            return self._vocab
+
+        projects = {}
+        for project in self.db.list_projects() or []:
+            name = project.get("project_name")
+            if name and project.get("project_id"):
+                projects[normalize_text(name)] = project["project_id"]
+
+        departments = {}
+        employees = set()
+        company_data = self.db.get_company_structure() or {}
+        for dept in company_data.get("companyStructure", {}).get("departments", []):
+            if dept.get("name"):
+                departments[normalize_text(dept["name"])] = dept["name"]
+            for team in dept.get("teams", []):
+                for emp in team.get("employees", []):
+                    full_name = f"{emp.get('firstName', '')} {emp.get('lastName', '')}".strip()
+                    if full_name:
+                        employees.add(normalize_text(full_name))
+                    if emp.get("firstName"):
+                        employees.add(normalize_text(emp["firstName"]))
+
+        self._vocab = {"projects": projects, "departments": departments, "employees": employees}
+        self._vocab_loaded_at = now
+        return self._vocab
+
+    def invalidate(self):
+        """İsim sözlüğünü bir sonraki istekte yeniden yüklenmeye zorlar."""
+        self._vocab = None
+
+    @staticmethod
+    def _find_entities(text: str, names: Dict[str, Any]) -> List[Any]:
+        """Metinde geçen isimleri bulur (Türkçe ekler için kelime sonu serbest)."""
+        found = []
+        for name, value in names.items():
+            if name and re.search(rf"\b{re.escape(name)}", text):
+                found.append(value)
+        return found
+
+    def route(self, user_prompt: str) -> Optional[Dict[str, Any]]:
+        """
+        Mesajı sınıflandırır.
+
+        Returns:
+            {"tool": tool_adı, "args": {...}, "only_available": bool, "all_departments": bool}
+            veya emin olunamadıysa None
+        """
+        text = normalize_text(user_prompt)
+        if not text or len(text) > 120 or _ACTION_KEYWORDS.search(text):
+            return None
+
+        matches_tasks = any(p.search(text) for p in _LIST_TASKS_PATTERNS)
+        matches_employees = any(p.search(text) for p in _LIST_EMPLOYEES_PATTERNS)
+        matches_workload = any(p.search(text) for p in _DEPARTMENT_WORKLOAD_PATTERNS)
+
+        # Birden fazla niyet eşleşiyorsa belirsizdir
+        if sum([matches_tasks, matches_employees, matches_workload]) != 1:
+            return None
+
+        try:
+            vocab = self._get_vocabulary()
+        except Exception as e:
+            print(f"[IntentRouter Log] Sözlük yüklenemedi, LLM'e devrediliyor: {e}")
+            return None
+
+        # Belirli bir kişi hakkındaki sorular bağlam gerektirir
+        if self._find_entities(text, {name: name for name in vocab["employees"]}):
+            return None
+
+        projects = self._find_entities(text, vocab["projects"])
+        departments = self._find_entities(text, vocab["departments"])
+        if len(set(projects)) > 1 or len(set(departments)) > 1:
+            return None
+
+        if matches_tasks:
+            if departments:
+                return None
+            args = {"project_id": projects[0]} if projects else {}
+            return {"tool": "list_tasks", "args": args, "only_available": False, "all_departments": False}
+
+        if projects:
+            return None
+
+        if matches_employees:
+            args = {"department": departments[0]} if departments else {}
+            return {
+                "tool": "list_employees",
+                "args": args,
+                "only_available": bool(_AVAILABILITY_KEYWORD.search(text)),
+                "all_departments": False
+            }
+
+        if departments:
+            return {"tool": "get_department_workload", "args": {"department": departments[0]}, "only_available": False, "all_departments": False}
+        return {
+            "tool": "get_department_workload",
+            "args": {},
+            "only_available": False,
+            "all_departments": True,
+            "departments": list(vocab["departments"].values())
+        }
@@ -5,7 +5,7 @@ from app.services.groq_service import GroqService
 from app.firebase_db import FirebaseDatabase
 from app.orchestrator import ChatOrchestrator
 from app.groq_client import GroqAgent
-from app.routers import sprints, contracts, projects, tasks, employees, chat
+from app.routers import sprints, contracts, projects, tasks, employees, chat, portfolio
 from pydantic import BaseModel
 from typing import Optional, Dict, Any
 import tempfile
@@ -48,6 +48,7 @@ app.include_router(employees.router, prefix="/api/employees", tags=["employees"]
 app.include_router(sprints.router, prefix="/api/sprints", tags=["sprints"])
 app.include_router(contracts.router, prefix="/api/contracts", tags=["contracts"])
 app.include_router(chat.router, prefix="/api/chat", tags=["chat"])
+app.include_router(portfolio.router, prefix="/api/portfolio", tags=["portfolio"])
 
 # Pydantic Models
 
@@ -1,16 +1,33 @@
 from app.base_db import BaseDatabase
 from app.groq_client import GroqAgent
 from app.tools import available_tools, inject_dependencies, get_all_tools
+from app.intent_router import IntentRouter
+from app.confirmations import create_pending_action, is_expired, verify_pending_action, apply_write_set
+from app.request_cache import RequestScopedDatabase
+from app.session_store import SessionStateStore
+from concurrent.futures import ThreadPoolExecutor
 import json
 
+# Sonucu kullanıcıya hazır mesaj olarak değil, yanıt üretmesi için modele verilen araçlar
+MODEL_ANSWERED_TOOLS = {"search_contract_clauses"}
+
 class ChatOrchestrator:
     """
     Kullanıcı girdisi, Veritabanı, Agent (LLM) ve Araçlar (Tools)
     arasındaki tüm akışı yönetir.
     """
     def __init__(self, db_client: BaseDatabase, agent_client: GroqAgent):
-        self.db = db_client
+        # Aktif proje, son mesajlar ve bekleyen onaylar bellekte tutulur (Firestore'a asenkron yazılır)
+        self.db = SessionStateStore(db_client)
         self.agent = agent_client
+        self.intent_router = IntentRouter(db_client)
+        
+        # Tool listesi ve şemaları süreç başına bir kez hazırlanır
+        self.langchain_tools = get_all_tools()
+        self.agent.prepare_tools(self.langchain_tools)
+        
+        # LLM düşünürken tool verilerini önceden okuyan havuz
+        self._prefetch_pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix="prefetch")
         print("[Orchestrator Info] ChatOrchestrator başlatıldı.")
 
     def handle_message(self, session_id: str, user_prompt: str) -> dict:
@@ -19,20 +36,29 @@ class ChatOrchestrator:
         Tool kullanımını da yönetir.
         """
         
-        # 0. Tools'a DB ve session_id erişimi ver
-        inject_dependencies(self.db, session_id)
+        # 0. Tools'a istek kapsamlı (önbellekli) DB ve session_id erişimi ver
+        request_db = RequestScopedDatabase(self.db)
+        inject_dependencies(request_db, session_id)
         
-        # 0.1 LangChain tools listesini al
-        langchain_tools = get_all_tools()
+        # 0.1 Aktif proje, görevler ve şirket yapısını ilk model çağrısıyla eş zamanlı ısıt
+        request_db.prefetch_session(session_id, self._prefetch_pool)
         
         # 1. Kullanıcının yeni mesajını 'user' rolüyle DB'ye kaydet
         self.db.save_message(session_id, {"role": "user", "content": user_prompt})
         
-        # 2. Agent'a göndermek için tüm konuşma geçmişini DB'den al
-        messages = self.db.get_chat_history(session_id)
+        # 1.1 Salt okuma isteklerini LLM'e gitmeden yanıtla (fast-path)
+        fast_response = self._try_fast_path(session_id, user_prompt)
+        if fast_response is not None:
+            return fast_response
+        
+        # 2. Agent'a göndermek için son konuşma penceresini session deposundan al
+        messages, history_offset = self.db.get_chat_window(session_id)
         
         # 3. Agent'tan (LLM) bir yanıt iste (LangChain tools ile)
-        ai_response_message = self.agent.get_response(messages, use_tools=True, tools=langchain_tools)
+        ai_response_message = self.agent.get_response(
+            messages, use_tools=True, tools=self.langchain_tools,
+            session_id=session_id, history_offset=history_offset
+        )
         
         # 4. Gelen yanıtı (bu bir tool çağrısı isteği de olsa) DB'ye kaydet
         # LangChain groq_client zaten dict döndürüyor
@@ -101,13 +127,27 @@ class ChatOrchestrator:
                     tool_result = json.loads(tool_output)
                     requires_confirmation = tool_result.get("requires_confirmation", False)
                     
+                    if function_name in MODEL_ANSWERED_TOOLS and not tool_result.get("error"):
+                        # Araç sonucu (ör. ilgili sözleşme maddeleri) soruyu yanıtlaması için modele verilir
+                        return self._answer_with_tool_result(session_id)
+                    
                     if requires_confirmation:
+                        # Önerilen aksiyonu hesaplanmış sonucuyla birlikte token altında sakla
+                        write_set = tool_result.pop("write_set", [])
+                        pending_action = create_pending_action(
+                            session_id, function_name, function_args, tool_result, write_set
+                        )
+                        self.db.save_pending_confirmation(pending_action["confirmation_token"], pending_action)
+                        
                         # Onay gerektiren durum - kullanıcıya detaylı bilgi sun
                         confirmation_data = {
                             "tool_name": function_name,
                             "tool_args": function_args,
                             "tool_result": tool_result,
-                            "confirmation_type": tool_result.get("confirmation_type", "general")
+                            "confirmation_type": tool_result.get("confirmation_type", "general"),
+                            "confirmation_token": pending_action["confirmation_token"],
+                            "content_hash": pending_action["content_hash"],
+                            "expires_at": pending_action["expires_at"]
                         }
                         
                         # Onay mesajı oluştur
@@ -149,22 +189,7 @@ class ChatOrchestrator:
                     # JSON parse hatası - normal akışa devam et
                     print("[Orchestrator Log] Tool çıktısı JSON parse edilemedi, normal akışa devam ediliyor.")
                     
-                    # Agent'ı TEKRAR çağır: Bu sefer tool'un sonucuyla birlikte
-                    print("[Orchestrator Log] Tool sonucuyla agent tekrar çağrılıyor.")
-                    final_messages = self.db.get_chat_history(session_id)
-                    
-                    # Bu sefer tool kullanmasına gerek yok
-                    final_response_message = self.agent.get_response(final_messages, use_tools=False, tools=None)
-                    final_response_dict = final_response_message
-                    
-                    # 9. Agent'ın son nihai yanıtını DB'ye kaydet
-                    self.db.save_message(session_id, final_response_dict)
-                    
-                    return {
-                        "response": final_response_dict.get("content", "Bir sorun oluştu."),
-                        "requires_confirmation": False,
-                        "confirmation_data": None
-                    }
+                    return self._answer_with_tool_result(session_id)
             
             else:
                 # Agent var olmayan bir tool çağırmaya çalışırsa
@@ -185,6 +210,84 @@ class ChatOrchestrator:
                 "confirmation_data": None
             }
     
+    def _answer_with_tool_result(self, session_id: str) -> dict:
+        """Agent'ı tool sonucunu içeren geçmişle tekrar çağırır ve nihai yanıtı döndürür."""
+        # Agent'ı TEKRAR çağır: Bu sefer tool'un sonucuyla birlikte
+        print("[Orchestrator Log] Tool sonucuyla agent tekrar çağrılıyor.")
+        final_messages, history_offset = self.db.get_chat_window(session_id)
+        
+        # Bu sefer tool kullanmasına gerek yok
+        final_response_dict = self.agent.get_response(
+            final_messages, use_tools=False, tools=None,
+            session_id=session_id, history_offset=history_offset
+        )
+        
+        # 9. Agent'ın son nihai yanıtını DB'ye kaydet
+        self.db.save_message(session_id, final_response_dict)
+        
+        return {
+            "response": final_response_dict.get("content", "Bir sorun oluştu."),
+            "requires_confirmation": False,
+            "confirmation_data": None
+        }
+    
+    def reset_session(self, session_id: str):
+        """Session'ın bellekteki durumunu ve agent'ın dönüştürülmüş geçmişini temizler."""
+        # Bekleyen yazmalar silinen geçmişi yeniden oluşturmasın
+        self.db.flush()
+        self.db.reset_session(session_id)
+        self.agent.reset_session(session_id)
+    
+    def _try_fast_path(self, session_id: str, user_prompt: str):
+        """
+        IntentRouter emin olduğunda ilgili tool'u doğrudan çalıştırır ve
+        deterministik şablonla yanıt üretir. Emin değilse None döner.
+        """
+        intent = self.intent_router.route(user_prompt)
+        if not intent:
+            return None
+        
+        function_name = intent["tool"]
+        tool_object = available_tools.get(function_name)
+        if tool_object is None:
+            return None
+        
+        try:
+            if intent.get("all_departments"):
+                departments = []
+                for department in intent.get("departments", []):
+                    dept_result = json.loads(tool_object.invoke({"department": department}))
+                    if "error" not in dept_result:
+                        departments.append(dept_result)
+                tool_result = {"departments": departments}
+            else:
+                tool_result = json.loads(tool_object.invoke(intent["args"]))
+        except Exception as e:
+            print(f"[Orchestrator Log] Fast-path başarısız, LLM'e devrediliyor: {e}")
+            return None
+        
+        if "error" in tool_result:
+            return None
+        
+        if intent.get("only_available") and "employees" in tool_result:
+            tool_result["employees"] = [
+                emp for emp in tool_result["employees"]
+                if emp.get("availability", "available") == "available"
+            ]
+        
+        print(f"[Orchestrator Log] Fast-path ile yanıtlandı: {function_name}")
+        user_friendly_message = self._create_user_friendly_message(tool_result, function_name)
+        self.db.save_message(session_id, {
+            "role": "assistant",
+            "content": user_friendly_message
+        })
+        
+        return {
+            "response": user_friendly_message,
+            "requires_confirmation": False,
+            "confirmation_data": None
+        }
+    
     def _create_user_friendly_message(self, tool_result: dict, function_name: str) -> str:
         """
         Onay gerektirmeyen tool sonucu için kullanıcı dostu mesaj oluşturur.
@@ -233,10 +336,12 @@ class ChatOrchestrator:
             if employees:
                 message = f"👥 **Çalışan Listesi** ({len(employees)} kişi)\n\n"
                 for i, emp in enumerate(employees[:10], 1):  # İlk 10 çalışanı göster
-                    workload_emoji = "🟢" if emp.get("currentWorkload") == "low" else "🟡" if emp.get("currentWorkload") == "medium" else "🔴"
-                    message += f"{i}. {workload_emoji} **{emp.get('firstName', '')} {emp.get('lastName', '')}**\n"
+                    workload = emp.get("currentWorkload", emp.get("workload"))
+                    name = emp.get("name") or f"{emp.get('firstName', '')} {emp.get('lastName', '')}"
+                    workload_emoji = "🟢" if workload == "low" else "🟡" if workload == "medium" else "🔴"
+                    message += f"{i}. {workload_emoji} **{name}**\n"
                     message += f"   🏢 Departman: {emp.get('department', 'Bilinmeyen')}\n"
-                    message += f"   💼 İş Yükü: {emp.get('currentWorkload', 'Bilinmeyen')}\n"
+                    message += f"   💼 İş Yükü: {workload or 'Bilinmeyen'}\n"
                     if emp.get('techStack'):
                         techs = emp.get('techStack', [])[:3]  # İlk 3 teknoloji
                         message += f"   🛠️ Teknolojiler: {', '.join(techs)}\n"
@@ -249,6 +354,44 @@ class ChatOrchestrator:
             else:
                 return "👥 Henüz hiç çalışan bulunmuyor."
         
+        elif function_name == "get_department_workload":
+            departments = tool_result.get("departments", [tool_result])
+            if not departments:
+                return "🏢 Henüz hiç departman bulunmuyor."
+            
+            # En yoğun departman en üstte
+            departments = sorted(
+                departments,
+                key=lambda d: (d.get("workload_distribution", {}).get("high", 0), d.get("total_employees", 0)),
+                reverse=True
+            )
+            message = f"🏢 **Departman İş Yükü** ({len(departments)} departman)\n\n"
+            for i, dept in enumerate(departments, 1):
+                distribution = dept.get("workload_distribution", {})
+                message += f"{i}. **{dept.get('department', 'Bilinmeyen')}** ({dept.get('total_employees', 0)} kişi)\n"
+                message += f"   🔴 Yüksek: {distribution.get('high', 0)}  🟡 Orta: {distribution.get('medium', 0)}  🟢 Düşük: {distribution.get('low', 0)}\n\n"
+            
+            return message
+        
+        elif function_name == "predict_project_delays":
+            analysis = tool_result.get("analysis", {})
+            simulation = analysis.get("simulation", {})
+            percentiles = simulation.get("percentiles", {})
+
+            message = f"📈 **Teslim Tarihi Tahmini** ({tool_result.get('project_name', 'Proje')})\n\n"
+            if simulation.get("on_time_probability") is not None:
+                message += f"**Gecikme Riski:** {analysis.get('overall_delay_risk', 'Bilinmeyen')}\n"
+                message += f"**Zamanında Bitme Olasılığı:** %{simulation['on_time_probability'] * 100:.0f}\n"
+            else:
+                message += "**Gecikme Riski:** Hedef teslim tarihi olmadığı için hesaplanmadı\n"
+            message += f"**P50 / P80 / P95:** {percentiles.get('p50')} / {percentiles.get('p80')} / {percentiles.get('p95')}\n\n"
+            if analysis.get("explanation"):
+                message += f"{analysis['explanation']}\n\n"
+            for risk in analysis.get("risk_factors", [])[:4]:
+                message += f"• {risk.get('description')}\n"
+
+            return message
+
         elif function_name == "list_projects":
             projects = tool_result.get("projects", [])
             if projects:
@@ -322,6 +465,37 @@ class ChatOrchestrator:
             
             message += "Bu yeniden atamayı onaylıyor musunuz?"
             
+        elif function_name == "bulk_reassign_employee_tasks":
+            reassignments = tool_result.get("reassignments", [])
+            delays = tool_result.get("delays", [])
+            
+            message = f"**Toplu Yeniden Atama Önerisi**\n\n"
+            message += f"**Çalışan:** {tool_result.get('employee_name', 'Bilinmeyen Kişi')}\n"
+            message += f"**Tarih Aralığı:** {tool_result.get('start_date')} - {tool_result.get('end_date')}\n"
+            message += f"**Etkilenen Görev:** {tool_result.get('affected_tasks', 0)}\n\n"
+            
+            if reassignments:
+                message += "**Yeniden Atamalar:**\n"
+                for item in reassignments:
+                    message += f"• {item['title']} ({item['project_name']}) → {item['to_employee_name']}\n"
+                message += "\n"
+            
+            if delays:
+                message += "**Ertelenen Görevler (uygun kişi yok):**\n"
+                for item in delays:
+                    message += f"• {item['title']} ({item['project_name']}) → {item['new_start_date']}\n"
+                message += "\n"
+            
+            for item in tool_result.get("cascade", []):
+                sprint = item.get("sprint") or {}
+                if item.get("delayed_dependents") or sprint.get("tasks_moved") or sprint.get("sprints_added"):
+                    message += f"**{item['project_name']} etkisi:** {len(item.get('delayed_dependents', []))} bağımlı görev gecikiyor"
+                    if sprint:
+                        message += f", {len(sprint.get('tasks_moved', []))} görev sprint değiştiriyor, bitiş: {sprint.get('projected_end_date')}"
+                    message += "\n"
+            
+            message += "\nTüm değişiklikler tek seferde uygulanacak. Onaylıyor musunuz?"
+            
         else:
             # Genel onay mesajı
             message = f"**Aksiyon Onayı Gerekli**\n\n"
@@ -331,39 +505,69 @@ class ChatOrchestrator:
         
         return message
     
+    def _create_applied_message(self, tool_result: dict, function_name: str) -> str:
+        """
+        Onaylanıp uygulanan aksiyon için kullanıcı dostu mesaj oluşturur.
+        """
+        if function_name == "reassign_task_to_employee":
+            message = "✅ **Görev Yeniden Atandı**\n\n"
+            message += f"**Görev:** {tool_result.get('task_title', 'Bilinmeyen Görev')}\n"
+            message += f"**Yeni Atanan:** {tool_result.get('new_assignee', 'Bilinmeyen Kişi')}\n"
+            message += f"**Gerekçe:** {tool_result.get('reason', 'Belirtilmemiş')}\n\n"
+            message += "Onayladığınız öneri aynen uygulandı."
+            return message
+        
+        if function_name == "bulk_reassign_employee_tasks":
+            message = "✅ **Toplu Yeniden Atama Uygulandı**\n\n"
+            message += f"**Çalışan:** {tool_result.get('employee_name', 'Bilinmeyen Kişi')}\n"
+            message += f"**Yeniden Atanan:** {len(tool_result.get('reassignments', []))} görev\n"
+            message += f"**Ertelenen:** {len(tool_result.get('delays', []))} görev\n\n"
+            message += "Onayladığınız öneri aynen uygulandı."
+            return message
+        
+        return f"✅ Onaylanan işlem uygulandı: {function_name}"
+    
     def handle_confirmation(self, session_id: str, confirmation_data: dict, confirmed: bool) -> str:
         """
         Kullanıcı onayını işler ve gerekli aksiyonu gerçekleştirir.
+        Onayda öneri yeniden hesaplanmaz; token altında saklanan yazma kümesi uygulanır.
         """
         try:
             tool_name = confirmation_data.get("tool_name")
-            tool_args = confirmation_data.get("tool_args", {})
             tool_result = confirmation_data.get("tool_result", {})
+            token = confirmation_data.get("confirmation_token")
+            
+            pending_action = self.db.get_pending_confirmation(token) if token else None
+            if not pending_action or pending_action.get("session_id") != session_id:
+                message = "Onay bilgisi bulunamadı. Lütfen isteğinizi tekrarlayın."
+                self.db.save_message(session_id, {"role": "assistant", "content": message})
+                return message
+            
+            if is_expired(pending_action):
+                self.db.delete_pending_confirmation(token)
+                message = "Onay süresi doldu. Güncel verilerle yeni bir öneri almak için isteğinizi tekrarlayın."
+                self.db.save_message(session_id, {"role": "assistant", "content": message})
+                return message
+            
+            tool_name = pending_action.get("tool_name", tool_name)
+            tool_result = pending_action.get("tool_result", tool_result)
             
             if confirmed:
-                # Onay verildi - tool'u çalıştır
-                if tool_name in available_tools:
-                    tool_object = available_tools[tool_name]
-                    
-                    # Tool'u tekrar çalıştır (bu sefer gerçekten uygula)
-                    tool_output = tool_object.invoke(tool_args)
-                    
-                    # Sonucu DB'ye kaydet
-                    self.db.save_message(session_id, {
-                        "role": "tool",
-                        "name": tool_name,
-                        "content": tool_output
-                    })
-                    
-                    # Agent'a sonucu gönder ve final yanıt al
-                    messages = self.db.get_chat_history(session_id)
-                    final_response = self.agent.get_response(messages, use_tools=False, tools=None)
-                    self.db.save_message(session_id, final_response)
-                    
-                    return final_response.get("content", "Aksiyon başarıyla gerçekleştirildi.")
-                else:
-                    return "Hata: Tool bulunamadı."
+                if not verify_pending_action(pending_action, confirmation_data.get("content_hash")):
+                    message = "Hata: Onaylanan öneri ile saklanan öneri eşleşmiyor. İşlem uygulanmadı."
+                    self.db.save_message(session_id, {"role": "assistant", "content": message})
+                    return message
+                
+                # Onay verildi - saklanan yazma kümesini uygula
+                apply_write_set(self.db, pending_action.get("write_set", []))
+                self.db.delete_pending_confirmation(token)
+                
+                message = self._create_applied_message(tool_result, tool_name)
+                self.db.save_message(session_id, {"role": "assistant", "content": message})
+                return message
             else:
+                self.db.delete_pending_confirmation(token)
+                
                 # Onay reddedildi - alternatif öneriler sun
                 if tool_name == "assign_task_to_employee":
                     alternatives = tool_result.get("alternatives", [])
@@ -0,0 +1,168 @@
+import copy
+import threading
+from concurrent.futures import Future, Executor
+from typing import Dict, Any, Callable, Optional, Tuple
+
+# Bu önekle başlayan devredilen metotlar okuma kabul edilir, önbelleği etkilemez
+READ_PREFIXES = ("get_", "list_", "find_", "open_", "download_")
+
+
+class RequestScopedDatabase:
+    """
+    Tek bir chat isteği boyunca geçerli, okuma önbellekli veritabanı sarmalayıcısı.
+
+    Okumalar Future olarak saklanır: önceden başlatılmış (prefetch) bir okuma devam
+    ederken aynı veriyi isteyen tool yeni bir DB çağrısı yapmaz, sonucu bekler.
+    Yazmalar doğrudan alttaki istemciye gider ve ilgili önbellek kayıtlarını geçersiz kılar.
+    """
+    def __init__(self, db_client):
+        self._db = db_client
+        self._entries: Dict[Tuple, Future] = {}
+        self._lock = threading.Lock()
+
+    def __getattr__(self, name):
+        # Önbelleklenmeyen tüm metotlar alttaki istemciye devredilir
+        attr = getattr(self._db, name)
+        if not callable(attr) or name.startswith(READ_PREFIXES):
+            return attr
+
+        # Burada ayrıca tanımlanmamış yazmalar (save_sprint, update_sprint_health, ...) hangi
+        # kayıtları etkilediği bilinmediğinden tüm önbelleği geçersiz kılar
+        def write(*args, **kwargs):
+            try:
+                return attr(*args, **kwargs)
+            finally:
+                self.invalidate_all()
+        return write
+
+    # --- ÖNBELLEK ALTYAPISI ---
+
+    def _get_entry(self, key: Tuple) -> Tuple[Future, bool]:
+        with self._lock:
+            future = self._entries.get(key)
+            if future is not None:
+                return future, False
+            future = Future()
+            self._entries[key] = future
+            return future, True
+
+    def _run_loader(self, key: Tuple, future: Future, loader: Callable[[], Any]):
+        try:
+            future.set_result(loader())
+        except Exception as e:
+            # Hatalı okuma önbellekte kalmasın, sonraki çağrı tekrar denesin
+            with self._lock:
+                if self._entries.get(key) is future:
+                    del self._entries[key]
+            future.set_exception(e)
+
+    def _cached(self, key: Tuple, loader: Callable[[], Any]) -> Any:
+        future, is_owner = self._get_entry(key)
+        if is_owner:
+            self._run_loader(key, future, loader)
+        # Tool'lar dönen veriyi değiştirebildiği için kopya verilir
+        return copy.deepcopy(future.result())
+
+    def _prefetch(self, key: Tuple, loader: Callable[[], Any], executor: Executor) -> Future:
+        future, is_owner = self._get_entry(key)
+        if is_owner:
+            executor.submit(self._run_loader, key, future, loader)
+        return future
+
+    def invalidate(self, *keys: Tuple):
+        with self._lock:
+            for key in keys:
+                self._entries.pop(key, None)
+
+    def invalidate_all(self):
+        with self._lock:
+            self._entries.clear()
+
+    # --- ÖNBELLEKLİ OKUMALAR ---
+
+    def get_active_project(self, session_id: str) -> Optional[str]:
+        return self._cached(("active_project", session_id), lambda: self._db.get_active_project(session_id))
+
+    def get_project(self, project_id: str) -> Optional[Dict[str, Any]]:
+        return self._cached(("project", project_id), lambda: self._db.get_project(project_id))
+
+    def list_projects(self):
+        return self._cached(("projects",), self._db.list_projects)
+
+    def get_tasks(self, project_id: str):
+        return self._cached(("tasks", project_id), lambda: self._db.get_tasks(project_id))
+
+    def get_company_structure(self) -> Optional[Dict[str, Any]]:
+        return self._cached(("company",), self._db.get_company_structure)
+
+    def get_employee_workloads(self) -> Dict[str, Dict[str, Any]]:
+        return self._cached(("workloads",), self._db.get_employee_workloads)
+
+    # --- ÖNBELLEĞİ GEÇERSİZ KILAN YAZMALAR ---
+
+    def set_active_project(self, session_id: str, project_id: str):
+        self._db.set_active_project(session_id, project_id)
+        self.invalidate(("active_project", session_id))
+
+    def save_project(self, project_id: str, project_data: Dict[str, Any]):
+        self._db.save_project(project_id, project_data)
+        self.invalidate(("project", project_id), ("projects",))
+
+    def save_tasks(self, project_id: str, tasks):
+        self._db.save_tasks(project_id, tasks)
+        self.invalidate(("tasks", project_id), ("workloads",))
+
+    def delete_tasks(self, project_id: str, task_ids):
+        self._db.delete_tasks(project_id, task_ids)
+        self.invalidate(("tasks", project_id), ("workloads",))
+
+    def update_task_dates(self, task_id: str, project_id: str, *args, **kwargs):
+        self._db.update_task_dates(task_id, project_id, *args, **kwargs)
+        self.invalidate(("tasks", project_id))
+
+    def update_task_status(self, task_id: str, project_id: str, *args, **kwargs):
+        self._db.update_task_status(task_id, project_id, *args, **kwargs)
+        self.invalidate(("tasks", project_id), ("workloads",))
+
+    def reassign_task(self, task_id: str, project_id: str, *args, **kwargs):
+        self._db.reassign_task(task_id, project_id, *args, **kwargs)
+        self.invalidate(("tasks", project_id), ("workloads",))
+
+    def save_company_structure(self, company_data: Dict[str, Any]):
+        self._db.save_company_structure(company_data)
+        self.invalidate(("company",))
+
+    def update_employee_availability(self, *args, **kwargs):
+        self._db.update_employee_availability(*args, **kwargs)
+        self.invalidate(("company",))
+
+    def apply_batch(self, write_set):
+        self._db.apply_batch(write_set)
+        keys = {("tasks", op["args"]["project_id"]) for op in write_set if "project_id" in op.get("args", {})}
+        keys.add(("workloads",))
+        if any(op.get("op") in ("update_employee_availability", "save_company_structure") for op in write_set):
+            keys.add(("company",))
+        self.invalidate(*keys)
+
+    # --- PREFETCH ---
+
+    def prefetch_session(self, session_id: str, executor: Executor):
+        """
+        Session'ın aktif projesini çözer ve proje, görevler ile şirket yapısını
+        arka planda önbelleğe ısıtır. Çağıran beklemez.
+        """
+        self._prefetch(("company",), self._db.get_company_structure, executor)
+        active_future = self._prefetch(
+            ("active_project", session_id), lambda: self._db.get_active_project(session_id), executor
+        )
+
+        def _warm_project(done: Future):
+            if done.exception() is not None:
+                return
+            project_id = done.result()
+            if not project_id:
+                return
+            self._prefetch(("project", project_id), lambda: self._db.get_project(project_id), executor)
+            self._prefetch(("tasks", project_id), lambda: self._db.get_tasks(project_id), executor)
+
+        active_future.add_done_callback(_warm_project)
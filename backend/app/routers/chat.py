@@ -74,6 +74,9 @@ async def clear_chat_history(session_id: str):
     Belirli bir session'ın chat geçmişini temizle.
     """
     try:
+        if _orchestrator is not None:
+            _orchestrator.reset_session(session_id)
+        
         # Firebase'de chat history'yi temizle
         db_client = get_db()
         db_client.db.collection('chat_history').document(session_id).delete()
@@ -4,6 +4,8 @@ from typing import Optional, List, Dict, Any
 import uuid
 import json
 from app.firebase_db import FirebaseDatabase
+from app.services.task_dedup import dedupe_tasks
+from app.services.clause_index import clause_index
 
 router = APIRouter()
 
@@ -86,12 +88,16 @@ Lütfen bu görevi EN UYGUN çalışana ata. Sadece JSON formatında yanıt ver.
 class ContractAnalysisRequest(BaseModel):
     contract_text: str
     contract_name: str = "Contract Document"
+    force: bool = False  # Aynı metin daha önce analiz edilmişse bile yeniden analiz et
 
 class ContractAnalysisResponse(BaseModel):
     status: str
     contract_id: str
     message: str
     analysis: Dict[str, Any]
+    duplicate_of: Optional[str] = None
+    duplicates_removed: int = 0
+    duplicates_flagged: int = 0
 
 class ContractResponse(BaseModel):
     contract_id: str
@@ -138,38 +144,95 @@ async def upload_contract(file: UploadFile = File(...)):
         if not file.content_type == "application/pdf":
             raise HTTPException(status_code=400, detail="Sadece PDF dosyaları kabul edilir")
         
-        # Dosyayı oku
-        file_content = await file.read()
-        
-        # Dosya boyutunu kontrol et (max 10MB)
-        file_size = len(file_content)
-        if file_size > 10 * 1024 * 1024:
-            raise HTTPException(status_code=400, detail="Dosya boyutu çok büyük (max 10MB)")
-        
-        # Firebase Storage'a yükle
-        file_path = f"contracts/{uuid.uuid4().hex}.pdf"
-        file_url = get_db().upload_file(file_path, file_content, "application/pdf")
+        # Dosyayı parça parça hash'leyerek yerel depoya yaz (bellekte tutulmaz)
+        from app.services.contract_spool import contract_spool, UploadTooLargeError
+        try:
+            ingest = await contract_spool.ingest(file)
+        except UploadTooLargeError as e:
+            raise HTTPException(status_code=400, detail=str(e))
         
         # Contract kaydı oluştur
         contract_id = f"contract_{uuid.uuid4().hex[:8]}"
         contract_data = {
             "contract_name": file.filename,
-            "file_path": file_path,
-            "file_url": file_url,
             "status": "uploaded",
-            "file_size": file_size
+            "file_size": ingest["file_size"],
+            "content_hash": ingest["content_hash"]
         }
+        
+        # Aynı içerik daha önce analiz edildiyse mevcut blob ve analize bağlan; henüz analiz edilmediyse
+        # yalnızca blob paylaşılır (kayıt bağımsız kalır). Yalnızca yeni içerik Storage'a yüklenir.
+        from app.services.contract_fingerprint import link_to_existing
+        existing = get_db().find_contract_by_fingerprint("content_hash", ingest["content_hash"])
+        if not link_to_existing(contract_data, existing, contract_id) and existing and existing.get("file_path"):
+            contract_data["file_path"] = existing["file_path"]
+            contract_data["file_url"] = existing.get("file_url")
+        if not contract_data.get("file_path"):
+            file_path = f"contracts/{uuid.uuid4().hex}.pdf"
+            contract_data["file_path"] = file_path
+            contract_data["file_url"] = contract_spool.publish(ingest["local_path"], get_db(), file_path, "application/pdf")
+        file_url = contract_data["file_url"]
         get_db().save_contract(contract_id, contract_data)
         
-        return {
+        response = {
             "contract_id": contract_id,
             "file_url": file_url,
             "message": "Sözleşme başarıyla yüklendi"
         }
+        if contract_data.get("duplicate_of"):
+            response["duplicate_of"] = contract_data["duplicate_of"]
+            response["status"] = contract_data["status"]
+            response["message"] = "Bu sözleşme daha önce yüklenmiş, mevcut kayda bağlandı"
+        return response
         
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Sözleşme yükleme hatası: {str(e)}")
 
+@router.post("/batch")
+async def batch_ingest_contracts(files: List[UploadFile] = File(...), auto_assign: bool = True, force: bool = False):
+    """
+    Çok sayıda PDF sözleşmeyi tek istekte yükler ve aşamalı boru hattıyla analiz eder.
+    Ayrıştırma, analiz, task üretimi ve atama ayrı eşzamanlılık sınırlarıyla çalışır.
+    
+    Returns:
+        Doküman başına durum raporu
+    """
+    try:
+        from app.services.contract_pipeline import ContractPipeline
+        from app.services.contract_spool import UploadTooLargeError
+        
+        pipeline = ContractPipeline(get_db(), auto_assign=auto_assign, force=force)
+        documents = []
+        rejected = []
+        for file in files:
+            if file.content_type != "application/pdf":
+                rejected.append({"document": file.filename, "status": "rejected", "error": "Sadece PDF dosyaları kabul edilir"})
+                continue
+            try:
+                documents.append(await pipeline.ingest_upload(file))
+            except UploadTooLargeError as e:
+                rejected.append({"document": file.filename, "status": "rejected", "error": str(e)})
+        
+        reports = await pipeline.run(documents) if documents else []
+        results = reports + rejected
+        summary = {}
+        for report in results:
+            summary[report["status"]] = summary.get(report["status"], 0) + 1
+        
+        return {
+            "status": "success",
+            "total_documents": len(files),
+            "summary": summary,
+            "documents": results,
+            "message": f"{summary.get('analyzed', 0)} sözleşme analiz edildi, {summary.get('duplicate', 0)} yinelenen, "
+                       f"{summary.get('failed', 0) + summary.get('rejected', 0)} başarısız"
+        }
+        
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Toplu sözleşme aktarım hatası: {str(e)}")
+
 @router.post("/analyze", response_model=ContractAnalysisResponse)
 async def analyze_contract(request: ContractAnalysisRequest):
     """
@@ -177,48 +240,81 @@ async def analyze_contract(request: ContractAnalysisRequest):
     """
     try:
         from app.services.groq_service import GroqService
+        from app.services.contract_fingerprint import text_sha256, link_to_existing
+        
+        # Aynı metin daha önce analiz edildiyse mevcut analize bağlan
+        text_hash = text_sha256(request.contract_text)
+        contract_id = f"contract_{uuid.uuid4().hex[:8]}"
+        if not request.force:
+            existing = get_db().find_contract_by_fingerprint("text_hash", text_hash)
+            contract_data = {
+                "contract_name": request.contract_name,
+                "contract_text": request.contract_text,
+                "text_hash": text_hash
+            }
+            if existing and existing.get("analysis") and link_to_existing(contract_data, existing, contract_id):
+                get_db().save_contract(contract_id, contract_data)
+                return ContractAnalysisResponse(
+                    status="success",
+                    contract_id=contract_id,
+                    message="Bu sözleşme daha önce analiz edilmiş, mevcut analiz kullanıldı",
+                    analysis=contract_data["analysis"],
+                    duplicate_of=contract_data["duplicate_of"]
+                )
+        
+        from app.services.contract_preprocessor import prepare_for_analysis
         
         groq_service = GroqService()
         
-        # Sözleşmeyi analiz et
-        analysis = groq_service.analyze_project(request.contract_text)
+        # Sözleşmeyi sadeleştir ve analiz et
+        analysis_text, preprocessing = prepare_for_analysis(request.contract_text)
+        analysis = groq_service.analyze_project(analysis_text)
         
-        # Proje oluştur
+        # Proje oluştur, yakın kopya taskları birleştir
         tasks = groq_service.generate_tasks(analysis)
+        for task in tasks:
+            task.setdefault("task_id", f"task_{uuid.uuid4().hex[:8]}")
+        tasks, dedup_report = dedupe_tasks(tasks)
         
         # Proje ID oluştur ve kaydet
         project_id = f"project_{uuid.uuid4().hex[:8]}"
         get_db().save_project(project_id, analysis)
         get_db().save_tasks(project_id, tasks)
         
-        # Contract kaydet
-        contract_id = f"contract_{uuid.uuid4().hex[:8]}"
-        get_db().save_contract(contract_id, {
+        # Contract kaydet ve maddelerini arama indeksine ekle
+        contract_data = {
             "contract_name": request.contract_name,
             "contract_text": request.contract_text,
+            "text_hash": text_hash,
+            **preprocessing,
             "analysis": analysis,
             "project_id": project_id,
             "status": "analyzed"
-        })
+        }
+        get_db().save_contract(contract_id, contract_data)
+        clause_index.index_record({**contract_data, "contract_id": contract_id})
         
         return ContractAnalysisResponse(
             status="success",
             contract_id=contract_id,
             message="Sözleşme başarıyla analiz edildi",
-            analysis=analysis
+            analysis=analysis,
+            duplicates_removed=dedup_report["removed"],
+            duplicates_flagged=dedup_report["flagged"]
         )
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Sözleşme analiz hatası: {str(e)}")
 
 @router.post("/{contract_id}/analyze")
-async def analyze_uploaded_contract(contract_id: str, auto_assign: bool = True):
+async def analyze_uploaded_contract(contract_id: str, auto_assign: bool = True, force: bool = False):
     """
     Yüklenmiş bir sözleşmeyi analiz et, projeye dönüştür ve otomatik task ataması yap.
     
     Args:
         contract_id: Sözleşme ID'si
         auto_assign: True ise taskları otomatik olarak çalışanlara atar (varsayılan: True)
+        force: True ise aynı içerik daha önce analiz edilmiş olsa bile yeniden analiz eder
     """
     try:
         # Sözleşmeyi al
@@ -226,51 +322,77 @@ async def analyze_uploaded_contract(contract_id: str, auto_assign: bool = True):
         if not contract:
             raise HTTPException(status_code=404, detail="Sözleşme bulunamadı")
         
-        # Dosya URL'sini al
-        file_url = contract.get("file_url")
-        if not file_url:
-            raise HTTPException(status_code=400, detail="Sözleşme dosyası bulunamadı")
+        # Aynı içerik daha önce analiz edildiyse mevcut proje ve analizi döndür
+        if not force:
+            from app.services.contract_fingerprint import link_to_existing
+            if contract.get("status") != "analyzed" and contract.get("content_hash"):
+                existing = get_db().find_contract_by_fingerprint("content_hash", contract["content_hash"])
+                if link_to_existing(contract, existing, contract_id):
+                    get_db().save_contract(contract_id, contract)
+            if contract.get("status") == "analyzed" and contract.get("project_id"):
+                tasks = get_db().get_tasks(contract["project_id"])
+                return {
+                    "status": "success",
+                    "contract_id": contract_id,
+                    "project_id": contract["project_id"],
+                    "duplicate_of": contract.get("duplicate_of"),
+                    "message": "Sözleşme daha önce analiz edilmiş, mevcut analiz kullanıldı",
+                    "analysis": contract.get("analysis", {}),
+                    "total_tasks": len(tasks),
+                    "tasks": tasks
+                }
         
         # LlamaParse ile parse et
         from app.services.llamaparse_service import LlamaParseService
         from app.services.groq_service import GroqService
-        import tempfile
-        import os
-        import requests
+        from app.services.contract_spool import contract_spool
         
-        llamaparse = LlamaParseService()
         groq_service = GroqService()
         
-        # Dosyayı indir
-        response = requests.get(file_url)
-        if response.status_code != 200:
-            raise HTTPException(status_code=400, detail="Dosya indirilemedi")
+        # Daha önce ayrıştırılmış metin varsa (yeniden analiz) tekrar parse edilmez
+        parsed_text = contract.get("parsed_text")
+        if not parsed_text:
+            # Dosyayı yerel depodan al (yoksa storage istemcisiyle indirilir)
+            local_path = contract_spool.local_path(contract, get_db())
+            if not local_path:
+                raise HTTPException(status_code=400, detail="Sözleşme dosyası bulunamadı")
+            
+            # Parse et
+            parsed_text = LlamaParseService().parse_pdf(local_path, content_hash=contract.get("content_hash"))
+        
+        # Sadeleştir ve analiz et (temiz metin ve orijinal ofset eşlemesi sözleşmede saklanır)
+        from app.services.contract_preprocessor import prepare_for_analysis
+        analysis_text, preprocessing = prepare_for_analysis(parsed_text)
+        analysis = groq_service.analyze_project(analysis_text)
+        
+        # Proje adını belirle (AI'dan gelen öncelikli)
+        if not analysis.get("project_name") or analysis.get("project_name") == "Yeni Proje":
+            # AI bulamadıysa sözleşme adını kullan
+            contract_name = contract.get("contract_name", "Sözleşme Projesi")
+            # .pdf uzantısını temizle
+            if contract_name.lower().endswith('.pdf'):
+                contract_name = contract_name[:-4]
+            analysis["project_name"] = contract_name
+        
+        print(f"[Contract Analysis] Proje adı belirlendi: {analysis['project_name']}")
         
-        # Geçici dosya oluştur
-        with tempfile.NamedTemporaryFile(delete=False, suffix=".pdf") as tmp:
-            tmp.write(response.content)
-            tmp_path = tmp.name
+        # Projeyi kaydet (paralel task üretiminde tasklar geldikçe kaydedilir, proje hemen kullanılabilir)
+        project_id = f"project_{uuid.uuid4().hex[:8]}"
+        get_db().save_project(project_id, analysis)
+        get_db().save_contract(contract_id, {**contract, "status": "generating_tasks", "project_id": project_id})
+        
+        def persist_task_group(group_id: str, group_tasks: List[Dict[str, Any]]):
+            for task in group_tasks:
+                task["task_id"] = f"task_{uuid.uuid4().hex[:8]}"
+                task["status"] = "pending"
+                task["project_id"] = project_id
+                task["task_attended_to"] = ""
+                task["assigned_employee_id"] = None
+            get_db().save_tasks(project_id, group_tasks)
         
         try:
-            # Parse et
-            parsed_text = llamaparse.parse_pdf(tmp_path)
-            
-            # Analiz et
-            analysis = groq_service.analyze_project(parsed_text)
-            
-            # Proje adını belirle (AI'dan gelen öncelikli)
-            if not analysis.get("project_name") or analysis.get("project_name") == "Yeni Proje":
-                # AI bulamadıysa sözleşme adını kullan
-                contract_name = contract.get("contract_name", "Sözleşme Projesi")
-                # .pdf uzantısını temizle
-                if contract_name.lower().endswith('.pdf'):
-                    contract_name = contract_name[:-4]
-                analysis["project_name"] = contract_name
-            
-            print(f"[Contract Analysis] Proje adı belirlendi: {analysis['project_name']}")
-            
             # Tasklar oluştur
-            tasks = groq_service.generate_tasks(analysis)
+            tasks = groq_service.generate_tasks(analysis, on_tasks=persist_task_group)
             
             # Task'ların düzgün formatını kontrol et ve filtrele
             valid_tasks = []
@@ -284,115 +406,277 @@ async def analyze_uploaded_contract(contract_id: str, auto_assign: bool = True):
             
             if not tasks:
                 raise HTTPException(status_code=500, detail="Hiç geçerli task oluşturulamadı")
+        except Exception as e:
+            # Yarım kalan proje ve akıtılmış tasklar silinir, sözleşme başarısız olarak işaretlenir
+            detail = e.detail if isinstance(e, HTTPException) else f"Task üretimi hatası: {str(e)}"
+            get_db().delete_project(project_id)
+            get_db().save_contract(contract_id, {**contract, "status": "failed", "error": detail, "project_id": None})
+            print(f"[Contract Analysis] Task üretimi başarısız, proje silindi: {project_id}")
+            raise HTTPException(status_code=500, detail=detail)
+        
+        print(f"[Contract Analysis] {len(tasks)} geçerli task oluşturuldu")
+        
+        # Yakın kopya taskları atama ve kayıttan önce birleştir veya işaretle (kaydedilmiş kopyalar silinir);
+        # kimlikler önce verilir ki işaretlenen kopyalar tutulan taskın task_id'sine bağlansın
+        for task in tasks:
+            task.setdefault("task_id", f"task_{uuid.uuid4().hex[:8]}")
+        tasks, dedup_report = dedupe_tasks(tasks)
+        if dedup_report["removed_task_ids"]:
+            get_db().delete_tasks(project_id, dedup_report["removed_task_ids"])
+        
+        # Otomatik atama yapılacaksa
+        assignment_results = []
+        if auto_assign:
+            print(f"[Contract Analysis] {len(tasks)} task için otomatik atama başlatılıyor...")
             
-            print(f"[Contract Analysis] {len(tasks)} geçerli task oluşturuldu")
-            
-            # Projeyi kaydet
-            project_id = f"project_{uuid.uuid4().hex[:8]}"
-            get_db().save_project(project_id, analysis)
-            
-            # Otomatik atama yapılacaksa
-            assignment_results = []
-            if auto_assign:
-                print(f"[Contract Analysis] {len(tasks)} task için otomatik atama başlatılıyor...")
+            # Şirket yapısını al
+            company_data = get_db().get_company_structure()
+            if company_data:
+                # Tüm çalışanları düz listeye çevir
+                all_employees = []
+                for department in company_data.get("companyStructure", {}).get("departments", []):
+                    dept_name = department["name"]
+                    for team in department.get("teams", []):
+                        team_name = team["name"]
+                        for employee in team.get("employees", []):
+                            all_employees.append({
+                                **employee,
+                                "department": dept_name,
+                                "team": team_name
+                            })
                 
-                # Şirket yapısını al
-                company_data = get_db().get_company_structure()
-                if company_data:
-                    # Tüm çalışanları düz listeye çevir
-                    all_employees = []
-                    for department in company_data.get("companyStructure", {}).get("departments", []):
-                        dept_name = department["name"]
-                        for team in department.get("teams", []):
-                            team_name = team["name"]
-                            for employee in team.get("employees", []):
-                                all_employees.append({
-                                    **employee,
-                                    "department": dept_name,
-                                    "team": team_name
-                                })
-                    
-                    # Her task için uygun çalışan bul ve ata
-                    for i, task in enumerate(tasks):
-                        try:
-                            # Task ID oluştur
-                            task["task_id"] = f"task_{uuid.uuid4().hex[:8]}"
-                            task["status"] = "pending"
-                            task["project_id"] = project_id
+                # Her task için uygun çalışan bul ve ata
+                for i, task in enumerate(tasks):
+                    try:
+                        task["project_id"] = project_id
+                        # Kopya olarak işaretlenen tasklar atanmaz
+                        if task.get("duplicate_of"):
+                            task["task_attended_to"] = ""
+                            task["assigned_employee_id"] = None
+                            continue
+                        task["status"] = "pending"
+                        
+                        # AI ile atama yap
+                        assigned_employee = _auto_assign_task_to_employee(
+                            task, all_employees, groq_service
+                        )
+                        
+                        if assigned_employee:
+                            task["task_attended_to"] = assigned_employee["assigned_employee_name"]
+                            task["assigned_employee_id"] = assigned_employee["assigned_employee_id"]
+                            task["assignment_reason"] = assigned_employee["assignment_reason"]
                             
-                            # AI ile atama yap
-                            assigned_employee = _auto_assign_task_to_employee(
-                                task, all_employees, groq_service
-                            )
+                            assignment_results.append({
+                                "task_title": task["task_title"],
+                                "assigned_to": assigned_employee["assigned_employee_name"],
+                                "reason": assigned_employee["assignment_reason"]
+                            })
                             
-                            if assigned_employee:
-                                task["task_attended_to"] = assigned_employee["assigned_employee_name"]
-                                task["assigned_employee_id"] = assigned_employee["assigned_employee_id"]
-                                task["assignment_reason"] = assigned_employee["assignment_reason"]
-                                
-                                assignment_results.append({
-                                    "task_title": task["task_title"],
-                                    "assigned_to": assigned_employee["assigned_employee_name"],
-                                    "reason": assigned_employee["assignment_reason"]
-                                })
-                                
-                                print(f"[Contract Analysis] Task {i+1}/{len(tasks)} atandı: {task['task_title']} -> {assigned_employee['assigned_employee_name']}")
-                            else:
-                                task["task_attended_to"] = ""
-                                task["assigned_employee_id"] = None
-                                print(f"[Contract Analysis] Task {i+1}/{len(tasks)} atanamadı: {task['task_title']}")
-                        
-                        except Exception as e:
-                            print(f"[Contract Analysis] Task atama hatası: {str(e)}")
+                            print(f"[Contract Analysis] Task {i+1}/{len(tasks)} atandı: {task['task_title']} -> {assigned_employee['assigned_employee_name']}")
+                        else:
                             task["task_attended_to"] = ""
                             task["assigned_employee_id"] = None
-                else:
-                    print("[Contract Analysis] Şirket yapısı bulunamadı, atama yapılamıyor")
+                            print(f"[Contract Analysis] Task {i+1}/{len(tasks)} atanamadı: {task['task_title']}")
+                    
+                    except Exception as e:
+                        print(f"[Contract Analysis] Task atama hatası: {str(e)}")
+                        task["task_attended_to"] = ""
+                        task["assigned_employee_id"] = None
             else:
-                # Otomatik atama kapalıysa, task'lara sadece ID ve status ekle
-                for task in tasks:
-                    task["task_id"] = f"task_{uuid.uuid4().hex[:8]}"
-                    task["status"] = "pending"
-                    task["project_id"] = project_id
-                    task["task_attended_to"] = ""
-                    task["assigned_employee_id"] = None
-            
-            # Taskları kaydet
-            get_db().save_tasks(project_id, tasks)
-            
-            # Sözleşmeyi güncelle
-            contract["status"] = "analyzed"
-            contract["project_id"] = project_id
-            contract["parsed_text"] = parsed_text
-            contract["analysis"] = analysis
-            get_db().save_contract(contract_id, contract)
-            
-            response_data = {
-                "status": "success",
+                print("[Contract Analysis] Şirket yapısı bulunamadı, atama yapılamıyor")
+        else:
+            # Otomatik atama kapalıysa, task'lara sadece ID ve status ekle
+            for task in tasks:
+                task.setdefault("status", "pending")
+                task["project_id"] = project_id
+                task["task_attended_to"] = ""
+                task["assigned_employee_id"] = None
+        
+        # Taskları kaydet
+        get_db().save_tasks(project_id, tasks)
+        
+        # Sözleşmeyi güncelle
+        contract["status"] = "analyzed"
+        contract["project_id"] = project_id
+        contract["parsed_text"] = parsed_text
+        contract["analysis"] = analysis
+        contract.update(preprocessing)
+        get_db().save_contract(contract_id, contract)
+        clause_index.index_record({**contract, "contract_id": contract_id})
+        
+        response_data = {
+            "status": "success",
+            "contract_id": contract_id,
+            "project_id": project_id,
+            "message": "Sözleşme başarıyla analiz edildi",
+            "analysis": analysis,
+            "total_tasks": len(tasks),
+            "duplicates_removed": dedup_report["removed"],
+            "duplicates_flagged": dedup_report["flagged"],
+            "tasks": tasks
+        }
+        if dedup_report["groups"]:
+            response_data["dedup"] = dedup_report["groups"]
+        if preprocessing:
+            response_data["preprocessing"] = preprocessing["preprocessing"]["tokens"]
+        
+        if auto_assign and assignment_results:
+            response_data["assignments"] = assignment_results
+            response_data["assigned_count"] = len(assignment_results)
+            response_data["message"] = f"Sözleşme analiz edildi ve {len(assignment_results)} task otomatik olarak atandı"
+        
+        return response_data
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Sözleşme analiz hatası: {str(e)}")
+
+class ContractRevisionTextRequest(BaseModel):
+    contract_text: str
+    contract_name: Optional[str] = None
+
+def _previous_version(contract_id: str) -> Dict[str, Any]:
+    """Revize edilecek sözleşmeyi getirir; analiz edilmemişse hata verir."""
+    previous = get_db().get_contract(contract_id)
+    if not previous:
+        raise HTTPException(status_code=404, detail="Sözleşme bulunamadı")
+    if previous.get("status") != "analyzed" or not previous.get("project_id") or not previous.get("analysis"):
+        raise HTTPException(status_code=400, detail="Önceki sürüm henüz analiz edilmemiş")
+    if not (previous.get("parsed_text") or previous.get("contract_text")):
+        raise HTTPException(status_code=400, detail="Önceki sürümün metni bulunamadı")
+    return previous
+
+def _apply_revision(previous: Dict[str, Any], new_text: str, contract_data: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Yeni sürümü önceki sürümle bölüm bazında karşılaştırır, yalnızca değişen kısımları analiz eder,
+    sonucu mevcut proje analizine birleştirir ve yeni kapsam için görev üretir.
+    """
+    from app.services.groq_service import GroqService
+    from app.services.contract_versioning import analyze_revision
+    
+    project_id = previous["project_id"]
+    result = analyze_revision(
+        previous.get("parsed_text") or previous.get("contract_text"),
+        new_text,
+        previous["analysis"],
+        get_db().get_tasks(project_id),
+        GroqService()
+    )
+    
+    # Yeni kapsam görevleri mevcut projeye eklenir (atama /auto-assign-tasks ile yapılabilir)
+    new_tasks = result["new_tasks"]
+    for task in new_tasks:
+        task["task_id"] = f"task_{uuid.uuid4().hex[:8]}"
+        task["status"] = "pending"
+        task["project_id"] = project_id
+        task["task_attended_to"] = ""
+        task["assigned_employee_id"] = None
+    if new_tasks:
+        get_db().save_tasks(project_id, new_tasks)
+    get_db().save_project(project_id, result["analysis"])
+    
+    # Yeni sürüm kaydı
+    previous_id = previous["contract_id"]
+    contract_id = f"contract_{uuid.uuid4().hex[:8]}"
+    version_data = {
+        **contract_data,
+        "contract_name": contract_data.get("contract_name") or previous.get("contract_name"),
+        "status": "analyzed",
+        "project_id": project_id,
+        "analysis": result["analysis"],
+        "version": previous.get("version", 1) + 1,
+        "previous_version_id": previous_id,
+        "root_contract_id": previous.get("root_contract_id", previous_id),
+        "revision_delta": result["delta"]
+    }
+    get_db().save_contract(contract_id, version_data)
+    get_db().save_contract(previous_id, {**previous, "superseded_by": contract_id})
+    clause_index.index_record({**version_data, "contract_id": contract_id})
+    
+    print(f"[Contract Revision] {previous_id} -> {contract_id}: {len(new_tasks)} yeni task")
+    return {
+        "status": "success",
+        "contract_id": contract_id,
+        "previous_contract_id": previous_id,
+        "version": previous.get("version", 1) + 1,
+        "project_id": project_id,
+        "message": f"Revize sözleşme analiz edildi, {len(new_tasks)} yeni task oluşturuldu",
+        "delta": result["delta"],
+        "new_tasks": new_tasks
+    }
+
+@router.post("/{contract_id}/revise")
+async def revise_contract(contract_id: str, file: UploadFile = File(...)):
+    """
+    Sözleşmenin revize edilmiş PDF sürümünü yükler ve yalnızca değişen bölümleri yeniden analiz eder.
+    Yanıt kapsam, risk ve task değişikliklerini içeren yapısal bir delta döndürür.
+    """
+    try:
+        if not file.content_type == "application/pdf":
+            raise HTTPException(status_code=400, detail="Sadece PDF dosyaları kabul edilir")
+        previous = _previous_version(contract_id)
+        
+        from app.services.contract_spool import contract_spool, UploadTooLargeError
+        from app.services.llamaparse_service import LlamaParseService
+        
+        try:
+            ingest = await contract_spool.ingest(file)
+        except UploadTooLargeError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        
+        # İçerik aynıysa yeni sürüm oluşturulmaz (Storage'a hiçbir şey yüklenmez)
+        if ingest["content_hash"] == previous.get("content_hash"):
+            return {
+                "status": "unchanged",
                 "contract_id": contract_id,
-                "project_id": project_id,
-                "message": "Sözleşme başarıyla analiz edildi",
-                "analysis": analysis,
-                "total_tasks": len(tasks),
-                "tasks": tasks
+                "message": "Yüklenen dosya mevcut sürümle aynı"
             }
-            
-            if auto_assign and assignment_results:
-                response_data["assignments"] = assignment_results
-                response_data["assigned_count"] = len(assignment_results)
-                response_data["message"] = f"Sözleşme analiz edildi ve {len(assignment_results)} task otomatik olarak atandı"
-            
-            return response_data
-            
-        finally:
-            # Geçici dosyayı sil
-            if os.path.exists(tmp_path):
-                os.unlink(tmp_path)
+        
+        file_path = f"contracts/{uuid.uuid4().hex}.pdf"
+        file_url = contract_spool.publish(ingest["local_path"], get_db(), file_path, "application/pdf")
+        parsed_text = LlamaParseService().parse_pdf(ingest["local_path"], content_hash=ingest["content_hash"])
+        return _apply_revision(previous, parsed_text, {
+            "contract_name": file.filename,
+            "file_path": file_path,
+            "file_url": file_url,
+            "file_size": ingest["file_size"],
+            "content_hash": ingest["content_hash"],
+            "parsed_text": parsed_text
+        })
         
     except HTTPException:
         raise
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Sözleşme analiz hatası: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Sözleşme revizyon hatası: {str(e)}")
+
+@router.post("/{contract_id}/revise-text")
+async def revise_contract_text(contract_id: str, request: ContractRevisionTextRequest):
+    """
+    Sözleşmenin revize edilmiş metnini yalnızca değişen bölümler üzerinden yeniden analiz eder.
+    """
+    try:
+        from app.services.contract_fingerprint import text_sha256
+        
+        previous = _previous_version(contract_id)
+        text_hash = text_sha256(request.contract_text)
+        if text_hash == previous.get("text_hash"):
+            return {
+                "status": "unchanged",
+                "contract_id": contract_id,
+                "message": "Gönderilen metin mevcut sürümle aynı"
+            }
+        
+        return _apply_revision(previous, request.contract_text, {
+            "contract_name": request.contract_name,
+            "contract_text": request.contract_text,
+            "text_hash": text_hash
+        })
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Sözleşme revizyon hatası: {str(e)}")
 
 @router.post("/{contract_id}/convert-to-project")
 async def convert_contract_to_project(contract_id: str):
@@ -547,8 +831,12 @@ async def delete_contract(contract_id: str):
         if not contract:
             raise HTTPException(status_code=404, detail="Sözleşme bulunamadı")
         
-        # Dosyayı Storage'dan sil
-        if contract.get("file_path"):
+        # Dosyayı Storage'dan sil (yinelenen sözleşmeler aynı blob'u paylaşabilir)
+        shared = contract.get("file_path") and any(
+            doc.id != contract_id
+            for doc in get_db().db.collection('contracts').where("file_path", "==", contract["file_path"]).stream()
+        )
+        if contract.get("file_path") and not shared:
             try:
                 blob = get_db().bucket.blob(contract["file_path"])
                 blob.delete()
@@ -557,6 +845,7 @@ async def delete_contract(contract_id: str):
         
         # Sözleşmeyi sil
         get_db().db.collection('contracts').document(contract_id).delete()
+        clause_index.remove_contract(contract_id)
         
         return {"message": f"Sözleşme silindi: {contract_id}"}
         
@@ -3,7 +3,8 @@ from pydantic import BaseModel
 from typing import Optional, List, Dict, Any
 import uuid
 from app.firebase_db import FirebaseDatabase
-from app.tools import inject_dependencies, list_employees, get_employee_info, get_department_workload, update_employee_availability
+from app.tools import inject_dependencies, list_employees, get_employee_info, get_department_workload, update_employee_availability, bulk_reassign_employee_tasks
+from app.confirmations import create_pending_action, is_expired, verify_pending_action, apply_write_set
 
 router = APIRouter()
 
@@ -154,6 +155,24 @@ async def import_employees(csv_data: str):
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Çalışan içe aktarma hatası: {str(e)}")
 
+@router.post("/workload/rebuild")
+async def rebuild_workloads():
+    """
+    Çalışan iş yükü sayaçlarını tüm projelerin görevlerinden yeniden hesaplar.
+    """
+    try:
+        workloads = get_db().rebuild_employee_workloads()
+        
+        return {
+            "status": "success",
+            "total_employees": len(workloads),
+            "workloads": workloads
+        }
+        
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"İş yükü yeniden hesaplama hatası: {str(e)}")
+
+
 @router.put("/{employee_id}/workload")
 async def update_employee_workload(employee_id: str, workload: str):
     """
@@ -219,6 +238,104 @@ async def update_availability(employee_id: str, data: EmployeeAvailabilityUpdate
         raise HTTPException(status_code=500, detail=f"Müsaitlik güncelleme hatası: {str(e)}")
 
 
+class BulkReassignmentRequest(BaseModel):
+    start_date: str  # ISO date
+    end_date: Optional[str] = None  # ISO date
+    reason: Optional[str] = None
+
+
+class BulkReassignmentConfirmation(BaseModel):
+    confirmation_token: str
+    content_hash: str
+    confirmed: bool = True
+
+
+@router.post("/{employee_id}/bulk-reassign")
+async def bulk_reassign(employee_id: str, data: BulkReassignmentRequest):
+    """
+    Çalışanın yokluğu için tüm projelerdeki görevlerinin toplu yeniden atama önerisini döndürür.
+    Yazma kümesi onay token'ı altında saklanır; `/bulk-reassign/confirm` ile token ve içerik
+    özeti gönderildiğinde uygulanır.
+    """
+    try:
+        # Tools'a dependency injection yap
+        inject_dependencies(get_db(), "api_session")
+        
+        tool_args = {
+            "employee_id": employee_id,
+            "start_date": data.start_date,
+            "end_date": data.end_date,
+            "reason": data.reason
+        }
+        result = bulk_reassign_employee_tasks.invoke(tool_args)
+        
+        import json
+        result_data = json.loads(result)
+        
+        if "error" in result_data:
+            raise HTTPException(status_code=400, detail=result_data["error"])
+        
+        # Önerilen yazma kümesini token altında sakla (sohbet onay akışıyla aynı kayıt)
+        write_set = result_data.pop("write_set", [])
+        pending_action = create_pending_action(
+            "api_session", "bulk_reassign_employee_tasks", tool_args, result_data, write_set
+        )
+        get_db().save_pending_confirmation(pending_action["confirmation_token"], pending_action)
+        
+        result_data["confirmation_token"] = pending_action["confirmation_token"]
+        result_data["content_hash"] = pending_action["content_hash"]
+        result_data["expires_at"] = pending_action["expires_at"]
+        return result_data
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Toplu yeniden atama hatası: {str(e)}")
+
+
+@router.post("/{employee_id}/bulk-reassign/confirm")
+async def confirm_bulk_reassign(employee_id: str, data: BulkReassignmentConfirmation):
+    """
+    Saklanan toplu yeniden atama önerisini onaylar (uygular) veya reddeder.
+    Öneri yeniden hesaplanmaz; token altında saklanan yazma kümesi uygulanır.
+    """
+    try:
+        pending_action = get_db().get_pending_confirmation(data.confirmation_token)
+        if (not pending_action
+                or pending_action.get("tool_name") != "bulk_reassign_employee_tasks"
+                or pending_action.get("tool_args", {}).get("employee_id") != employee_id):
+            raise HTTPException(status_code=404, detail="Onay bilgisi bulunamadı. Lütfen öneriyi yeniden alın.")
+        
+        if is_expired(pending_action):
+            get_db().delete_pending_confirmation(data.confirmation_token)
+            raise HTTPException(status_code=400, detail="Onay süresi doldu. Güncel verilerle yeni bir öneri alın.")
+        
+        if not data.confirmed:
+            get_db().delete_pending_confirmation(data.confirmation_token)
+            return {"success": True, "applied": False, "employee_id": employee_id}
+        
+        if not verify_pending_action(pending_action, data.content_hash):
+            raise HTTPException(status_code=400, detail="Onaylanan öneri ile saklanan öneri eşleşmiyor. İşlem uygulanmadı.")
+        
+        write_set = pending_action.get("write_set", [])
+        apply_write_set(get_db(), write_set)
+        get_db().delete_pending_confirmation(data.confirmation_token)
+        
+        return {
+            "success": True,
+            "applied": True,
+            "employee_id": employee_id,
+            "operations": len(write_set)
+        }
+        
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Toplu yeniden atama onay hatası: {str(e)}")
+
+
 @router.get("/{employee_id}/tasks")
 async def get_employee_tasks(employee_id: str):
     """
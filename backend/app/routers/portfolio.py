@@ -0,0 +1,65 @@
+from fastapi import APIRouter, HTTPException
+from typing import Optional
+from app.firebase_db import FirebaseDatabase
+from app.tools import inject_dependencies, level_portfolio_resources, find_available_employees
+
+router = APIRouter()
+
+_db_client = None
+def get_db():
+    global _db_client
+    if _db_client is None:
+        _db_client = FirebaseDatabase()
+    return _db_client
+
+@router.get("/schedule")
+async def get_portfolio_schedule(employee_id: Optional[str] = None):
+    """
+    Projeler arası çalışan tahsisini, aşırı yüklenmeleri ve dengeleme önerilerini getirir.
+    """
+    try:
+        # Tools'a dependency injection yap
+        inject_dependencies(get_db(), "api_session")
+        
+        result = level_portfolio_resources.invoke({"employee_id": employee_id})
+        import json
+        result_data = json.loads(result)
+        
+        if "error" in result_data:
+            raise HTTPException(status_code=400, detail=result_data["error"])
+        
+        return result_data
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Portföy planlama hatası: {str(e)}")
+
+
+@router.get("/availability")
+async def get_portfolio_availability(hours: float, start_date: str, end_date: str, department: Optional[str] = None):
+    """
+    Tarih aralığında en az `hours` saat boş kapasitesi olan çalışanları getirir.
+    """
+    try:
+        # Tools'a dependency injection yap
+        inject_dependencies(get_db(), "api_session")
+        
+        result = find_available_employees.invoke({
+            "hours": hours,
+            "start_date": start_date,
+            "end_date": end_date,
+            "department": department
+        })
+        import json
+        result_data = json.loads(result)
+        
+        if "error" in result_data:
+            raise HTTPException(status_code=400, detail=result_data["error"])
+        
+        return result_data
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Kapasite sorgulama hatası: {str(e)}")
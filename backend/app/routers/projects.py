@@ -1,8 +1,11 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Request
 from pydantic import BaseModel
 from typing import Optional, List, Dict, Any
 from app.firebase_db import FirebaseDatabase
 from app.tools import inject_dependencies, analyze_project_text, generate_tasks_from_project, list_projects, get_project_details, predict_project_delays
+from app.services.task_graph import task_graph_registry
+from app.services.calendar_projection import calendar_projections
+from app.routers.sprints import calendar_response
 import logging
 
 logger = logging.getLogger("uvicorn.error")
@@ -98,10 +101,33 @@ def get_project_risk_analysis(project_id: str):
         raise HTTPException(status_code=500, detail=error_detail)
 
 
+@router.get("/{project_id}/critical-path")
+def get_project_critical_path(project_id: str):
+    """
+    Görev bağımlılık grafiği üzerinden kritik yolu, en erken/en geç başlangıçları ve bollukları getirir.
+    """
+    try:
+        project = get_db().get_project(project_id)
+        if not project:
+            raise HTTPException(status_code=404, detail="Proje bulunamadı")
+        
+        graph = task_graph_registry.get(get_db(), project_id)
+        return {
+            "project_id": project_id,
+            "project_name": project.get("project_name"),
+            **graph.to_dict()
+        }
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Kritik yol hesaplama hatası: {str(e)}")
+
+
 @router.get("/{project_id}/calendar-view")
-def get_project_calendar_view(project_id: str):
+def get_project_calendar_view(project_id: str, request: Request):
     """
-    Projenin tüm sprint ve görevlerini takvim formatında getirir.
+    Projenin en son sprint planını ve görevlerini takvim formatında getirir.
     """
     try:
         # Projeyi kontrol et
@@ -119,63 +145,16 @@ def get_project_calendar_view(project_id: str):
                 "message": "Bu proje için sprint planı bulunamadı"
             }
         
-        # En son sprint'i al
-        latest_sprint = sprints[0]
-        sprint_id = latest_sprint.get("sprint_id")
-        
-        # Sprint takvim olaylarını al (sprints router'dan kodu tekrar kullan)
-        sprint_plan = latest_sprint.get("plan", {})
-        sprints_list = sprint_plan.get("sprints", [])
-        tasks = get_db().get_tasks(project_id)
-        
-        events = []
-        import datetime
-        
-        for sp in sprints_list:
-            sprint_number = sp.get("sprint_number", 1)
-            sprint_name = sp.get("sprint_name", f"Sprint {sprint_number}")
-            start_date = latest_sprint.get("start_date") or datetime.date.today().isoformat()
-            duration_weeks = sp.get("duration_weeks", 2)
-            
-            start = datetime.datetime.fromisoformat(start_date)
-            end = start + datetime.timedelta(weeks=duration_weeks * sprint_number)
-            start_offset = start + datetime.timedelta(weeks=duration_weeks * (sprint_number - 1))
-            
-            events.append({
-                "id": f"{sprint_id}_{sprint_number}",
-                "title": sprint_name,
-                "start": start_offset.isoformat(),
-                "end": end.isoformat(),
-                "type": "sprint",
-                "status": latest_sprint.get("status", "planned"),
-                "description": sp.get("focus", "")
-            })
-            
-            # Sprint task'ları ekle
-            sprint_tasks = sp.get("tasks", [])
-            for task_title in sprint_tasks:
-                task = next((t for t in tasks if t.get("task_title", t.get("title")) == task_title), None)
-                if task:
-                    task_start = task.get("start_date", start_offset.isoformat())
-                    task_end = task.get("due_date", (start_offset + datetime.timedelta(days=7)).isoformat())
-                    
-                    events.append({
-                        "id": task.get("task_id"),
-                        "title": task_title,
-                        "start": task_start,
-                        "end": task_end,
-                        "type": "task",
-                        "status": task.get("status", "pending"),
-                        "priority": task.get("priority", "medium"),
-                        "assignee": task.get("task_attended_to", "Atanmamış")
-                    })
-        
-        return {
+        # En son sprint'in projeksiyonu (sprint takvimiyle aynı motor ve aynı belge)
+        sprint = get_db().get_sprint(sprints[0].get("sprint_id")) or sprints[0]
+        projection = calendar_projections.get(get_db(), sprint)
+        return calendar_response(request, {
             "project_id": project_id,
             "project_name": project.get("project_name"),
-            "total_events": len(events),
-            "events": events
-        }
+            "sprint_id": projection.sprint_id,
+            "total_events": len(projection.events),
+            "events": projection.events
+        }, projection.etag)
         
     except HTTPException:
         raise
@@ -1,8 +1,10 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Request, Response
+from fastapi.responses import JSONResponse
 from pydantic import BaseModel
 from typing import Optional, List, Dict, Any
 from app.firebase_db import FirebaseDatabase
-from app.tools import inject_dependencies, generate_sprint_plan, replan_sprints, analyze_sprint_health
+from app.tools import inject_dependencies, generate_sprint_plan, replan_sprints, analyze_sprint_health, simulate_sprint_scenarios
+from app.services.calendar_projection import calendar_projections
 import logging
 
 logger = logging.getLogger("uvicorn.error")
@@ -21,11 +23,18 @@ def get_db():
 class SprintGenerationRequest(BaseModel):
     project_id: Optional[str] = None
     sprint_duration_weeks: int = 2
+    narrative: bool = False
 
 class SprintReplanRequest(BaseModel):
     project_id: Optional[str] = None
     vacation_days: int = 0
     delays: int = 0
+    events: Optional[List[Dict[str, Any]]] = None
+
+class SprintSimulationRequest(BaseModel):
+    project_id: Optional[str] = None
+    scenarios: List[Dict[str, Any]]
+    apply_scenario: Optional[str] = None
 
 class SprintResponse(BaseModel):
     status: str
@@ -39,6 +48,7 @@ class SprintReplanResponse(BaseModel):
     message: str
     new_plan: Dict[str, Any]
     changes: Dict[str, int]
+    diff: Optional[Dict[str, Any]] = None
 
 @router.get("/project/{project_id}")
 async def get_sprints(project_id: str):
@@ -81,7 +91,8 @@ async def generate_sprint(request: SprintGenerationRequest):
         # generate_sprint_plan tool'unu çağır (LangChain tool olduğu için .invoke() kullan)
         result = generate_sprint_plan.invoke({
             "project_id": request.project_id,
-            "sprint_duration_weeks": request.sprint_duration_weeks
+            "sprint_duration_weeks": request.sprint_duration_weeks,
+            "narrative": request.narrative
         })
         import json
         result_data = json.loads(result)
@@ -107,7 +118,8 @@ async def replan_sprint(request: SprintReplanRequest):
         result = replan_sprints.invoke({
             "project_id": request.project_id,
             "vacation_days": request.vacation_days,
-            "delays": request.delays
+            "delays": request.delays,
+            "events": request.events
         })
         import json
         result_data = json.loads(result)
@@ -120,6 +132,32 @@ async def replan_sprint(request: SprintReplanRequest):
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Sprint yeniden planlama hatası: {str(e)}")
 
+@router.post("/simulate")
+async def simulate_sprint_scenarios_endpoint(request: SprintSimulationRequest):
+    """
+    Senaryoları mevcut plan üzerinde karşılaştırır; yalnızca apply_scenario verilirse kaydeder.
+    """
+    try:
+        inject_dependencies(get_db(), "api_session")
+        
+        result = simulate_sprint_scenarios.invoke({
+            "project_id": request.project_id,
+            "scenarios": request.scenarios,
+            "apply_scenario": request.apply_scenario
+        })
+        import json
+        result_data = json.loads(result)
+        
+        if "error" in result_data:
+            raise HTTPException(status_code=400, detail=result_data["error"])
+        
+        return result_data
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Senaryo simülasyonu hatası: {str(e)}")
+
 @router.put("/{sprint_id}/tasks")
 async def update_sprint_tasks(sprint_id: str, tasks: List[str]):
     """
@@ -172,7 +210,7 @@ async def test_endpoint():
     return {"status": "ok", "message": "Test successful"}
 
 @router.get("/{sprint_id}/health")
-async def get_sprint_health(sprint_id: str, project_id: Optional[str] = None):
+async def get_sprint_health(sprint_id: str, project_id: Optional[str] = None, narrative: bool = False):
     """
     Sprint sağlık durumunu analiz eder ve döndürür.
     """
@@ -198,7 +236,8 @@ async def get_sprint_health(sprint_id: str, project_id: Optional[str] = None):
         logger.error(f"[DEBUG] Calling analyze_sprint_health tool")
         result = analyze_sprint_health.invoke({
             "project_id": project_id,
-            "sprint_id": sprint_id
+            "sprint_id": sprint_id,
+            "narrative": narrative
         })
         
         logger.error(f"[DEBUG] Health analysis result received")
@@ -228,204 +267,53 @@ async def get_sprint_health(sprint_id: str, project_id: Optional[str] = None):
         raise HTTPException(status_code=500, detail=error_detail)
 
 
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """If-None-Match karşılaştırması: "*", virgülle ayrılmış listeler ve zayıf (W/) etiketler desteklenir."""
+    if not if_none_match:
+        return False
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in candidates or any(tag.removeprefix("W/") == etag for tag in candidates)
+
+def calendar_response(request: Request, payload: Dict[str, Any], etag: str):
+    """Takvim projeksiyonunu ETag ile döndürür; istemcinin sürümü güncelse 304 döner."""
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers={"ETag": etag})
+    return JSONResponse(content=payload, headers={"ETag": etag})
+
+
 @router.get("/{sprint_id}/calendar-events")
-async def get_sprint_calendar_events(sprint_id: str):
+async def get_sprint_calendar_events(sprint_id: str, request: Request):
     """
     Sprint'e ait takvim olaylarını getirir (sprint ve task'lar).
+    Olaylar önceden materyalize edilmiş projeksiyondan ETag ile sunulur.
     """
-    logger.error(f"========== CALENDAR EVENTS START: {sprint_id} ==========")
     try:
-        logger.error(f"[DEBUG] Getting calendar events for sprint: {sprint_id}")
-        
-        # Sprint bilgilerini al
         sprint = get_db().get_sprint(sprint_id)
         if not sprint:
-            logger.error(f"[ERROR] Sprint not found: {sprint_id}")
             raise HTTPException(status_code=404, detail=f"Sprint bulunamadı: {sprint_id}")
         
-        logger.error(f"[DEBUG] Sprint found: {sprint.get('sprint_id')}")
-        
         project_id = sprint.get("project_id")
         if not project_id:
-            logger.error(f"[ERROR] Sprint has no project_id: {sprint}")
             raise HTTPException(status_code=400, detail="Sprint proje bilgisi eksik")
         
-        logger.error(f"[DEBUG] Project ID: {project_id}")
-        
-        # Sprint planını al
         sprint_plan = sprint.get("plan")
-        if not sprint_plan:
-            logger.error(f"[WARNING] Sprint has no plan, returning empty events")
-            return {
-                "sprint_id": sprint_id,
-                "project_id": project_id,
-                "total_events": 0,
-                "events": [],
-                "message": "Bu sprint için plan bulunamadı"
-            }
-        
-        logger.error(f"[DEBUG] Sprint plan found: {list(sprint_plan.keys())}")
-        sprints_list = sprint_plan.get("sprints", [])
-        
-        if not sprints_list:
-            logger.error(f"[WARNING] Sprint plan has no sprints array")
+        if not sprint_plan or not sprint_plan.get("sprints"):
             return {
                 "sprint_id": sprint_id,
                 "project_id": project_id,
                 "total_events": 0,
                 "events": [],
-                "message": "Sprint planında sprint bilgisi bulunamadı"
+                "message": "Bu sprint için plan bulunamadı" if not sprint_plan else "Sprint planında sprint bilgisi bulunamadı"
             }
         
-        logger.error(f"[DEBUG] Found {len(sprints_list)} sprints in plan")
-        
-        # Görevleri al
-        tasks = get_db().get_tasks(project_id) or []
-        logger.error(f"[DEBUG] Found {len(tasks)} tasks for project")
-        if tasks:
-            # İlk task'ın field'larını göster
-            first_task = tasks[0]
-            logger.error(f"[DEBUG] First task fields: {list(first_task.keys())}")
-            logger.error(f"[DEBUG] First task title: '{first_task.get('title')}'")
-            logger.error(f"[DEBUG] First task assigned_to (type: {type(first_task.get('assigned_to')).__name__}): {first_task.get('assigned_to')}")
-            logger.error(f"[DEBUG] First task task_attended_to (type: {type(first_task.get('task_attended_to')).__name__}): {first_task.get('task_attended_to')}")
-            # Tüm task isimlerini göster
-            task_names = [t.get("task_title") or t.get("title") or t.get("task_id") for t in tasks]
-            logger.error(f"[DEBUG] All task names: {task_names}")
-        
-        # Takvim olaylarını oluştur
-        events = []
-        
-        import datetime
-        # Sprint genel başlangıç tarihi
-        sprint_start_date = sprint.get("start_date")
-        if not sprint_start_date:
-            sprint_start_date = datetime.date.today().isoformat()
-            logger.error(f"[DEBUG] No start_date found, using today: {sprint_start_date}")
-        else:
-            logger.error(f"[DEBUG] Sprint start_date: {sprint_start_date}")
-        
-        # Sprint event'lerini ekle - her sprint'i ardışık olarak hesapla
-        # Tarih string'ini datetime'a dönüştür (sadece tarih varsa da çalışır)
-        try:
-            current_start = datetime.datetime.fromisoformat(sprint_start_date)
-            logger.error(f"[DEBUG] Parsed start date as datetime: {current_start}")
-        except ValueError as e:
-            logger.error(f"[DEBUG] Failed to parse as datetime, trying as date: {e}")
-            try:
-                # Eğer sadece tarih varsa (YYYY-MM-DD), datetime'a çevir
-                date_obj = datetime.date.fromisoformat(sprint_start_date)
-                current_start = datetime.datetime.combine(date_obj, datetime.time.min)
-                logger.error(f"[DEBUG] Parsed start date as date: {current_start}")
-            except Exception as parse_error:
-                logger.error(f"[ERROR] Failed to parse start_date: {parse_error}")
-                # Fallback: bugün
-                current_start = datetime.datetime.combine(datetime.date.today(), datetime.time.min)
-                logger.error(f"[DEBUG] Using fallback start date: {current_start}")
-        
-        for sp in sprints_list:
-            sprint_number = sp.get("sprint_number", 1)
-            sprint_name = sp.get("sprint_name", f"Sprint {sprint_number}")
-            duration_weeks = sp.get("duration_weeks", 2)
-            
-            # Bu sprint'in bitiş tarihi
-            current_end = current_start + datetime.timedelta(weeks=duration_weeks)
-            
-            events.append({
-                "id": f"{sprint_id}_{sprint_number}",
-                "title": sprint_name,
-                "start": current_start.isoformat(),
-                "end": current_end.isoformat(),
-                "type": "sprint",
-                "status": sprint.get("status", "planned"),
-                "description": sp.get("focus", "")
-            })
-            
-            # Bu sprint'teki task'ları ekle
-            sprint_tasks = sp.get("tasks", [])
-            task_count = len(sprint_tasks)
-            logger.error(f"[DEBUG] Sprint {sprint_number} has {task_count} tasks: {sprint_tasks[:3] if len(sprint_tasks) > 3 else sprint_tasks}")
-            
-            for idx, task_identifier in enumerate(sprint_tasks):
-                # Eğer task_title_X formatındaysa, index'e göre al
-                if isinstance(task_identifier, str) and task_identifier.startswith("task_title_"):
-                    try:
-                        task_index = int(task_identifier.split("_")[-1]) - 1
-                        if 0 <= task_index < len(tasks):
-                            task = tasks[task_index]
-                            logger.error(f"[DEBUG] Resolved placeholder '{task_identifier}' to task[{task_index}]: '{task.get('title')}'")
-                        else:
-                            task = None
-                            logger.error(f"[DEBUG] Placeholder '{task_identifier}' index out of range")
-                    except (ValueError, IndexError) as e:
-                        task = None
-                        logger.error(f"[DEBUG] Failed to parse placeholder '{task_identifier}': {e}")
-                else:
-                    # Task'ı bul - hem task_id, hem title, hem task_title ile kontrol et
-                    task = next((t for t in tasks if 
-                        task_identifier == t.get("task_id") or 
-                        task_identifier == t.get("title") or 
-                        task_identifier == t.get("task_title") or
-                        t.get("title", "").lower() == task_identifier.lower()), None)
-                    logger.error(f"[DEBUG] Looking for task '{task_identifier}': {'FOUND' if task else 'NOT FOUND'}")
-                if task:
-                    # Task tarihleri varsa kullan, yoksa sprint içinde eşit dağıt
-                    if task.get("start_date") and task.get("due_date"):
-                        task_start = task.get("start_date")
-                        task_end = task.get("due_date")
-                    else:
-                        # Task'ları sprint içinde eşit aralıklarla dağıt
-                        days_per_task = (duration_weeks * 7) / max(task_count, 1)
-                        task_start_offset = int(idx * days_per_task)
-                        task_end_offset = int((idx + 1) * days_per_task)
-                        
-                        task_start = (current_start + datetime.timedelta(days=task_start_offset)).isoformat()
-                        task_end = (current_start + datetime.timedelta(days=task_end_offset)).isoformat()
-                    
-                    # Atanan kişiyi bul - önce assigned_to, sonra task_attended_to
-                    assignee_data = task.get("assigned_to") or task.get("task_attended_to") or "Atanmamış"
-                    
-                    # Eğer assignee bir dict ise, name field'ını al
-                    if isinstance(assignee_data, dict):
-                        assignee = assignee_data.get("name", "Atanmamış")
-                    else:
-                        assignee = assignee_data if assignee_data else "Atanmamış"
-                    
-                    events.append({
-                        "id": task.get("task_id", f"task_{idx}"),
-                        "title": task.get("title", task_identifier),
-                        "start": task_start,
-                        "end": task_end,
-                        "type": "task",
-                        "status": task.get("status", "pending"),
-                        "priority": task.get("priority", "medium"),
-                        "assignee": assignee
-                    })
-                    logger.error(f"[DEBUG] ✅ Added task to calendar: '{task.get('title')}' → Assignee: {assignee}")
-            
-            # Bir sonraki sprint için başlangıç tarihini güncelle
-            current_start = current_end
-        
-        logger.error(f"[DEBUG] Total events created: {len(events)} (Sprints: {len([e for e in events if e['type'] == 'sprint'])}, Tasks: {len([e for e in events if e['type'] == 'task'])})")
-        
-        return {
-            "sprint_id": sprint_id,
-            "project_id": project_id,
-            "total_events": len(events),
-            "events": events
-        }
+        projection = calendar_projections.get(get_db(), sprint)
+        return calendar_response(request, projection.payload(), projection.etag)
         
     except HTTPException:
         raise
     except Exception as e:
         import traceback
         error_detail = f"Sprint takvim olayları getirme hatası: {str(e)}"
-        full_traceback = traceback.format_exc()
-        logger.error(f"\n{'='*80}")
-        logger.error(f"[ERROR] CALENDAR EVENTS FAILED")
-        logger.error(f"Sprint ID: {sprint_id}")
-        logger.error(f"Error: {error_detail}")
-        logger.error(f"{'='*80}")
-        logger.error(full_traceback)
-        logger.error(f"{'='*80}\n")
+        logger.error(f"[ERROR] CALENDAR EVENTS FAILED ({sprint_id}): {error_detail}")
+        logger.error(traceback.format_exc())
         raise HTTPException(status_code=500, detail=error_detail)
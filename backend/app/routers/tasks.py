@@ -3,6 +3,7 @@ from pydantic import BaseModel
 from typing import Optional, List, Dict, Any
 from app.firebase_db import FirebaseDatabase
 from app.tools import inject_dependencies, list_tasks, assign_task_to_employee, reassign_task_to_employee, get_available_employees_for_task
+from app.confirmations import apply_write_set
 
 router = APIRouter()
 
@@ -166,10 +167,16 @@ async def reassign_task(request: TaskReassignmentRequest):
         if "error" in result_data:
             raise HTTPException(status_code=400, detail=result_data["error"])
         
+        # REST çağrısı doğrudan uygular (chat akışı onay token'ı ile uygular)
+        apply_write_set(get_db(), result_data.pop("write_set", []))
+        result_data["requires_confirmation"] = False
+        
         return result_data
         
     except HTTPException:
         raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Görev yeniden atama hatası: {str(e)}")
 
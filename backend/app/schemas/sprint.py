@@ -33,11 +33,18 @@ class Sprint(SprintBase):
 class SprintGenerationRequest(BaseModel):
     project_id: Optional[str] = None
     sprint_duration_weeks: int = 2
+    narrative: bool = False
 
 class SprintReplanRequest(BaseModel):
     project_id: Optional[str] = None
     vacation_days: int = 0
     delays: int = 0
+    events: Optional[List[Dict[str, Any]]] = None
+
+class SprintSimulationRequest(BaseModel):
+    project_id: Optional[str] = None
+    scenarios: List[Dict[str, Any]]
+    apply_scenario: Optional[str] = None
 
 class SprintResponse(BaseModel):
     status: str
@@ -51,3 +58,4 @@ class SprintReplanResponse(BaseModel):
     message: str
     new_plan: Dict[str, Any]
     changes: Dict[str, int]
+    diff: Optional[Dict[str, Any]] = None
@@ -0,0 +1,55 @@
+from typing import Dict, Any, List, Optional, Tuple
+
+# Skor bileşenlerinin üst sınırları
+TECH_STACK_POINTS = 50
+WORKLOAD_POINTS = {"low": 30, "medium": 15, "high": 0}
+SAME_DEPARTMENT_POINTS = 20
+CAPACITY_POINTS = 20
+
+
+def task_techs(task: Dict[str, Any]) -> List[str]:
+    """Görevin gerektirdiği teknolojiler (virgüllü metin veya liste)."""
+    task_stack = task.get("task_stack", task.get("required_stack", ""))
+    if isinstance(task_stack, str):
+        return [t.strip() for t in task_stack.split(",") if t.strip()]
+    return task_stack if isinstance(task_stack, list) else []
+
+
+def score_employee(task: Dict[str, Any], employee: Dict[str, Any], department: str,
+                   free_hours: Optional[float] = None, hours: float = 0.0) -> Tuple[float, List[str]]:
+    """
+    Çalışanın göreve uygunluk skorunu hesaplar.
+
+    Tech stack uyumu (50), iş yükü (30) ve departman uyumu (20) puanlanır. `free_hours`
+    verilirse (toplu atamalar), görev sonrası kalan boş kapasite oranı için 20 puan eklenir.
+
+    Returns:
+        (skor, gerekçeler)
+    """
+    score = 0.0
+    reasons = []
+
+    techs = task_techs(task)
+    emp_techs = employee.get("techStack", [])
+    matching = [t for t in techs if t in emp_techs]
+    if matching:
+        score += len(matching) / len(techs) * TECH_STACK_POINTS
+        reasons.append(f"Tech stack uyumu: {len(matching)}/{len(techs)}")
+
+    workload = employee.get("currentWorkload", employee.get("workload", "medium"))
+    score += WORKLOAD_POINTS.get(workload, 0)
+    if workload == "low":
+        reasons.append("Düşük iş yükü")
+    elif workload == "medium":
+        reasons.append("Orta iş yükü")
+
+    if department and department == task.get("department", ""):
+        score += SAME_DEPARTMENT_POINTS
+        reasons.append("Aynı departman")
+
+    if free_hours is not None and free_hours > 0:
+        remaining = max(0.0, free_hours - hours) / free_hours
+        score += remaining * CAPACITY_POINTS
+        reasons.append(f"Boş kapasite: {free_hours:.0f} saat")
+
+    return round(score, 2), reasons
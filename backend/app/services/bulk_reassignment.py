@@ -0,0 +1,308 @@
+import copy
+import datetime
+import math
+from typing import Dict, Any, List, Optional, Tuple
+
+import numpy as np
+
+from app.services.sprint_planner import (
+    FOCUS_HOURS_PER_DAY, PRIORITY_RANK, EXCLUDED_STATUSES,
+    parse_date, parse_estimated_hours, employee_display_name, task_title, task_assignee_id
+)
+from app.services.sprint_replanner import SprintReplanner
+from app.services.task_graph import TaskGraph, add_working_days, count_working_days, SLACK_EPSILON
+from app.services.portfolio_scheduler import PortfolioScheduler, IN_PROGRESS_REMAINING, OVERLOAD_TOLERANCE
+from app.services.assignment_scoring import score_employee, task_techs
+from app.services.workload import effective_workload
+
+
+class BulkReassignmentPlanner:
+    """
+    Bir çalışanın belirli tarih aralığındaki yokluğu için tüm projelerdeki görevlerini
+    tek geçişte yeniden dağıtır.
+
+    Aralıkla çakışan açık görevler öncelik sırasıyla işlenir; her görev için portföy kapasite
+    defterinden (CapacityLedger) hesaplanan boş kapasitesi yeten çalışanlar skorlanır ve en
+    yüksek skorlu aday seçilir. Seçilen adayın boş kapasitesi aynı toplu işlem içinde
+    düşülür. Aday bulunamayan görevler çalışanın dönüşüne ertelenir; ertelemenin bağımlı
+    görevlere ve sprint planına etkisi hesaplanır. Hiçbir şey kaydedilmez, sonuç tek bir
+    onaylanabilir yazma kümesi olarak döner.
+    """
+    def __init__(self, scheduler: PortfolioScheduler, company_data: Optional[Dict[str, Any]],
+                 hours_per_day: float = FOCUS_HOURS_PER_DAY,
+                 workloads: Optional[Dict[str, Dict[str, Any]]] = None):
+        self.scheduler = scheduler
+        self.workloads = workloads
+        self.planner = scheduler.planner
+        self.replanner = SprintReplanner(company_data, hours_per_day)
+        self.hours_per_day = hours_per_day
+        self.today = scheduler.today
+
+    # --- ETKİLENEN GÖREVLER ---
+
+    def _date_window(self, project_id: str, task: Dict[str, Any]) -> Optional[Tuple[datetime.date, datetime.date]]:
+        """Görevin [başlangıç, bitiş) tarih aralığı: kendi tarihleri, yoksa sprint'i."""
+        start, due = parse_date(task.get("start_date")), parse_date(task.get("due_date"))
+        if start and due and due >= start:
+            return start, due + datetime.timedelta(days=1)
+        return self.scheduler.sprint_windows.get(project_id, {}).get(task.get("task_id"))
+
+    def affected_tasks(self, employee_id: str, start: datetime.date, end: datetime.date,
+                       projects: List[Dict[str, Any]]) -> List[Tuple[Dict[str, Any], Dict[str, Any]]]:
+        """Çalışanın aralıkla çakışan (veya tarihsiz) açık görevleri: [(proje, görev)]"""
+        affected = []
+        for project in projects:
+            for task in project["tasks"]:
+                if task.get("status") in EXCLUDED_STATUSES or not task.get("task_id"):
+                    continue
+                if task_assignee_id(task, self.planner.name_to_id) != employee_id:
+                    continue
+                window = self._date_window(project["project_id"], task)
+                # Tarihsiz görevler çalışanın üzerinde beklediğinden etkilenmiş sayılır
+                if window is None or (window[0] <= end and window[1] > start):
+                    affected.append((project, task))
+        return affected
+
+    # --- KAPASİTE ---
+
+    def _work_days(self, project_id: str, task: Dict[str, Any], hours: float, start: datetime.date) -> np.ndarray:
+        """Görevin devralan kişide kaplayacağı ufuk içi iş günleri."""
+        days = self.scheduler._task_window(project_id, task, hours)
+        if days is not None:
+            return days
+        first = max(0, (start - self.today).days)
+        needed = max(1, math.ceil(hours / self.hours_per_day))
+        return self.scheduler.workdays[self.scheduler.workdays >= first][:needed]
+
+    def _candidates(self, task: Dict[str, Any], employee_id: str) -> List[str]:
+        """Aynı departmandan veya görevin teknolojilerinden en az birini bilen çalışanlar."""
+        department = (task.get("department") or self.scheduler.department_of.get(employee_id, "")).lower()
+        techs = set(task_techs(task))
+        return [
+            candidate_id for candidate_id, employee in self.planner.employees.items()
+            if candidate_id != employee_id and (
+                self.scheduler.department_of.get(candidate_id, "").lower() == department
+                or techs & set(employee.get("techStack") or [])
+            )
+        ]
+
+    # --- PLANLAMA ---
+
+    def _delay(self, task: Dict[str, Any], hours: float, end: datetime.date) -> Dict[str, str]:
+        """Görevi çalışanın dönüşünden sonraki ilk iş gününe, süresini koruyarak kaydırır."""
+        start, due = parse_date(task.get("start_date")), parse_date(task.get("due_date"))
+        if start and due and due >= start:
+            duration = max(1, count_working_days(start, due + datetime.timedelta(days=1)))
+        else:
+            duration = max(1, math.ceil(hours / self.hours_per_day))
+        new_start = add_working_days(end + datetime.timedelta(days=1), 0)
+        new_due = add_working_days(new_start, duration - 1)
+        return {"start_date": new_start.isoformat(), "due_date": new_due.isoformat()}
+
+    def plan(self, employee_id: str, start: datetime.date, end: datetime.date,
+             projects: List[Dict[str, Any]], reason: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Args:
+            projects: [{"project_id", "project_name", "tasks", "sprint"}] (sprint: en son sprint belgesi)
+
+        Returns:
+            Yeniden atamalar, ertelemeler, zincirleme etkiler ve yazma kümesi
+        """
+        employee = self.planner.employees.get(employee_id)
+        if employee is None:
+            raise ValueError(f"Çalışan bulunamadı: {employee_id}")
+        if end < start:
+            raise ValueError("Bitiş tarihi başlangıç tarihinden önce olamaz.")
+        if end < self.today:
+            raise ValueError("Tarih aralığı geçmişte kalıyor.")
+        employee_name = employee_display_name(employee)
+        reason = reason or f"{employee_name} {start.isoformat()} - {end.isoformat()} arası müsait değil"
+
+        affected = self.affected_tasks(employee_id, start, end, projects)
+
+        def hours_of(task: Dict[str, Any]) -> float:
+            hours = parse_estimated_hours(task.get("estimated_hours"))
+            return hours * IN_PROGRESS_REMAINING if task.get("status") == "in_progress" else hours
+
+        affected.sort(key=lambda item: (
+            PRIORITY_RANK.get(item[1].get("priority"), PRIORITY_RANK["medium"]), -hours_of(item[1])
+        ))
+
+        # Toplu işlem içindeki geçici atamalar boş kapasiteden düşülür
+        free = self.scheduler.ledger.free()
+        reassignments, delays = [], []
+        changes_by_project: Dict[str, Dict[str, Dict[str, Any]]] = {}
+
+        for project, task in affected:
+            project_id, task_id = project["project_id"], task["task_id"]
+            hours = hours_of(task)
+            days = self._work_days(project_id, task, hours, max(start, self.today))
+
+            best = None
+            for candidate_id in self._candidates(task, employee_id):
+                row = self.scheduler.row[candidate_id]
+                free_hours = float(free[row, days].sum())
+                if free_hours + OVERLOAD_TOLERANCE < hours:
+                    continue
+                candidate = self.planner.employees[candidate_id]
+                candidate = {**candidate, "currentWorkload": effective_workload(candidate, self.workloads)}
+                score, reasons = score_employee(
+                    task, candidate, self.scheduler.department_of.get(candidate_id, ""),
+                    free_hours=free_hours, hours=hours
+                )
+                if best is None or score > best[1]:
+                    best = (candidate_id, score, reasons, free_hours)
+
+            if best is not None:
+                candidate_id, score, reasons, free_hours = best
+                row = self.scheduler.row[candidate_id]
+                # Efor, adayın boş saatleriyle orantılı olarak günlere dağıtılır
+                free[row, days] -= free[row, days] * min(1.0, hours / free_hours) if free_hours else 0
+                candidate_name = employee_display_name(self.planner.employees[candidate_id])
+                reassignments.append({
+                    "project_id": project_id,
+                    "project_name": project.get("project_name", project_id),
+                    "task_id": task_id,
+                    "title": task_title(task),
+                    "priority": task.get("priority", "medium"),
+                    "hours": round(hours, 1),
+                    "to_employee_id": candidate_id,
+                    "to_employee_name": candidate_name,
+                    "score": score,
+                    "reasons": reasons
+                })
+                changes_by_project.setdefault(project_id, {})[task_id] = {
+                    "assigned_employee_id": candidate_id, "assigned_to": candidate_name
+                }
+            else:
+                new_dates = self._delay(task, hours, end)
+                delays.append({
+                    "project_id": project_id,
+                    "project_name": project.get("project_name", project_id),
+                    "task_id": task_id,
+                    "title": task_title(task),
+                    "priority": task.get("priority", "medium"),
+                    "old_start_date": task.get("start_date"),
+                    "old_due_date": task.get("due_date"),
+                    "new_start_date": new_dates["start_date"],
+                    "new_due_date": new_dates["due_date"]
+                })
+                changes_by_project.setdefault(project_id, {})[task_id] = dict(new_dates)
+
+        cascade = [
+            self._cascade(project, changes_by_project[project["project_id"]], employee_id, start, end)
+            for project in projects if project["project_id"] in changes_by_project
+        ]
+
+        write_set = self._write_set(employee_id, start, end, reason, reassignments, delays, cascade)
+        for item in cascade:
+            item.pop("sprint_data", None)
+
+        return {
+            "employee_id": employee_id,
+            "employee_name": employee_name,
+            "start_date": start.isoformat(),
+            "end_date": end.isoformat(),
+            "affected_tasks": len(affected),
+            "reassignments": reassignments,
+            "delays": delays,
+            "cascade": cascade,
+            "write_set": write_set
+        }
+
+    # --- ZİNCİRLEME ETKİLER ---
+
+    def _cascade(self, project: Dict[str, Any], changes: Dict[str, Dict[str, Any]], employee_id: str,
+                 start: datetime.date, end: datetime.date) -> Dict[str, Any]:
+        """Ertelemelerin bağımlı görevlere ve projenin sprint planına etkisi."""
+        project_id = project["project_id"]
+        tasks = copy.deepcopy(project["tasks"])
+        for task in tasks:
+            task.update(changes.get(task.get("task_id"), {}))
+
+        delayed = [task_id for task_id, change in changes.items() if "start_date" in change]
+        result: Dict[str, Any] = {
+            "project_id": project_id,
+            "project_name": project.get("project_name", project_id),
+            "project_end_shift_days": 0.0,
+            "delayed_dependents": []
+        }
+        if delayed:
+            graph = TaskGraph(project["tasks"], self.hours_per_day, self.today)
+            before_end, before_es = graph.project_end, dict(graph.es)
+            for task_id in delayed:
+                graph.update_task(task_id, changes[task_id])
+            result["project_end_shift_days"] = round(graph.project_end - before_end, 2)
+            result["delayed_dependents"] = [
+                task_id for task_id in graph.order
+                if task_id not in changes and graph.es[task_id] > before_es.get(task_id, 0.0) + SLACK_EPSILON
+            ]
+
+        sprint = project.get("sprint")
+        plan = (sprint or {}).get("plan", {})
+        if plan.get("planner") != "deterministic":
+            result["sprint"] = None
+            return result
+
+        event = {
+            "type": "employee_unavailable", "employee_id": employee_id,
+            "start_date": start.isoformat(), "end_date": end.isoformat()
+        }
+        new_plan, diff = self.replanner.replan(plan, tasks, [event], self.today)
+        old_end = plan["sprints"][-1]["end_date"] if plan.get("sprints") else None
+        new_end = new_plan["sprints"][-1]["end_date"] if new_plan.get("sprints") else old_end
+        result["sprint"] = {
+            "sprint_id": sprint.get("sprint_id"),
+            "tasks_moved": diff["tasks_moved"],
+            "sprints_added": len(diff["sprints_added"]),
+            "sprints_removed": len(diff["sprints_removed"]),
+            "previous_end_date": old_end,
+            "projected_end_date": new_end
+        }
+        result["sprint_data"] = {
+            **sprint,
+            "plan": new_plan,
+            "status": "replanned",
+            "end_date": new_end,
+            "revision_reason": f"Toplu yeniden atama: {employee_id} {start.isoformat()} - {end.isoformat()}"
+        }
+        return result
+
+    def _write_set(self, employee_id: str, start: datetime.date, end: datetime.date, reason: str,
+                   reassignments: List[Dict[str, Any]], delays: List[Dict[str, Any]],
+                   cascade: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        write_set = []
+        # Müsaitlik yalnızca "... tarihine kadar" tutulduğundan ileri tarihli yokluk sprint planına olay olarak işlenir
+        if start <= self.today:
+            write_set.append({
+                "op": "update_employee_availability",
+                "args": {"employee_id": employee_id, "status": "unavailable", "until_date": end.isoformat(), "reason": reason}
+            })
+        for item in reassignments:
+            write_set.append({
+                "op": "reassign_task",
+                "args": {
+                    "task_id": item["task_id"],
+                    "project_id": item["project_id"],
+                    "new_employee_id": item["to_employee_id"],
+                    "new_employee_name": item["to_employee_name"],
+                    "reassignment_reason": reason
+                }
+            })
+        for item in delays:
+            write_set.append({
+                "op": "update_task_dates",
+                "args": {
+                    "task_id": item["task_id"],
+                    "project_id": item["project_id"],
+                    "start_date": item["new_start_date"],
+                    "due_date": item["new_due_date"]
+                }
+            })
+        for item in cascade:
+            if item.get("sprint_data"):
+                write_set.append({
+                    "op": "save_sprint",
+                    "args": {"project_id": item["project_id"], "sprint_data": item["sprint_data"]}
+                })
+        return write_set
@@ -0,0 +1,235 @@
+import datetime
+import hashlib
+import json
+import threading
+from typing import Dict, Any, List, Optional
+
+from app.services.sprint_planner import parse_date, task_title
+
+
+class TaskIndex:
+    """
+    Plan içindeki görev referanslarını (task_id, başlık veya `task_title_N` yer tutucusu)
+    görev kayıtlarına O(1) çözen indeks. Görev listesi başına bir kez kurulur.
+    """
+    PLACEHOLDER_PREFIX = "task_title_"
+
+    def __init__(self, tasks: List[Dict[str, Any]]):
+        self.tasks = tasks
+        self.by_id: Dict[str, Dict[str, Any]] = {}
+        self.by_title: Dict[str, Dict[str, Any]] = {}
+        for task in tasks:
+            if task.get("task_id"):
+                self.by_id[task["task_id"]] = task
+            for key in (task.get("title"), task.get("task_title")):
+                if key:
+                    self.by_title.setdefault(key.lower(), task)
+
+    def resolve(self, identifier: Any) -> Optional[Dict[str, Any]]:
+        if not isinstance(identifier, str) or not identifier:
+            return None
+        task = self.by_id.get(identifier) or self.by_title.get(identifier.lower())
+        if task is None and identifier.startswith(self.PLACEHOLDER_PREFIX):
+            # Eski LLM planlarındaki "task_title_3" gibi sıra tabanlı referanslar
+            try:
+                index = int(identifier[len(self.PLACEHOLDER_PREFIX):]) - 1
+            except ValueError:
+                return None
+            if 0 <= index < len(self.tasks):
+                task = self.tasks[index]
+        return task
+
+
+def resolve_plan_task_ids(plan: Dict[str, Any], tasks: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Plan sprint'lerindeki görev referanslarını task_id'ye çevirir (yerinde).
+    Çözülemeyen referanslar olduğu gibi bırakılır; başlıklar `task_titles` alanında tutulur.
+    """
+    index = TaskIndex(tasks)
+    for sprint in plan.get("sprints", []):
+        identifiers = sprint.get("tasks", [])
+        resolved = [index.resolve(identifier) for identifier in identifiers]
+        sprint["tasks"] = [
+            task.get("task_id") if task and task.get("task_id") else identifier
+            for identifier, task in zip(identifiers, resolved)
+        ]
+        sprint["task_titles"] = [
+            task_title(task) if task else identifier
+            for identifier, task in zip(identifiers, resolved)
+        ]
+    return plan
+
+
+def _to_datetime(value: Any) -> Optional[datetime.datetime]:
+    if isinstance(value, str) and len(value) > 10:
+        try:
+            return datetime.datetime.fromisoformat(value)
+        except ValueError:
+            pass
+    day = parse_date(value)
+    return datetime.datetime.combine(day, datetime.time.min) if day else None
+
+
+def task_event(task: Dict[str, Any], slot: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Görevin takvim olayını üretir. Görevin kendi tarihleri yoksa, sprint içinde
+    sırasına göre eşit aralıklı bir dilime yerleştirilir.
+    """
+    if task.get("start_date") and task.get("due_date"):
+        start, end = task["start_date"], task["due_date"]
+    else:
+        sprint_start = datetime.datetime.fromisoformat(slot["sprint_start"])
+        days_per_task = slot["sprint_days"] / max(slot["count"], 1)
+        start = (sprint_start + datetime.timedelta(days=int(slot["index"] * days_per_task))).isoformat()
+        end = (sprint_start + datetime.timedelta(days=int((slot["index"] + 1) * days_per_task))).isoformat()
+
+    assignee = task.get("assigned_to") or task.get("task_attended_to") or "Atanmamış"
+    if isinstance(assignee, dict):
+        assignee = assignee.get("name") or "Atanmamış"
+
+    return {
+        "id": task.get("task_id", f"task_{slot['index']}"),
+        "title": task_title(task),
+        "start": start,
+        "end": end,
+        "type": "task",
+        "status": task.get("status", "pending"),
+        "priority": task.get("priority", "medium"),
+        "assignee": assignee
+    }
+
+
+def sprint_version(sprint: Dict[str, Any]) -> str:
+    """
+    Projeksiyonu etkileyen alanların (plan, durum, başlangıç) özeti. `updated_at` kullanılmaz:
+    sağlık/durum güncellemeleri onu takvim değişmeden de ilerletir ve iki sprint belgesi
+    arasında farklı olabilir.
+    """
+    content = {key: sprint.get(key) for key in ("plan", "status", "start_date")}
+    return hashlib.sha1(json.dumps(content, sort_keys=True, ensure_ascii=False, default=str).encode("utf-8")).hexdigest()
+
+
+class CalendarProjection:
+    """Bir sprint belgesinin materyalize edilmiş takvim olayları ve ETag'i."""
+
+    def __init__(self, sprint: Dict[str, Any], tasks: List[Dict[str, Any]]):
+        self.sprint_id = sprint.get("sprint_id")
+        self.project_id = sprint.get("project_id")
+        self.version = sprint_version(sprint)
+        self.events: List[Dict[str, Any]] = []
+        # task_id -> (olay indeksi, görev kopyası, sprint içi yerleşim)
+        self._task_slots: Dict[str, tuple] = {}
+        self._materialize(sprint, TaskIndex(tasks))
+
+    def _materialize(self, sprint: Dict[str, Any], index: TaskIndex):
+        status = sprint.get("status", "planned")
+        current_start = _to_datetime(sprint.get("start_date")) or \
+            datetime.datetime.combine(datetime.date.today(), datetime.time.min)
+
+        for sp in sprint.get("plan", {}).get("sprints", []):
+            sprint_number = sp.get("sprint_number", 1)
+            duration_weeks = sp.get("duration_weeks", 2)
+            # Sprint'in kendi tarihleri varsa kullan, yoksa bir öncekinin bitişinden devam et
+            start = _to_datetime(sp.get("start_date")) or current_start
+            end = _to_datetime(sp.get("end_date")) or start + datetime.timedelta(weeks=duration_weeks)
+
+            self.events.append({
+                "id": f"{self.sprint_id}_{sprint_number}",
+                "title": sp.get("sprint_name", f"Sprint {sprint_number}"),
+                "start": start.isoformat(),
+                "end": end.isoformat(),
+                "type": "sprint",
+                "status": status,
+                "description": sp.get("focus", "")
+            })
+
+            identifiers = sp.get("tasks", [])
+            for idx, identifier in enumerate(identifiers):
+                task = index.resolve(identifier)
+                if not task:
+                    continue
+                slot = {
+                    "sprint_start": start.isoformat(),
+                    "sprint_days": (end - start).days,
+                    "index": idx,
+                    "count": len(identifiers)
+                }
+                if task.get("task_id"):
+                    self._task_slots[task["task_id"]] = (len(self.events), dict(task), slot)
+                self.events.append(task_event(task, slot))
+
+            current_start = end
+
+        self.etag = self._compute_etag()
+
+    def _compute_etag(self) -> str:
+        digest = hashlib.sha1(json.dumps(self.events, sort_keys=True, ensure_ascii=False).encode("utf-8")).hexdigest()
+        return f'"{digest[:16]}"'
+
+    def apply_task_change(self, task_id: str, changes: Dict[str, Any]) -> bool:
+        """Değişen görevin olayını yeniden üretir; görev bu projeksiyonda yoksa False döner."""
+        entry = self._task_slots.get(task_id)
+        if entry is None:
+            return False
+        position, task, slot = entry
+        task.update(changes)
+        self.events[position] = task_event(task, slot)
+        self.etag = self._compute_etag()
+        return True
+
+    def payload(self) -> Dict[str, Any]:
+        return {
+            "sprint_id": self.sprint_id,
+            "project_id": self.project_id,
+            "total_events": len(self.events),
+            "events": self.events
+        }
+
+
+class CalendarProjectionStore:
+    """
+    Sprint takvim projeksiyonlarının önbelleği.
+
+    Projeksiyon, sprint planının içerik sürümü değişince yeniden kurulur; görev
+    tarih/durum/atama değişiklikleri veritabanı bildirimleriyle ilgili olaylara yerinde
+    uygulanır, toplu görev kayıtlarında proje projeksiyonları düşürülür.
+    """
+    def __init__(self):
+        self._projections: Dict[str, CalendarProjection] = {}
+        self._lock = threading.Lock()
+        self._attached = False
+
+    def attach(self, db_client):
+        """Veritabanı görev bildirimlerine bir kez abone olur (dinleyiciler tüm istemcilerde ortaktır)."""
+        with self._lock:
+            if self._attached:
+                return
+            self._attached = True
+        db_client.add_task_listener(self.on_task_changed)
+
+    def get(self, db_client, sprint: Dict[str, Any]) -> CalendarProjection:
+        self.attach(db_client)
+        sprint_id = sprint.get("sprint_id")
+        with self._lock:
+            projection = self._projections.get(sprint_id)
+            if projection is not None and projection.version == sprint_version(sprint):
+                return projection
+        tasks = db_client.get_tasks(sprint.get("project_id")) or []
+        projection = CalendarProjection(sprint, tasks)
+        with self._lock:
+            self._projections[sprint_id] = projection
+        print(f"[Calendar] Projeksiyon oluşturuldu: {sprint_id}, {len(projection.events)} olay")
+        return projection
+
+    def on_task_changed(self, project_id: str, task_id: Optional[str], changes: Optional[Dict[str, Any]]):
+        with self._lock:
+            for sprint_id, projection in list(self._projections.items()):
+                if projection.project_id != project_id:
+                    continue
+                if task_id is None or changes is None:
+                    del self._projections[sprint_id]
+                else:
+                    projection.apply_task_change(task_id, changes)
+
+
+calendar_projections = CalendarProjectionStore()
@@ -0,0 +1,134 @@
+import datetime
+from typing import Dict, Any, List, Optional, Tuple
+
+import numpy as np
+
+from app.services.sprint_planner import FOCUS_HOURS_PER_DAY, parse_date
+
+# Planlama ufku (takvim günü)
+HORIZON_DAYS = 180
+
+
+def capacity_signature(employee: Dict[str, Any]) -> Tuple:
+    """Kapasite satırını belirleyen alanlar; değişmeyen çalışanların satırı yeniden hesaplanmaz."""
+    return (
+        employee.get("availability_status", "available"),
+        employee.get("unavailable_until")
+    )
+
+
+class CapacityLedger:
+    """
+    Çalışan × gün kapasite ve tahsis defteri.
+
+    `capacity` müsaitlik pencerelerinden (tam odak saati), `allocated` görev
+    tahsislerinden oluşan (çalışan, gün) boyutlu saat matrisleridir. Tahsisler görev başına
+    eklenip çıkarılır, müsaitlik değişikliğinde yalnızca ilgili satır yeniden hesaplanır;
+    tarih aralığı sorguları vektörel dilimlerle yanıtlanır. İş yükü yalnızca tahsislerle temsil
+    edilir; elle girilen `currentWorkload` katsayısı kapasiteye uygulanmaz (yük iki kez sayılmaz).
+    """
+    def __init__(self, hours_per_day: float = FOCUS_HOURS_PER_DAY, today: Optional[datetime.date] = None,
+                 horizon_days: int = HORIZON_DAYS):
+        self.hours_per_day = hours_per_day
+        self.today = today or datetime.date.today()
+        self.days = [self.today + datetime.timedelta(days=i) for i in range(horizon_days)]
+        self.workdays = np.array([i for i, d in enumerate(self.days) if d.weekday() < 5], dtype=np.int64)
+        self.workday_pos = {int(day): pos for pos, day in enumerate(self.workdays)}
+
+        self.employee_ids: List[str] = []
+        self.row: Dict[str, int] = {}
+        self.capacity = np.zeros((0, horizon_days))
+        self.allocated = np.zeros((0, horizon_days))
+        self._signatures: Dict[str, Tuple] = {}
+
+    # --- KAPASİTE ---
+
+    def capacity_row(self, employee: Dict[str, Any]) -> np.ndarray:
+        factor = 0.5 if employee.get("availability_status") == "limited" else 1.0
+        row = np.zeros(len(self.days))
+        row[self.workdays] = self.hours_per_day * factor
+        if employee.get("availability_status", "available") != "available":
+            until = parse_date(employee.get("unavailable_until"))
+            # Bitiş tarihi olmayan izinler süresiz kabul edilir
+            blocked_days = len(self.days) if until is None else max(0, (until - self.today).days + 1)
+            row[:blocked_days] = 0
+        return row
+
+    def set_employees(self, employees: Dict[str, Dict[str, Any]]) -> bool:
+        """
+        Çalışanları deftere işler; yalnızca müsaitliği değişenlerin satırı yenilenir.
+
+        Returns:
+            Çalışan listesi değiştiyse (tahsisler sıfırlandıysa) True
+        """
+        employee_ids = list(employees.keys())
+        reset = employee_ids != self.employee_ids
+        if reset:
+            self.employee_ids = employee_ids
+            self.row = {employee_id: i for i, employee_id in enumerate(employee_ids)}
+            self.capacity = np.zeros((len(employee_ids), len(self.days)))
+            self.allocated = np.zeros((len(employee_ids), len(self.days)))
+            self._signatures = {}
+        for employee_id, employee in employees.items():
+            self.set_availability(employee_id, employee)
+        return reset
+
+    def set_availability(self, employee_id: str, employee: Dict[str, Any]):
+        """Çalışanın kapasite satırını müsaitlik değişikliğine göre günceller."""
+        row = self.row.get(employee_id)
+        signature = capacity_signature(employee)
+        if row is None or self._signatures.get(employee_id) == signature:
+            return
+        self.capacity[row] = self.capacity_row(employee)
+        self._signatures[employee_id] = signature
+
+    # --- TAHSİS ---
+
+    def allocate(self, row: int, days: np.ndarray, daily: float):
+        self.allocated[row, days] += daily
+
+    def release(self, row: int, days: np.ndarray, daily: float):
+        self.allocated[row, days] -= daily
+
+    def free(self) -> np.ndarray:
+        """Gün bazında boş saat matrisi (kopya)."""
+        return (self.capacity - self.allocated).clip(min=0)
+
+    # --- ARALIK SORGULARI ---
+
+    def day_range(self, start: datetime.date, end: datetime.date) -> slice:
+        """[start, end] tarih aralığının ufuk içindeki gün dilimi."""
+        first = min(max(0, (start - self.today).days), len(self.days))
+        last = min(max(0, (end - self.today).days + 1), len(self.days))
+        return slice(first, max(first, last))
+
+    def range_hours(self, start: datetime.date, end: datetime.date) -> Dict[str, np.ndarray]:
+        """Çalışan başına aralıktaki kapasite, tahsis ve boş saat vektörleri."""
+        days = self.day_range(start, end)
+        capacity = self.capacity[:, days]
+        allocated = self.allocated[:, days]
+        return {
+            "capacity": capacity.sum(axis=1),
+            "allocated": allocated.sum(axis=1),
+            "free": (capacity - allocated).clip(min=0).sum(axis=1)
+        }
+
+    def find_available(self, hours: float, start: datetime.date, end: datetime.date,
+                       employee_ids: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+        """Aralıkta en az `hours` boş saati olan çalışanlar (boş saate göre azalan)."""
+        totals = self.range_hours(start, end)
+        rows = np.arange(len(self.employee_ids)) if employee_ids is None else \
+            np.array([self.row[e] for e in employee_ids if e in self.row], dtype=np.int64)
+        if len(rows) == 0:
+            return []
+        rows = rows[totals["free"][rows] >= hours]
+        rows = rows[np.argsort(-totals["free"][rows], kind="stable")]
+        return [
+            {
+                "employee_id": self.employee_ids[row],
+                "free_hours": round(float(totals["free"][row]), 1),
+                "capacity_hours": round(float(totals["capacity"][row]), 1),
+                "allocated_hours": round(float(totals["allocated"][row]), 1)
+            }
+            for row in rows
+        ]
@@ -0,0 +1,308 @@
+import hashlib
+import heapq
+import json
+import math
+import os
+import re
+import tempfile
+import threading
+from collections import Counter
+from typing import Dict, Any, List, Optional, Iterable
+
+from app.config import CLAUSE_INDEX_DIR
+from app.services.contract_preprocessor import estimate_tokens
+from app.services.pdf_extractor import PAGE_MARKER_PATTERN, is_heading
+
+# BM25 parametreleri
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+# Bir maddenin hedef uzunluğu; uzun bölümler paragraf sınırlarından bölünür (~300 token)
+MAX_CLAUSE_CHARS = 1200
+
+# Segment biçimi değişirse eski dosyalar yeniden indekslenir
+INDEX_VERSION = 2
+
+# Türkçe eklemeli yapısı için kelimenin ilk 5 harfi kök kabul edilir ("ödemeler" -> "odeme")
+STEM_LENGTH = 5
+
+MARKDOWN_HEADING = re.compile(r"^#{1,6}\s+(.+?)\s*#*$")
+TOKEN_PATTERN = re.compile(r"\w+", re.UNICODE)
+
+# Türkçe karakterler katlanır; sorgu "odeme" ile de "ödeme" ile de eşleşir
+CHAR_FOLD = str.maketrans({"ı": "i", "ç": "c", "ş": "s", "ğ": "g", "ö": "o", "ü": "u", "â": "a", "î": "i", "û": "u"})
+
+STOPWORDS = {
+    "ve", "ile", "bu", "bir", "da", "de", "icin", "olan", "olarak", "gibi", "her", "veya", "ya", "ise",
+    "ne", "nedir", "neler", "hangi", "mi", "mu", "ki", "daha", "en", "cok", "kadar", "sonra",
+    "the", "and", "or", "of", "to", "in", "for", "on", "is", "are", "what", "which", "a", "an", "by", "with"
+}
+
+
+def tokenize(text: str) -> List[str]:
+    """Küçük harfe çevirme (Türkçe İ/I), karakter katlama, durak kelime eleme ve önek kökleme."""
+    text = (text or "").replace("İ", "i").replace("I", "ı").lower().translate(CHAR_FOLD)
+    return [
+        token[:STEM_LENGTH]
+        for token in TOKEN_PATTERN.findall(text)
+        if len(token) > 1 and token not in STOPWORDS and not token.isdigit()
+    ]
+
+
+def _heading_title(line: str, previous: Optional[str] = None) -> Optional[str]:
+    match = MARKDOWN_HEADING.match(line)
+    if match:
+        return match.group(1).strip()
+    return line if is_heading(line, previous) else None
+
+
+def split_clauses(text: str) -> List[Dict[str, Any]]:
+    """
+    Ayrıştırılmış sözleşme metnini başlıklara, uzun bölümleri paragraflara göre maddelere böler.
+
+    Returns:
+        [{"title", "text", "start", "end", "page"}]; start/end orijinal metindeki ofsetlerdir
+    """
+    clauses: List[Dict[str, Any]] = []
+    current: Optional[Dict[str, Any]] = None
+    page = None
+    offset = 0
+    # Paragraftaki bir önceki gövde satırı (devam satırları başlık sayılmaz)
+    previous = None
+
+    def close():
+        if current and current["lines"]:
+            clauses.append({
+                "title": current["title"],
+                "text": "\n".join(current["lines"]),
+                "start": current["start"],
+                "end": current["end"],
+                "page": current["page"]
+            })
+
+    for raw in (text or "").splitlines(keepends=True):
+        line_start = offset
+        offset += len(raw)
+        stripped = raw.strip()
+
+        marker = PAGE_MARKER_PATTERN.fullmatch(stripped)
+        if marker:
+            page = int(marker.group(1))
+            continue
+
+        title = _heading_title(stripped, previous) if stripped else None
+        previous = None if title is not None or not stripped else stripped
+        if title is not None:
+            close()
+            current = {"title": title, "lines": [], "chars": 0, "start": line_start, "end": line_start, "page": page}
+            continue
+
+        if not stripped:
+            # Paragraf sınırı: madde yeterince uzunsa aynı başlıkla devam maddesi açılır
+            if current and current["chars"] >= MAX_CLAUSE_CHARS:
+                close()
+                current = {**current, "lines": [], "chars": 0, "start": offset, "end": offset, "page": page}
+            continue
+
+        if current is None or current["chars"] >= 2 * MAX_CLAUSE_CHARS:
+            close()
+            title = current["title"] if current else ""
+            current = {"title": title, "lines": [], "chars": 0, "start": line_start, "end": line_start, "page": page}
+        line = " ".join(stripped.split())
+        current["lines"].append(line)
+        current["chars"] += len(line)
+        current["end"] = line_start + len(raw.rstrip("\r\n"))
+
+    close()
+    return clauses
+
+
+class ClauseIndex:
+    """
+    Sözleşme maddeleri üzerinde BM25 ters indeksi.
+
+    Her sözleşme ayrı bir segment dosyasında (madde metinleri, ofsetler, terim frekansları)
+    saklanır. Sözleşme eklendiğinde/değiştiğinde yalnızca onun segmenti yazılır ve ters indeksteki
+    katkısı güncellenir; süreç yeniden başladığında segmentler diskten okunur.
+    """
+    def __init__(self, directory: str = CLAUSE_INDEX_DIR):
+        self.directory = directory
+        self._segments: Dict[str, Dict[str, Any]] = {}
+        self._postings: Dict[str, Dict[tuple, int]] = {}
+        self._total_length = 0
+        self._clause_count = 0
+        self._loaded = False
+        self._lock = threading.RLock()
+
+    # --- KALICILIK ---
+
+    def _segment_path(self, contract_id: str) -> str:
+        return os.path.join(self.directory, f"{contract_id}.json")
+
+    def _load(self):
+        if self._loaded:
+            return
+        self._loaded = True
+        if not os.path.isdir(self.directory):
+            return
+        for name in os.listdir(self.directory):
+            if not name.endswith(".json"):
+                continue
+            try:
+                with open(os.path.join(self.directory, name), encoding="utf-8") as f:
+                    segment = json.load(f)
+            except (OSError, ValueError) as e:
+                print(f"[Clause Index] Segment okunamadı ({name}): {e}")
+                continue
+            if segment.get("version") == INDEX_VERSION:
+                self._add_segment(segment)
+        print(f"[Clause Index] {len(self._segments)} sözleşme, {self._clause_count} madde yüklendi")
+
+    def _write_segment(self, segment: Dict[str, Any]):
+        os.makedirs(self.directory, exist_ok=True)
+        with tempfile.NamedTemporaryFile("w", dir=self.directory, suffix=".part", delete=False, encoding="utf-8") as tmp:
+            json.dump(segment, tmp, ensure_ascii=False)
+        os.replace(tmp.name, self._segment_path(segment["contract_id"]))
+
+    # --- TERS İNDEKS ---
+
+    def _add_segment(self, segment: Dict[str, Any]):
+        contract_id = segment["contract_id"]
+        for i, clause in enumerate(segment["clauses"]):
+            for term, tf in clause["tf"].items():
+                self._postings.setdefault(term, {})[(contract_id, i)] = tf
+            self._total_length += clause["length"]
+        self._clause_count += len(segment["clauses"])
+        self._segments[contract_id] = segment
+
+    def _drop_segment(self, contract_id: str):
+        segment = self._segments.pop(contract_id, None)
+        if not segment:
+            return
+        for i, clause in enumerate(segment["clauses"]):
+            for term in clause["tf"]:
+                postings = self._postings.get(term)
+                if postings is not None:
+                    postings.pop((contract_id, i), None)
+                    if not postings:
+                        del self._postings[term]
+            self._total_length -= clause["length"]
+        self._clause_count -= len(segment["clauses"])
+
+    # --- GÜNCELLEME ---
+
+    def index_contract(self, contract_id: str, text: str, metadata: Optional[Dict[str, Any]] = None) -> int:
+        """
+        Sözleşmeyi maddelerine ayırıp indeksler; metni değişmemişse hiçbir şey yapmaz.
+
+        Returns:
+            İndeksteki madde sayısı
+        """
+        text_hash = hashlib.sha256((text or "").encode("utf-8")).hexdigest()
+        with self._lock:
+            self._load()
+            existing = self._segments.get(contract_id)
+            if existing and existing["text_hash"] == text_hash:
+                return len(existing["clauses"])
+
+            clauses = []
+            for clause in split_clauses(text):
+                # Başlık, devam maddeleri dahil her maddenin içeriğine katılır
+                tokens = tokenize(f"{clause['title']} {clause['text']}")
+                if tokens:
+                    clauses.append({**clause, "tf": dict(Counter(tokens)), "length": len(tokens)})
+            segment = {
+                "version": INDEX_VERSION,
+                "contract_id": contract_id,
+                "text_hash": text_hash,
+                "metadata": metadata or {},
+                "clauses": clauses
+            }
+
+            self._drop_segment(contract_id)
+            self._add_segment(segment)
+            try:
+                self._write_segment(segment)
+            except OSError as e:
+                print(f"[Clause Index] Segment yazılamadı ({contract_id}): {e}")
+        print(f"[Clause Index] {contract_id}: {len(clauses)} madde indekslendi")
+        return len(clauses)
+
+    def index_record(self, contract: Dict[str, Any], reindex: bool = True) -> int:
+        """
+        Sözleşme kaydını (parsed_text veya contract_text) indeksler; reindex=False ise yalnızca
+        indekste olmayan kayıtlar (bu özellikten önce ayrıştırılmış sözleşmeler) indekslenir.
+        """
+        contract_id = contract["contract_id"]
+        if not reindex and self.is_indexed(contract_id):
+            return len(self._segments[contract_id]["clauses"])
+        text = contract.get("parsed_text") or contract.get("contract_text")
+        if not text:
+            return 0
+        return self.index_contract(contract_id, text, {
+            "contract_name": contract.get("contract_name"),
+            "project_id": contract.get("project_id")
+        })
+
+    def remove_contract(self, contract_id: str):
+        with self._lock:
+            self._load()
+            self._drop_segment(contract_id)
+            try:
+                os.remove(self._segment_path(contract_id))
+            except FileNotFoundError:
+                pass
+
+    def is_indexed(self, contract_id: str) -> bool:
+        with self._lock:
+            self._load()
+            return contract_id in self._segments
+
+    # --- ARAMA ---
+
+    def search(self, query: str, top_k: int = 5, contract_ids: Optional[Iterable[str]] = None) -> List[Dict[str, Any]]:
+        """
+        BM25 ile sorguya en uygun maddeleri döndürür.
+
+        Args:
+            contract_ids: Verilirse yalnızca bu sözleşmelerin maddeleri aranır
+        """
+        terms = set(tokenize(query))
+        scope = set(contract_ids) if contract_ids is not None else None
+        with self._lock:
+            self._load()
+            if not terms or not self._clause_count:
+                return []
+            avg_length = self._total_length / self._clause_count
+            scores: Dict[tuple, float] = {}
+            for term in terms:
+                postings = self._postings.get(term)
+                if not postings:
+                    continue
+                idf = math.log(1 + (self._clause_count - len(postings) + 0.5) / (len(postings) + 0.5))
+                for key, tf in postings.items():
+                    if scope is not None and key[0] not in scope:
+                        continue
+                    length = self._segments[key[0]]["clauses"][key[1]]["length"]
+                    norm = tf + BM25_K1 * (1 - BM25_B + BM25_B * length / avg_length)
+                    scores[key] = scores.get(key, 0.0) + idf * tf * (BM25_K1 + 1) / norm
+
+            results = []
+            for (contract_id, i), score in heapq.nlargest(top_k, scores.items(), key=lambda item: item[1]):
+                segment = self._segments[contract_id]
+                clause = segment["clauses"][i]
+                results.append({
+                    "contract_id": contract_id,
+                    "contract_name": segment["metadata"].get("contract_name"),
+                    "title": clause["title"],
+                    "text": clause["text"],
+                    "start": clause["start"],
+                    "end": clause["end"],
+                    "page": clause["page"],
+                    "score": round(score, 3),
+                    "tokens": estimate_tokens(clause["text"])
+                })
+            return results
+
+
+clause_index = ClauseIndex()
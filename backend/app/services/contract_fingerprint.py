@@ -0,0 +1,39 @@
+import hashlib
+import unicodedata
+from typing import Dict, Any, Optional
+
+# Yinelenen sözleşmeye bağlanırken asıl kayıttan kopyalanan analiz çıktıları
+LINKED_ARTIFACTS = ("file_path", "file_url", "parsed_text", "cleaned_text", "preprocessing", "analysis", "project_id", "status")
+
+
+def normalize_contract_text(text: str) -> str:
+    """Unicode biçimini (NFC) ve boşlukları sadeleştirir; biçim farkları aynı parmak izini verir."""
+    return " ".join(unicodedata.normalize("NFC", text or "").split())
+
+
+def text_sha256(text: str) -> str:
+    return hashlib.sha256(normalize_contract_text(text).encode("utf-8")).hexdigest()
+
+
+def link_to_existing(contract_data: Dict[str, Any], existing: Optional[Dict[str, Any]],
+                     contract_id: Optional[str] = None) -> bool:
+    """
+    Yeni sözleşme kaydını aynı içerikli mevcut sözleşmenin blob, metin ve analizine bağlar (yerinde).
+
+    Yalnızca analiz edilmiş kayda bağlanılır ve `duplicate_of` her zaman asıl (kök) kaydı gösterir;
+    kayıt kendisine (veya kendi kopyasına) bağlanmaz.
+
+    Returns:
+        Bağlantı kurulduysa True
+    """
+    if not existing or existing.get("status") != "analyzed":
+        return False
+    root_id = existing.get("duplicate_of") or existing.get("contract_id")
+    if not root_id or contract_id in (root_id, existing.get("contract_id")):
+        return False
+    for field in LINKED_ARTIFACTS:
+        if existing.get(field) is not None:
+            contract_data[field] = existing[field]
+    contract_data["duplicate_of"] = root_id
+    print(f"[Contract Dedup] Yinelenen içerik, mevcut sözleşmeye bağlandı: {contract_data['duplicate_of']}")
+    return True
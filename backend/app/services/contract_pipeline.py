@@ -0,0 +1,291 @@
+import asyncio
+import copy
+import os
+import threading
+import time
+import uuid
+from typing import Dict, Any, List, Optional
+
+from app.config import CONTRACT_PIPELINE_LIMITS
+from app.services.assignment_scoring import score_employee
+from app.services.clause_index import clause_index
+from app.services.contract_fingerprint import link_to_existing
+from app.services.contract_preprocessor import prepare_for_analysis
+from app.services.contract_spool import contract_spool
+from app.services.task_dedup import dedupe_tasks
+from app.services.workload import effective_workload, workload_deltas
+
+# Aşamalar çalışma sırasıyla
+PIPELINE_STAGES = ("parse", "analyze", "tasks", "assign")
+
+
+class PipelineDocument:
+    """Aşamalar arasında taşınan doküman durumu ve rapor satırı."""
+    def __init__(self, name: str, local_path: str, contract_data: Dict[str, Any]):
+        self.name = name
+        self.local_path = local_path
+        self.contract_id = f"contract_{uuid.uuid4().hex[:8]}"
+        self.contract_data = contract_data
+        self.parsed_text: Optional[str] = None
+        self.analysis: Optional[Dict[str, Any]] = None
+        self.tasks: List[Dict[str, Any]] = []
+        self.content_type = "application/pdf"
+        self.project_id: Optional[str] = None
+        self.report: Dict[str, Any] = {
+            "document": name,
+            "contract_id": self.contract_id,
+            "status": "pending",
+            "stage": None,
+            "timings": {}
+        }
+
+
+class ContractPipeline:
+    """
+    Çok sayıda sözleşmeyi aşamalı boru hattıyla analiz eder.
+
+    Ayrıştırma, analiz, görev üretimi ve atama ayrı aşamalardır; her aşamanın kendi eşzamanlılık
+    sınırı vardır. Dokümanlar aşamalardan bağımsız ilerler, böylece N. doküman analiz edilirken
+    N+1. doküman ayrıştırılır. Engelleyen çağrılar iş parçacıklarında çalışır.
+    """
+    def __init__(self, db, limits: Optional[Dict[str, int]] = None, auto_assign: bool = True,
+                 force: bool = False, parser=None, groq_service=None):
+        self.db = db
+        self.limits = {**CONTRACT_PIPELINE_LIMITS, **(limits or {})}
+        self.auto_assign = auto_assign
+        self.force = force
+        self.parser = parser
+        self.groq_service = groq_service
+        self._semaphores: Dict[str, asyncio.Semaphore] = {}
+        self._in_flight: Dict[str, asyncio.Event] = {}
+        self._employees: Optional[List[Dict[str, Any]]] = None
+        self._workloads: Dict[str, Dict[str, float]] = {}
+        self._assign_lock = threading.Lock()
+
+    # --- GİRİŞ ---
+
+    async def ingest_upload(self, upload, content_type: str = "application/pdf") -> PipelineDocument:
+        """UploadFile'ı yerel depoya akıtarak boru hattı dokümanı oluşturur (Storage'a işlenirken yüklenir)."""
+        ingest = await contract_spool.ingest(upload)
+        return self._document(upload.filename, ingest, content_type)
+
+    async def ingest_path(self, path: str, content_type: str = "application/pdf") -> PipelineDocument:
+        """Yerel dosyayı (CLI) yerel depoya akıtarak boru hattı dokümanı oluşturur."""
+        with open(path, "rb") as f:
+            ingest = await contract_spool.ingest(_AsyncFileReader(f))
+        return self._document(os.path.basename(path), ingest, content_type)
+
+    def _document(self, name: str, ingest: Dict[str, Any], content_type: str) -> PipelineDocument:
+        doc = PipelineDocument(name, ingest["local_path"], {
+            "contract_name": name,
+            "file_size": ingest["file_size"],
+            "content_hash": ingest["content_hash"],
+            "status": "uploaded"
+        })
+        doc.content_type = content_type
+        return doc
+
+    def _upload(self, doc: PipelineDocument):
+        """Yinelenen değilse dosyayı yerel depodan Storage'a yükler."""
+        file_path = f"contracts/{uuid.uuid4().hex}.pdf"
+        doc.contract_data["file_url"] = contract_spool.publish(doc.local_path, self.db, file_path, doc.content_type)
+        doc.contract_data["file_path"] = file_path
+
+    # --- ÇALIŞTIRMA ---
+
+    async def run(self, documents: List[PipelineDocument]) -> List[Dict[str, Any]]:
+        """Tüm dokümanları boru hattından geçirir ve doküman başına durum raporu döner."""
+        if self.parser is None:
+            from app.services.llamaparse_service import LlamaParseService
+            self.parser = LlamaParseService()
+        if self.groq_service is None:
+            from app.services.groq_service import GroqService
+            self.groq_service = GroqService()
+
+        self._semaphores = {stage: asyncio.Semaphore(max(1, self.limits[stage])) for stage in PIPELINE_STAGES}
+        started = time.perf_counter()
+        await asyncio.gather(*(self._process(doc) for doc in documents))
+        print(f"[Contract Pipeline] {len(documents)} doküman {time.perf_counter() - started:.1f} sn'de işlendi")
+        return [doc.report for doc in documents]
+
+    async def _process(self, doc: PipelineDocument):
+        if not self.force:
+            # Aynı toplu işteki aynı içerikli doküman önce işlenir, sonrakiler ona bağlanır
+            content_hash = doc.contract_data["content_hash"]
+            first = self._in_flight.get(content_hash)
+            if first is not None:
+                await first.wait()
+            if self._link_duplicate(doc):
+                return
+            self._in_flight[content_hash] = asyncio.Event()
+
+        try:
+            try:
+                await asyncio.to_thread(self._upload, doc)
+            except Exception as e:
+                doc.report.update({"status": "failed", "stage": "upload", "error": str(e)})
+                self.db.save_contract(doc.contract_id, {**doc.contract_data, "status": "failed", "error": str(e)})
+                print(f"[Contract Pipeline] {doc.name} Storage'a yüklenemedi: {e}")
+                return
+            self.db.save_contract(doc.contract_id, doc.contract_data)
+            await self._run_stages(doc)
+        finally:
+            if not self.force:
+                self._in_flight[doc.contract_data["content_hash"]].set()
+
+    async def _run_stages(self, doc: PipelineDocument):
+        stages = PIPELINE_STAGES if self.auto_assign else PIPELINE_STAGES[:-1]
+        for stage in stages:
+            doc.report["stage"] = stage
+            async with self._semaphores[stage]:
+                started = time.perf_counter()
+                try:
+                    await asyncio.to_thread(getattr(self, f"_{stage}"), doc)
+                except Exception as e:
+                    doc.report["status"] = "failed"
+                    doc.report["error"] = str(e)
+                    self.db.save_contract(doc.contract_id, {**doc.contract_data, "status": "failed", "error": str(e)})
+                    print(f"[Contract Pipeline] {doc.name} '{stage}' aşamasında başarısız: {e}")
+                    return
+                finally:
+                    doc.report["timings"][stage] = round(time.perf_counter() - started, 2)
+
+        doc.report.update({
+            "status": "analyzed",
+            "stage": None,
+            "project_id": doc.project_id,
+            "project_name": doc.analysis.get("project_name"),
+            "total_tasks": len(doc.tasks),
+            "assigned_count": sum(1 for t in doc.tasks if t.get("assigned_employee_id"))
+        })
+
+    def _link_duplicate(self, doc: PipelineDocument) -> bool:
+        existing = self.db.find_contract_by_fingerprint("content_hash", doc.contract_data["content_hash"])
+        if not link_to_existing(doc.contract_data, existing, doc.contract_id):
+            return False
+        self.db.save_contract(doc.contract_id, doc.contract_data)
+        doc.report.update({
+            "status": "duplicate",
+            "duplicate_of": doc.contract_data["duplicate_of"],
+            "project_id": doc.contract_data.get("project_id")
+        })
+        return True
+
+    # --- AŞAMALAR ---
+
+    def _parse(self, doc: PipelineDocument):
+        doc.parsed_text = self.parser.parse_pdf(doc.local_path, content_hash=doc.contract_data["content_hash"])
+
+    def _analyze(self, doc: PipelineDocument):
+        analysis_text, preprocessing = prepare_for_analysis(doc.parsed_text)
+        doc.contract_data.update(preprocessing)
+        if preprocessing:
+            doc.report["tokens"] = preprocessing["preprocessing"]["tokens"]
+        analysis = self.groq_service.analyze_project(analysis_text)
+        if not analysis.get("project_name") or analysis.get("project_name") == "Yeni Proje":
+            name = doc.name
+            analysis["project_name"] = name[:-4] if name.lower().endswith(".pdf") else name
+        doc.analysis = analysis
+
+    def _tasks(self, doc: PipelineDocument):
+        # Proje önce kaydedilir; paralel üretimde görev grupları geldikçe kaydedilir
+        doc.project_id = f"project_{uuid.uuid4().hex[:8]}"
+        self.db.save_project(doc.project_id, doc.analysis)
+
+        def persist_group(group_id: str, group_tasks: List[Dict[str, Any]]):
+            self._prepare_tasks(doc, group_tasks)
+            self.db.save_tasks(doc.project_id, group_tasks)
+
+        try:
+            tasks = [
+                t for t in self.groq_service.generate_tasks(doc.analysis, on_tasks=persist_group)
+                if isinstance(t, dict) and t.get("task_title")
+            ]
+            if not tasks:
+                raise ValueError("Hiç geçerli task oluşturulamadı")
+        except Exception:
+            # Yarım kalan proje ve akıtılmış görevler silinir; sözleşme _run_stages'te başarısız işaretlenir
+            self.db.delete_project(doc.project_id)
+            doc.project_id = None
+            raise
+
+        # Kimlikler önce verilir; işaretlenen kopyalar tutulan görevin task_id'sine bağlanır
+        self._prepare_tasks(doc, [t for t in tasks if "task_id" not in t])
+        tasks, dedup_report = dedupe_tasks(tasks)
+        if dedup_report["removed_task_ids"]:
+            self.db.delete_tasks(doc.project_id, dedup_report["removed_task_ids"])
+        doc.report["duplicates_removed"] = dedup_report["removed"]
+        doc.report["duplicates_flagged"] = dedup_report["flagged"]
+        doc.tasks = tasks
+        if not self.auto_assign:
+            self._save(doc)
+
+    def _prepare_tasks(self, doc: PipelineDocument, tasks: List[Dict[str, Any]]):
+        for task in tasks:
+            task["task_id"] = f"task_{uuid.uuid4().hex[:8]}"
+            task["status"] = "pending"
+            task["project_id"] = doc.project_id
+            task["task_attended_to"] = ""
+            task["assigned_employee_id"] = None
+
+    def _assign(self, doc: PipelineDocument):
+        # İş yükü sayaçları dokümanlar arasında paylaşıldığından atamalar sırayla yapılır
+        with self._assign_lock:
+            self._assign_tasks(doc)
+        self._save(doc)
+
+    def _assign_tasks(self, doc: PipelineDocument):
+        employees = self._load_employees()
+        for task in doc.tasks:
+            if task.get("duplicate_of"):
+                continue
+            best = None
+            for employee in employees:
+                # İş yükü seviyesi bu toplu işte yapılan atamalarla birlikte hesaplanır
+                candidate = {**employee, "currentWorkload": effective_workload(employee, self._workloads)}
+                score, reasons = score_employee(task, candidate, employee["department"])
+                if best is None or score > best[0]:
+                    best = (score, employee, reasons)
+            if best is None:
+                continue
+            score, employee, reasons = best
+            task["task_attended_to"] = f"{employee.get('firstName', '')} {employee.get('lastName', '')}".strip()
+            task["assigned_employee_id"] = employee.get("id")
+            task["assignment_reason"] = ", ".join(reasons)
+            workload_deltas(None, task, self._workloads)
+
+    def _save(self, doc: PipelineDocument):
+        self.db.save_tasks(doc.project_id, doc.tasks)
+        doc.contract_data.update({
+            "status": "analyzed",
+            "project_id": doc.project_id,
+            "parsed_text": doc.parsed_text,
+            "analysis": doc.analysis
+        })
+        self.db.save_contract(doc.contract_id, doc.contract_data)
+        clause_index.index_record({**doc.contract_data, "contract_id": doc.contract_id})
+
+    # --- ATAMA YARDIMCILARI ---
+
+    def _load_employees(self) -> List[Dict[str, Any]]:
+        """Müsait çalışanlar; toplu iş boyunca bir kez okunur."""
+        if self._employees is not None:
+            return self._employees
+        company_data = copy.deepcopy(self.db.get_company_structure() or {})
+        self._workloads = copy.deepcopy(self.db.get_employee_workloads() or {})
+        self._employees = []
+        for dept in company_data.get("companyStructure", {}).get("departments", []):
+            for team in dept.get("teams", []):
+                for employee in team.get("employees", []):
+                    if employee.get("availability_status", "available") == "available":
+                        self._employees.append({**employee, "department": dept["name"], "team": team["name"]})
+        return self._employees
+
+
+class _AsyncFileReader:
+    """Yerel dosyayı ContractSpool.ingest'in beklediği async read arayüzüyle sunar."""
+    def __init__(self, f):
+        self.f = f
+
+    async def read(self, size: int = -1) -> bytes:
+        return self.f.read(size)
@@ -0,0 +1,293 @@
+import math
+import re
+from collections import Counter
+from typing import Dict, Any, List, Optional, Tuple
+
+from app.config import CONTRACT_PREPROCESS
+from app.services.pdf_extractor import PAGE_MARKER_PATTERN, is_heading
+
+# Sayfa numarası satırları: "3", "- 3 -", "Sayfa 3 / 12", "Page 3 of 12"
+PAGE_NUMBER_PATTERN = re.compile(
+    r"^[-–\s]*((sayfa|page)\s*)?\d{1,4}(\s*(/|of|-)\s*\d{1,4})?[-–\s]*$", re.IGNORECASE
+)
+
+# İmza bloğu satırları: çizgiler ve içeriksiz etiketler ("İmza:", "Kaşe / İmza", "Adı Soyadı:")
+SIGNATURE_RULE_PATTERN = re.compile(r"^[\s_.\-…]{5,}$")
+SIGNATURE_LABEL_PATTERN = re.compile(
+    r"^(imza|kaşe|kaşe\s*/\s*imza|imza\s*/\s*kaşe|signature|adı\s+soyadı|ad\s+soyad|unvan|name|title|tarih|date)"
+    r"\s*[:/]?\s*[_.…\s]*$",
+    re.IGNORECASE
+)
+
+# Sayfaların ilk/son kaç satırı üst/alt bilgi adayıdır
+HEADER_FOOTER_LINES = 3
+
+# Bir satırın tekrar eden üst/alt bilgi sayılması için geçtiği sayfa oranı (en az 3 sayfa)
+HEADER_FOOTER_MIN_PAGES = 3
+HEADER_FOOTER_PAGE_RATIO = 0.5
+
+# Sayfa işareti olmayan metinde tekrar eden kısa satır eşikleri
+REPEATED_LINE_MIN_COUNT = 3
+REPEATED_LINE_MAX_LENGTH = 80
+
+# Sayfa işareti yokken tekrar sayılmayan satırlar: tablo satırları ve liste maddeleri
+# (taksit tabloları, madde listeleri meşru olarak tekrar eder)
+TABLE_ROW_PATTERN = re.compile(r"^\|")
+LIST_ITEM_PATTERN = re.compile(r"^([-*•–]|\(?\d{1,3}[.)]|\(?[a-zçğıöşü][.)])\s", re.IGNORECASE)
+
+# Ofset eşlemesinde bir aralığın en fazla kapsadığı temiz metin (satırlar aralıklarda birleştirilir,
+# böylece eşleme belgesi Firestore'un 1 MB sınırına yaklaşmaz)
+OFFSET_SEGMENT_CHARS = 500
+
+# Standart madde başlığının önündeki numaralandırma: "3.", "3.1", "MADDE 3 -", "Article 12:"
+HEADING_NUMBERING = r"(?:(?:madde|article|bölüm|section)\s+)?(?:\d+(?:\.\d+)*\.?)?\s*[-–:.)]?\s*"
+
+
+def _clause_heading(alternatives: str) -> re.Pattern:
+    """Başlığın tamamıyla (numara hariç) eşleşen kalıp; "Sistem Tanımları ve Kapsam" gibi başlıklar eşleşmez."""
+    return re.compile(rf"{HEADING_NUMBERING}(?:{alternatives})\s*[:.]?", re.IGNORECASE)
+
+
+# Tanınan standart (boilerplate) maddeler: (tür, başlık kalıbı, gövde kısaltılsın mı)
+# Hukuki risk taşıyabilen maddeler (mücbir sebep, uyuşmazlık) etiketlenir ama korunur.
+BOILERPLATE_CLAUSES = (
+    ("definitions", _clause_heading(r"tanımlar(?:\s+ve\s+kısaltmalar)?|definitions(?:\s+and\s+interpretation)?"), True),
+    ("notices", _clause_heading(r"tebligat(?:\s+adresleri)?|bildirim(?:ler)?(?:\s+ve\s+tebligat)?|bildirim\s+adresleri|notices"), True),
+    ("stamp_tax", _clause_heading(r"damga\s+vergisi|stamp\s+(?:tax|duty)"), True),
+    ("counterparts", _clause_heading(r"nüshalar|nüsha(?:\s+sayısı)?|counterparts"), True),
+    ("severability", _clause_heading(r"bölünebilirlik|kısmi\s+geçersizlik|severability"), True),
+    ("entire_agreement", _clause_heading(r"sözleşmenin\s+bütünlüğü|entire\s+agreement"), True),
+    ("force_majeure", _clause_heading(r"mücbir\s+sebep(?:ler)?|force\s+majeure"), False),
+    ("governing_law", _clause_heading(
+        r"uyuşmazlık(?:ların\s+çözümü)?|yetkili\s+mahkeme(?:\s+ve\s+icra\s+daireleri)?|uygulanacak\s+hukuk"
+        r"|governing\s+law(?:\s+and\s+jurisdiction)?|jurisdiction"
+    ), False),
+)
+
+MARKDOWN_HEADING = re.compile(r"^#{1,6}\s+(.+)$")
+DIGITS = re.compile(r"\d+")
+
+# Kısaltılan standart maddelerde tutulan en fazla karakter
+COLLAPSED_CLAUSE_CHARS = 160
+
+
+def estimate_tokens(text: str) -> int:
+    """Yaklaşık token sayısı (~4 karakter / token)."""
+    return math.ceil(len(text or "") / 4)
+
+
+def _line_signature(line: str) -> str:
+    """Sayfa numarası gibi değişen rakamlar yok sayılarak karşılaştırılan satır imzası."""
+    return DIGITS.sub("#", " ".join(line.split()).lower())
+
+
+def _split_lines(text: str) -> List[Tuple[int, str, Optional[int]]]:
+    """Metni (orijinal ofset, satır, sayfa numarası) üçlülerine ayırır."""
+    lines = []
+    offset = 0
+    page = None
+    for raw in text.splitlines(keepends=True):
+        line = raw.rstrip("\r\n")
+        marker = PAGE_MARKER_PATTERN.fullmatch(line.strip())
+        if marker:
+            page = int(marker.group(1))
+        lines.append((offset, line, page))
+        offset += len(raw)
+    return lines
+
+
+def _repeated_signatures(lines: List[Tuple[int, str, Optional[int]]]) -> set:
+    """Sayfaların başında/sonunda tekrar eden (üst/alt bilgi) satır imzaları."""
+    pages: Dict[int, List[str]] = {}
+    for _, line, page in lines:
+        if page is not None and line.strip() and not PAGE_MARKER_PATTERN.fullmatch(line.strip()):
+            pages.setdefault(page, []).append(_line_signature(line))
+
+    if len(pages) >= HEADER_FOOTER_MIN_PAGES:
+        counts = Counter()
+        for page_lines in pages.values():
+            edges = set(page_lines[:HEADER_FOOTER_LINES] + page_lines[-HEADER_FOOTER_LINES:])
+            counts.update(edges)
+        limit = max(HEADER_FOOTER_MIN_PAGES, HEADER_FOOTER_PAGE_RATIO * len(pages))
+        return {sig for sig, count in counts.items() if count >= limit}
+
+    # Sayfa bilgisi yoksa (LlamaParse çıktısı) birebir aynı tekrar eden kısa satırlar; rakam içeren
+    # satırlar (rakam maskesi farklı satırları eşitler), tablo satırları ve liste maddeleri korunur
+    counts = Counter(
+        _line_signature(line) for _, line, _ in lines
+        if _repeatable_without_pages(line.strip())
+    )
+    return {sig for sig, count in counts.items() if count >= REPEATED_LINE_MIN_COUNT}
+
+
+def _repeatable_without_pages(line: str) -> bool:
+    return (
+        bool(line)
+        and len(line) <= REPEATED_LINE_MAX_LENGTH
+        and not is_heading(line)
+        and not DIGITS.search(line)
+        and not TABLE_ROW_PATTERN.match(line)
+        and not LIST_ITEM_PATTERN.match(line)
+    )
+
+
+def _boilerplate_type(line: str) -> Optional[Tuple[str, bool]]:
+    for clause_type, pattern, collapse in BOILERPLATE_CLAUSES:
+        if pattern.fullmatch(line.strip()):
+            return clause_type, collapse
+    return None
+
+
+def _heading_text(line: str, previous: Optional[str] = None) -> Optional[str]:
+    match = MARKDOWN_HEADING.match(line)
+    if match:
+        return match.group(1).strip()
+    return line if is_heading(line, previous) else None
+
+
+def preprocess_contract(text: str) -> Dict[str, Any]:
+    """
+    Ayrıştırılmış sözleşme metnini LLM'e gönderilmeden önce sadeleştirir.
+
+    Tekrar eden üst/alt bilgiler, sayfa numaraları, sayfa işaretleri ve imza çizgileri çıkarılır,
+    boşluklar sadeleştirilir, standart maddeler etiketlenir (bir kısmı kısaltılır).
+
+    Returns:
+        {
+            "cleaned_text": str,
+            "offsets": [{"clean_start", "clean_end", "orig_start", "orig_end", "page"}, ...],
+            "removed": {tür: satır sayısı},
+            "boilerplate": [{"type", "title", "collapsed", "clean_offset", "original_offset"}],
+            "tokens": {"original", "cleaned", "reduction_pct"}
+        }
+    """
+    text = text or ""
+    lines = _split_lines(text)
+    repeated = _repeated_signatures(lines)
+
+    out: List[str] = []
+    offsets: List[Dict[str, Optional[int]]] = []
+    removed = Counter()
+    boilerplate: List[Dict[str, Any]] = []
+    clean_pos = 0
+    collapsing: Optional[Dict[str, Any]] = None
+    blank_pending = False
+    # Paragraftaki bir önceki gövde satırı (devam satırları başlık sayılmaz)
+    previous: Optional[str] = None
+
+    def emit(line: str, orig_start: int, orig_end: int, page: Optional[int]):
+        nonlocal clean_pos, blank_pending
+        if out:
+            separator = "\n\n" if blank_pending else "\n"
+            out.append(separator)
+            clean_pos += len(separator)
+        blank_pending = False
+        out.append(line)
+        # Orijinalde art arda gelen (arada çıkarılan satır olmayan) aynı sayfadaki satırlar tek aralıkta birleşir
+        last = offsets[-1] if offsets else None
+        if last and last["orig_end"] == orig_start and last["page"] == page \
+                and clean_pos + len(line) - last["clean_start"] <= OFFSET_SEGMENT_CHARS:
+            last["clean_end"] = clean_pos + len(line)
+            last["orig_end"] = orig_end
+        else:
+            offsets.append({
+                "clean_start": clean_pos, "clean_end": clean_pos + len(line),
+                "orig_start": orig_start, "orig_end": orig_end, "page": page
+            })
+        clean_pos += len(line)
+
+    for i, (orig_start, raw, page) in enumerate(lines):
+        stripped = raw.strip()
+        # Satır sonu dahil; böylece art arda satırlar aynı ofset aralığında birleşebilir
+        orig_end = lines[i + 1][0] if i + 1 < len(lines) else len(text)
+
+        if not stripped:
+            if offsets and offsets[-1]["orig_end"] == orig_start:
+                offsets[-1]["orig_end"] = orig_end
+            blank_pending = bool(out)
+            previous = None
+            continue
+        if PAGE_MARKER_PATTERN.fullmatch(stripped):
+            removed["page_markers"] += 1
+            continue
+        if PAGE_NUMBER_PATTERN.match(stripped):
+            removed["page_numbers"] += 1
+            continue
+        if _line_signature(stripped) in repeated:
+            removed["headers_footers"] += 1
+            continue
+        if SIGNATURE_RULE_PATTERN.match(stripped) or SIGNATURE_LABEL_PATTERN.match(stripped):
+            removed["signature_lines"] += 1
+            continue
+
+        line = " ".join(stripped.split())
+        heading = _heading_text(line, previous)
+        previous = None if heading is not None else line
+        if heading is not None:
+            collapsing = None
+            clause = _boilerplate_type(heading)
+            if clause:
+                clause_type, collapse = clause
+                line = f"{line} [STANDART MADDE: {clause_type}]"
+                boilerplate.append({
+                    "type": clause_type,
+                    "title": heading,
+                    "collapsed": collapse,
+                    "clean_offset": clean_pos + (len("\n\n" if blank_pending else "\n") if out else 0),
+                    "original_offset": orig_start
+                })
+                if collapse:
+                    collapsing = {"remaining": COLLAPSED_CLAUSE_CHARS}
+            emit(line, orig_start, orig_end, page)
+            continue
+
+        if collapsing is not None:
+            # Standart maddenin gövdesi ilk birkaç cümleye indirilir
+            if collapsing["remaining"] <= 0:
+                removed["boilerplate_lines"] += 1
+                continue
+            if len(line) > collapsing["remaining"]:
+                line = line[:collapsing["remaining"]].rsplit(" ", 1)[0] + " …"
+                removed["boilerplate_truncated"] += 1
+            collapsing["remaining"] -= len(line)
+
+        emit(line, orig_start, orig_end, page)
+
+    cleaned_text = "".join(out)
+    original_tokens = estimate_tokens(text)
+    cleaned_tokens = estimate_tokens(cleaned_text)
+    reduction = round(100 * (1 - cleaned_tokens / original_tokens), 1) if original_tokens else 0.0
+
+    print(f"[Contract Preprocess] {original_tokens} -> {cleaned_tokens} token (%{reduction} azalma), "
+          f"{sum(removed.values())} satır çıkarıldı, {len(boilerplate)} standart madde")
+    return {
+        "cleaned_text": cleaned_text,
+        "offsets": offsets,
+        "removed": dict(removed),
+        "boilerplate": boilerplate,
+        "tokens": {"original": original_tokens, "cleaned": cleaned_tokens, "reduction_pct": reduction}
+    }
+
+
+def original_offset(offsets: List[Dict[str, Optional[int]]], clean_offset: int) -> Optional[Dict[str, Optional[int]]]:
+    """Temizlenmiş metindeki bir ofsetin orijinal metinde düştüğü satır aralığı ve sayfası."""
+    for segment in offsets:
+        if segment["clean_start"] <= clean_offset <= segment["clean_end"]:
+            return {"start": segment["orig_start"], "end": segment["orig_end"], "page": segment["page"]}
+    return None
+
+
+def prepare_for_analysis(text: str) -> Tuple[str, Dict[str, Any]]:
+    """
+    analyze_project'e gidecek metni hazırlar.
+
+    Returns:
+        (LLM'e gönderilecek metin, sözleşme kaydına eklenecek alanlar)
+    """
+    if not CONTRACT_PREPROCESS:
+        return text, {}
+    result = preprocess_contract(text)
+    return result["cleaned_text"], {
+        "cleaned_text": result["cleaned_text"],
+        "preprocessing": {key: result[key] for key in ("offsets", "removed", "boilerplate", "tokens")}
+    }
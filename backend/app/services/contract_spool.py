@@ -0,0 +1,125 @@
+import hashlib
+import os
+import tempfile
+from typing import Dict, Any, Optional
+
+from app.config import CONTRACT_SPOOL_DIR, MAX_CONTRACT_UPLOAD_MB
+
+# Multipart gövdesinden tek seferde okunan parça
+READ_CHUNK_SIZE = 1024 * 1024
+
+
+class UploadTooLargeError(ValueError):
+    """Yüklenen dosya MAX_CONTRACT_UPLOAD_MB sınırını aşıyor."""
+
+
+class ContractSpool:
+    """
+    Sözleşme dosyalarının içerik adresli (SHA-256) yerel deposu.
+
+    Yükleme sırasında gövde parça parça okunur; her parça aynı anda hash'lenir ve yerel
+    depoya yazılır, dosyanın tamamı bellekte tutulmaz. Storage'a yalnızca parmak izi yeni
+    olan içerik yüklenir (publish). Analiz dosyayı önce bu depodan okur; yoksa public URL
+    yerine storage istemcisiyle indirip depoya ekler.
+    """
+    def __init__(self, directory: str = CONTRACT_SPOOL_DIR, max_bytes: int = MAX_CONTRACT_UPLOAD_MB * 1024 * 1024):
+        self.directory = directory
+        self.max_bytes = max_bytes
+
+    def path_for(self, content_hash: str) -> str:
+        return os.path.join(self.directory, f"{content_hash}.pdf")
+
+    def _temp_file(self):
+        os.makedirs(self.directory, exist_ok=True)
+        return tempfile.NamedTemporaryFile(dir=self.directory, suffix=".part", delete=False)
+
+    def _commit(self, tmp_path: str, content_hash: str) -> str:
+        path = self.path_for(content_hash)
+        os.replace(tmp_path, path)
+        return path
+
+    async def ingest(self, upload) -> Dict[str, Any]:
+        """
+        UploadFile gövdesini parça parça hash'leyerek yerel depoya yazar; Storage'a dokunmaz.
+        Aynı içerik daha önce yüklendiyse çağıran, parmak izine bakıp yüklemeyi atlayabilir.
+
+        Returns:
+            {"content_hash", "file_size", "local_path"}
+        """
+        digest = hashlib.sha256()
+        file_size = 0
+        tmp = self._temp_file()
+        try:
+            with tmp:
+                while True:
+                    chunk = await upload.read(READ_CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    file_size += len(chunk)
+                    if file_size > self.max_bytes:
+                        raise UploadTooLargeError(
+                            f"Dosya boyutu çok büyük (max {self.max_bytes // (1024 * 1024)}MB)"
+                        )
+                    digest.update(chunk)
+                    tmp.write(chunk)
+        except Exception:
+            os.unlink(tmp.name)
+            raise
+
+        content_hash = digest.hexdigest()
+        local_path = self._commit(tmp.name, content_hash)
+        print(f"[ContractSpool] {file_size} bayt alındı: {content_hash[:12]}")
+        return {
+            "content_hash": content_hash,
+            "file_size": file_size,
+            "local_path": local_path
+        }
+
+    def publish(self, local_path: str, db, storage_path: str, content_type: str) -> str:
+        """
+        Yerel depodaki dosyayı parça parça Storage'a yükler ve public URL'ini döner.
+        Yalnızca parmak izi eşleşmeyen (yeni) içerik için çağrılır.
+        """
+        writer = db.open_file_writer(storage_path, content_type)
+        with open(local_path, "rb") as f:
+            # Kapatılmayan resumable oturum Storage'da dosya oluşturmaz
+            for chunk in iter(lambda: f.read(READ_CHUNK_SIZE), b""):
+                writer.write(chunk)
+        writer.close()
+        return db.publish_file(storage_path)
+
+    def local_path(self, contract: Dict[str, Any], db) -> Optional[str]:
+        """
+        Sözleşme dosyasının yerel yolunu döner; depoda yoksa Storage'dan indirip ekler.
+
+        Returns:
+            Yerel dosya yolu veya sözleşmenin Storage yolu yoksa None
+        """
+        content_hash = contract.get("content_hash")
+        if content_hash and os.path.exists(self.path_for(content_hash)):
+            return self.path_for(content_hash)
+
+        file_path = contract.get("file_path")
+        if not file_path:
+            return None
+
+        tmp = self._temp_file()
+        tmp.close()
+        try:
+            db.download_file(file_path, tmp.name)
+            digest = hashlib.sha256()
+            with open(tmp.name, "rb") as f:
+                for chunk in iter(lambda: f.read(READ_CHUNK_SIZE), b""):
+                    digest.update(chunk)
+        except Exception:
+            os.unlink(tmp.name)
+            raise
+
+        actual_hash = digest.hexdigest()
+        if content_hash and actual_hash != content_hash:
+            print(f"[ContractSpool] Uyarı: hash uyuşmuyor ({file_path}), indirilen içerik kullanılıyor")
+        contract["content_hash"] = actual_hash
+        return self._commit(tmp.name, actual_hash)
+
+
+contract_spool = ContractSpool()
@@ -0,0 +1,264 @@
+import copy
+import hashlib
+import re
+from typing import Dict, Any, List, Optional, Tuple
+
+from app.services.contract_fingerprint import normalize_contract_text
+from app.services.contract_preprocessor import prepare_for_analysis
+from app.services.pdf_extractor import PAGE_MARKER_PATTERN
+from app.services.sprint_planner import parse_date
+from app.services.task_dedup import dedupe_tasks
+
+# Markdown başlıkları (LlamaParse "#", yerel ayrıştırıcı "## " üretir)
+HEADING_PATTERN = re.compile(r"^#{1,6}\s+(.+?)\s*#*\s*$", re.MULTILINE)
+
+# Başlıksız metinde bölüm yerine kullanılan paragraf ayırıcı
+PARAGRAPH_PATTERN = re.compile(r"\n\s*\n")
+
+# Bir analiz maddesinin bir bölüme ait sayılması için kelimelerinin bölümde geçme oranı
+ATTRIBUTION_THRESHOLD = 0.5
+
+# Sürümler arasında birleştirilen liste alanları (analiz JSON'undaki yolları)
+LIST_FIELDS = (
+    ("scopeItems",),
+    ("acceptanceCriteria",),
+    ("techStack",),
+    ("criticalAnalysis", "missingInfo"),
+    ("criticalAnalysis", "risks"),
+    ("criticalAnalysis", "contradictions"),
+    ("criticalAnalysis", "legalConcerns"),
+    ("timeline", "milestones"),
+)
+
+# Kısmi analizden alınan tekil alanlar ve geçerlilik kontrolleri (şablon metinleri elenir)
+SCALAR_FIELDS = (
+    ("timeline", "startDate", lambda v: parse_date(v) is not None),
+    ("timeline", "endDate", lambda v: parse_date(v) is not None),
+    ("budget", "amount", lambda v: any(c.isdigit() for c in str(v))),
+    ("budget", "paymentTerms", lambda v: isinstance(v, str) and len(v) > 3),
+)
+
+WORD_PATTERN = re.compile(r"\w{3,}", re.UNICODE)
+
+
+def _words(text: str) -> set:
+    return set(WORD_PATTERN.findall((text or "").lower()))
+
+
+def _item_key(item: Any) -> str:
+    return normalize_contract_text(str(item)).lower()
+
+
+def _section_key(title: str) -> str:
+    return normalize_contract_text(title).lower()
+
+
+def split_sections(text: str) -> List[Dict[str, str]]:
+    """
+    Ayrıştırılmış sözleşme metnini başlıklara göre bölümlere ayırır (sayfa işaretleri atılır).
+    Başlık yoksa paragraflar bölüm kabul edilir ve içerik hash'i anahtar olur.
+
+    Returns:
+        [{"key", "title", "text"}] metindeki sırayla
+    """
+    text = PAGE_MARKER_PATTERN.sub("", text or "")
+    headings = list(HEADING_PATTERN.finditer(text))
+    sections = []
+
+    if headings:
+        preamble = text[:headings[0].start()].strip()
+        if preamble:
+            sections.append({"key": "__preamble__", "title": "", "text": preamble})
+        for i, match in enumerate(headings):
+            end = headings[i + 1].start() if i + 1 < len(headings) else len(text)
+            sections.append({
+                "key": _section_key(match.group(1)),
+                "title": match.group(1).strip(),
+                "text": text[match.end():end].strip()
+            })
+    else:
+        for paragraph in PARAGRAPH_PATTERN.split(text):
+            paragraph = paragraph.strip()
+            if paragraph:
+                digest = hashlib.sha256(normalize_contract_text(paragraph).encode("utf-8")).hexdigest()[:16]
+                sections.append({"key": digest, "title": "", "text": paragraph})
+
+    # Aynı başlık birden çok kez geçiyorsa sıra numarasıyla ayrıştır
+    seen: Dict[str, int] = {}
+    for section in sections:
+        count = seen.get(section["key"], 0)
+        seen[section["key"]] = count + 1
+        if count:
+            section["key"] = f"{section['key']}#{count + 1}"
+    return sections
+
+
+def diff_sections(old_text: str, new_text: str) -> Dict[str, List[Dict[str, str]]]:
+    """Önceki ve yeni sürümü bölüm bazında karşılaştırır (boşluk farkları değişiklik sayılmaz)."""
+    old_sections = {s["key"]: s for s in split_sections(old_text)}
+    diff = {"added": [], "changed": [], "removed": [], "unchanged": []}
+    new_keys = set()
+    for section in split_sections(new_text):
+        new_keys.add(section["key"])
+        previous = old_sections.get(section["key"])
+        if previous is None:
+            diff["added"].append(section)
+        elif normalize_contract_text(previous["text"]) != normalize_contract_text(section["text"]):
+            diff["changed"].append({**section, "previous_text": previous["text"]})
+        else:
+            diff["unchanged"].append(section)
+    diff["removed"] = [s for key, s in old_sections.items() if key not in new_keys]
+    return diff
+
+
+def changed_text(diff: Dict[str, List[Dict[str, str]]]) -> str:
+    """Yeniden analiz edilecek (eklenen ve değişen) bölümlerin metni."""
+    parts = []
+    for section in diff["changed"] + diff["added"]:
+        heading = f"## {section['title']}\n" if section["title"] else ""
+        parts.append(f"{heading}{section['text']}")
+    return "\n\n".join(parts)
+
+
+def _get_list(analysis: Dict[str, Any], path: Tuple[str, ...]) -> List[Any]:
+    value = analysis
+    for key in path:
+        value = value.get(key) if isinstance(value, dict) else None
+    return list(value) if isinstance(value, list) else []
+
+
+def _set_list(analysis: Dict[str, Any], path: Tuple[str, ...], items: List[Any]):
+    target = analysis
+    for key in path[:-1]:
+        if not isinstance(target.get(key), dict):
+            target[key] = {}
+        target = target[key]
+    target[path[-1]] = items
+
+
+def _attributed(item: Any, sections: List[Dict[str, str]]) -> bool:
+    """Madde kelimelerinin çoğu bölümlerden birinde geçiyorsa madde o bölüme aittir."""
+    words = _words(str(item))
+    if not words:
+        return False
+    return any(len(words & _words(s["text"])) / len(words) >= ATTRIBUTION_THRESHOLD for s in sections)
+
+
+def merge_analysis(base: Dict[str, Any], partial: Dict[str, Any],
+                   diff: Dict[str, List[Dict[str, str]]]) -> Tuple[Dict[str, Any], Dict[str, Dict[str, List[Any]]]]:
+    """
+    Değişen bölümlerin analizini mevcut analizle birleştirir.
+
+    Değişen veya silinen bölümlere ait eski maddeler çıkarılır (yeni analiz tekrar bulduysa
+    korunur), yeni analizdeki maddeler eklenir. Değişmeyen bölümlerin maddelerine dokunulmaz.
+
+    Returns:
+        (birleştirilmiş analiz, {alan: {"added": [...], "removed": [...]}})
+    """
+    merged = copy.deepcopy(base)
+    stale_sections = diff["removed"] + [
+        {"text": s["previous_text"]} for s in diff["changed"]
+    ]
+    delta: Dict[str, Dict[str, List[Any]]] = {}
+
+    for path in LIST_FIELDS:
+        old_items = _get_list(base, path)
+        new_items = _get_list(partial, path)
+        new_keys = {_item_key(i) for i in new_items}
+        old_keys = {_item_key(i) for i in old_items}
+
+        kept = [i for i in old_items
+                if _item_key(i) in new_keys or not _attributed(i, stale_sections)]
+        kept_keys = {_item_key(i) for i in kept}
+        added = [i for i in new_items if _item_key(i) not in old_keys]
+        removed = [i for i in old_items if _item_key(i) not in kept_keys]
+
+        if old_items or new_items:
+            _set_list(merged, path, kept + [i for i in added if _item_key(i) not in kept_keys])
+        if added or removed:
+            delta[".".join(path)] = {"added": added, "removed": removed}
+
+    # Tarih ve bütçe yalnızca kısmi analiz geçerli bir değer bulduysa güncellenir
+    for section_key, field, valid in SCALAR_FIELDS:
+        previous = (base.get(section_key) or {}).get(field)
+        value = (partial.get(section_key) or {}).get(field)
+        if value and valid(value) and value != previous:
+            merged.setdefault(section_key, {})[field] = value
+            delta[f"{section_key}.{field}"] = {"previous": previous, "current": value}
+    return merged, delta
+
+
+def scope_delta_analysis(merged: Dict[str, Any], delta: Dict[str, Dict[str, List[Any]]]) -> Optional[Dict[str, Any]]:
+    """
+    Görev üretimi için yalnızca yeni kapsam maddelerini ve kabul kriterlerini içeren analiz.
+    Yeni kapsam yoksa None.
+    """
+    scope = delta.get("scopeItems", {}).get("added", [])
+    criteria = delta.get("acceptanceCriteria", {}).get("added", [])
+    if not scope and not criteria:
+        return None
+    return {**merged, "scopeItems": scope, "acceptanceCriteria": criteria}
+
+
+def affected_tasks(tasks: List[Dict[str, Any]], removed_scope: List[Any]) -> List[Dict[str, Any]]:
+    """Kaynağı (source) çıkarılan kapsam maddelerine dayanan mevcut görevler."""
+    if not removed_scope:
+        return []
+    removed_sections = [{"text": str(item)} for item in removed_scope]
+    return [
+        task for task in tasks
+        if task.get("source") and _attributed(task["source"].split(":", 1)[-1], removed_sections)
+    ]
+
+
+def analyze_revision(previous_text: str, new_text: str, base_analysis: Dict[str, Any],
+                     existing_tasks: List[Dict[str, Any]], groq_service) -> Dict[str, Any]:
+    """
+    Revize sözleşmeyi yalnızca eklenen/değişen bölümler üzerinden analiz eder.
+
+    Returns:
+        {"analysis": birleştirilmiş analiz, "new_tasks": [...], "delta": {...}}
+    """
+    diff = diff_sections(previous_text, new_text)
+    section_summary = {
+        kind: [s["title"] or s["text"][:60] for s in diff[kind]]
+        for kind in ("added", "changed", "removed")
+    }
+    print(f"[Contract Revision] Bölümler: {len(diff['added'])} eklendi, {len(diff['changed'])} değişti, "
+          f"{len(diff['removed'])} silindi, {len(diff['unchanged'])} aynı")
+
+    partial = {}
+    if diff["added"] or diff["changed"]:
+        analysis_text, _ = prepare_for_analysis(changed_text(diff))
+        partial = groq_service.analyze_project(analysis_text)
+    merged, analysis_delta = merge_analysis(base_analysis, partial, diff)
+
+    scope_analysis = scope_delta_analysis(merged, analysis_delta)
+    new_tasks = []
+    if scope_analysis:
+        new_tasks = [t for t in groq_service.generate_tasks(scope_analysis) if isinstance(t, dict) and t.get("task_title")]
+    # Mevcut projede zaten karşılığı olan görevler yeniden oluşturulmaz
+    new_tasks, dedup_report = dedupe_tasks(new_tasks, existing=existing_tasks)
+
+    removed_scope = analysis_delta.get("scopeItems", {}).get("removed", [])
+    review_tasks = [
+        {"task_id": t.get("task_id"), "title": t.get("title", t.get("task_title")), "source": t.get("source")}
+        for t in affected_tasks(existing_tasks, removed_scope)
+    ]
+
+    return {
+        "analysis": merged,
+        "new_tasks": new_tasks,
+        "delta": {
+            "sections": section_summary,
+            "scope": analysis_delta.get("scopeItems", {"added": [], "removed": []}),
+            "risks": analysis_delta.get("criticalAnalysis.risks", {"added": [], "removed": []}),
+            "analysis": {k: v for k, v in analysis_delta.items() if k not in ("scopeItems", "criticalAnalysis.risks")},
+            "tasks": {
+                "added": [t.get("task_title") for t in new_tasks],
+                "review": review_tasks,
+                "duplicates_removed": dedup_report["removed"],
+                "duplicates_flagged": dedup_report["flagged"]
+            }
+        }
+    }
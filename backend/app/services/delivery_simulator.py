@@ -0,0 +1,322 @@
+import datetime
+from typing import Dict, Any, List, Optional, Tuple
+
+import numpy as np
+
+from app.services.sprint_planner import (
+    SprintPlanner, FOCUS_HOURS_PER_DAY, WORKLOAD_FACTOR, DONE_STATUSES, EXCLUDED_STATUSES,
+    parse_date, parse_estimated_hours, task_title, task_assignee_id
+)
+
+# Süre belirsizliği dağılımları (tahmin çarpanları)
+DISTRIBUTIONS = {
+    # (iyimser, en olası, kötümser) çarpanları
+    "triangular": {"optimistic": 0.8, "most_likely": 1.0, "pessimistic": 1.8},
+    # Medyanı tahmin olan log-normal; sigma sağa çarpıklığı belirler
+    "lognormal": {"sigma": 0.35},
+}
+
+# Devam eden görevlerin kalan efor oranı
+IN_PROGRESS_REMAINING = 0.5
+
+# Engellenen (blocked) görevlerin ortalama bekleme süresi (iş günü)
+BLOCKED_MEAN_DAYS = 3.0
+
+# Atanmamış görevler için ortalama atama gecikmesi (iş günü)
+UNASSIGNED_MEAN_DAYS = 1.0
+
+# Süresiz izindeki kişinin görevinin devredilmesi için ortalama gecikme (iş günü)
+REASSIGNMENT_MEAN_DAYS = 5.0
+
+
+class DeliverySimulator:
+    """
+    Proje teslim tarihini Monte Carlo yöntemiyle tahmin eder.
+
+    Her denemede görev süreleri `estimated_hours` üzerinden seçilen dağılımdan örneklenir,
+    atanan kişinin iş yükü ve müsaitliği ile `blocked` durumları uygulanır ve süreler
+    bağımlılık grafiği boyunca yayılır. Tüm denemeler NumPy ile vektörel hesaplanır;
+    aynı seed aynı sonucu üretir.
+    """
+    def __init__(self, company_data: Optional[Dict[str, Any]], trials: int = 10000, seed: int = 42,
+                 distribution: str = "triangular", hours_per_day: float = FOCUS_HOURS_PER_DAY,
+                 **distribution_params):
+        if distribution not in DISTRIBUTIONS:
+            raise ValueError(f"Desteklenmeyen dağılım: {distribution}")
+        self.planner = SprintPlanner(company_data, hours_per_day)
+        self.trials = max(100, int(trials))
+        self.seed = seed
+        self.distribution = distribution
+        self.params = {**DISTRIBUTIONS[distribution], **distribution_params}
+        self.hours_per_day = hours_per_day
+
+    # --- ÖRNEKLEME ---
+
+    def _sample_multipliers(self, rng: np.random.Generator, size) -> np.ndarray:
+        if self.distribution == "lognormal":
+            return rng.lognormal(mean=0.0, sigma=self.params["sigma"], size=size)
+        return rng.triangular(self.params["optimistic"], self.params["most_likely"], self.params["pessimistic"], size=size)
+
+    def _task_inputs(self, task: Dict[str, Any], start_date: datetime.date):
+        """Görevin nominal süresini (iş günü), başlangıç alt sınırını ve gecikme kaynaklarını hesaplar."""
+        hours = parse_estimated_hours(task.get("estimated_hours"))
+        if task.get("status") == "in_progress":
+            hours *= IN_PROGRESS_REMAINING
+
+        assignee_id = task_assignee_id(task, self.planner.name_to_id)
+        employee = self.planner.employees.get(assignee_id) if assignee_id else None
+        factor = WORKLOAD_FACTOR.get((employee or {}).get("currentWorkload"), WORKLOAD_FACTOR["medium"])
+        nominal_days = hours / (self.hours_per_day * factor)
+
+        # Müsait olmayan atanan kişi, dönüş tarihine kadar göreve başlayamaz
+        start_floor = 0
+        leave = None
+        if employee and employee.get("availability_status", "available") != "available":
+            until = parse_date(employee.get("unavailable_until"))
+            since = parse_date(employee.get("unavailable_from"))
+            if since and since > start_date and until and until >= since:
+                # İleri tarihli izin: yalnızca izin aralığıyla çakışan çalışma uzar
+                leave = (int(np.busday_count(start_date, since)),
+                         int(np.busday_count(start_date, until + datetime.timedelta(days=1))))
+            elif until and until >= start_date:
+                start_floor = int(np.busday_count(start_date, until + datetime.timedelta(days=1)))
+            elif not until:
+                start_floor = None  # süresiz izin: devir gecikmesi olarak modellenir
+
+        return nominal_days, start_floor, assignee_id if employee is not None else None, leave
+
+    # --- SİMÜLASYON ---
+
+    def simulate(self, tasks: List[Dict[str, Any]], start_date: Optional[datetime.date] = None,
+                 target_date: Optional[datetime.date] = None) -> Dict[str, Any]:
+        """
+        Args:
+            tasks: Proje görevleri
+            start_date: Simülasyon başlangıcı (varsayılan: bugün)
+            target_date: Hedef teslim tarihi (yoksa olasılık ve risk seviyesi hesaplanmaz)
+
+        Returns:
+            Yüzdelik tarihler, zamanında bitme olasılığı ve kritik yol frekansları
+        """
+        start_date = start_date or datetime.date.today()
+        open_tasks = [t for t in tasks if t.get("task_id") and t.get("status") not in EXCLUDED_STATUSES]
+        completed = sum(1 for t in tasks if t.get("status") in DONE_STATUSES)
+        if not open_tasks:
+            return {
+                "trials": 0,
+                "open_tasks": 0,
+                "completed_tasks": completed,
+                "percentiles": {p: start_date.isoformat() for p in ("p50", "p80", "p95")},
+                "on_time_probability": 1.0,
+                "critical_tasks": []
+            }
+
+        ordered, cyclic_ids = SprintPlanner.order_tasks(open_tasks)
+        n = len(ordered)
+        index_of = {t["task_id"]: i for i, t in enumerate(ordered)}
+        rng = np.random.default_rng(self.seed)
+
+        nominal = np.empty(n)
+        floors = np.zeros(n)
+        waits = np.zeros((self.trials, n))
+        assignees: List[Optional[str]] = []
+        leaves: List[Optional[Tuple[int, int]]] = []
+        for i, task in enumerate(ordered):
+            nominal_days, start_floor, assigned, leave = self._task_inputs(task, start_date)
+            assignees.append(assigned)
+            leaves.append(leave)
+            nominal[i] = nominal_days
+            if start_floor is None:
+                waits[:, i] += rng.exponential(REASSIGNMENT_MEAN_DAYS, self.trials)
+            else:
+                floors[i] = start_floor
+            if task.get("status") == "blocked":
+                waits[:, i] += rng.exponential(BLOCKED_MEAN_DAYS, self.trials)
+            if not assigned:
+                waits[:, i] += rng.exponential(UNASSIGNED_MEAN_DAYS, self.trials)
+
+        durations = nominal * self._sample_multipliers(rng, (self.trials, n)) + waits
+
+        # Bağımlılıklar boyunca en erken bitişleri yay; kritik öncülü kaydet.
+        # Aynı kişinin görevleri paralel yürümez: kişinin sıradaki önceki görevi de öncül sayılır.
+        finish = np.empty((self.trials, n))
+        critical_parent = np.full((self.trials, n), -1, dtype=np.int64)
+        nominal_finish = np.empty(n)
+        last_of_assignee: Dict[str, int] = {}
+        for i, task in enumerate(ordered):
+            deps = [index_of[d] for d in (task.get("dependencies") or []) if index_of.get(d, n) < i]
+            if assignees[i] is not None:
+                previous = last_of_assignee.get(assignees[i])
+                if previous is not None and previous not in deps:
+                    deps.append(previous)
+                last_of_assignee[assignees[i]] = i
+            start = np.full(self.trials, floors[i])
+            nominal_start = floors[i]
+            if deps:
+                dep_finish = finish[:, deps]
+                best = dep_finish.argmax(axis=1)
+                latest = dep_finish[np.arange(self.trials), best]
+                from_dep = latest > start
+                start = np.where(from_dep, latest, start)
+                critical_parent[:, i] = np.where(from_dep, np.asarray(deps)[best], -1)
+                nominal_start = max(nominal_start, nominal_finish[deps].max())
+            finish[:, i] = start + durations[:, i]
+            nominal_finish[i] = nominal_start + nominal[i]
+            if leaves[i]:
+                # İzin aralığına denk gelen görev izin süresi kadar uzar (izinde başlayan, dönüşte başlar)
+                leave_start, leave_end = leaves[i]
+                overlaps = (start < leave_end) & (finish[:, i] > leave_start)
+                finish[:, i] += np.where(overlaps, leave_end - np.maximum(start, leave_start), 0)
+                if nominal_start < leave_end and nominal_finish[i] > leave_start:
+                    nominal_finish[i] += leave_end - max(nominal_start, leave_start)
+
+        project_days = finish.max(axis=1)
+
+        # Her denemenin kritik yolunu sondan başa izle
+        critical_counts = np.zeros(n, dtype=np.int64)
+        current = finish.argmax(axis=1)
+        rows = np.arange(self.trials)
+        for _ in range(n):
+            active = current >= 0
+            if not active.any():
+                break
+            np.add.at(critical_counts, current[active], 1)
+            current = np.where(active, critical_parent[rows, np.maximum(current, 0)], -1)
+
+        nominal_days_total = float(nominal_finish.max())
+
+        percentiles = {
+            f"p{p}": self._to_date(start_date, float(np.percentile(project_days, p))).isoformat()
+            for p in (50, 80, 95)
+        }
+        frequency = critical_counts / self.trials
+        critical_tasks = [
+            {
+                "task_id": ordered[i]["task_id"],
+                "title": task_title(ordered[i]),
+                "critical_frequency": round(float(frequency[i]), 3)
+            }
+            for i in np.argsort(-frequency, kind="stable")[:10] if frequency[i] > 0
+        ]
+
+        # Hedef tarih yoksa zamanında bitme olasılığı ve gecikme hesaplanmaz
+        # (nominal bitişe göre hesaplamak, ortalaması >1 olan çarpanlarla her projeyi riskli gösterir)
+        on_time_probability = None
+        delay_days_p80 = None
+        if target_date:
+            target_days = float(np.busday_count(start_date, target_date))
+            on_time_probability = round(float((project_days <= target_days).mean()), 3)
+            delay_days_p80 = max(0, int(np.ceil(np.percentile(project_days, 80) - target_days)))
+
+        return {
+            "trials": self.trials,
+            "seed": self.seed,
+            "distribution": self.distribution,
+            "open_tasks": n,
+            "completed_tasks": completed,
+            "start_date": start_date.isoformat(),
+            "target_date": target_date.isoformat() if target_date else None,
+            "nominal_completion_date": self._to_date(start_date, nominal_days_total).isoformat(),
+            "percentiles": percentiles,
+            "mean_working_days": round(float(project_days.mean()), 1),
+            "on_time_probability": on_time_probability,
+            "delay_days_p80": delay_days_p80,
+            "critical_tasks": critical_tasks,
+            "cyclic_tasks": cyclic_ids
+        }
+
+    @staticmethod
+    def _to_date(start_date: datetime.date, working_days: float) -> datetime.date:
+        """İş günü cinsinden süreyi takvim tarihine çevirir (hafta sonları atlanır)."""
+        offset = int(np.ceil(working_days))
+        return np.busday_offset(start_date, offset, roll="forward").astype(datetime.date)
+
+
+def summarize_delay_risk(simulation: Dict[str, Any], tasks: List[Dict[str, Any]],
+                         company_data: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Simülasyon sonucunu mevcut gecikme analizi şemasına çevirir
+    (overall_delay_risk, estimated_delay_days, risk_factors, recommendations, predicted_completion_date).
+    """
+    probability = simulation["on_time_probability"]
+    if probability is None:
+        overall = None  # hedef tarih yok
+    elif probability >= 0.8:
+        overall = "low"
+    elif probability >= 0.5:
+        overall = "medium"
+    elif probability >= 0.2:
+        overall = "high"
+    else:
+        overall = "critical"
+
+    planner = SprintPlanner(company_data)
+    open_tasks = [t for t in tasks if t.get("status") not in EXCLUDED_STATUSES]
+    critical_ids = {c["task_id"] for c in simulation.get("critical_tasks", []) if c["critical_frequency"] >= 0.3}
+    risk_factors = []
+    recommendations = []
+
+    blocked = [t for t in open_tasks if t.get("status") == "blocked"]
+    if blocked:
+        on_path = any(t.get("task_id") in critical_ids for t in blocked)
+        risk_factors.append({
+            "type": "blocked_tasks",
+            "severity": "high" if on_path else "medium",
+            "description": f"{len(blocked)} görev engellenmiş durumda" + (" ve kritik yol üzerinde." if on_path else "."),
+            "impact_score": 8 if on_path else 5,
+            "affected_tasks": [task_title(t) for t in blocked]
+        })
+        recommendations.append("Engellenen görevlerin blokerlerini öncelikli olarak kaldırın.")
+
+    unassigned = [t for t in open_tasks if not task_assignee_id(t, planner.name_to_id)]
+    if unassigned:
+        risk_factors.append({
+            "type": "unassigned_tasks",
+            "severity": "medium" if len(unassigned) < 5 else "high",
+            "description": f"{len(unassigned)} görev henüz atanmamış.",
+            "impact_score": min(9, 3 + len(unassigned)),
+            "affected_tasks": [task_title(t) for t in unassigned][:10]
+        })
+        recommendations.append("Atanmamış görevleri kapasitesi olan çalışanlara atayın.")
+
+    unavailable = []
+    for t in open_tasks:
+        employee = planner.employees.get(task_assignee_id(t, planner.name_to_id))
+        if employee and employee.get("availability_status", "available") != "available":
+            unavailable.append(t)
+    if unavailable:
+        risk_factors.append({
+            "type": "unavailable_employees",
+            "severity": "high" if any(t.get("task_id") in critical_ids for t in unavailable) else "medium",
+            "description": f"{len(unavailable)} görevin sorumlusu şu an müsait değil.",
+            "impact_score": 7,
+            "affected_tasks": [task_title(t) for t in unavailable]
+        })
+        recommendations.append("Müsait olmayan çalışanların kritik görevlerini yeniden atayın.")
+
+    if critical_ids:
+        top = simulation["critical_tasks"][:5]
+        risk_factors.append({
+            "type": "dependency_issues",
+            "severity": "high" if overall in ("high", "critical") else "medium",
+            "description": "Denemelerin çoğunda teslim tarihini belirleyen görevler: " +
+                           ", ".join(f"{c['title']} (%{c['critical_frequency'] * 100:.0f})" for c in top),
+            "impact_score": 6,
+            "affected_tasks": [c["title"] for c in top]
+        })
+        recommendations.append("Kritik yol üzerindeki görevlere en deneyimli kişileri atayın veya görevleri bölün.")
+
+    if probability is None:
+        recommendations.append("Gecikme riskinin ölçülebilmesi için proje bitiş tarihi veya görev teslim tarihleri tanımlayın.")
+
+    if simulation.get("cyclic_tasks"):
+        recommendations.append("Döngüsel bağımlılıkları düzeltin: " + ", ".join(simulation["cyclic_tasks"]))
+
+    return {
+        "overall_delay_risk": overall,
+        "estimated_delay_days": simulation.get("delay_days_p80", 0),
+        "risk_factors": risk_factors,
+        "recommendations": recommendations,
+        "predicted_completion_date": simulation["percentiles"]["p80"],
+        "simulation": simulation
+    }
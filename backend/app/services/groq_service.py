@@ -1,7 +1,11 @@
 from groq import Groq
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Callable, Dict, List, Optional
 import json
 import os
 
+from app.config import TASK_GENERATION_MODE, TASK_GENERATION_WORKERS
+
 # ENHANCED PROJECT ANALYSIS PROMPT
 PROJECT_ANALYSIS_PROMPT = """
 You are an expert technical consultant and legal analyst specializing in software development contracts.
@@ -183,6 +187,12 @@ FINAL REMINDER:
 - Create AT LEAST 8-15 tasks (depending on contract scope)!
 """
 
+# Paralel modda grup başına çıktı sınırı (tek çağrıdaki 8192 yerine)
+GROUP_MAX_TOKENS = 2048
+
+# Kabul edilen görev öncelikleri
+TASK_PRIORITIES = ("critical", "high", "medium", "low")
+
 class GroqService:
     """
     Groq AI service - EXACT implementation from prototype
@@ -225,16 +235,24 @@ Lütfen bu metni sistem talimatlarında belirtilen JSON formatında analiz et:
         
         return json.loads(completion.choices[0].message.content)
     
-    def generate_tasks(self, project_json: dict) -> list:
+    def generate_tasks(self, project_json: dict,
+                       on_tasks: Optional[Callable[[str, List[dict]], None]] = None) -> list:
         """
         ENHANCED task generation - scopeItems'ı da kullanır
         
+        TASK_GENERATION_MODE=parallel ise generate_tasks_parallel kullanılır ve `on_tasks`
+        her grup tamamlandığında çağrılır; tek çağrı modunda `on_tasks` kullanılmaz.
+        
         Args:
             project_json: Project analysis data (with scopeItems)
+            on_tasks: Paralel modda grup sonuçlarını alan geri çağırım (grup_id, görevler)
             
         Returns:
             List of generated tasks
         """
+        if TASK_GENERATION_MODE == "parallel":
+            return self.generate_tasks_parallel(project_json, on_tasks)
+        
         project_name = project_json.get("project_name", "Proje")
         description = json.dumps(project_json.get("detailedDescription", ""), ensure_ascii=False, indent=2)
         scope_items = json.dumps(project_json.get("scopeItems", []), ensure_ascii=False, indent=2)
@@ -285,29 +303,170 @@ Now create a detailed task list!
             response_format={"type": "json_object"}
         )
         
-        task_list_data = json.loads(completion.choices[0].message.content)
+        return extract_task_list(json.loads(completion.choices[0].message.content))
+    
+    def generate_tasks_parallel(self, project_json: dict,
+                                on_tasks: Optional[Callable[[str, List[dict]], None]] = None,
+                                max_workers: int = TASK_GENERATION_WORKERS) -> list:
+        """
+        Görevleri her kapsam maddesi ve altyapı/kabul/QA grupları için ayrı, sınırlı sayıda
+        paralel çağrıyla üretir. Her grubun sonucu ayrı doğrulanır; bozuk bir grup bir kez
+        yeniden denenir ve diğerlerini etkilemez. `on_tasks(grup, görevler)` her grup
+        tamamlandığında çağıran iş parçacığında çağrılır (görevler geldikçe kaydedilebilir).
         
-        # JSON object içindeki array'i bul
-        if isinstance(task_list_data, dict):
-            # Olası array key'lerini kontrol et
-            for key in ['tasks', 'task_list', 'görevler', 'items']:
-                if key in task_list_data and isinstance(task_list_data[key], list):
-                    tasks = task_list_data[key]
-                    # Her task'ın dict olduğundan emin ol
-                    return [task if isinstance(task, dict) else {} for task in tasks]
-            
-            # Tek key varsa onun value'sunu döndür
-            if len(task_list_data) == 1:
-                value = list(task_list_data.values())[0]
-                if isinstance(value, list):
-                    return [task if isinstance(task, dict) else {} for task in value]
+        Returns:
+            Tüm grupların doğrulanmış görevleri (grup sırasıyla)
+        """
+        groups = task_groups(project_json)
+        results: Dict[str, List[dict]] = {}
         
-        # Direkt list döndüyse
-        if isinstance(task_list_data, list):
-            # Her task'ın dict olduğundan emin ol
-            return [task if isinstance(task, dict) else {} for task in task_list_data]
+        with ThreadPoolExecutor(max_workers=max(1, max_workers)) as pool:
+            futures = {pool.submit(self._generate_group, project_json, group): group for group in groups}
+            for future in as_completed(futures):
+                group = futures[future]
+                try:
+                    tasks = future.result()
+                except Exception as e:
+                    print(f"[GroqService] Task grubu başarısız ({group['id']}): {e}")
+                    continue
+                results[group["id"]] = tasks
+                print(f"[GroqService] Task grubu tamamlandı ({group['id']}): {len(tasks)} task")
+                if on_tasks and tasks:
+                    on_tasks(group["id"], tasks)
         
-        # Fallback
-        print(f"[GroqService] Task generation failed: Unexpected format: {type(task_list_data)}")
-        print(f"[GroqService] Data: {task_list_data}")
-        return []
+        print(f"[GroqService] Paralel task üretimi: {len(results)}/{len(groups)} grup başarılı")
+        return [task for group in groups for task in results.get(group["id"], [])]
+    
+    def _generate_group(self, project_json: dict, group: dict) -> list:
+        """Tek grup için görev üretir; geçerli görev çıkmazsa bir kez yeniden dener."""
+        user_prompt = f"""
+PROJECT: {project_json.get("project_name", "Proje")}
+
+PROJECT DESCRIPTION:
+{json.dumps(project_json.get("detailedDescription", ""), ensure_ascii=False)}
+
+TECHNOLOGY STACK:
+{json.dumps(project_json.get("techStack", []), ensure_ascii=False)}
+
+MAIN DEPARTMENT: {project_json.get("department", "Full-Stack")}
+
+---
+
+THIS REQUEST COVERS ONLY ONE PART OF THE PROJECT. Other parts are generated separately,
+so the 8-15 task minimum does NOT apply here and tasks for other scope items must NOT be created.
+
+{group["instruction"]}
+
+Create 1-{group["max_tasks"]} tasks for this part only. Return {{"tasks": [...]}}.
+"""
+        for attempt in range(2):
+            completion = self.client.chat.completions.create(
+                model="meta-llama/llama-4-maverick-17b-128e-instruct",
+                messages=[
+                    {"role": "system", "content": TASK_GENERATION_PROMPT},
+                    {"role": "user", "content": user_prompt}
+                ],
+                temperature=0.15,
+                max_tokens=GROUP_MAX_TOKENS,
+                response_format={"type": "json_object"}
+            )
+            try:
+                tasks = [t for t in (validate_task(t) for t in extract_task_list(json.loads(completion.choices[0].message.content))) if t]
+            except json.JSONDecodeError as e:
+                print(f"[GroqService] Task grubu JSON hatası ({group['id']}, deneme {attempt + 1}): {e}")
+                continue
+            if tasks:
+                for task in tasks:
+                    task.setdefault("source", group["source"])
+                return tasks
+        raise ValueError("Geçerli task üretilemedi")
+
+
+def extract_task_list(task_list_data) -> list:
+    """Model yanıtındaki görev dizisini bulur (farklı anahtar ve biçimleri tolere eder)."""
+    # JSON object içindeki array'i bul
+    if isinstance(task_list_data, dict):
+        # Olası array key'lerini kontrol et
+        for key in ['tasks', 'task_list', 'görevler', 'items']:
+            if key in task_list_data and isinstance(task_list_data[key], list):
+                tasks = task_list_data[key]
+                # Her task'ın dict olduğundan emin ol
+                return [task if isinstance(task, dict) else {} for task in tasks]
+        
+        # Tek key varsa onun value'sunu döndür
+        if len(task_list_data) == 1:
+            value = list(task_list_data.values())[0]
+            if isinstance(value, list):
+                return [task if isinstance(task, dict) else {} for task in value]
+    
+    # Direkt list döndüyse
+    if isinstance(task_list_data, list):
+        # Her task'ın dict olduğundan emin ol
+        return [task if isinstance(task, dict) else {} for task in task_list_data]
+    
+    # Fallback
+    print(f"[GroqService] Task generation failed: Unexpected format: {type(task_list_data)}")
+    print(f"[GroqService] Data: {task_list_data}")
+    return []
+
+
+def validate_task(task) -> Optional[dict]:
+    """Tek görevi doğrular ve alanlarını düzeltir; başlıksız/bozuk görevler için None."""
+    if not isinstance(task, dict):
+        return None
+    title = task.get("task_title")
+    if not isinstance(title, str) or not title.strip():
+        return None
+    task["task_title"] = title.strip()
+    if task.get("priority") not in TASK_PRIORITIES:
+        task["priority"] = "medium"
+    if task.get("estimated_hours") is not None:
+        task["estimated_hours"] = str(task["estimated_hours"])
+    task.setdefault("task_attended_to", "")
+    return task
+
+
+def task_groups(project_json: dict) -> List[dict]:
+    """
+    Paralel görev üretim grupları: her kapsam maddesi, kabul kriterleri, altyapı ve QA.
+
+    Returns:
+        [{"id", "instruction", "source", "max_tasks"}]
+    """
+    groups = []
+    for i, item in enumerate(project_json.get("scopeItems", []) or []):
+        groups.append({
+            "id": f"scope_{i + 1}",
+            "instruction": f"SCOPE ITEM:\n{item}\n\nCreate the development tasks for THIS scope item only "
+                           f"(split it into subtasks if it is large).",
+            "source": f"Scope Item: {item}",
+            "max_tasks": 4
+        })
+
+    criteria = project_json.get("acceptanceCriteria", []) or []
+    if criteria:
+        groups.append({
+            "id": "acceptance",
+            "instruction": "ACCEPTANCE CRITERIA:\n" + json.dumps(criteria, ensure_ascii=False, indent=2) +
+                           "\n\nCreate tasks only for technical acceptance criteria that need dedicated work "
+                           "(performance, security, compliance). Do not repeat feature development.",
+            "source": "Acceptance Criterion",
+            "max_tasks": 4
+        })
+
+    groups.append({
+        "id": "infrastructure",
+        "instruction": "Create ONLY infrastructure and preparation tasks: project/environment setup, database "
+                       "schema design, CI/CD pipeline, security configuration and production deployment. "
+                       "Do not create feature tasks.",
+        "source": "Requirement: Infrastructure",
+        "max_tasks": 4
+    })
+    groups.append({
+        "id": "qa",
+        "instruction": "Create ONLY test, QA and documentation tasks: unit/integration tests, UAT, performance "
+                       "testing, technical and user documentation. Use department 'QA' for testing tasks.",
+        "source": "Requirement: Quality Assurance",
+        "max_tasks": 3
+    })
+    return groups
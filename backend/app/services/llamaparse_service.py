@@ -1,39 +1,90 @@
-from llama_cloud_services import LlamaParse
-from app.config import LLAMAPARSE_API_KEY
+from typing import Optional
+
+from app.config import LLAMAPARSE_API_KEY, PDF_PARSER_MODE
+from app.services.pdf_extractor import LocalPdfExtractor, ParsedTextCache, ScannedPdfError, file_sha256
 
 class LlamaParseService:
     """
     LlamaParse service - EXACT implementation from prototype Cell 3
+
+    PDF_PARSER_MODE ile ayrıştırıcı seçilir: "remote" (LlamaParse), "local" (pypdf) veya
+    "auto" (önce yerel, taranmış PDF'lerde LlamaParse). Sonuçlar dosya içeriği hash'i ile
+    önbelleğe alınır.
     """
-    def __init__(self):
+    def __init__(self, mode: str = PDF_PARSER_MODE):
+        self.mode = mode
         self.api_key = LLAMAPARSE_API_KEY
         if not self.api_key:
             print("Uyarı: LLAMAPARSE_API_KEY bulunamadı. Lütfen .env dosyanızı kontrol edin.")
             self.api_key = None
-        
-        self.parser = LlamaParse(
-            api_key=self.api_key,
-            num_workers=4,      # EXACT from prototype
-            verbose=True,
-            language="tr"       # Türkçe dokümanlar
-        )
-    
-    def parse_pdf(self, file_path: str) -> str:
+
+        self._parser = None
+        self.local = LocalPdfExtractor()
+        self.cache = ParsedTextCache()
+
+    @property
+    def parser(self):
+        # LlamaParse yalnızca uzak ayrıştırma gerektiğinde oluşturulur
+        if self._parser is None:
+            from llama_cloud_services import LlamaParse
+            self._parser = LlamaParse(
+                api_key=self.api_key,
+                num_workers=4,      # EXACT from prototype
+                verbose=True,
+                language="tr"       # Türkçe dokümanlar
+            )
+        return self._parser
+
+    def parse_pdf(self, file_path: str, content_hash: Optional[str] = None) -> str:
         """
-        PDF'i parse et - EXACT prototip implementation from Cell 3
-        
+        PDF'i seçili moda göre ayrıştırır.
+
         Args:
             file_path: Path to PDF file
-            
+            content_hash: Dosyanın bilinen SHA-256 hash'i (verilmezse hesaplanır)
+
         Returns:
             Parsed text content
         """
+        content_hash = content_hash or file_sha256(file_path)
+        backends = {"remote": ["remote"], "local": ["local"], "auto": ["local", "remote"]}[self.mode]
+
+        for backend in backends:
+            cached = self.cache.get(content_hash, backend)
+            if cached is not None:
+                print(f"[PDF Parse] Önbellekten okundu ({backend}): {content_hash[:12]}")
+                return cached
+
+        for i, backend in enumerate(backends):
+            try:
+                if backend == "local":
+                    parsed_text = self.parse_pdf_local(file_path)
+                else:
+                    parsed_text = self.parse_pdf_remote(file_path)
+            except ScannedPdfError as e:
+                if i == len(backends) - 1:
+                    raise
+                print(f"[PDF Parse] Yerel ayrıştırma yetersiz, LlamaParse'a geçiliyor: {e}")
+                continue
+            self.cache.put(content_hash, backend, parsed_text)
+            return parsed_text
+
+    def parse_pdf_local(self, file_path: str) -> str:
+        print(f"pypdf ile '{file_path}' dosyası yerel olarak ayrıştırılıyor...")
+        parsed_text = self.local.extract(file_path)
+        print(f"PDF başarıyla ayrıştırıldı. Toplam {len(parsed_text)} karakter bulundu.")
+        return parsed_text
+
+    def parse_pdf_remote(self, file_path: str) -> str:
+        """
+        PDF'i parse et - EXACT prototip implementation from Cell 3
+        """
         print(f"LlamaParse ile '{file_path}' dosyası ayrıştırılıyor...")
-        
+
         try:
             result = self.parser.parse(file_path)
             text_documents = result.get_text_documents(split_by_page=False)
-            
+
             if text_documents:
                 # EXACT logic from prototype
                 parsed_text = "\n".join([doc.text for doc in text_documents])
@@ -41,7 +92,7 @@ class LlamaParseService:
                 return parsed_text
             else:
                 raise Exception("PDF'ten metin çıkarılamadı.")
-                
+
         except Exception as e:
             print(f"LlamaParse hatası: {e}")
             raise
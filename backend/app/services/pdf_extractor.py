@@ -0,0 +1,147 @@
+import hashlib
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Optional
+
+from pypdf import PdfReader
+
+from app.config import PDF_PARSE_WORKERS, PDF_CACHE_DIR
+
+# Her sayfanın başına eklenen işaret; parçalama (chunking) sayfa sınırlarını buradan bulur
+PAGE_MARKER = "<!-- page: {number} -->"
+PAGE_MARKER_PATTERN = re.compile(r"<!-- page: (\d+) -->")
+
+# Bir sürece verilen en az sayfa sayısı (küçük PDF'ler süreç havuzu açmadan işlenir)
+PAGES_PER_WORKER = 8
+
+# Sayfa başına ortalama karakter bunun altındaysa PDF taranmış (görüntü) kabul edilir
+MIN_CHARS_PER_PAGE = 40
+
+# Başlık sayılan satırlar: numaralı maddeler ("1.", "3.2", "3.2.1.", "MADDE 5", "IV.") veya tamamı büyük harf.
+# Tek sayı nokta ister; "30 gün içinde ..." veya "2025 yılında ..." gibi satır başları başlık sayılmaz.
+NUMBERED_HEADING = re.compile(
+    r"^(MADDE\s+\d+|BÖLÜM\s+\d+|\d+(\.\d+)*\.|\d+(\.\d+)+|[IVX]+\.)\s+\S", re.IGNORECASE
+)
+MAX_HEADING_LENGTH = 80
+MAX_HEADING_WORDS = 10
+
+# Yerel çıktının biçimi (başlık işaretleme) değişince artırılır; eski önbellek kayıtları kullanılmaz
+LOCAL_FORMAT_VERSION = 2
+
+# Cümleyi bitiren noktalama; bununla bitmeyen gövde satırının ardından gelen satır devam satırıdır
+SENTENCE_END = (".", ":", ";", "!", "?")
+
+
+class ScannedPdfError(ValueError):
+    """PDF'te çıkarılabilir metin katmanı yok (taranmış doküman)."""
+
+
+def file_sha256(file_path: str, chunk_size: int = 1024 * 1024) -> str:
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def is_heading(line: str, previous: Optional[str] = None) -> bool:
+    """
+    Satırın başlık olup olmadığı. `previous`, aynı paragraftaki bir önceki gövde satırıdır
+    (boş satır veya başlıktan sonra None); cümlesi bitmemiş satırın devamı başlık sayılmaz.
+    """
+    if not line or len(line) > MAX_HEADING_LENGTH or line.endswith((",", ";")):
+        return False
+    if previous and not previous.endswith(SENTENCE_END):
+        return False
+    if NUMBERED_HEADING.match(line) and not line.endswith(".") and len(line.split()) <= MAX_HEADING_WORDS:
+        return True
+    letters = [c for c in line if c.isalpha()]
+    return len(letters) >= 3 and all(c.isupper() for c in letters)
+
+
+def format_page(text: str) -> str:
+    """Sayfa metnini satırlara ayırır, boşlukları sadeleştirir ve başlıkları '## ' ile işaretler."""
+    lines = []
+    previous = None
+    for raw in (text or "").splitlines():
+        line = " ".join(raw.split())
+        if not line:
+            if lines and lines[-1]:
+                lines.append("")
+            previous = None
+            continue
+        if is_heading(line, previous):
+            lines.append(f"## {line}")
+            previous = None
+        else:
+            lines.append(line)
+            previous = line
+    return "\n".join(lines).strip()
+
+
+def _extract_page_range(file_path: str, start: int, stop: int) -> List[str]:
+    """Süreç havuzunda çalışır: [start, stop) aralığındaki sayfaların biçimlenmiş metni."""
+    reader = PdfReader(file_path)
+    return [format_page(reader.pages[i].extract_text() or "") for i in range(start, stop)]
+
+
+class ParsedTextCache:
+    """Ayrıştırılmış metinleri dosya içeriği hash'i ve ayrıştırıcı adıyla diskte saklar."""
+
+    def __init__(self, directory: str = PDF_CACHE_DIR):
+        self.directory = directory
+
+    def _path(self, content_hash: str, backend: str) -> str:
+        if backend == "local":
+            backend = f"local.v{LOCAL_FORMAT_VERSION}"
+        return os.path.join(self.directory, f"{content_hash}.{backend}.txt")
+
+    def get(self, content_hash: str, backend: str) -> Optional[str]:
+        path = self._path(content_hash, backend)
+        if not os.path.exists(path):
+            return None
+        with open(path, "r", encoding="utf-8") as f:
+            return f.read()
+
+    def put(self, content_hash: str, backend: str, text: str):
+        os.makedirs(self.directory, exist_ok=True)
+        path = self._path(content_hash, backend)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(text)
+        os.replace(tmp_path, path)
+
+
+class LocalPdfExtractor:
+    """
+    LlamaParse'a alternatif yerel PDF metin çıkarıcı (pypdf).
+
+    Sayfalar aralıklara bölünüp süreç havuzunda paralel işlenir; çıktıda her sayfa
+    PAGE_MARKER ile başlar ve başlık satırları '## ' ile işaretlenir.
+    """
+    def __init__(self, workers: int = PDF_PARSE_WORKERS):
+        self.workers = max(1, workers)
+
+    def extract(self, file_path: str) -> str:
+        page_count = len(PdfReader(file_path).pages)
+        if page_count == 0:
+            raise ScannedPdfError("PDF'te sayfa bulunamadı.")
+
+        workers = min(self.workers, -(-page_count // PAGES_PER_WORKER))
+        if workers <= 1:
+            pages = _extract_page_range(file_path, 0, page_count)
+        else:
+            step = -(-page_count // workers)
+            ranges = [(start, min(start + step, page_count)) for start in range(0, page_count, step)]
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                futures = [pool.submit(_extract_page_range, file_path, start, stop) for start, stop in ranges]
+                pages = [page for future in futures for page in future.result()]
+
+        if sum(len(page) for page in pages) < MIN_CHARS_PER_PAGE * page_count:
+            raise ScannedPdfError("PDF'ten yeterli metin çıkarılamadı (taranmış doküman olabilir).")
+
+        print(f"[PdfExtractor] {page_count} sayfa {workers} süreçle ayrıştırıldı")
+        return "\n\n".join(
+            f"{PAGE_MARKER.format(number=i + 1)}\n{page}" for i, page in enumerate(pages)
+        )
@@ -0,0 +1,389 @@
+import datetime
+import math
+import threading
+from typing import Dict, Any, List, Optional, Set, Tuple
+
+import numpy as np
+
+from app.services.sprint_planner import (
+    SprintPlanner, FOCUS_HOURS_PER_DAY, PRIORITY_RANK, EXCLUDED_STATUSES,
+    parse_date, parse_estimated_hours, iter_employees, employee_display_name,
+    task_title, task_assignee_id
+)
+from app.services.capacity_ledger import CapacityLedger, HORIZON_DAYS
+
+# Bu miktarın (saat) altındaki günlük aşımlar yok sayılır
+OVERLOAD_TOLERANCE = 0.5
+
+# Erteleme önerisinde denenecek en fazla kaydırma (iş günü)
+MAX_SHIFT_DAYS = 60
+
+# Devam eden görevlerin kalan efor oranı
+IN_PROGRESS_REMAINING = 0.5
+
+
+class PortfolioScheduler:
+    """
+    Tüm projelerin görevlerinden çalışan × gün saat tahsisi çıkarır, aşırı tahsisi tespit eder
+    ve kaymayı en aza indiren dengeleme önerileri üretir.
+
+    Görev eforu; görevin kendi tarihleri, yoksa bulunduğu sprint'in tarihleri arasındaki iş
+    günlerine eşit dağıtılır ve CapacityLedger'a işlenir. Görev başına katkı saklandığından
+    atama/tarih/durum değişikliği yalnızca o görevin satırını günceller.
+    """
+    def __init__(self, company_data: Optional[Dict[str, Any]], hours_per_day: float = FOCUS_HOURS_PER_DAY,
+                 today: Optional[datetime.date] = None, horizon_days: int = HORIZON_DAYS):
+        self.hours_per_day = hours_per_day
+        self.ledger = CapacityLedger(hours_per_day, today, horizon_days)
+        self.today = self.ledger.today
+        self.days = self.ledger.days
+        self.workdays = self.ledger.workdays
+        self.workday_pos = self.ledger.workday_pos
+
+        self.entries: Dict[Tuple[str, str], Dict[str, Any]] = {}
+        self.sprint_windows: Dict[str, Dict[str, Tuple[datetime.date, datetime.date]]] = {}
+        self.project_names: Dict[str, str] = {}
+        self.unscheduled: Set[Tuple[str, str]] = set()
+        self.set_company(company_data)
+
+    # --- KAPASİTE ---
+
+    @property
+    def employee_ids(self) -> List[str]:
+        return self.ledger.employee_ids
+
+    @property
+    def row(self) -> Dict[str, int]:
+        return self.ledger.row
+
+    @property
+    def capacity(self) -> np.ndarray:
+        return self.ledger.capacity
+
+    @property
+    def allocated(self) -> np.ndarray:
+        return self.ledger.allocated
+
+    def set_company(self, company_data: Optional[Dict[str, Any]]):
+        """
+        Şirket yapısını deftere işler: yalnızca müsaitliği değişen çalışanların kapasitesi
+        yenilenir; çalışan listesi değişirse tahsisler yeniden kurulur.
+        """
+        self.planner = SprintPlanner(company_data, self.hours_per_day)
+        self.department_of = {employee.get("id"): department for department, employee in iter_employees(company_data)}
+        if self.ledger.set_employees(self.planner.employees):
+            tasks = [(project_id, entry["task"]) for (project_id, _), entry in self.entries.items()]
+            self.entries = {}
+            for project_id, task in tasks:
+                self.set_task(project_id, task)
+
+    # --- TAHSİS ---
+
+    def load_project(self, project_id: str, project_name: str, tasks: List[Dict[str, Any]],
+                     sprint: Optional[Dict[str, Any]]):
+        """Projenin görevlerini (ve en son sprint planının tarihlerini) tahsise yükler."""
+        for key in [k for k in self.entries if k[0] == project_id]:
+            self.remove_task(*key)
+        self.unscheduled = {k for k in self.unscheduled if k[0] != project_id}
+        self.project_names[project_id] = project_name
+        windows = {}
+        for sp in (sprint or {}).get("plan", {}).get("sprints", []):
+            start, end = parse_date(sp.get("start_date")), parse_date(sp.get("end_date"))
+            if start and end:
+                for task_id in sp.get("tasks", []):
+                    windows[task_id] = (start, end)
+        self.sprint_windows[project_id] = windows
+        for task in tasks:
+            self.set_task(project_id, task)
+
+    def _task_window(self, project_id: str, task: Dict[str, Any], hours: float) -> Optional[np.ndarray]:
+        """Görevin eforunun dağıtılacağı iş günü indeksleri."""
+        start, due = parse_date(task.get("start_date")), parse_date(task.get("due_date"))
+        if start and due and due >= start:
+            window = (start, due + datetime.timedelta(days=1))
+        else:
+            window = self.sprint_windows.get(project_id, {}).get(task.get("task_id"))
+        if window is None:
+            return None
+        first = max(0, (window[0] - self.today).days)
+        last = min(len(self.days), (window[1] - self.today).days)
+        days = self.workdays[(self.workdays >= first) & (self.workdays < last)]
+        if len(days) == 0 and window[1] <= self.today:
+            # Gecikmiş görev: kalan efor bugünden itibaren tam günlerle planlanır
+            needed = max(1, math.ceil(hours / self.hours_per_day))
+            days = self.workdays[:needed]
+        return days if len(days) else None
+
+    def set_task(self, project_id: str, task: Dict[str, Any]):
+        """Görevin tahsisini (yeniden) hesaplar."""
+        task_id = task.get("task_id")
+        if not task_id:
+            return
+        key = (project_id, task_id)
+        self.remove_task(project_id, task_id)
+        self.unscheduled.discard(key)
+        if task.get("status") in EXCLUDED_STATUSES:
+            return
+        assignee_id = task_assignee_id(task, self.planner.name_to_id)
+        if assignee_id not in self.row:
+            return
+        hours = parse_estimated_hours(task.get("estimated_hours"))
+        if task.get("status") == "in_progress":
+            hours *= IN_PROGRESS_REMAINING
+        days = self._task_window(project_id, task, hours)
+        if days is None:
+            self.unscheduled.add(key)
+            return
+        daily = hours / len(days)
+        row = self.row[assignee_id]
+        self.ledger.allocate(row, days, daily)
+        self.entries[key] = {"task": dict(task), "row": row, "days": days, "daily": daily, "hours": hours}
+
+    def remove_task(self, project_id: str, task_id: str):
+        entry = self.entries.pop((project_id, task_id), None)
+        if entry is not None:
+            self.ledger.release(entry["row"], entry["days"], entry["daily"])
+
+    def apply_task_change(self, project_id: str, task_id: str, changes: Dict[str, Any]) -> bool:
+        """Değişen görevin katkısını günceller; görev tahsiste bilinmiyorsa False döner."""
+        key = (project_id, task_id)
+        entry = self.entries.get(key)
+        if entry is None:
+            return False
+        self.set_task(project_id, {**entry["task"], **changes})
+        return True
+
+    # --- ANALİZ ---
+
+    def _periods(self, mask: np.ndarray) -> List[Tuple[int, int]]:
+        """True değerli ardışık gün aralıkları [start, end]; hafta sonları aralığı bölmez."""
+        periods = []
+        start = previous = None
+        for day in np.flatnonzero(mask):
+            if start is not None and not all(self.days[d].weekday() >= 5 for d in range(previous + 1, day)):
+                periods.append((start, previous))
+                start = None
+            if start is None:
+                start = day
+            previous = day
+        if start is not None:
+            periods.append((start, previous))
+        return periods
+
+    def conflicts(self, allocated: Optional[np.ndarray] = None) -> List[Dict[str, Any]]:
+        allocated = self.allocated if allocated is None else allocated
+        over = allocated - self.capacity
+        result = []
+        for employee_id, row in self.row.items():
+            for start, end in self._periods(over[row] > OVERLOAD_TOLERANCE):
+                projects = sorted({
+                    project_id for (project_id, _), entry in self.entries.items()
+                    if entry["row"] == row and ((entry["days"] >= start) & (entry["days"] <= end)).any()
+                })
+                result.append({
+                    "employee_id": employee_id,
+                    "employee_name": employee_display_name(self.planner.employees[employee_id]),
+                    "start_date": self.days[start].isoformat(),
+                    "end_date": self.days[end].isoformat(),
+                    "overload_hours": round(float(over[row, start:end + 1].clip(min=0).sum()), 1),
+                    "projects": projects
+                })
+        return sorted(result, key=lambda c: -c["overload_hours"])
+
+    def _candidates(self, task: Dict[str, Any], current_row: int) -> List[str]:
+        """Görevi devralabilecek çalışanlar: görevin (yoksa mevcut sorumlunun) departmanı."""
+        current_id = self.employee_ids[current_row]
+        department = (task.get("department") or self.department_of.get(current_id, "")).lower()
+        members = self.planner.department_members.get(department) or \
+            self.planner.department_members.get(self.department_of.get(current_id, "").lower(), [])
+        return [m for m in members if m != current_id]
+
+    @staticmethod
+    def _skill_overlap(task: Dict[str, Any], employee: Dict[str, Any]) -> int:
+        required = {s.lower() for s in (task.get("required_stack") or []) if isinstance(s, str)}
+        return len(required & {s.lower() for s in (employee.get("techStack") or []) if isinstance(s, str)})
+
+    def level(self) -> Dict[str, Any]:
+        """
+        Aşırı tahsisi açgözlü yaklaşımla giderir (kaydedilmez, yalnızca öneri üretir):
+        önce kaymasız yeniden atama, olmazsa aynı kişide en az iş günü erteleme denenir.
+        Düşük öncelikli görevler önce taşınır.
+        """
+        allocated = self.allocated.copy()
+        proposals: List[Dict[str, Any]] = []
+        unresolved: List[Dict[str, Any]] = []
+        moved: Set[Tuple[str, str]] = set()
+        total_slip = 0
+
+        overload = (allocated - self.capacity).clip(min=0)
+        rows = sorted(range(len(self.employee_ids)), key=lambda r: -overload[r].sum())
+
+        for row in rows:
+            while True:
+                over_days = np.flatnonzero(allocated[row] - self.capacity[row] > OVERLOAD_TOLERANCE)
+                if len(over_days) == 0:
+                    break
+                candidates = [
+                    (key, entry) for key, entry in self.entries.items()
+                    if entry["row"] == row and key not in moved and np.isin(entry["days"], over_days).any()
+                ]
+                if not candidates:
+                    break
+                key, entry = max(candidates, key=lambda c: (
+                    PRIORITY_RANK.get(c[1]["task"].get("priority"), PRIORITY_RANK["medium"]), c[1]["hours"]
+                ))
+                moved.add(key)
+                task, days, daily = entry["task"], entry["days"], entry["daily"]
+                allocated[row, days] -= daily
+                base = {
+                    "project_id": key[0],
+                    "project_name": self.project_names.get(key[0]),
+                    "task_id": key[1],
+                    "title": task_title(task),
+                    "from_employee_id": self.employee_ids[row],
+                    "from_employee_name": employee_display_name(self.planner.employees[self.employee_ids[row]])
+                }
+
+                # 1. Kaymasız yeniden atama
+                best = None
+                for employee_id in self._candidates(task, row):
+                    other = self.row[employee_id]
+                    free = self.capacity[other, days] - allocated[other, days]
+                    if (free >= daily - 1e-9).all():
+                        score = (self._skill_overlap(task, self.planner.employees[employee_id]), float(free.sum()))
+                        if best is None or score > best[0]:
+                            best = (score, employee_id)
+                if best is not None:
+                    other = self.row[best[1]]
+                    allocated[other, days] += daily
+                    proposals.append({
+                        **base,
+                        "type": "reassign",
+                        "to_employee_id": best[1],
+                        "to_employee_name": employee_display_name(self.planner.employees[best[1]]),
+                        "slip_days": 0
+                    })
+                    continue
+
+                # 2. Aynı kişide en az kaydırma ile erteleme
+                positions = np.array([self.workday_pos[int(d)] for d in days])
+                shifted = None
+                for shift in range(1, MAX_SHIFT_DAYS + 1):
+                    if positions[-1] + shift >= len(self.workdays):
+                        break
+                    new_days = self.workdays[positions + shift]
+                    if (self.capacity[row, new_days] - allocated[row, new_days] >= daily - 1e-9).all():
+                        shifted = (shift, new_days)
+                        break
+                if shifted is not None:
+                    shift, new_days = shifted
+                    allocated[row, new_days] += daily
+                    total_slip += shift
+                    proposals.append({
+                        **base,
+                        "type": "delay",
+                        "slip_days": shift,
+                        "new_start_date": self.days[int(new_days[0])].isoformat(),
+                        "new_due_date": self.days[int(new_days[-1])].isoformat()
+                    })
+                else:
+                    allocated[row, days] += daily
+                    unresolved.append(base)
+
+        return {
+            "proposals": proposals,
+            "unresolved": unresolved,
+            "total_slip_days": total_slip,
+            "remaining_conflicts": self.conflicts(allocated)
+        }
+
+    def employee_summary(self) -> List[Dict[str, Any]]:
+        summary = []
+        for employee_id, row in self.row.items():
+            allocated = float(self.allocated[row].sum())
+            capacity = float(self.capacity[row].sum())
+            projects: Dict[str, float] = {}
+            for (project_id, _), entry in self.entries.items():
+                if entry["row"] == row:
+                    projects[project_id] = projects.get(project_id, 0.0) + entry["hours"]
+            summary.append({
+                "employee_id": employee_id,
+                "name": employee_display_name(self.planner.employees[employee_id]),
+                "department": self.department_of.get(employee_id, ""),
+                "allocated_hours": round(allocated, 1),
+                "capacity_hours": round(capacity, 1),
+                "utilization": round(allocated / capacity, 2) if capacity else None,
+                "overloaded_days": int(((self.allocated[row] - self.capacity[row]) > OVERLOAD_TOLERANCE).sum()),
+                "projects": {p: round(h, 1) for p, h in projects.items()}
+            })
+        return summary
+
+    def analyze(self) -> Dict[str, Any]:
+        leveling = self.level()
+        return {
+            "horizon": {"start_date": self.days[0].isoformat(), "end_date": self.days[-1].isoformat()},
+            "projects": len(self.project_names),
+            "scheduled_tasks": len(self.entries),
+            "unscheduled_tasks": len(self.unscheduled),
+            "employees": self.employee_summary(),
+            "conflicts": self.conflicts(),
+            **leveling
+        }
+
+
+class PortfolioRegistry:
+    """
+    Portföy tahsisinin önbelleği. Görev değişikliği bildirimleri ilgili görevin katkısını
+    artımlı günceller; toplu görev kayıtlarında proje bir sonraki istekte yeniden yüklenir.
+    """
+    def __init__(self):
+        self._scheduler: Optional[PortfolioScheduler] = None
+        self._dirty_projects: Set[str] = set()
+        self._lock = threading.Lock()
+        self._attached = False
+
+    def attach(self, db_client):
+        """
+        Görev bildirimlerine süreç başına bir kez abone olur. Chat her istekte yeni bir
+        RequestScopedDatabase oluşturduğundan sarmalayıcı kimliğine göre ayırt edilmez.
+        """
+        with self._lock:
+            if self._attached:
+                return
+            self._attached = True
+        db_client.add_task_listener(self.on_task_changed)
+
+    def get(self, db_client) -> PortfolioScheduler:
+        self.attach(db_client)
+        company_data = db_client.get_company_structure()
+        with self._lock:
+            scheduler = self._scheduler
+            if scheduler is None or scheduler.today != datetime.date.today():
+                scheduler = PortfolioScheduler(company_data)
+                projects = db_client.list_projects()
+                self._dirty_projects = {p.get("project_id") for p in projects if p.get("project_id")}
+                self._scheduler = scheduler
+                print(f"[Portfolio] Tahsis oluşturuluyor: {len(self._dirty_projects)} proje")
+            else:
+                scheduler.set_company(company_data)
+
+            for project_id in sorted(self._dirty_projects):
+                project = db_client.get_project(project_id) or {}
+                sprints = db_client.get_sprints(project_id)
+                scheduler.load_project(
+                    project_id, project.get("project_name", project_id),
+                    db_client.get_tasks(project_id) or [], sprints[0] if sprints else None
+                )
+            self._dirty_projects = set()
+            return scheduler
+
+    def on_task_changed(self, project_id: str, task_id: Optional[str], changes: Optional[Dict[str, Any]]):
+        with self._lock:
+            if self._scheduler is None:
+                return
+            if task_id is None or changes is None or not self._scheduler.apply_task_change(project_id, task_id, changes):
+                # Bilinmeyen veya toplu değişiklik: proje bir sonraki istekte yeniden yüklenir
+                self._dirty_projects.add(project_id)
+
+
+portfolio_registry = PortfolioRegistry()
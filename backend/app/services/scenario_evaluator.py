@@ -0,0 +1,207 @@
+import copy
+import datetime
+from typing import Dict, Any, List, Optional, Tuple
+
+from app.services.sprint_planner import (
+    FOCUS_HOURS_PER_DAY, parse_date, parse_estimated_hours, iter_employees
+)
+from app.services.sprint_replanner import SprintReplanner
+from app.services.delivery_simulator import DeliverySimulator, summarize_delay_risk
+
+# Senaryo başına Monte Carlo deneme sayısı (toplu değerlendirmede tek analizden düşük tutulur)
+SCENARIO_TRIALS = 2000
+
+# Bir istekte değerlendirilebilecek en fazla senaryo
+MAX_SCENARIOS = 10
+
+
+def scenario_label(scenario: Dict[str, Any], index: int) -> str:
+    """Sonuçlarda ve apply_scenario eşleştirmesinde kullanılan senaryo adı."""
+    return scenario.get("name") or f"Senaryo {index + 1}"
+
+
+def find_scenario(scenarios: List[Dict[str, Any]], selector: str) -> Optional[Dict[str, Any]]:
+    """Senaryoyu adıyla, üretilen etiketiyle ("Senaryo 2") veya 1 tabanlı sırasıyla bulur."""
+    for i, scenario in enumerate(scenarios):
+        if selector in (scenario.get("name"), scenario_label(scenario, i), str(i + 1)):
+            return scenario
+    return None
+
+
+class ScenarioEvaluator:
+    """
+    "Ne olur?" senaryolarını mevcut deterministik plan üzerinde bellekte değerlendirir.
+
+    Her senaryo, SprintReplanner olaylarından oluşur (ör. bir çalışanın izni, kapsam çıkarma,
+    sprint ekleme). Plan kopyası yeniden dengelenir, aynı olaylar görev/şirket verisine de
+    uygulanarak teslim tarihi simüle edilir. Hiçbir şey kaydedilmez.
+
+    Senaryo formatı:
+        {"name": "Ahmet 5 gün izinli", "events": [...], "vacation_days": 0, "delays": 0}
+    """
+    def __init__(self, company_data: Optional[Dict[str, Any]], trials: int = SCENARIO_TRIALS, seed: int = 42,
+                 hours_per_day: float = FOCUS_HOURS_PER_DAY):
+        self.company_data = company_data or {}
+        self.replanner = SprintReplanner(company_data, hours_per_day)
+        self.trials = trials
+        self.seed = seed
+        self.hours_per_day = hours_per_day
+
+    def scenario_events(self, scenario: Dict[str, Any], today: datetime.date) -> List[Dict[str, Any]]:
+        events = list(scenario.get("events") or [])
+        events += SprintReplanner.events_from_legacy(scenario.get("vacation_days", 0), scenario.get("delays", 0), today)
+        self.replanner.validate_events(events)
+        return events
+
+    # --- GİRDİ UYARLAMA ---
+
+    def _apply_to_inputs(self, tasks: List[Dict[str, Any]], events: List[Dict[str, Any]],
+                         today: datetime.date) -> Tuple[List[Dict[str, Any]], Dict[str, Any], datetime.date]:
+        """Olayları simülasyon girdilerine (görevler, şirket yapısı, başlangıç) uygular."""
+        tasks = copy.deepcopy(tasks)
+        company_data = copy.deepcopy(self.company_data)
+        tasks_by_id = {t.get("task_id"): t for t in tasks}
+        employees = {e.get("id"): e for _, e in iter_employees(company_data)}
+        start_date = today
+
+        for event in events:
+            event_type = event["type"]
+            if event_type == "scope_removed":
+                for task_id in event.get("task_ids", []):
+                    if task_id in tasks_by_id:
+                        tasks_by_id[task_id]["status"] = "cancelled"
+            elif event_type == "task_slipped":
+                task = tasks_by_id.get(event["task_id"])
+                if task:
+                    task["estimated_hours"] = parse_estimated_hours(task.get("estimated_hours")) + \
+                        max(0, int(event.get("days", 0))) * self.hours_per_day
+            elif event_type == "schedule_slipped":
+                start_date += datetime.timedelta(days=max(0, int(event.get("days", 0))))
+            elif event_type == "employee_unavailable":
+                begin = parse_date(event["start_date"])
+                end = parse_date(event.get("end_date")) or begin
+                employee = employees.get(event.get("employee_id"))
+                if employee:
+                    employee["availability_status"] = "unavailable"
+                    employee["unavailable_until"] = end.isoformat()
+                    if begin > today:
+                        employee["unavailable_from"] = begin.isoformat()
+                elif event.get("employee_id") is None and end >= start_date and begin <= start_date:
+                    # Başlamış tüm ekip izni başlangıcı izin bitişine kaydırır
+                    start_date = end + datetime.timedelta(days=1)
+                elif event.get("employee_id") is None and end >= start_date:
+                    # İleri tarihli tüm ekip izni: her çalışanın izni aynı aralıkta
+                    for member in employees.values():
+                        member["availability_status"] = "unavailable"
+                        member["unavailable_from"] = begin.isoformat()
+                        member["unavailable_until"] = end.isoformat()
+        return tasks, company_data, start_date
+
+    # --- METRİKLER ---
+
+    def _metrics(self, plan: Dict[str, Any], tasks: List[Dict[str, Any]], company_data: Dict[str, Any],
+                 start_date: datetime.date, target_date: Optional[datetime.date],
+                 today: datetime.date) -> Dict[str, Any]:
+        sprints = plan.get("sprints", [])
+        history = plan.get("replan_events", [])
+        excluded = self.replanner._excluded_days(history)
+        extra = self.replanner._extra_hours(history)
+        tasks_by_id = {t.get("task_id"): t for t in tasks}
+        planner = self.replanner.planner
+
+        overloaded = []
+        overload_hours = 0.0
+        peak = 0.0
+        for sp in sprints:
+            start, end = parse_date(sp.get("start_date")), parse_date(sp.get("end_date"))
+            if not start or not end or end <= today:
+                continue
+            capacity = sum(planner.sprint_capacity(start, end, excluded).values())
+            planned = sum(
+                parse_estimated_hours(tasks_by_id.get(t, {}).get("estimated_hours")) + extra.get(t, 0.0)
+                for t in sp.get("tasks", [])
+            )
+            utilization = planned / capacity if capacity else (float("inf") if planned else 0.0)
+            peak = max(peak, utilization)
+            if planned > capacity:
+                overloaded.append(sp["sprint_number"])
+                overload_hours += planned - capacity
+
+        simulation = DeliverySimulator(company_data, trials=self.trials, seed=self.seed).simulate(
+            tasks, start_date=start_date, target_date=target_date
+        )
+        risk = summarize_delay_risk(simulation, tasks, company_data)
+        return {
+            "projected_end_date": sprints[-1]["end_date"] if sprints else None,
+            "total_sprints": len(sprints),
+            "overloaded_sprints": overloaded,
+            "overload_hours": round(overload_hours, 1),
+            "peak_utilization": round(peak, 2) if peak != float("inf") else None,
+            "delivery_p50": simulation["percentiles"]["p50"],
+            "delivery_p80": simulation["percentiles"]["p80"],
+            "on_time_probability": simulation["on_time_probability"],
+            "overall_delay_risk": risk["overall_delay_risk"],
+            "risk_factors": [f["type"] for f in risk["risk_factors"]]
+        }
+
+    # --- DEĞERLENDİRME ---
+
+    def evaluate(self, plan: Dict[str, Any], tasks: List[Dict[str, Any]], scenarios: List[Dict[str, Any]],
+                 target_date: Optional[datetime.date] = None,
+                 today: Optional[datetime.date] = None) -> Dict[str, Any]:
+        """
+        Returns:
+            {"baseline": metrikler, "scenarios": [{name, events, metrics, delta, diff}]}
+        """
+        if not scenarios:
+            raise ValueError("En az bir senaryo belirtilmeli.")
+        if len(scenarios) > MAX_SCENARIOS:
+            raise ValueError(f"En fazla {MAX_SCENARIOS} senaryo değerlendirilebilir.")
+        today = today or datetime.date.today()
+        target_date = target_date or parse_date(plan.get("sprints", [{}])[-1].get("end_date"))
+
+        baseline = self._metrics(plan, tasks, self.company_data, today, target_date, today)
+        baseline_end = parse_date(baseline["projected_end_date"])
+
+        results = []
+        for i, scenario in enumerate(scenarios):
+            name = scenario_label(scenario, i)
+            events = self.scenario_events(scenario, today)
+            new_plan, diff = self.replanner.replan(plan, copy.deepcopy(tasks), events, today)
+            scenario_tasks, company_data, start_date = self._apply_to_inputs(tasks, events, today)
+
+            # Sprint eklemek teslim hedefini de eklenen süre kadar uzatır
+            scenario_target = target_date
+            if target_date:
+                added_weeks = sum(
+                    max(1, int(e.get("count", 1))) * plan.get("sprint_duration_weeks", 2)
+                    for e in events if e["type"] == "sprint_added"
+                )
+                scenario_target = target_date + datetime.timedelta(weeks=added_weeks)
+
+            metrics = self._metrics(new_plan, scenario_tasks, company_data, start_date, scenario_target, today)
+            end = parse_date(metrics["projected_end_date"])
+            results.append({
+                "name": name,
+                "events": events,
+                "metrics": metrics,
+                "delta": {
+                    "end_date_days": (end - baseline_end).days if end and baseline_end else None,
+                    "on_time_probability": round(metrics["on_time_probability"] - baseline["on_time_probability"], 3)
+                    if metrics["on_time_probability"] is not None and baseline["on_time_probability"] is not None else None,
+                    "overload_hours": round(metrics["overload_hours"] - baseline["overload_hours"], 1)
+                },
+                "diff": {
+                    "tasks_moved": len(diff["tasks_moved"]),
+                    "tasks_removed": len(diff["tasks_removed"]),
+                    "sprints_added": len(diff["sprints_added"]),
+                    "sprints_removed": len(diff["sprints_removed"]),
+                    "task_dates_changed": len(diff["task_dates_changed"])
+                }
+            })
+
+        return {
+            "baseline": baseline,
+            "target_date": target_date.isoformat() if target_date else None,
+            "scenarios": results
+        }
@@ -0,0 +1,268 @@
+import datetime
+from typing import Dict, Any, List, Optional, Tuple
+
+from app.services.sprint_planner import (
+    SprintPlanner, FOCUS_HOURS_PER_DAY, EXCLUDED_STATUSES,
+    parse_date, parse_estimated_hours, working_days, employee_display_name,
+    employee_capacity_hours, task_title, task_assignee_id
+)
+from app.services.calendar_projection import TaskIndex
+
+# Devam eden görevlerin ilerleme hesabında tamamlanmış sayılan oranı
+IN_PROGRESS_CREDIT = 0.5
+
+# Atanmamış olması risk sayılan öncelikler
+CRITICAL_PRIORITIES = {"critical", "high"}
+
+# Ceza üst sınırları (toplam 100 puandan düşülür)
+MAX_PENALTY = {
+    "time_pressure": 35,
+    "blocked_tasks": 25,
+    "unassigned_tasks": 15,
+    "low_capacity": 20,
+    "dependency_issues": 10,
+}
+
+
+def health_status(score: float) -> str:
+    """Skoru mevcut sağlık durumu etiketlerine çevirir."""
+    if score >= 80:
+        return "healthy"
+    if score >= 60:
+        return "warning"
+    if score >= 40:
+        return "at_risk"
+    return "critical"
+
+
+def severity_for(penalty: float, maximum: float) -> str:
+    ratio = penalty / maximum if maximum else 0
+    if ratio >= 0.75:
+        return "critical"
+    if ratio >= 0.5:
+        return "high"
+    if ratio >= 0.25:
+        return "medium"
+    return "low"
+
+
+class SprintHealthCalculator:
+    """
+    Sprint sağlık skorunu kurallara göre hesaplar (LLM kullanmaz).
+
+    Skor 100'den başlar; geçen süreye göre geride kalan ilerleme, engellenen görev oranı,
+    atanmamış kritik görevler, müsait olmayan/aşırı yüklü sorumlular ve engellenen
+    bağımlılıklar için sınırlı cezalar düşülür. Çıktı, eski LLM analiziyle aynı şemadadır.
+    """
+    def __init__(self, company_data: Optional[Dict[str, Any]], hours_per_day: float = FOCUS_HOURS_PER_DAY,
+                 today: Optional[datetime.date] = None):
+        self.planner = SprintPlanner(company_data, hours_per_day)
+        self.hours_per_day = hours_per_day
+        self.today = today or datetime.date.today()
+
+    # --- SPRINT SEÇİMİ ---
+
+    def current_window(self, sprint: Dict[str, Any]) -> Tuple[Optional[Dict[str, Any]], Optional[datetime.date], Optional[datetime.date]]:
+        """
+        Değerlendirilecek plan sprint'ini ve tarih aralığını bulur.
+
+        Tarihli planlarda bugünü kapsayan sprint (yoksa en yakını), tarihsiz eski planlarda
+        tüm plan ve sprint belgesinin tarihleri kullanılır.
+        """
+        plan_sprints = sprint.get("plan", {}).get("sprints", [])
+        dated = [
+            (parse_date(s.get("start_date")), parse_date(s.get("end_date")), s)
+            for s in plan_sprints
+        ]
+        dated = [d for d in dated if d[0] and d[1]]
+        if dated and len(dated) == len(plan_sprints):
+            dated.sort(key=lambda d: d[0])
+            for start, end, plan_sprint in dated:
+                if start <= self.today < end:
+                    return plan_sprint, start, end
+            if self.today < dated[0][0]:
+                return dated[0][2], dated[0][0], dated[0][1]
+            return dated[-1][2], dated[-1][0], dated[-1][1]
+        return None, parse_date(sprint.get("start_date")), parse_date(sprint.get("end_date"))
+
+    @staticmethod
+    def resolve_tasks(identifiers: List[str], tasks: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Plandaki görev referanslarını (task_id, başlık veya yer tutucu) görev kayıtlarına çevirir."""
+        index = TaskIndex(tasks)
+        resolved = []
+        seen = set()
+        for identifier in identifiers:
+            task = index.resolve(identifier)
+            if task and id(task) not in seen:
+                seen.add(id(task))
+                resolved.append(task)
+        return resolved
+
+    # --- HESAPLAMA ---
+
+    def evaluate(self, sprint: Dict[str, Any], tasks: List[Dict[str, Any]]) -> Dict[str, Any]:
+        plan_sprint, start, end = self.current_window(sprint)
+        if plan_sprint is not None:
+            identifiers = plan_sprint.get("tasks", [])
+        else:
+            identifiers = [i for s in sprint.get("plan", {}).get("sprints", []) for i in s.get("tasks", [])]
+        sprint_tasks = [t for t in self.resolve_tasks(identifiers, tasks) if t.get("status") != "cancelled"]
+        open_tasks = [t for t in sprint_tasks if t.get("status") not in EXCLUDED_STATUSES]
+
+        total = len(sprint_tasks)
+        done = total - len(open_tasks)
+        completion_rate = round(done / total, 2) if total else 1.0
+
+        # Efor ağırlıklı ilerleme ve geçen süre oranı
+        total_hours = sum(parse_estimated_hours(t.get("estimated_hours")) for t in sprint_tasks)
+        remaining_hours = sum(
+            parse_estimated_hours(t.get("estimated_hours")) * (1 - IN_PROGRESS_CREDIT if t.get("status") == "in_progress" else 1)
+            for t in open_tasks
+        )
+        progress = 1 - remaining_hours / total_hours if total_hours else 1.0
+        if start and end and end > start:
+            elapsed = len(working_days(start, min(max(self.today, start), end))) / max(1, len(working_days(start, end)))
+        else:
+            elapsed = 0.0
+
+        risk_factors: List[Dict[str, Any]] = []
+        recommendations: List[str] = []
+        penalties: Dict[str, float] = {}
+
+        def add_risk(risk_type: str, penalty: float, description: str, impact: str, recommendation: str):
+            penalty = min(MAX_PENALTY[risk_type], penalty)
+            if penalty <= 0:
+                return
+            penalties[risk_type] = penalty
+            risk_factors.append({
+                "type": risk_type,
+                "severity": severity_for(penalty, MAX_PENALTY[risk_type]),
+                "description": description,
+                "impact_on_sprint": impact
+            })
+            recommendations.append(recommendation)
+
+        # 1. Zaman baskısı: geçen süre, ilerlemenin önünde mi?
+        gap = elapsed - progress
+        add_risk(
+            "time_pressure", gap * 60,
+            f"Sprint süresinin %{elapsed * 100:.0f}'i geçti, işin %{progress * 100:.0f}'i tamamlandı.",
+            f"Kalan {remaining_hours:.0f} saatlik iş mevcut hızla sprint bitişine yetişmeyebilir.",
+            "Kalan işi önceliklendirin; düşük öncelikli görevleri sonraki sprint'e taşıyın."
+        )
+
+        # 2. Engellenen görevler
+        blocked = [t for t in open_tasks if t.get("status") == "blocked"]
+        blockers = [
+            {
+                "task_title": task_title(t),
+                "reason": t.get("blocked_reason") or "Belirtilmemiş",
+                "critical": t.get("priority") in CRITICAL_PRIORITIES
+            }
+            for t in blocked
+        ]
+        if blocked:
+            share = len(blocked) / max(1, len(open_tasks))
+            critical_blocked = sum(1 for b in blockers if b["critical"])
+            add_risk(
+                "blocked_tasks", share * 40 + critical_blocked * 5,
+                f"{len(blocked)} görev engellenmiş durumda ({critical_blocked} tanesi yüksek öncelikli).",
+                "Engellenen görevler ve onlara bağlı işler ilerleyemiyor.",
+                "Engellenen görevlerin blokerlerini öncelikli olarak kaldırın."
+            )
+
+        # 3. Atanmamış kritik görevler
+        unassigned = [
+            t for t in open_tasks
+            if t.get("priority") in CRITICAL_PRIORITIES and not task_assignee_id(t, self.planner.name_to_id)
+        ]
+        if unassigned:
+            add_risk(
+                "unassigned_tasks", len(unassigned) * 6,
+                f"{len(unassigned)} yüksek öncelikli görev henüz atanmamış: " + ", ".join(task_title(t) for t in unassigned[:5]),
+                "Sahibi olmayan kritik görevler sprint sonuna kadar başlamayabilir.",
+                "Atanmamış kritik görevleri kapasitesi olan çalışanlara atayın."
+            )
+
+        # 4. Sorumluların müsaitliği ve kalan kapasitesi
+        remaining_start = max(self.today, start) if start else self.today
+        remaining_end = end or remaining_start
+        load: Dict[str, float] = {}
+        for t in open_tasks:
+            assignee_id = task_assignee_id(t, self.planner.name_to_id)
+            if assignee_id in self.planner.employees:
+                hours = parse_estimated_hours(t.get("estimated_hours"))
+                if t.get("status") == "in_progress":
+                    hours *= 1 - IN_PROGRESS_CREDIT
+                load[assignee_id] = load.get(assignee_id, 0.0) + hours
+        unavailable_people, overloaded_people = [], []
+        for employee_id, hours in load.items():
+            employee = self.planner.employees[employee_id]
+            capacity = employee_capacity_hours(employee, remaining_start, remaining_end, self.hours_per_day)
+            if employee.get("availability_status", "available") == "unavailable" and capacity == 0:
+                unavailable_people.append(employee_display_name(employee))
+            elif hours > capacity:
+                overloaded_people.append((employee_display_name(employee), hours, capacity))
+        if unavailable_people or overloaded_people:
+            parts = []
+            if unavailable_people:
+                parts.append(f"Müsait olmayan sorumlular: {', '.join(unavailable_people)}")
+            if overloaded_people:
+                parts.append("Aşırı yüklü: " + ", ".join(f"{name} ({h:.0f}/{c:.0f} saat)" for name, h, c in overloaded_people))
+            add_risk(
+                "low_capacity", len(unavailable_people) * 8 + len(overloaded_people) * 5,
+                ". ".join(parts) + ".",
+                "Bu kişilerin görevleri sprint içinde tamamlanamayabilir.",
+                "Müsait olmayan veya aşırı yüklü çalışanların görevlerini yeniden dağıtın."
+            )
+
+        # 5. Engellenen bağımlılıklar
+        status_by_id = {t.get("task_id"): t.get("status") for t in tasks}
+        waiting = [
+            t for t in open_tasks
+            if any(status_by_id.get(d) == "blocked" for d in (t.get("dependencies") or []))
+        ]
+        if waiting:
+            add_risk(
+                "dependency_issues", len(waiting) * 4,
+                f"{len(waiting)} görev engellenmiş bir görevi bekliyor.",
+                "Bağımlılık zinciri üzerindeki gecikme sonraki görevlere yayılıyor.",
+                "Bağımlılık zincirindeki engelleri çözün veya bağımlı görevleri yeniden sıralayın."
+            )
+
+        health_score = max(0, round(100 - sum(penalties.values())))
+
+        # Tahmini sonuç: kalan iş vs. sprint sonuna kadarki ekip kapasitesi
+        team_capacity = sum(self.planner.sprint_capacity(remaining_start, remaining_end).values()) if end else 0.0
+        daily_capacity = sum(self.planner.sprint_capacity(self.today, self.today + datetime.timedelta(days=7)).values()) / 5
+        if health_score < 40:
+            predicted_outcome = "Sprint revizyon gerektirir"
+        elif remaining_hours <= team_capacity or not remaining_hours:
+            predicted_outcome = "Sprint büyük olasılıkla zamanında tamamlanacak"
+        else:
+            delay_days = int(-(-(remaining_hours - team_capacity) // max(daily_capacity, 1)))
+            predicted_outcome = f"{delay_days} gün gecikme riski var"
+
+        return {
+            "health_score": health_score,
+            "status": health_status(health_score),
+            "completion_rate": completion_rate,
+            "risk_factors": risk_factors,
+            "blockers": blockers,
+            "recommendations": recommendations,
+            "predicted_outcome": predicted_outcome,
+            "metrics": {
+                "sprint_number": plan_sprint.get("sprint_number") if plan_sprint else None,
+                "start_date": start.isoformat() if start else None,
+                "end_date": end.isoformat() if end else None,
+                "total_tasks": total,
+                "completed_tasks": done,
+                "blocked_tasks": len(blocked),
+                "elapsed_ratio": round(elapsed, 2),
+                "progress_ratio": round(progress, 2),
+                "remaining_hours": round(remaining_hours, 1),
+                "remaining_capacity_hours": round(team_capacity, 1),
+                "penalties": {k: round(v, 1) for k, v in penalties.items()}
+            },
+            "calculator": "rule_based"
+        }
@@ -0,0 +1,347 @@
+import datetime
+import heapq
+import re
+from typing import Dict, Any, List, Optional, Tuple
+
+# Öncelik sıralaması (küçük değer önce planlanır)
+PRIORITY_RANK = {"critical": 0, "high": 1, "medium": 2, "low": 3}
+
+# İş yükü etiketine göre çalışanın projeye ayırabileceği zaman oranı
+WORKLOAD_FACTOR = {"low": 1.0, "medium": 0.75, "high": 0.5}
+
+# Süre tahmini olmayan görevler için varsayılan efor (saat)
+DEFAULT_TASK_HOURS = 16.0
+
+# Bir çalışanın günlük odaklı çalışma süresi (saat)
+FOCUS_HOURS_PER_DAY = 6.0
+
+DONE_STATUSES = {"completed", "done"}
+
+# Yakın kopya olarak işaretlenen görevlerin durumu (atanmaz, planlanmaz)
+DUPLICATE_STATUS = "duplicate"
+
+# Plana alınmayan durumlar (tamamlanan, kapsamdan çıkarılan veya kopya olarak işaretlenen görevler)
+EXCLUDED_STATUSES = DONE_STATUSES | {"cancelled", DUPLICATE_STATUS}
+
+
+def parse_estimated_hours(value: Any, default: float = DEFAULT_TASK_HOURS) -> float:
+    """'24', 24, '16 saat' gibi değerleri saate çevirir; okunamazsa varsayılanı döndürür."""
+    if isinstance(value, (int, float)) and value > 0:
+        return float(value)
+    if isinstance(value, str):
+        match = re.search(r"\d+(?:[.,]\d+)?", value)
+        if match:
+            hours = float(match.group().replace(",", "."))
+            if hours > 0:
+                return hours
+    return default
+
+
+def parse_date(value: Any) -> Optional[datetime.date]:
+    """ISO tarih/tarih-saat string'ini date'e çevirir."""
+    if isinstance(value, datetime.datetime):
+        return value.date()
+    if isinstance(value, datetime.date):
+        return value
+    if isinstance(value, str) and value:
+        try:
+            return datetime.date.fromisoformat(value[:10])
+        except ValueError:
+            return None
+    return None
+
+
+def working_days(start: datetime.date, end: datetime.date) -> List[datetime.date]:
+    """[start, end) aralığındaki hafta içi günleri döndürür."""
+    days = []
+    current = start
+    while current < end:
+        if current.weekday() < 5:
+            days.append(current)
+        current += datetime.timedelta(days=1)
+    return days
+
+
+def iter_employees(company_data: Optional[Dict[str, Any]]):
+    """Şirket yapısındaki tüm çalışanları (departman adıyla) döndürür."""
+    if not company_data:
+        return
+    for dept in company_data.get("companyStructure", {}).get("departments", []):
+        for team in dept.get("teams", []):
+            for employee in team.get("employees", []):
+                yield dept.get("name", ""), employee
+
+
+def employee_display_name(employee: Dict[str, Any]) -> str:
+    return f"{employee.get('firstName', '')} {employee.get('lastName', '')}".strip() or employee.get("name", "")
+
+
+def is_employee_available_on(employee: Dict[str, Any], day: datetime.date) -> bool:
+    """Çalışanın verilen günde müsait olup olmadığını döndürür."""
+    status = employee.get("availability_status", "available")
+    if status == "available":
+        return True
+    # İleri tarihli izin (senaryolar): başlangıçtan önceki günler müsaittir
+    since = parse_date(employee.get("unavailable_from"))
+    if since and day < since:
+        return True
+    until = parse_date(employee.get("unavailable_until"))
+    # Bitiş tarihi olmayan izinler süresiz kabul edilir
+    return until is not None and day > until
+
+
+def employee_capacity_hours(employee: Dict[str, Any], start: datetime.date, end: datetime.date,
+                            hours_per_day: float = FOCUS_HOURS_PER_DAY,
+                            excluded_days: Optional[set] = None) -> float:
+    """Çalışanın [start, end) aralığındaki kullanılabilir saatini hesaplar."""
+    factor = WORKLOAD_FACTOR.get(employee.get("currentWorkload"), WORKLOAD_FACTOR["medium"])
+    if employee.get("availability_status") == "limited":
+        factor *= 0.5
+    excluded_days = excluded_days or set()
+    days = [
+        d for d in working_days(start, end)
+        if d not in excluded_days and is_employee_available_on(employee, d)
+    ]
+    return len(days) * hours_per_day * factor
+
+
+def task_title(task: Dict[str, Any]) -> str:
+    return task.get("title") or task.get("task_title") or task.get("task_id", "")
+
+
+def task_assignee_id(task: Dict[str, Any], name_to_id: Dict[str, str]) -> Optional[str]:
+    """Görevin atandığı çalışanın ID'sini (ID veya isim üzerinden) bulur."""
+    if task.get("assigned_employee_id"):
+        return task["assigned_employee_id"]
+    assignee = task.get("assigned_to") or task.get("task_attended_to")
+    if isinstance(assignee, dict):
+        return assignee.get("id") or name_to_id.get((assignee.get("name") or "").lower())
+    if isinstance(assignee, str) and assignee:
+        return name_to_id.get(assignee.lower())
+    return None
+
+
+class SprintPlanner:
+    """
+    Görevleri kapasiteye göre sprint'lere yerleştiren deterministik planlayıcı.
+
+    Görevler bağımlılık sırasına (topolojik), eşitlikte önceliğe ve orijinal sıraya
+    göre dizilir; her görev, bağımlılıklarından önceki olmayan ve departman/atanan kişi
+    kapasitesinin yettiği ilk sprint'e yerleştirilir. Aynı girdi her zaman aynı planı üretir.
+    """
+    VIRTUAL_MEMBER = "_team"
+
+    def __init__(self, company_data: Optional[Dict[str, Any]], hours_per_day: float = FOCUS_HOURS_PER_DAY):
+        self.hours_per_day = hours_per_day
+        self.employees: Dict[str, Dict[str, Any]] = {}
+        self.department_members: Dict[str, List[str]] = {}
+        self.name_to_id: Dict[str, str] = {}
+
+        for department, employee in iter_employees(company_data):
+            employee_id = employee.get("id")
+            if not employee_id:
+                continue
+            self.employees[employee_id] = employee
+            self.department_members.setdefault(department.lower(), []).append(employee_id)
+            self.name_to_id[employee_display_name(employee).lower()] = employee_id
+
+    # --- SIRALAMA ---
+
+    @staticmethod
+    def order_tasks(tasks: List[Dict[str, Any]]) -> Tuple[List[Dict[str, Any]], List[str]]:
+        """
+        Görevleri bağımlılık sırasına göre dizer (Kahn algoritması, öncelik ile eşitlik bozma).
+
+        Returns:
+            (sıralı görevler, döngüde kalan görev ID'leri)
+        """
+        index_of = {task["task_id"]: i for i, task in enumerate(tasks)}
+        indegree = [0] * len(tasks)
+        dependents: List[List[int]] = [[] for _ in tasks]
+        for i, task in enumerate(tasks):
+            for dep_id in set(task.get("dependencies") or []):
+                j = index_of.get(dep_id)
+                if j is not None and j != i:
+                    indegree[i] += 1
+                    dependents[j].append(i)
+
+        def sort_key(i: int):
+            return (PRIORITY_RANK.get(tasks[i].get("priority"), PRIORITY_RANK["medium"]), i)
+
+        heap = [sort_key(i) for i in range(len(tasks)) if indegree[i] == 0]
+        heapq.heapify(heap)
+        ordered = []
+        while heap:
+            _, i = heapq.heappop(heap)
+            ordered.append(i)
+            for k in dependents[i]:
+                indegree[k] -= 1
+                if indegree[k] == 0:
+                    heapq.heappush(heap, sort_key(k))
+
+        # Döngüdeki görevler en sona, öncelik sırasıyla eklenir
+        cyclic = sorted((i for i in range(len(tasks)) if indegree[i] > 0), key=sort_key)
+        ordered.extend(cyclic)
+        return [tasks[i] for i in ordered], [tasks[i]["task_id"] for i in cyclic]
+
+    # --- KAPASİTE ---
+
+    def _pool_members(self, department: str) -> List[str]:
+        """Görevin departmanındaki çalışanlar; departman boşsa tüm şirket."""
+        members = self.department_members.get((department or "").lower())
+        return members if members else (list(self.employees.keys()) or [self.VIRTUAL_MEMBER])
+
+    def task_pool(self, task: Dict[str, Any]) -> List[str]:
+        """Görevin eforunun düşüleceği çalışanlar: atanan kişi, yoksa departman havuzu."""
+        assignee_id = task_assignee_id(task, self.name_to_id)
+        if assignee_id in self.employees:
+            return [assignee_id]
+        return self._pool_members(task.get("department", ""))
+
+    def sprint_capacity(self, start: datetime.date, end: datetime.date,
+                        excluded_days: Optional[Dict[str, set]] = None) -> Dict[str, float]:
+        """
+        Sprint aralığında çalışan başına kullanılabilir saat.
+
+        Args:
+            excluded_days: {employee_id: {date, ...}} ek izin günleri (None anahtarı tüm ekip için)
+        """
+        excluded_days = excluded_days or {}
+        team_excluded = excluded_days.get(None, set())
+        if not self.employees:
+            # Şirket yapısı yoksa tek kişilik varsayılan ekip kapasitesi kullanılır
+            days = [d for d in working_days(start, end) if d not in team_excluded]
+            return {self.VIRTUAL_MEMBER: len(days) * self.hours_per_day}
+        return {
+            employee_id: employee_capacity_hours(
+                employee, start, end, self.hours_per_day,
+                team_excluded | excluded_days.get(employee_id, set())
+            )
+            for employee_id, employee in self.employees.items()
+        }
+
+    @staticmethod
+    def consume(capacity: Dict[str, float], pool: List[str], hours: float):
+        """Efor, havuzdaki en boş çalışanlardan başlanarak kapasiteden düşülür."""
+        left = hours
+        for member in sorted(pool, key=lambda m: -capacity[m]):
+            take = min(left, capacity[member])
+            capacity[member] -= take
+            left -= take
+            if left <= 0:
+                break
+
+    # --- PLANLAMA ---
+
+    def plan(self, tasks: List[Dict[str, Any]], sprint_duration_weeks: int = 2,
+             start_date: Optional[datetime.date] = None) -> Dict[str, Any]:
+        """
+        Sprint planını üretir (mevcut `plan` şeması ile uyumlu).
+
+        Args:
+            tasks: Proje görevleri (task_id içermeli)
+            sprint_duration_weeks: Sprint süresi (hafta)
+            start_date: İlk sprint'in başlangıcı (varsayılan: bugün)
+        """
+        start_date = start_date or datetime.date.today()
+        sprint_duration_weeks = max(1, int(sprint_duration_weeks))
+        sprint_length = datetime.timedelta(weeks=sprint_duration_weeks)
+
+        open_tasks = [t for t in tasks if t.get("task_id") and t.get("status") not in EXCLUDED_STATUSES]
+        completed_ids = [t["task_id"] for t in tasks if t.get("task_id") and t.get("status") in DONE_STATUSES]
+        ordered, cyclic_ids = self.order_tasks(open_tasks)
+
+        sprints: List[Dict[str, Any]] = []
+        remaining: List[Dict[str, float]] = []
+        placed_in: Dict[str, int] = {}
+        overflow: List[str] = []
+        max_sprints = len(ordered) + 12
+        # Henüz oluşturulmamış sprint'lerin kapasitesi; yoklama sırasında sprint üretilmez
+        probed: Dict[int, Dict[str, float]] = {}
+
+        def capacity_at(index: int) -> Dict[str, float]:
+            if index < len(remaining):
+                return remaining[index]
+            if index not in probed:
+                sprint_start = start_date + sprint_length * index
+                probed[index] = self.sprint_capacity(sprint_start, sprint_start + sprint_length)
+            return probed[index]
+
+        def ensure_sprint(index: int):
+            while len(sprints) <= index:
+                number = len(sprints) + 1
+                sprint_start = start_date + sprint_length * (number - 1)
+                capacity = capacity_at(number - 1)
+                sprints.append({
+                    "sprint_number": number,
+                    "sprint_name": f"Sprint {number}",
+                    "duration_weeks": sprint_duration_weeks,
+                    "start_date": sprint_start.isoformat(),
+                    "end_date": (sprint_start + sprint_length).isoformat(),
+                    "tasks": [],
+                    "task_titles": [],
+                    "planned_hours": 0.0,
+                    "capacity_hours": round(sum(capacity.values()), 1),
+                    "focus": ""
+                })
+                remaining.append(capacity)
+
+        for task in ordered:
+            task_id = task["task_id"]
+            hours = parse_estimated_hours(task.get("estimated_hours"))
+            earliest = max((placed_in[d] for d in (task.get("dependencies") or []) if d in placed_in), default=0)
+            pool = self.task_pool(task)
+
+            chosen = None
+            for index in range(earliest, max_sprints):
+                free = sum(capacity_at(index)[member] for member in pool)
+                fresh = index >= len(sprints) or sprints[index]["planned_hours"] == 0
+                # Tek sprint'e sığmayan büyük görevler boş bir sprint'e tek başına yerleşir
+                if free >= hours or (fresh and free > 0):
+                    chosen = index
+                    break
+            if chosen is None:
+                chosen = earliest
+                overflow.append(task_id)
+            ensure_sprint(chosen)
+
+            self.consume(remaining[chosen], pool, hours)
+
+            sprint = sprints[chosen]
+            sprint["tasks"].append(task_id)
+            sprint["task_titles"].append(task_title(task))
+            sprint["planned_hours"] = round(sprint["planned_hours"] + hours, 1)
+            placed_in[task_id] = chosen
+
+        for sprint in sprints:
+            sprint["focus"] = self.default_focus(sprint, {t["task_id"]: t for t in open_tasks})
+
+        notes = [f"{len(open_tasks)} açık görev, {len(sprints)} sprint'e kapasiteye göre yerleştirildi."]
+        if completed_ids:
+            notes.append(f"{len(completed_ids)} tamamlanmış görev plana dahil edilmedi.")
+        if cyclic_ids:
+            notes.append(f"Döngüsel bağımlılık tespit edildi: {', '.join(cyclic_ids)}")
+        if overflow:
+            notes.append(f"Kapasite yetersiz, zorunlu yerleştirilen görevler: {', '.join(overflow)}")
+
+        return {
+            "total_sprints": len(sprints),
+            "sprint_duration_weeks": sprint_duration_weeks,
+            "sprints": sprints,
+            "backlog": [],
+            "completed_tasks": completed_ids,
+            "notes": " ".join(notes),
+            "planner": "deterministic"
+        }
+
+    @staticmethod
+    def default_focus(sprint: Dict[str, Any], tasks_by_id: Dict[str, Dict[str, Any]]) -> str:
+        """LLM kullanılmadığında sprint odağını görev departmanlarından üretir."""
+        departments: Dict[str, int] = {}
+        for task_id in sprint["tasks"]:
+            department = tasks_by_id.get(task_id, {}).get("department") or "Genel"
+            departments[department] = departments.get(department, 0) + 1
+        if not departments:
+            return ""
+        summary = ", ".join(f"{name} ({count})" for name, count in sorted(departments.items(), key=lambda x: (-x[1], x[0])))
+        return f"{len(sprint['tasks'])} görev, {sprint['planned_hours']:.0f} saat: {summary}"
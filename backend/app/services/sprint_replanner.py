@@ -0,0 +1,363 @@
+import copy
+import datetime
+import heapq
+from typing import Dict, Any, List, Optional, Tuple
+
+from app.services.sprint_planner import (
+    SprintPlanner, FOCUS_HOURS_PER_DAY, parse_date, parse_estimated_hours, task_title
+)
+
+# Desteklenen revizyon olayları
+EVENT_TYPES = {"employee_unavailable", "task_slipped", "scope_removed", "schedule_slipped", "sprint_added"}
+
+
+class SprintReplanner:
+    """
+    Deterministik sprint planını olaylara göre yerel olarak revize eder.
+
+    Yalnızca etkilenen sprint'ler yeniden dengelenir: kapasiteye sığan görevler yerinde
+    kalır, sığmayanlar (ve onlara bağımlı görevler) bir sonraki sprint'e kayar.
+    Sonuç olarak güncellenmiş plan ile birlikte minimal bir fark (diff) döner.
+
+    Olay formatları:
+        {"type": "employee_unavailable", "employee_id": "emp_1" | None, "start_date": "YYYY-MM-DD", "end_date": "YYYY-MM-DD"}
+        {"type": "task_slipped", "task_id": "task_1", "days": 3}
+        {"type": "scope_removed", "task_ids": ["task_1", "task_2"]}
+        {"type": "schedule_slipped", "days": 3}
+        {"type": "sprint_added", "count": 1}
+    """
+    def __init__(self, company_data: Optional[Dict[str, Any]], hours_per_day: float = FOCUS_HOURS_PER_DAY):
+        self.planner = SprintPlanner(company_data, hours_per_day)
+        self.hours_per_day = hours_per_day
+
+    @staticmethod
+    def events_from_legacy(vacation_days: int, delays: int, today: datetime.date) -> List[Dict[str, Any]]:
+        """Eski `vacation_days` / `delays` parametrelerini olaylara çevirir."""
+        events = []
+        if vacation_days and vacation_days > 0:
+            events.append({
+                "type": "employee_unavailable",
+                "employee_id": None,
+                "start_date": today.isoformat(),
+                "end_date": (today + datetime.timedelta(days=vacation_days - 1)).isoformat()
+            })
+        if delays and delays > 0:
+            events.append({"type": "schedule_slipped", "days": delays})
+        return events
+
+    @staticmethod
+    def validate_events(events: List[Dict[str, Any]]):
+        for event in events:
+            event_type = event.get("type")
+            if event_type not in EVENT_TYPES:
+                raise ValueError(f"Desteklenmeyen revizyon olayı: {event_type}")
+            if event_type == "employee_unavailable" and not parse_date(event.get("start_date")):
+                raise ValueError("employee_unavailable olayı için start_date gerekli")
+            if event_type == "task_slipped" and not event.get("task_id"):
+                raise ValueError("task_slipped olayı için task_id gerekli")
+
+    # --- OLAY GEÇMİŞİ ---
+
+    @staticmethod
+    def _excluded_days(history: List[Dict[str, Any]]) -> Dict[Optional[str], set]:
+        """Geçmişteki izin olaylarını çalışan başına gün kümesine çevirir."""
+        excluded: Dict[Optional[str], set] = {}
+        for event in history:
+            if event.get("type") != "employee_unavailable":
+                continue
+            start = parse_date(event.get("start_date"))
+            end = parse_date(event.get("end_date")) or start
+            days = excluded.setdefault(event.get("employee_id"), set())
+            current = start
+            while current <= end:
+                days.add(current)
+                current += datetime.timedelta(days=1)
+        return excluded
+
+    def _extra_hours(self, history: List[Dict[str, Any]]) -> Dict[str, float]:
+        """Geçmişteki gecikme olaylarını görev başına ek efora çevirir."""
+        extra: Dict[str, float] = {}
+        for event in history:
+            if event.get("type") == "task_slipped":
+                task_id = event["task_id"]
+                extra[task_id] = extra.get(task_id, 0.0) + max(0, int(event.get("days", 0))) * self.hours_per_day
+        return extra
+
+    # --- REVİZYON ---
+
+    def replan(self, plan: Dict[str, Any], tasks: List[Dict[str, Any]], events: List[Dict[str, Any]],
+               today: Optional[datetime.date] = None) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+        """
+        Args:
+            plan: Mevcut deterministik plan (`planner` == "deterministic")
+            tasks: Proje görevleri
+            events: Uygulanacak olaylar
+
+        Returns:
+            (yeni plan, diff)
+        """
+        self.validate_events(events)
+        today = today or datetime.date.today()
+        plan = copy.deepcopy(plan)
+        sprints = plan.get("sprints", [])
+        tasks_by_id = {t["task_id"]: t for t in tasks if t.get("task_id")}
+
+        diff = {
+            "tasks_moved": [],
+            "tasks_removed": [],
+            "sprints_added": [],
+            "sprints_removed": [],
+            "sprint_dates_changed": [],
+            "task_dates_changed": []
+        }
+        if not sprints:
+            return plan, diff
+
+        current = next(
+            (i for i, sp in enumerate(sprints) if (parse_date(sp.get("end_date")) or today) > today),
+            len(sprints) - 1
+        )
+        sprint_of = {task_id: i for i, sp in enumerate(sprints) for task_id in sp.get("tasks", [])}
+        touched = set()
+        rebalance_from = None
+        kept_sprints = 0
+
+        for event in events:
+            event_type = event["type"]
+
+            if event_type == "employee_unavailable":
+                start = parse_date(event["start_date"])
+                end = parse_date(event.get("end_date")) or start
+                overlapping = [
+                    i for i, sp in enumerate(sprints)
+                    if i >= current and parse_date(sp["start_date"]) <= end and parse_date(sp["end_date"]) > start
+                ]
+                if overlapping:
+                    rebalance_from = min(rebalance_from if rebalance_from is not None else overlapping[0], overlapping[0])
+
+            elif event_type == "task_slipped":
+                task_id = event["task_id"]
+                if task_id in sprint_of:
+                    index = max(sprint_of[task_id], current)
+                    rebalance_from = index if rebalance_from is None else min(rebalance_from, index)
+                diff["task_dates_changed"].extend(
+                    self._shift_task_dates(tasks_by_id, task_id, int(event.get("days", 0)))
+                )
+
+            elif event_type == "scope_removed":
+                for task_id in event.get("task_ids", []):
+                    index = sprint_of.pop(task_id, None)
+                    if index is None:
+                        continue
+                    sprints[index]["tasks"].remove(task_id)
+                    touched.add(index)
+                    diff["tasks_removed"].append(task_id)
+
+            elif event_type == "schedule_slipped":
+                days = int(event.get("days", 0))
+                for sp in sprints[current:]:
+                    old_start, old_end = sp["start_date"], sp["end_date"]
+                    sp["start_date"] = (parse_date(old_start) + datetime.timedelta(days=days)).isoformat()
+                    sp["end_date"] = (parse_date(old_end) + datetime.timedelta(days=days)).isoformat()
+                    diff["sprint_dates_changed"].append({
+                        "sprint_number": sp["sprint_number"],
+                        "old_start_date": old_start, "new_start_date": sp["start_date"],
+                        "old_end_date": old_end, "new_end_date": sp["end_date"]
+                    })
+                # Kaydırılan sprint'ler yeni tarihlerdeki kapasiteye göre yeniden kontrol edilir
+                rebalance_from = current if rebalance_from is None else min(rebalance_from, current)
+
+            elif event_type == "sprint_added":
+                # Açıkça eklenen sprint'ler boş kalsa da planda tutulur (teslim tarihi uzatılır)
+                for _ in range(max(1, int(event.get("count", 1)))):
+                    self._append_sprint(plan)
+                    touched.add(len(sprints) - 1)
+                    diff["sprints_added"].append({
+                        "sprint_number": sprints[-1]["sprint_number"],
+                        "start_date": sprints[-1]["start_date"],
+                        "end_date": sprints[-1]["end_date"]
+                    })
+                kept_sprints = len(sprints)
+                rebalance_from = current if rebalance_from is None else min(rebalance_from, current)
+
+        history = plan.get("replan_events", []) + [
+            {**event, "applied_at": today.isoformat()} for event in events
+        ]
+        extra_hours = self._extra_hours(history)
+
+        if rebalance_from is not None:
+            before = dict(sprint_of)
+            touched |= self._rebalance(plan, tasks_by_id, rebalance_from, self._excluded_days(history), extra_hours, diff)
+            after = {task_id: i for i, sp in enumerate(plan["sprints"]) for task_id in sp.get("tasks", [])}
+            for task_id, index in after.items():
+                if before.get(task_id, index) != index:
+                    diff["tasks_moved"].append({
+                        "task_id": task_id,
+                        "title": task_title(tasks_by_id.get(task_id, {"task_id": task_id})),
+                        "from_sprint": plan["sprints"][before[task_id]]["sprint_number"],
+                        "to_sprint": plan["sprints"][index]["sprint_number"]
+                    })
+
+        # Sondaki boş sprint'ler kaldırılır
+        sprints = plan["sprints"]
+        while len(sprints) > max(current + 1, kept_sprints) and not sprints[-1]["tasks"]:
+            diff["sprints_removed"].append(sprints.pop()["sprint_number"])
+            touched.discard(len(sprints))
+
+        for index in touched:
+            if index < len(sprints):
+                self._refresh_sprint(sprints[index], tasks_by_id, extra_hours)
+
+        plan["total_sprints"] = len(sprints)
+        plan["replan_events"] = history
+        plan["revision_summary"] = {
+            "tasks_moved": len(diff["tasks_moved"]),
+            "sprints_added": len(diff["sprints_added"]),
+            "reason": ", ".join(sorted({e["type"] for e in events}))
+        }
+        return plan, diff
+
+    def _rebalance(self, plan: Dict[str, Any], tasks_by_id: Dict[str, Dict[str, Any]], from_index: int,
+                   excluded_days: Dict[Optional[str], set], extra_hours: Dict[str, float],
+                   diff: Dict[str, Any]) -> set:
+        """
+        from_index'ten itibaren sprint'leri sırayla kontrol eder; sığmayan görevleri
+        bir sonraki sprint'e taşır. Değişen sprint indekslerini döndürür.
+        """
+        sprints = plan["sprints"]
+        sprint_of = {task_id: i for i, sp in enumerate(sprints) for task_id in sp.get("tasks", [])}
+        max_sprints = len(sprints) + len(tasks_by_id) + 12
+        touched = set()
+        carry: List[str] = []
+        index = from_index
+
+        while index < len(sprints) or carry:
+            if index >= len(sprints):
+                self._append_sprint(plan)
+                diff["sprints_added"].append({
+                    "sprint_number": sprints[-1]["sprint_number"],
+                    "start_date": sprints[-1]["start_date"],
+                    "end_date": sprints[-1]["end_date"]
+                })
+
+            sprint = sprints[index]
+            capacity = self.planner.sprint_capacity(
+                parse_date(sprint["start_date"]), parse_date(sprint["end_date"]), excluded_days
+            )
+            queue = carry + sprint["tasks"]
+            carry, kept, used = [], [], False
+            force = index >= max_sprints - 1
+
+            for task_id in queue:
+                task = tasks_by_id.get(task_id)
+                if task is None:
+                    kept.append(task_id)
+                    continue
+                hours = parse_estimated_hours(task.get("estimated_hours")) + extra_hours.get(task_id, 0.0)
+                pool = self.planner.task_pool(task)
+                free = sum(capacity[member] for member in pool)
+                deps_ready = all(sprint_of.get(dep, -1) <= index for dep in (task.get("dependencies") or []))
+                if force or (deps_ready and (free >= hours or (not used and free > 0))):
+                    self.planner.consume(capacity, pool, hours)
+                    kept.append(task_id)
+                    sprint_of[task_id] = index
+                    used = True
+                else:
+                    carry.append(task_id)
+                    sprint_of[task_id] = index + 1
+
+            if kept != sprint["tasks"]:
+                touched.add(index)
+            sprint["tasks"] = kept
+            index += 1
+
+        return touched
+
+    @staticmethod
+    def _append_sprint(plan: Dict[str, Any]):
+        last = plan["sprints"][-1]
+        duration_weeks = last.get("duration_weeks", plan.get("sprint_duration_weeks", 2))
+        start = parse_date(last["end_date"])
+        number = last["sprint_number"] + 1
+        plan["sprints"].append({
+            "sprint_number": number,
+            "sprint_name": f"Sprint {number}",
+            "duration_weeks": duration_weeks,
+            "start_date": start.isoformat(),
+            "end_date": (start + datetime.timedelta(weeks=duration_weeks)).isoformat(),
+            "tasks": [],
+            "task_titles": [],
+            "planned_hours": 0.0,
+            "capacity_hours": 0.0,
+            "focus": ""
+        })
+
+    def _refresh_sprint(self, sprint: Dict[str, Any], tasks_by_id: Dict[str, Dict[str, Any]],
+                        extra_hours: Dict[str, float]):
+        """Görev listesi değişen sprint'in özet alanlarını yeniden hesaplar."""
+        sprint["task_titles"] = [task_title(tasks_by_id.get(t, {"task_id": t})) for t in sprint["tasks"]]
+        sprint["planned_hours"] = round(sum(
+            parse_estimated_hours(tasks_by_id.get(t, {}).get("estimated_hours")) + extra_hours.get(t, 0.0)
+            for t in sprint["tasks"]
+        ), 1)
+        capacity = self.planner.sprint_capacity(parse_date(sprint["start_date"]), parse_date(sprint["end_date"]))
+        sprint["capacity_hours"] = round(sum(capacity.values()), 1)
+        sprint["focus"] = SprintPlanner.default_focus(sprint, tasks_by_id)
+
+    @staticmethod
+    def _shift_task_dates(tasks_by_id: Dict[str, Dict[str, Any]], task_id: str, days: int) -> List[Dict[str, Any]]:
+        """
+        Geciken görevin bitiş tarihini kaydırır ve tarihi olan bağımlı görevleri
+        yalnızca çakışma kadar ileri iter.
+        """
+        changes = []
+        task = tasks_by_id.get(task_id)
+        if not task or days <= 0 or not parse_date(task.get("due_date")):
+            return changes
+
+        dependents: Dict[str, List[str]] = {}
+        for other in tasks_by_id.values():
+            for dep in other.get("dependencies") or []:
+                dependents.setdefault(dep, []).append(other["task_id"])
+
+        old_due = task["due_date"]
+        task["due_date"] = (parse_date(old_due) + datetime.timedelta(days=days)).isoformat()
+        changes.append({"task_id": task_id, "start_date": task.get("start_date"), "due_date": task["due_date"],
+                        "old_due_date": old_due})
+
+        # Bağımlılık sırasıyla ilerlenir; her görev bir kez işlenir (döngüdeki görevler sonsuza dek itilmez)
+        ordered, _ = SprintPlanner.order_tasks([t for t in tasks_by_id.values() if t.get("task_id")])
+        position = {t["task_id"]: i for i, t in enumerate(ordered)}
+        queue = [(position.get(task_id, -1), task_id)]
+        visited = {task_id}
+        processed = set()
+        while queue:
+            parent = tasks_by_id[heapq.heappop(queue)[1]]
+            processed.add(parent["task_id"])
+            parent_due = parse_date(parent.get("due_date"))
+            for child_id in dependents.get(parent["task_id"], []):
+                if child_id in processed:
+                    continue
+                child = tasks_by_id[child_id]
+                child_start = parse_date(child.get("start_date"))
+                if not parent_due or not child_start or child_start > parent_due:
+                    continue
+                shift = (parent_due - child_start).days + 1
+                old_start, old_child_due = child["start_date"], child.get("due_date")
+                child["start_date"] = (child_start + datetime.timedelta(days=shift)).isoformat()
+                if parse_date(old_child_due):
+                    child["due_date"] = (parse_date(old_child_due) + datetime.timedelta(days=shift)).isoformat()
+                changes.append({"task_id": child_id, "start_date": child["start_date"], "due_date": child.get("due_date"),
+                                "old_start_date": old_start, "old_due_date": old_child_due})
+                if child_id not in visited:
+                    visited.add(child_id)
+                    heapq.heappush(queue, (position.get(child_id, len(position)), child_id))
+
+        # Aynı görev birden fazla kez itildiyse ilk eski tarih ile son yeni tarih tutulur
+        merged: Dict[str, Dict[str, Any]] = {}
+        for change in changes:
+            if change["task_id"] in merged:
+                merged[change["task_id"]].update({"start_date": change["start_date"], "due_date": change["due_date"]})
+            else:
+                merged[change["task_id"]] = change
+        return list(merged.values())
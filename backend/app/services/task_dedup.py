@@ -0,0 +1,196 @@
+import hashlib
+from typing import Dict, Any, List, Optional, Tuple
+
+import numpy as np
+
+from app.config import TASK_DEDUP_THRESHOLD, TASK_DEDUP_MODE
+from app.services.clause_index import tokenize
+from app.services.sprint_planner import DUPLICATE_STATUS
+
+# MinHash imza uzunluğu ve LSH bantları (32 bant x 4 satır; ~0.4 benzerlikte aday üretir)
+NUM_PERM = 128
+LSH_BANDS = 32
+
+# Benzerlikte başlığın ağırlığı; geri kalanı detaydan gelir (detayı olmayan görevlerde yalnızca başlık)
+TITLE_WEIGHT = 0.6
+
+MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+MAX_HASH = np.uint64((1 << 32) - 1)
+
+_rng = np.random.RandomState(1)
+PERM_A = _rng.randint(1, int(MERSENNE_PRIME), size=NUM_PERM, dtype=np.uint64)
+PERM_B = _rng.randint(0, int(MERSENNE_PRIME), size=NUM_PERM, dtype=np.uint64)
+
+PRIORITY_RANK = {"critical": 0, "high": 1, "medium": 2, "low": 3}
+
+
+def _title(task: Dict[str, Any]) -> str:
+    return task.get("task_title", task.get("title", "")) or ""
+
+
+def _detail(task: Dict[str, Any]) -> str:
+    return task.get("task_detail", task.get("detail", "")) or ""
+
+
+def shingles(text: str) -> set:
+    """
+    Kelime tekli ve ikilileri (Türkçe karakter katlama, durak kelime eleme ve önek kökleme ile).
+    Karakter shingle'ları yerine kelime kullanılır: "ödeme modülü testleri" ile "kullanıcı modülü
+    testleri" ortak harf dizilerinde çok benzer görünür, ayırt edici kelimede ayrışır.
+    """
+    tokens = tokenize(text)
+    return set(tokens) | {f"{a} {b}" for a, b in zip(tokens, tokens[1:])}
+
+
+def minhash(shingle_set: set) -> np.ndarray:
+    """Shingle kümesinin MinHash imzası (NUM_PERM uzunluğunda)."""
+    if not shingle_set:
+        return np.full(NUM_PERM, MAX_HASH, dtype=np.uint64)
+    hashes = np.array(
+        [int.from_bytes(hashlib.blake2b(s.encode("utf-8"), digest_size=8).digest(), "little") for s in shingle_set],
+        dtype=np.uint64
+    )
+    # (a*x + b) mod p permütasyonları; uint64 taşması bilinçli (datasketch ile aynı yaklaşım)
+    with np.errstate(over="ignore"):
+        permuted = np.bitwise_and((np.outer(hashes, PERM_A) + PERM_B) % MERSENNE_PRIME, MAX_HASH)
+    return permuted.min(axis=0)
+
+
+def _candidate_pairs(signatures: List[Optional[np.ndarray]]) -> set:
+    """LSH bantlama ile benzer olabilecek imza çiftleri (boş imzalar atlanır)."""
+    rows = NUM_PERM // LSH_BANDS
+    pairs = set()
+    for band in range(LSH_BANDS):
+        buckets: Dict[bytes, List[int]] = {}
+        for i, signature in enumerate(signatures):
+            if signature is not None:
+                buckets.setdefault(signature[band * rows:(band + 1) * rows].tobytes(), []).append(i)
+        for members in buckets.values():
+            for a in range(len(members)):
+                for b in range(a + 1, len(members)):
+                    pairs.add((members[a], members[b]))
+    return pairs
+
+
+def _similarity(a: int, b: int, titles: List[Optional[np.ndarray]], details: List[Optional[np.ndarray]]) -> float:
+    if titles[a] is None or titles[b] is None:
+        return 0.0
+    title_similarity = float(np.mean(titles[a] == titles[b]))
+    if details[a] is None or details[b] is None:
+        return title_similarity
+    detail_similarity = float(np.mean(details[a] == details[b]))
+    return TITLE_WEIGHT * title_similarity + (1 - TITLE_WEIGHT) * detail_similarity
+
+
+def _merge_into(keeper: Dict[str, Any], duplicate: Dict[str, Any]):
+    """Yinelenen görevin kaynağını, teknolojilerini, önceliğini ve süresini tutulan göreve katar."""
+    keeper.setdefault("merged_from", []).append(_title(duplicate))
+
+    sources = [s for s in (keeper.get("source"), duplicate.get("source")) if s]
+    if len(set(sources)) > 1:
+        keeper["source"] = " | ".join(dict.fromkeys(sources))
+
+    stack = keeper.get("task_stack")
+    other = duplicate.get("task_stack")
+    if isinstance(stack, str) and isinstance(other, str):
+        techs = [t.strip() for t in f"{stack},{other}".split(",") if t.strip()]
+        keeper["task_stack"] = ", ".join(dict.fromkeys(techs))
+
+    if PRIORITY_RANK.get(duplicate.get("priority"), 9) < PRIORITY_RANK.get(keeper.get("priority"), 9):
+        keeper["priority"] = duplicate["priority"]
+
+    try:
+        hours = max(float(keeper.get("estimated_hours") or 0), float(duplicate.get("estimated_hours") or 0))
+        if hours:
+            keeper["estimated_hours"] = str(int(hours) if hours.is_integer() else hours)
+    except (TypeError, ValueError):
+        pass
+
+
+def dedupe_tasks(tasks: List[Dict[str, Any]], threshold: float = TASK_DEDUP_THRESHOLD,
+                 mode: str = TASK_DEDUP_MODE,
+                 existing: Optional[List[Dict[str, Any]]] = None) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
+    """
+    Başlık (ağırlıklı) ve detay kelime shingle'larının MinHash benzerliğiyle yakın kopya görevleri bulur.
+
+    Görevler en ayrıntılıdan başlayarak sırayla kümelere yerleşir: her görev yalnızca kümelerin
+    tutulan görevleriyle karşılaştırılır, böylece A~B ve B~C olması A ile C'yi birleştirmez.
+    "flag" modunda görevler korunur, kopyalar `duplicate_of` ve "duplicate" durumuyla işaretlenir
+    (atanmaz, planlanmaz); "merge" modunda kopyalar tutulan göreve katılır ve listeden çıkarılır.
+    `existing` (kayıtlı görevler) verilirse yeni görevler bunlarla da karşılaştırılır; kayıtlı bir
+    görevin kopyası olan yeni görevler moddan bağımsız çıkarılır, kayıtlı görevler hiçbir zaman çıkarılmaz.
+
+    Returns:
+        (görevler, {"removed", "flagged", "removed_task_ids", "groups"})
+    """
+    existing = existing or []
+    pool = existing + tasks
+    report = {"removed": 0, "flagged": 0, "removed_task_ids": [], "groups": []}
+    if not tasks or len(pool) < 2 or threshold <= 0:
+        return tasks, report
+
+    def signature(text: str) -> Optional[np.ndarray]:
+        shingle_set = shingles(text)
+        return minhash(shingle_set) if shingle_set else None
+
+    titles = [signature(_title(t)) for t in pool]
+    details = [signature(_detail(t)) for t in pool]
+
+    neighbours: Dict[int, set] = {}
+    for a, b in _candidate_pairs(titles) | _candidate_pairs(details):
+        neighbours.setdefault(a, set()).add(b)
+        neighbours.setdefault(b, set()).add(a)
+
+    # Kayıtlı görevler her zaman tutulur; yeni görevlerden en ayrıntılısı önce yerleşir
+    order = list(range(len(existing))) + sorted(
+        range(len(existing), len(pool)),
+        key=lambda i: -len(_title(pool[i]) + _detail(pool[i]))
+    )
+    keepers: List[int] = []
+    members: Dict[int, List[Tuple[int, float]]] = {}
+    for i in order:
+        best, best_similarity = None, threshold
+        if i >= len(existing):
+            for keeper in keepers:
+                if keeper not in neighbours.get(i, ()):
+                    continue
+                similarity = _similarity(i, keeper, titles, details)
+                if similarity >= best_similarity:
+                    best, best_similarity = keeper, similarity
+        if best is None:
+            keepers.append(i)
+            members[i] = []
+        else:
+            members[best].append((i, best_similarity))
+
+    removed = set()
+    for keeper in keepers:
+        duplicates = members[keeper]
+        if not duplicates:
+            continue
+        anchored = keeper < len(existing)
+        keeper_title = _title(pool[keeper])
+        report["groups"].append({
+            "kept": keeper_title,
+            "duplicates": [_title(pool[i]) for i, _ in duplicates],
+            "similarity": round(max(s for _, s in duplicates), 2),
+            "existing": anchored
+        })
+
+        for i, _ in duplicates:
+            if mode == "flag" and not anchored:
+                pool[i]["duplicate_of"] = pool[keeper].get("task_id") or keeper_title
+                pool[i]["status"] = DUPLICATE_STATUS
+                report["flagged"] += 1
+                continue
+            if not anchored:
+                _merge_into(pool[keeper], pool[i])
+            removed.add(i)
+            if pool[i].get("task_id"):
+                report["removed_task_ids"].append(pool[i]["task_id"])
+
+    report["removed"] = len(removed)
+    if report["removed"] or report["flagged"]:
+        print(f"[Task Dedup] {len(tasks)} görevden {report['removed']} çıkarıldı, {report['flagged']} işaretlendi")
+    kept = [t for i, t in enumerate(pool) if i >= len(existing) and i not in removed]
+    return kept, report
@@ -0,0 +1,335 @@
+import datetime
+import threading
+from typing import Dict, Any, List, Optional, Set
+
+from app.services.sprint_planner import (
+    SprintPlanner, FOCUS_HOURS_PER_DAY, DONE_STATUSES, EXCLUDED_STATUSES,
+    parse_date, parse_estimated_hours, task_title
+)
+
+# Bolluk karşılaştırmalarında kayan nokta toleransı (iş günü)
+SLACK_EPSILON = 1e-6
+
+# Grafiğin yapısını değiştiren alanlar (artımlı güncelleme yerine yeniden kurulum gerekir)
+STRUCTURAL_FIELDS = {"dependencies", "task_id"}
+
+
+def add_working_days(start: datetime.date, days: float) -> datetime.date:
+    """Başlangıca (kesirli ise yukarı yuvarlanan) iş günü ekler; hafta sonları atlanır."""
+    remaining = int(-(-days // 1)) if days > 0 else 0
+    current = start
+    while current.weekday() >= 5:
+        current += datetime.timedelta(days=1)
+    while remaining > 0:
+        current += datetime.timedelta(days=1)
+        if current.weekday() < 5:
+            remaining -= 1
+    return current
+
+
+def count_working_days(start: datetime.date, end: datetime.date) -> int:
+    """[start, end) aralığındaki iş günü sayısı."""
+    if end <= start:
+        return 0
+    full_weeks, extra = divmod((end - start).days, 7)
+    count = full_weeks * 5
+    for offset in range(extra):
+        if (start + datetime.timedelta(days=full_weeks * 7 + offset)).weekday() < 5:
+            count += 1
+    return count
+
+
+class TaskGraph:
+    """
+    Proje görevlerinin bağımlılık grafiği (DAG) ve kritik yol (CPM) hesabı.
+
+    Süreler iş günü cinsindendir (`estimated_hours` / günlük odak saati); tamamlanan ve iptal
+    edilen görevlerin süresi sıfırdır. İleri tarihli `start_date`, görev için "bundan önce
+    başlayamaz" alt sınırı olarak uygulanır. Döngüdeki görevler sıralamanın sonuna eklenir ve
+    sıralamaya ters düşen kenarlar hesaplamada yok sayılır.
+    """
+    def __init__(self, tasks: List[Dict[str, Any]], hours_per_day: float = FOCUS_HOURS_PER_DAY,
+                 start_date: Optional[datetime.date] = None):
+        self.hours_per_day = hours_per_day
+        self.start_date = start_date or datetime.date.today()
+        self.tasks: Dict[str, Dict[str, Any]] = {}
+        self._build([t for t in tasks if t.get("task_id")])
+
+    # --- KURULUM ---
+
+    def _build(self, tasks: List[Dict[str, Any]]):
+        self.tasks = {t["task_id"]: dict(t) for t in tasks}
+        ordered, leftover = SprintPlanner.order_tasks(list(self.tasks.values()))
+        self.order: List[str] = [t["task_id"] for t in ordered]
+        self.position: Dict[str, int] = {task_id: i for i, task_id in enumerate(self.order)}
+        self.cycles: List[List[str]] = self._find_cycles(leftover)
+
+        # Yalnızca sıralamaya uyan kenarlar hesaba katılır (döngüler kırılır)
+        self.predecessors: Dict[str, List[str]] = {task_id: [] for task_id in self.order}
+        self.successors: Dict[str, List[str]] = {task_id: [] for task_id in self.order}
+        for task_id in self.order:
+            for dep_id in dict.fromkeys(self.tasks[task_id].get("dependencies") or []):
+                if dep_id in self.position and self.position[dep_id] < self.position[task_id]:
+                    self.predecessors[task_id].append(dep_id)
+                    self.successors[dep_id].append(task_id)
+
+        self.duration: Dict[str, float] = {}
+        self.floor: Dict[str, float] = {}
+        for task_id in self.order:
+            self._load_task_inputs(task_id)
+
+        self.es: Dict[str, float] = {}
+        self.ef: Dict[str, float] = {}
+        self.ls: Dict[str, float] = {}
+        self.lf: Dict[str, float] = {}
+        self._forward(self.order)
+        self.project_end = max(self.ef.values(), default=0.0)
+        self._backward(reversed(self.order))
+
+    def _load_task_inputs(self, task_id: str):
+        """Görevin süresini (iş günü) ve başlangıç alt sınırını hesaplar."""
+        task = self.tasks[task_id]
+        if task.get("status") in EXCLUDED_STATUSES:
+            self.duration[task_id] = 0.0
+        else:
+            self.duration[task_id] = parse_estimated_hours(task.get("estimated_hours")) / self.hours_per_day
+        planned_start = parse_date(task.get("start_date"))
+        if planned_start and planned_start > self.start_date and task.get("status") not in DONE_STATUSES:
+            self.floor[task_id] = float(count_working_days(self.start_date, planned_start))
+        else:
+            self.floor[task_id] = 0.0
+
+    def _find_cycles(self, leftover: List[str]) -> List[List[str]]:
+        """Sıralanamayan görevler arasındaki döngüleri (güçlü bağlı bileşenler) bulur."""
+        nodes = set(leftover)
+        graph = {
+            task_id: [d for d in (self.tasks[task_id].get("dependencies") or []) if d in nodes and d != task_id]
+            for task_id in leftover
+        }
+        index: Dict[str, int] = {}
+        low: Dict[str, int] = {}
+        stack: List[str] = []
+        on_stack: Set[str] = set()
+        cycles: List[List[str]] = []
+        counter = 0
+
+        # Özyinelemesiz Tarjan algoritması
+        for root in leftover:
+            if root in index:
+                continue
+            work = [(root, iter(graph[root]))]
+            index[root] = low[root] = counter
+            counter += 1
+            stack.append(root)
+            on_stack.add(root)
+            while work:
+                node, children = work[-1]
+                child = next(children, None)
+                if child is not None:
+                    if child not in index:
+                        index[child] = low[child] = counter
+                        counter += 1
+                        stack.append(child)
+                        on_stack.add(child)
+                        work.append((child, iter(graph[child])))
+                    elif child in on_stack:
+                        low[node] = min(low[node], index[child])
+                    continue
+                work.pop()
+                if work:
+                    parent = work[-1][0]
+                    low[parent] = min(low[parent], low[node])
+                if low[node] == index[node]:
+                    component = []
+                    while True:
+                        member = stack.pop()
+                        on_stack.discard(member)
+                        component.append(member)
+                        if member == node:
+                            break
+                    if len(component) > 1:
+                        cycles.append(sorted(component))
+        return cycles
+
+    # --- CPM GEÇİŞLERİ ---
+
+    def _forward(self, task_ids):
+        for task_id in task_ids:
+            start = self.floor[task_id]
+            for dep_id in self.predecessors[task_id]:
+                start = max(start, self.ef[dep_id])
+            self.es[task_id] = start
+            self.ef[task_id] = start + self.duration[task_id]
+
+    def _backward(self, task_ids):
+        for task_id in task_ids:
+            finish = min((self.ls[s] for s in self.successors[task_id]), default=self.project_end)
+            self.lf[task_id] = finish
+            self.ls[task_id] = finish - self.duration[task_id]
+
+    def _reachable(self, task_id: str, edges: Dict[str, List[str]]) -> Set[str]:
+        seen = {task_id}
+        queue = [task_id]
+        while queue:
+            current = queue.pop()
+            for nxt in edges[current]:
+                if nxt not in seen:
+                    seen.add(nxt)
+                    queue.append(nxt)
+        return seen
+
+    # --- ARTIMLI GÜNCELLEME ---
+
+    def update_task(self, task_id: str, changes: Dict[str, Any]) -> Set[str]:
+        """
+        Görevdeki değişikliği grafiğe uygular ve yalnızca etkilenen görevleri yeniden hesaplar.
+
+        Süre veya başlangıç değişince torunların ES/EF'i, görevin kendisi ve atalarının LS/LF'i
+        güncellenir; proje bitişi değişirse geri geçiş tüm grafikte yapılır. Bağımlılık
+        değişiklikleri veya bilinmeyen görevler grafiği yeniden kurar.
+
+        Returns:
+            Zamanlaması yeniden hesaplanan görev ID'leri
+        """
+        if task_id not in self.tasks or STRUCTURAL_FIELDS & set(changes):
+            if task_id in self.tasks:
+                self.tasks[task_id].update(changes)
+                tasks = list(self.tasks.values())
+            else:
+                tasks = list(self.tasks.values()) + [{"task_id": task_id, **changes}]
+            self._build(tasks)
+            return set(self.order)
+
+        self.tasks[task_id].update(changes)
+        old_duration, old_floor = self.duration[task_id], self.floor[task_id]
+        self._load_task_inputs(task_id)
+        if self.duration[task_id] == old_duration and self.floor[task_id] == old_floor:
+            return set()
+
+        descendants = self._reachable(task_id, self.successors)
+        self._forward(sorted(descendants, key=self.position.__getitem__))
+
+        old_end = self.project_end
+        self.project_end = max(self.ef.values(), default=0.0)
+        if abs(self.project_end - old_end) > SLACK_EPSILON:
+            self._backward(reversed(self.order))
+            return set(self.order)
+
+        ancestors = self._reachable(task_id, self.predecessors)
+        self._backward(sorted(ancestors, key=self.position.__getitem__, reverse=True))
+        return descendants | ancestors
+
+    # --- SONUÇLAR ---
+
+    def slack(self, task_id: str) -> float:
+        return max(0.0, self.ls[task_id] - self.es[task_id])
+
+    def is_critical(self, task_id: str) -> bool:
+        task = self.tasks[task_id]
+        return task.get("status") not in EXCLUDED_STATUSES and self.slack(task_id) <= SLACK_EPSILON
+
+    def critical_path(self) -> List[str]:
+        """Proje bitişini belirleyen görev zinciri (baştan sona)."""
+        open_ids = [t for t in self.order if self.tasks[t].get("status") not in EXCLUDED_STATUSES]
+        if not open_ids:
+            return []
+        current = max(open_ids, key=lambda t: (self.ef[t], -self.position[t]))
+        path = [current]
+        while True:
+            previous = [
+                d for d in self.predecessors[current]
+                if self.is_critical(d) and abs(self.ef[d] - self.es[current]) <= SLACK_EPSILON
+            ]
+            if not previous:
+                break
+            current = min(previous, key=self.position.__getitem__)
+            path.append(current)
+        path.reverse()
+        return path
+
+    def _task_entry(self, task_id: str) -> Dict[str, Any]:
+        task = self.tasks[task_id]
+        return {
+            "task_id": task_id,
+            "title": task_title(task),
+            "status": task.get("status", "pending"),
+            "dependencies": self.predecessors[task_id],
+            "duration_days": round(self.duration[task_id], 2),
+            "earliest_start": round(self.es[task_id], 2),
+            "earliest_finish": round(self.ef[task_id], 2),
+            "latest_start": round(self.ls[task_id], 2),
+            "latest_finish": round(self.lf[task_id], 2),
+            "slack_days": round(self.slack(task_id), 2),
+            "is_critical": self.is_critical(task_id),
+            "earliest_start_date": add_working_days(self.start_date, self.es[task_id]).isoformat(),
+            "latest_finish_date": add_working_days(self.start_date, self.lf[task_id]).isoformat()
+        }
+
+    def to_dict(self) -> Dict[str, Any]:
+        path = self.critical_path()
+        return {
+            "start_date": self.start_date.isoformat(),
+            "project_duration_days": round(self.project_end, 2),
+            "projected_end_date": add_working_days(self.start_date, self.project_end).isoformat(),
+            "critical_path": [self._task_entry(task_id) for task_id in path],
+            "critical_path_days": round(sum(self.duration[t] for t in path), 2),
+            "topological_order": self.order,
+            "cycles": self.cycles,
+            "tasks": [self._task_entry(task_id) for task_id in self.order]
+        }
+
+
+class TaskGraphRegistry:
+    """
+    Proje başına TaskGraph önbelleği.
+
+    Veritabanının görev değişikliği bildirimlerini dinler; tarih/durum değişikliklerini
+    önbellekteki grafiğe artımlı uygular, toplu kayıtlarda grafiği geçersiz kılar.
+    """
+    def __init__(self, hours_per_day: float = FOCUS_HOURS_PER_DAY):
+        self.hours_per_day = hours_per_day
+        self._graphs: Dict[str, TaskGraph] = {}
+        self._lock = threading.Lock()
+        self._attached = False
+
+    def attach(self, db_client):
+        """Veritabanı görev bildirimlerine bir kez abone olur (dinleyiciler tüm istemcilerde ortaktır)."""
+        with self._lock:
+            if self._attached:
+                return
+            self._attached = True
+        db_client.add_task_listener(self.on_task_changed)
+
+    def get(self, db_client, project_id: str) -> TaskGraph:
+        self.attach(db_client)
+        today = datetime.date.today()
+        with self._lock:
+            graph = self._graphs.get(project_id)
+            # Hesaplar bugüne göre yapıldığından gün değişince grafik yeniden kurulur
+            if graph is not None and graph.start_date == today:
+                return graph
+        graph = TaskGraph(db_client.get_tasks(project_id), self.hours_per_day, today)
+        with self._lock:
+            self._graphs[project_id] = graph
+        print(f"[TaskGraph] Grafik kuruldu: {project_id}, {len(graph.order)} görev")
+        return graph
+
+    def invalidate(self, project_id: str):
+        with self._lock:
+            self._graphs.pop(project_id, None)
+
+    def on_task_changed(self, project_id: str, task_id: Optional[str], changes: Optional[Dict[str, Any]]):
+        """Görev değişikliği bildirimi; task_id None ise proje grafiği geçersiz kılınır."""
+        with self._lock:
+            graph = self._graphs.get(project_id)
+            if graph is None:
+                return
+            if task_id is None or changes is None:
+                self._graphs.pop(project_id, None)
+                return
+            updated = graph.update_task(task_id, changes)
+        if updated:
+            print(f"[TaskGraph] Artımlı güncelleme: {project_id}/{task_id}, {len(updated)} görev yeniden hesaplandı")
+
+
+task_graph_registry = TaskGraphRegistry()
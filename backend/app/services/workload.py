@@ -0,0 +1,99 @@
+from typing import Dict, Any, List, Optional
+
+from app.services.sprint_planner import FOCUS_HOURS_PER_DAY, EXCLUDED_STATUSES, parse_estimated_hours
+
+# Sayaç alanları (employee_workload/{employee_id} belgesi)
+WORKLOAD_FIELDS = ("open_tasks", "remaining_hours", "critical_tasks")
+
+# Kritik sayılan görev öncelikleri
+CRITICAL_PRIORITIES = {"critical", "high"}
+
+# İş yükü seviyesinin ölçüldüğü kapasite penceresi (iş günü, iki haftalık sprint)
+WORKLOAD_WINDOW_DAYS = 10
+
+# Kalan saat / pencere kapasitesi oranına göre seviye eşikleri
+WORKLOAD_THRESHOLDS = (("low", 0.5), ("medium", 1.0))
+
+
+def task_contribution(task: Optional[Dict[str, Any]]) -> Optional[tuple]:
+    """
+    Görevin sorumlusunun iş yüküne katkısı: (employee_id, {alan: değer}).
+    Tamamlanan/iptal edilen veya atanmamış görevler katkı yapmaz.
+    """
+    if not task or task.get("status") in EXCLUDED_STATUSES:
+        return None
+    employee_id = task.get("assigned_employee_id")
+    if not employee_id:
+        return None
+    return employee_id, {
+        "open_tasks": 1,
+        "remaining_hours": parse_estimated_hours(task.get("estimated_hours")),
+        "critical_tasks": 1 if task.get("priority") in CRITICAL_PRIORITIES else 0
+    }
+
+
+def workload_deltas(old_task: Optional[Dict[str, Any]], new_task: Optional[Dict[str, Any]],
+                    deltas: Optional[Dict[str, Dict[str, float]]] = None) -> Dict[str, Dict[str, float]]:
+    """
+    Görevin eski ve yeni hali arasındaki sayaç farklarını `deltas` içinde biriktirir.
+
+    Returns:
+        {employee_id: {alan: fark}} (sıfır farklar dahil edilmez)
+    """
+    deltas = {} if deltas is None else deltas
+    for contribution, sign in ((task_contribution(old_task), -1), (task_contribution(new_task), 1)):
+        if contribution is None:
+            continue
+        employee_id, values = contribution
+        employee_deltas = deltas.setdefault(employee_id, {})
+        for field, value in values.items():
+            employee_deltas[field] = employee_deltas.get(field, 0) + sign * value
+    for employee_id in list(deltas):
+        deltas[employee_id] = {f: v for f, v in deltas[employee_id].items() if v}
+        if not deltas[employee_id]:
+            del deltas[employee_id]
+    return deltas
+
+
+def count_workloads(tasks: List[Dict[str, Any]]) -> Dict[str, Dict[str, float]]:
+    """Görev listesinden sayaçları baştan hesaplar (yeniden kurulum için)."""
+    counters: Dict[str, Dict[str, float]] = {}
+    for task in tasks:
+        workload_deltas(None, task, counters)
+    return counters
+
+
+def workload_level(counters: Optional[Dict[str, Any]], hours_per_day: float = FOCUS_HOURS_PER_DAY) -> str:
+    """Kalan saati iki haftalık odak kapasitesiyle karşılaştırarak low/medium/high döndürür."""
+    remaining = (counters or {}).get("remaining_hours", 0) or 0
+    ratio = remaining / (hours_per_day * WORKLOAD_WINDOW_DAYS)
+    for level, limit in WORKLOAD_THRESHOLDS:
+        if ratio < limit:
+            return level
+    return "high"
+
+
+def effective_workload(employee: Dict[str, Any], workloads: Optional[Dict[str, Dict[str, Any]]]) -> str:
+    """Sayaç varsa atamalardan türetilen seviye, yoksa elle girilen `currentWorkload`."""
+    counters = (workloads or {}).get(employee.get("id"))
+    if counters is not None:
+        return workload_level(counters)
+    return employee.get("currentWorkload", "medium")
+
+
+def apply_workloads(company_data: Optional[Dict[str, Any]], workloads: Optional[Dict[str, Dict[str, Any]]]):
+    """
+    Şirket yapısındaki çalışanların `currentWorkload` alanını türetilmiş seviyeyle değiştirir
+    ve sayaçları `workload` alanına ekler (yerinde). Puanlama ve LLM istemleri bu alanı okur.
+    """
+    if not company_data or not workloads:
+        return company_data
+    for dept in company_data.get("companyStructure", {}).get("departments", []):
+        for team in dept.get("teams", []):
+            for employee in team.get("employees", []):
+                counters = workloads.get(employee.get("id"))
+                if counters is None:
+                    continue
+                employee["currentWorkload"] = workload_level(counters)
+                employee["workload"] = {field: counters.get(field, 0) for field in WORKLOAD_FIELDS}
+    return company_data
@@ -0,0 +1,207 @@
+import copy
+import json
+import os
+import queue
+import threading
+from collections import OrderedDict
+from typing import Dict, Any, List, Optional, Tuple
+
+# Session başına bellekte tutulacak son mesaj sayısı (LLM'e gönderilen pencere)
+SESSION_MESSAGE_WINDOW = int(os.getenv("SESSION_MESSAGE_WINDOW", "40"))
+
+# Paylaşımlı backend (birden fazla worker süreci için), örn: redis://localhost:6379/0
+SESSION_STORE_URL = os.getenv("SESSION_STORE_URL")
+
+
+class InMemorySessionBackend:
+    """Süreç içi anahtar-değer deposu (varsayılan backend). LRU ile sınırlıdır."""
+    def __init__(self, max_entries: int = 1024):
+        self._data: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._max_entries = max_entries
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            value = self._data.get(key)
+            if value is None:
+                return None
+            self._data.move_to_end(key)
+            return copy.deepcopy(value)
+
+    def set(self, key: str, value: Dict[str, Any]):
+        with self._lock:
+            self._data[key] = copy.deepcopy(value)
+            self._data.move_to_end(key)
+            while len(self._data) > self._max_entries:
+                self._data.popitem(last=False)
+
+    def delete(self, key: str):
+        with self._lock:
+            self._data.pop(key, None)
+
+
+class RedisSessionBackend:
+    """Birden fazla süreç arasında paylaşılan Redis deposu (opsiyonel, `redis` paketi gerekir)."""
+    def __init__(self, url: str, ttl_seconds: int = 24 * 3600):
+        import redis
+        self._client = redis.Redis.from_url(url)
+        self._ttl_seconds = ttl_seconds
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        raw = self._client.get(f"session_store:{key}")
+        return json.loads(raw) if raw else None
+
+    def set(self, key: str, value: Dict[str, Any]):
+        self._client.set(f"session_store:{key}", json.dumps(value, ensure_ascii=False, default=str), ex=self._ttl_seconds)
+
+    def delete(self, key: str):
+        self._client.delete(f"session_store:{key}")
+
+
+def create_session_backend():
+    """SESSION_STORE_URL tanımlıysa paylaşımlı backend'i, değilse süreç içi backend'i döndürür."""
+    if SESSION_STORE_URL:
+        try:
+            backend = RedisSessionBackend(SESSION_STORE_URL)
+            print("[SessionStore Info] Paylaşımlı session backend kullanılıyor.")
+            return backend
+        except Exception as e:
+            print(f"[SessionStore Warning] Paylaşımlı backend başlatılamadı, bellek içi kullanılıyor: {e}")
+    return InMemorySessionBackend()
+
+
+class SessionStateStore:
+    """
+    Chat session durumunu (aktif proje, son mesaj penceresi, bekleyen onaylar) bellekte tutar.
+
+    Okumalar yalnızca session ilk kez görüldüğünde Firestore'a gider; sonraki tüm
+    okumalar depodan karşılanır. Yazmalar depoya hemen, Firestore'a ise arka plandaki
+    yazıcı thread üzerinden sırayla (write-through, asenkron) uygulanır.
+    Diğer tüm metotlar alttaki veritabanı istemcisine devredilir.
+    """
+    def __init__(self, db_client, backend=None, window_size: int = SESSION_MESSAGE_WINDOW):
+        self._db = db_client
+        self._backend = backend or create_session_backend()
+        self._window_size = window_size
+        self._session_locks: Dict[str, threading.Lock] = {}
+        self._locks_guard = threading.Lock()
+
+        self._write_queue: "queue.Queue" = queue.Queue()
+        self._writer = threading.Thread(target=self._write_loop, name="session-writer", daemon=True)
+        self._writer.start()
+
+    def __getattr__(self, name):
+        return getattr(self._db, name)
+
+    # --- ARKA PLAN YAZICI ---
+
+    def _write_loop(self):
+        while True:
+            description, func, args = self._write_queue.get()
+            try:
+                func(*args)
+            except Exception as e:
+                print(f"[SessionStore Error] Firestore yazması başarısız ({description}): {e}")
+            finally:
+                self._write_queue.task_done()
+
+    def _write_behind(self, description: str, func, *args):
+        self._write_queue.put((description, func, args))
+
+    def flush(self):
+        """Kuyruktaki tüm Firestore yazmalarının tamamlanmasını bekler."""
+        self._write_queue.join()
+
+    # --- SESSION DURUMU ---
+
+    def _session_lock(self, session_id: str) -> threading.Lock:
+        with self._locks_guard:
+            lock = self._session_locks.get(session_id)
+            if lock is None:
+                lock = threading.Lock()
+                self._session_locks[session_id] = lock
+            return lock
+
+    def _trim_window(self, state: Dict[str, Any]):
+        """Pencereyi sınırlar; pencere, çağrısı dışarıda kalmış bir tool mesajıyla başlamaz."""
+        messages = state["messages"]
+        drop = max(0, len(messages) - self._window_size)
+        while drop < len(messages) and messages[drop].get("role") == "tool":
+            drop += 1
+        if drop:
+            state["messages"] = messages[drop:]
+            state["offset"] += drop
+
+    def _load_state(self, session_id: str) -> Dict[str, Any]:
+        """Session durumunu depodan getirir; yoksa Firestore'dan bir kez yükler."""
+        state = self._backend.get(f"session:{session_id}")
+        if state is not None:
+            return state
+
+        print(f"[SessionStore Log] Session ilk kez yükleniyor: {session_id}")
+        history = self._db.get_chat_history(session_id) or []
+        state = {
+            "active_project": self._db.get_active_project(session_id),
+            "messages": list(history),
+            "offset": 0
+        }
+        self._trim_window(state)
+        self._backend.set(f"session:{session_id}", state)
+        return state
+
+    def get_active_project(self, session_id: str) -> Optional[str]:
+        with self._session_lock(session_id):
+            return self._load_state(session_id).get("active_project")
+
+    def set_active_project(self, session_id: str, project_id: str):
+        with self._session_lock(session_id):
+            state = self._load_state(session_id)
+            state["active_project"] = project_id
+            self._backend.set(f"session:{session_id}", state)
+        self._write_behind("set_active_project", self._db.set_active_project, session_id, project_id)
+
+    def get_chat_history(self, session_id: str) -> List[Dict[str, Any]]:
+        """Son mesaj penceresini döndürür (tam geçmiş için alttaki istemci kullanılmalı)."""
+        return self.get_chat_window(session_id)[0]
+
+    def get_chat_window(self, session_id: str) -> Tuple[List[Dict[str, Any]], int]:
+        """
+        Returns:
+            (mesajlar, offset) - offset, pencerenin ilk mesajının tüm geçmişteki sırasıdır
+        """
+        with self._session_lock(session_id):
+            state = self._load_state(session_id)
+            return state["messages"], state["offset"]
+
+    def save_message(self, session_id: str, message: Dict[str, Any]):
+        with self._session_lock(session_id):
+            state = self._load_state(session_id)
+            state["messages"].append(message)
+            self._trim_window(state)
+            self._backend.set(f"session:{session_id}", state)
+        self._write_behind("save_message", self._db.save_message, session_id, message)
+
+    def reset_session(self, session_id: str):
+        """Session durumunu depodan siler (bir sonraki istekte Firestore'dan yeniden yüklenir)."""
+        with self._session_lock(session_id):
+            self._backend.delete(f"session:{session_id}")
+
+    # --- BEKLEYEN ONAYLAR ---
+
+    def save_pending_confirmation(self, token: str, pending_action: Dict[str, Any]):
+        self._backend.set(f"confirmation:{token}", pending_action)
+        self._write_behind("save_pending_confirmation", self._db.save_pending_confirmation, token, pending_action)
+
+    def get_pending_confirmation(self, token: str) -> Optional[Dict[str, Any]]:
+        pending_action = self._backend.get(f"confirmation:{token}")
+        if pending_action is None:
+            # Süreç yeniden başlamış olabilir, kalıcı kayda bak
+            return self._db.get_pending_confirmation(token)
+        if pending_action.get("deleted"):
+            # Silme henüz Firestore'a yazılmamış olabilir, token tekrar kullanılamaz
+            return None
+        return pending_action
+
+    def delete_pending_confirmation(self, token: str):
+        self._backend.set(f"confirmation:{token}", {"deleted": True})
+        self._write_behind("delete_pending_confirmation", self._db.delete_pending_confirmation, token)
@@ -1,9 +1,21 @@
+import copy
 import json
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Optional
 from langchain_core.tools import tool
 from groq import Groq
 import os
 import uuid
+from app.services.sprint_planner import SprintPlanner, parse_date
+from app.services.sprint_replanner import SprintReplanner
+from app.services.delivery_simulator import DeliverySimulator, summarize_delay_risk
+from app.services.sprint_health import SprintHealthCalculator
+from app.services.calendar_projection import resolve_plan_task_ids
+from app.services.scenario_evaluator import ScenarioEvaluator, find_scenario
+from app.services.portfolio_scheduler import portfolio_registry
+from app.services.assignment_scoring import score_employee
+from app.services.bulk_reassignment import BulkReassignmentPlanner
+from app.services.workload import apply_workloads, WORKLOAD_FIELDS
+from app.services.clause_index import clause_index
 
 # This will be injected by the orchestrator
 _db_instance = None
@@ -16,6 +28,13 @@ def inject_dependencies(db_instance, session_id: str):
     _session_id = session_id
 
 # --- CHAT CONVERSATION SYSTEM PROMPT ---
+def _company_with_workloads():
+    """Şirket yapısını, iş yükü seviyeleri atamalardan türetilmiş olarak (kopya) döndürür."""
+    company_data = _db_instance.get_company_structure()
+    if not company_data:
+        return company_data
+    return apply_workloads(copy.deepcopy(company_data), _db_instance.get_employee_workloads())
+
 CHAT_CONVERSATION_PROMPT = """
 Sen, deneyimli bir Proje Yöneticisi (Project Manager) olarak görev yapan profesyonel bir AI asistanısın.
 
@@ -486,7 +505,7 @@ def assign_task_to_employee(task_title: str, project_id: Optional[str] = None):
         return json.dumps({"error": f"Görev bulunamadı: {task_title}"}, ensure_ascii=False)
     
     # Çalışanları al
-    company_data = _db_instance.get_company_structure()
+    company_data = _company_with_workloads()
     if not company_data:
         return json.dumps({"error": "Şirket yapısı bulunamadı."}, ensure_ascii=False)
     
@@ -655,7 +674,8 @@ def list_employees(department: Optional[str] = None):
                     "department": dept_name,
                     "team": team["name"],
                     "techStack": employee["techStack"],
-                    "workload": employee["currentWorkload"]
+                    "workload": employee["currentWorkload"],
+                    "availability": employee.get("availability_status", "available")
                 })
     
     result = {
@@ -700,7 +720,7 @@ def get_department_workload(department: str):
     """
     print(f"[Tool Log] 'get_department_workload' çağrıldı: department={department}")
     
-    company_data = _db_instance.get_company_structure()
+    company_data = _company_with_workloads()
     if not company_data:
         return json.dumps({"error": "Şirket yapısı bulunamadı."}, ensure_ascii=False)
     
@@ -717,14 +737,16 @@ def get_department_workload(department: str):
         
         for team in dept.get("teams", []):
             for employee in team.get("employees", []):
-                workload = employee["currentWorkload"]
-                workload_stats[workload] += 1
+                workload = employee.get("currentWorkload", "medium")
+                workload_stats[workload] = workload_stats.get(workload, 0) + 1
+                counters = employee.get("workload") or {}
                 employees_list.append({
                     "id": employee["id"],
                     "name": f"{employee['firstName']} {employee['lastName']}",
                     "role": employee["role"],
                     "team": team["name"],
-                    "workload": workload
+                    "workload": workload,
+                    **{field: counters.get(field, 0) for field in WORKLOAD_FIELDS}
                 })
     
     result = {
@@ -757,44 +779,6 @@ def switch_active_project(project_id: str):
 
 # --- SPRINT PLANNING TOOLS ---
 
-# --- SPRINT PLANNING SYSTEM PROMPT ---
-SPRINT_PLANNING_PROMPT = """
-Sen, agile yazılım geliştirme süreçlerinde sprint planlama konusunda uzman bir AI asistanısın.
-Görevin, verilen görev listesini (tasks) ve proje bilgilerini inceleyip, bu görevleri mantıklı sprint'lere dağıtmaktır.
-
-Sprint planlama yaparken şu kriterleri dikkate al:
-1. **Görev Bağımlılıkları**: Önce temel altyapı, sonra özellikler, son olarak optimizasyonlar
-2. **Departman Dağılımı**: Aynı departmanın görevlerini mümkünse birlikte planla
-3. **İş Yükü Dengesi**: Her sprint'e yaklaşık eşit sayıda görev dağıt
-4. **Öncelik**: Kritik görevler önce, nice-to-have'ler sona
-
-Çıktı formatı SADECE ve SADECE şu JSON yapısı olmalı:
-{
-  "total_sprints": 2,
-  "sprint_duration_weeks": 2,
-  "sprints": [
-    {
-      "sprint_number": 1,
-      "sprint_name": "Sprint 1: Foundation",
-      "duration_weeks": 2,
-      "tasks": ["task_title_1", "task_title_2"],
-      "focus": "Sprint'in odak noktası kısa açıklama"
-    },
-    {
-      "sprint_number": 2,
-      "sprint_name": "Sprint 2: Features",
-      "duration_weeks": 2,
-      "tasks": ["task_title_3", "task_title_4"],
-      "focus": "Sprint'in odak noktası kısa açıklama"
-    }
-  ],
-  "backlog": ["gelecek sprintler için task'lar"],
-  "notes": "Plan hakkında önemli notlar"
-}
-
-Başka hiçbir açıklama veya metin ekleme.
-"""
-
 # --- SPRINT REPLAN SYSTEM PROMPT ---
 SPRINT_REPLAN_PROMPT = """
 Sen, agile yazılım geliştirme süreçlerinde sprint revizyon konusunda uzman bir AI asistanısın.
@@ -831,14 +815,73 @@ Revizyon yaparken şu kriterleri dikkate al:
 Başka hiçbir açıklama veya metin ekleme.
 """
 
+SPRINT_FOCUS_PROMPT = """
+Sen, agile sprint planlarını özetleyen uzman bir proje yönetim AI asistanısın.
+Sana görevleri önceden belirlenmiş sprint'ler verilecek. Görev dağılımını DEĞİŞTİRME,
+sadece her sprint için kısa bir isim ve odak noktası yaz.
+
+Çıktı formatı SADECE ve SADECE şu JSON yapısı olmalı:
+{
+  "sprints": [
+    {"sprint_number": 1, "sprint_name": "Sprint 1: Foundation", "focus": "Sprint'in odak noktası kısa açıklama"}
+  ],
+  "notes": "Plan hakkında kısa notlar"
+}
+
+Başka hiçbir açıklama veya metin ekleme.
+"""
+
+
+def _write_sprint_narrative(project: Dict[str, Any], plan: Dict[str, Any]):
+    """
+    Deterministik planın sprint isimlerini ve odak metinlerini LLM ile yazar.
+    Görev dağılımı değiştirilmez; hata durumunda plan olduğu gibi kalır.
+    """
+    try:
+        client = Groq(api_key=os.getenv("GROQ_API_KEY"))
+        summary = [
+            {"sprint_number": sp["sprint_number"], "tasks": sp.get("task_titles", [])}
+            for sp in plan.get("sprints", [])
+        ]
+        user_prompt = f"""
+PROJE: {project.get('project_name', 'N/A')}
+SPRINT'LER:
+{json.dumps(summary, indent=2, ensure_ascii=False)}
+"""
+        completion = client.chat.completions.create(
+            model="meta-llama/llama-4-maverick-17b-128e-instruct",
+            messages=[
+                {"role": "system", "content": SPRINT_FOCUS_PROMPT},
+                {"role": "user", "content": user_prompt}
+            ],
+            temperature=0.2,
+            max_tokens=1024,
+            response_format={"type": "json_object"}
+        )
+        narrative = json.loads(completion.choices[0].message.content)
+        by_number = {item.get("sprint_number"): item for item in narrative.get("sprints", [])}
+        for sprint in plan.get("sprints", []):
+            item = by_number.get(sprint["sprint_number"], {})
+            if item.get("sprint_name"):
+                sprint["sprint_name"] = item["sprint_name"]
+            if item.get("focus"):
+                sprint["focus"] = item["focus"]
+        if narrative.get("notes"):
+            plan["notes"] = f"{plan.get('notes', '')} {narrative['notes']}".strip()
+    except Exception as e:
+        print(f"[Tool Log] Sprint odak metni üretilemedi, deterministik metin kullanılıyor: {e}")
+
+
 @tool
-def generate_sprint_plan(project_id: Optional[str] = None, sprint_duration_weeks: int = 2):
+def generate_sprint_plan(project_id: Optional[str] = None, sprint_duration_weeks: int = 2, narrative: bool = False):
     """
     Proje için otomatik sprint planı oluşturur.
+    Görevler bağımlılık, öncelik, süre tahmini ve ekip kapasitesine göre sprint'lere yerleştirilir.
     
     Args:
         project_id: Proje ID'si (opsiyonel, aktif proje kullanılır)
         sprint_duration_weeks: Her sprint'in süresi (hafta)
+        narrative: True ise sprint isimleri ve odak metinleri AI ile yazılır
     """
     print(f"[Tool Log] 'generate_sprint_plan' çağrıldı: project_id={project_id}, duration={sprint_duration_weeks}")
     
@@ -857,62 +900,21 @@ def generate_sprint_plan(project_id: Optional[str] = None, sprint_duration_weeks
         return json.dumps({"error": "Bu proje için görev bulunamadı. Önce görev oluşturun."}, ensure_ascii=False)
     
     try:
-        groq_api_key = os.getenv("GROQ_API_KEY")
-        client = Groq(api_key=groq_api_key)
+        import datetime
+        start_date = datetime.date.today()
         
-        # Task listesini sadeleştir (sadece önemli alanlar)
-        simplified_tasks = [
-            {
-                "task_title": t.get("task_title"),
-                "task_detail": t.get("task_detail"),
-                "task_stack": t.get("task_stack"),
-                "department": t.get("department"),
-                "task_attended_to": t.get("task_attended_to", "")
-            }
-            for t in tasks
-        ]
+        # Görevleri kapasiteye göre sprint'lere yerleştir (deterministik)
+        planner = SprintPlanner(_db_instance.get_company_structure())
+        sprint_plan = planner.plan(tasks, sprint_duration_weeks, start_date)
         
-        user_prompt = f"""
-Lütfen aşağıdaki proje için sprint planı oluştur.
-
-PROJE BİLGİLERİ:
-- Proje Adı: {project.get('project_name', 'N/A')}
-- Departman: {project.get('department', 'N/A')}
-- Açıklama: {project.get('detailedDescription', 'N/A')[:300]}
-
-GÖREVLER:
-{json.dumps(simplified_tasks, indent=2, ensure_ascii=False)}
-
-SPRINT AYARLARI:
-- Sprint Süresi: {sprint_duration_weeks} hafta
-- Toplam Görev Sayısı: {len(tasks)}
-
-Talimat: Bu görevleri mantıklı sprint'lere dağıt. Her sprint'te 2-4 görev olsun. Bağımlılıkları dikkate al.
-"""
-        
-        completion = client.chat.completions.create(
-            model="meta-llama/llama-4-maverick-17b-128e-instruct",
-            messages=[
-                {"role": "system", "content": SPRINT_PLANNING_PROMPT},
-                {"role": "user", "content": user_prompt}
-            ],
-            temperature=0.2,
-            max_tokens=4096,
-            response_format={"type": "json_object"}
-        )
-        
-        sprint_plan = json.loads(completion.choices[0].message.content)
+        if narrative:
+            _write_sprint_narrative(project, sprint_plan)
         
         # Sprint planını kaydet
-        import datetime
         sprint_id = f"sprint_{uuid.uuid4().hex[:8]}"
         
-        # Başlangıç tarihini bugün olarak ayarla
-        start_date = datetime.date.today()
-        
-        # Bitiş tarihini toplam sprint süresine göre hesapla
-        total_weeks = sprint_plan.get("total_sprints", 2) * sprint_plan.get("sprint_duration_weeks", 2)
-        end_date = start_date + datetime.timedelta(weeks=total_weeks)
+        # Bitiş tarihi son sprint'in bitişidir
+        end_date = sprint_plan["sprints"][-1]["end_date"] if sprint_plan["sprints"] else start_date.isoformat()
         
         sprint_data = {
             "sprint_id": sprint_id,
@@ -920,7 +922,7 @@ Talimat: Bu görevleri mantıklı sprint'lere dağıt. Her sprint'te 2-4 görev
             "plan": sprint_plan,
             "status": "planned",
             "start_date": start_date.isoformat(),
-            "end_date": end_date.isoformat(),
+            "end_date": end_date,
             "current_sprint_number": 1,
             "created_at": json.dumps({"timestamp": "now"})  # Firebase timestamp
         }
@@ -938,15 +940,73 @@ Talimat: Bu görevleri mantıklı sprint'lere dağıt. Her sprint'te 2-4 görev
         return json.dumps({"error": f"Sprint planlama hatası: {str(e)}"}, ensure_ascii=False)
 
 
+def _replan_locally(project_id: str, current_sprint: Dict[str, Any], vacation_days: int, delays: int,
+                    events: List[Dict[str, Any]]) -> str:
+    """Deterministik planı olaylara göre revize eder ve mevcut sprint dokümanını günceller."""
+    import datetime
+    today = datetime.date.today()
+    
+    try:
+        all_events = list(events) + SprintReplanner.events_from_legacy(vacation_days, delays, today)
+        if not all_events:
+            return json.dumps({"error": "Revizyon için değişiklik belirtilmedi."}, ensure_ascii=False)
+        
+        tasks = _db_instance.get_tasks(project_id) or []
+        replanner = SprintReplanner(_db_instance.get_company_structure())
+        new_plan, diff = replanner.replan(current_sprint.get("plan", {}), tasks, all_events, today)
+        
+        # Yalnızca değişen görevler güncellenir
+        for change in diff["task_dates_changed"]:
+            _db_instance.update_task_dates(change["task_id"], project_id, change.get("start_date"), change.get("due_date"))
+        for task_id in diff["tasks_removed"]:
+            _db_instance.update_task_status(task_id, project_id, "cancelled")
+        
+        sprint_data = {
+            **current_sprint,
+            "plan": new_plan,
+            "status": "replanned",
+            "end_date": new_plan["sprints"][-1]["end_date"] if new_plan.get("sprints") else current_sprint.get("end_date"),
+            "revision_reason": f"Tatil: {vacation_days} gün, Gecikme: {delays} gün, Olay: {len(events)}",
+            "vacation_days": (current_sprint.get("vacation_days") or 0) + vacation_days,
+            "delays": (current_sprint.get("delays") or 0) + delays
+        }
+        _db_instance.save_sprint(project_id, sprint_data)
+        
+        return json.dumps({
+            "status": "success",
+            "sprint_id": current_sprint.get("sprint_id"),
+            "message": f"Sprint planı revize edildi: {len(diff['tasks_moved'])} görev taşındı, {len(diff['sprints_added'])} sprint eklendi",
+            "new_plan": new_plan,
+            "changes": {
+                "vacation_days": vacation_days,
+                "delays": delays,
+                "tasks_moved": len(diff["tasks_moved"]),
+                "sprints_added": len(diff["sprints_added"])
+            },
+            "diff": diff
+        }, ensure_ascii=False)
+    
+    except ValueError as e:
+        return json.dumps({"error": str(e)}, ensure_ascii=False)
+    except Exception as e:
+        return json.dumps({"error": f"Sprint revizyon hatası: {str(e)}"}, ensure_ascii=False)
+
+
 @tool
-def replan_sprints(project_id: Optional[str] = None, vacation_days: int = 0, delays: int = 0):
+def replan_sprints(project_id: Optional[str] = None, vacation_days: int = 0, delays: int = 0,
+                   events: Optional[List[Dict[str, Any]]] = None):
     """
     Mevcut sprint planını revize eder (tatil günleri, gecikmeler vs. için).
+    Yalnızca etkilenen sprint ve görevler kaydırılır, mevcut plan güncellenir.
     
     Args:
         project_id: Proje ID'si (opsiyonel, aktif proje kullanılır)
-        vacation_days: Tatil/izin gün sayısı
+        vacation_days: Tatil/izin gün sayısı (tüm ekip, bugünden itibaren)
         delays: Gecikme miktarı (gün)
+        events: Ayrıntılı olaylar, örn:
+            {"type": "employee_unavailable", "employee_id": "emp_1", "start_date": "2024-03-01", "end_date": "2024-03-05"}
+            {"type": "task_slipped", "task_id": "task_1", "days": 3}
+            {"type": "scope_removed", "task_ids": ["task_1"]}
     """
     print(f"[Tool Log] 'replan_sprints' çağrıldı: project_id={project_id}, vacation={vacation_days}, delays={delays}")
     
@@ -964,6 +1024,10 @@ def replan_sprints(project_id: Optional[str] = None, vacation_days: int = 0, del
     current_sprint = sprints[0]  # En son oluşturulan sprint
     current_plan = current_sprint.get("plan", {})
     
+    # Deterministik planlar yerel olarak, yalnızca etkilenen kısımlar değiştirilerek revize edilir
+    if current_plan.get("planner") == "deterministic":
+        return _replan_locally(project_id, current_sprint, vacation_days, delays, events or [])
+    
     try:
         groq_api_key = os.getenv("GROQ_API_KEY")
         client = Groq(api_key=groq_api_key)
@@ -993,6 +1057,8 @@ Talimat: Bu değişikliklere göre sprint planını yeniden düzenle. Gerekirse
         )
         
         new_plan = json.loads(completion.choices[0].message.content)
+        # Görev referanslarını (başlık vb.) task_id'ye çevir
+        resolve_plan_task_ids(new_plan, _db_instance.get_tasks(project_id))
         
         # Yeni planı kaydet
         import datetime
@@ -1073,7 +1139,7 @@ def reassign_task_to_employee(task_title: str, from_employee_id: str, reason: st
         return json.dumps({"error": f"Görev bulunamadı: {task_title}"}, ensure_ascii=False)
     
     # Çalışanları al
-    company_data = _db_instance.get_company_structure()
+    company_data = _company_with_workloads()
     if not company_data:
         return json.dumps({"error": "Şirket yapısı bulunamadı."}, ensure_ascii=False)
     
@@ -1124,15 +1190,18 @@ Lütfen bu görevi EN UYGUN çalışana ata. Müsaitlik durumunu, tech stack uyu
         
         result = json.loads(completion.choices[0].message.content)
         
-        # Görevi yeniden ata
+        # Görev henüz güncellenmez; onay sonrası uygulanacak yazma kümesi döner
         task_id = task.get("task_id")
-        _db_instance.reassign_task(
-            task_id=task_id,
-            project_id=project_id,
-            new_employee_id=result["assigned_employee_id"],
-            new_employee_name=result["assigned_employee_name"],
-            reassignment_reason=result["reassignment_reason"]
-        )
+        write_set = [{
+            "op": "reassign_task",
+            "args": {
+                "task_id": task_id,
+                "project_id": project_id,
+                "new_employee_id": result["assigned_employee_id"],
+                "new_employee_name": result["assigned_employee_name"],
+                "reassignment_reason": result["reassignment_reason"]
+            }
+        }]
         
         return json.dumps({
             "status": "success",
@@ -1150,7 +1219,8 @@ Lütfen bu görevi EN UYGUN çalışana ata. Müsaitlik durumunu, tech stack uyu
                 "to_employee": result["assigned_employee_name"],
                 "reason": reason,
                 "urgency": "high" if "acil" in reason.lower() or "emergency" in reason.lower() else "medium"
-            }
+            },
+            "write_set": write_set
         }, ensure_ascii=False)
         
     except Exception as e:
@@ -1224,7 +1294,7 @@ def update_employee_availability(employee_id: str, status: str, unavailable_unti
         }
         
         if len(employee_tasks) > 0 and status == "unavailable":
-            response["warning"] = f"Bu çalışanın {len(employee_tasks)} aktif görevi var. Görevleri yeniden atamayı düşünün."
+            response["warning"] = f"Bu çalışanın {len(employee_tasks)} aktif görevi var. Görevleri toplu yeniden atama ile dağıtmayı düşünün."
         
         return json.dumps(response, ensure_ascii=False)
         
@@ -1232,13 +1302,34 @@ def update_employee_availability(employee_id: str, status: str, unavailable_unti
         return json.dumps({"error": f"Müsaitlik güncelleme hatası: {str(e)}"}, ensure_ascii=False)
 
 
+def _project_target_date(project: Dict[str, Any], tasks: List[Dict[str, Any]]):
+    """Hedef teslim tarihi: proje bitişi, yoksa görevlerin en geç teslim tarihi."""
+    target_date = parse_date(project.get("timeline", {}).get("endDate") or project.get("end_date"))
+    if not target_date:
+        due_dates = [parse_date(t.get("due_date")) for t in tasks]
+        target_date = max((d for d in due_dates if d), default=None)
+    return target_date
+
+
+DELAY_EXPLANATION_PROMPT = """
+Sen, yazılım projelerinde gecikme riskini yöneticilere açıklayan uzman bir analiz AI'sın.
+Sana Monte Carlo simülasyonunun sonuçları verilecek. Sayıları DEĞİŞTİRME veya yeniden tahmin etme;
+sadece ne anlama geldiklerini 3-5 cümlelik Türkçe bir paragrafla açıkla.
+"""
+
+
 @tool
-def predict_project_delays(project_id: Optional[str] = None):
+def predict_project_delays(project_id: Optional[str] = None, trials: int = 10000, seed: int = 42,
+                           distribution: str = "triangular", explain: bool = False):
     """
-    Proje için gecikme riski analizi yapar.
+    Proje için gecikme riski analizi yapar (Monte Carlo teslim tarihi simülasyonu).
     
     Args:
         project_id: Proje ID'si (opsiyonel, aktif proje kullanılır)
+        trials: Simülasyon deneme sayısı
+        seed: Tekrarlanabilirlik için rastgele sayı tohumu
+        distribution: Süre belirsizliği dağılımı ("triangular" veya "lognormal")
+        explain: True ise sonuçlar AI tarafından yorumlanır
     """
     print(f"[Tool Log] 'predict_project_delays' çağrıldı: project_id={project_id}")
     
@@ -1249,7 +1340,7 @@ def predict_project_delays(project_id: Optional[str] = None):
         return json.dumps({"error": "Aktif proje bulunamadı."}, ensure_ascii=False)
     
     # Proje ve görevleri al
-    project = _db_instance.get_project(project_id)
+    project = _db_instance.get_project(project_id) or {}
     tasks = _db_instance.get_tasks(project_id)
     
     if not tasks:
@@ -1258,64 +1349,34 @@ def predict_project_delays(project_id: Optional[str] = None):
     # Çalışan bilgilerini al
     company_data = _db_instance.get_company_structure()
     
-    # Çalışanları düz listeye çevir
-    all_employees = []
-    for dept in company_data.get("companyStructure", {}).get("departments", []):
-        for team in dept.get("teams", []):
-            for emp in team.get("employees", []):
-                all_employees.append({
-                    "id": emp.get("id"),
-                    "name": f"{emp.get('firstName')} {emp.get('lastName')}",
-                    "workload": emp.get("currentWorkload"),
-                    "availability": emp.get("availability_status", "available")
-                })
-    
     try:
-        groq_api_key = os.getenv("GROQ_API_KEY")
-        client = Groq(api_key=groq_api_key)
-        
-        # Task bilgilerini sadeleştir
-        task_summary = [
-            {
-                "title": t.get("task_title", t.get("title")),
-                "status": t.get("status", "pending"),
-                "assigned_to": t.get("task_attended_to", "Atanmamış"),
-                "assigned_id": t.get("assigned_employee_id"),
-                "department": t.get("department"),
-                "blocked_reason": t.get("blocked_reason"),
-                "due_date": t.get("due_date"),
-                "priority": t.get("priority", "medium")
-            }
-            for t in tasks
-        ]
-        
-        user_prompt = f"""
-PROJE BİLGİLERİ:
-- Proje Adı: {project.get('project_name', 'N/A')}
-- Departman: {project.get('department', 'N/A')}
-- Toplam Görev: {len(tasks)}
-
-GÖREV DURUMU:
-{json.dumps(task_summary, indent=2, ensure_ascii=False)}
-
-ÇALIŞAN DURUMU:
-{json.dumps(all_employees, indent=2, ensure_ascii=False)}
-
-Lütfen bu proje için gecikme riski analizi yap. Tüm faktörleri (workload, müsaitlik, blocked tasks, atanmamış görevler) değerlendir.
-"""
-        
-        completion = client.chat.completions.create(
-            model="meta-llama/llama-4-maverick-17b-128e-instruct",
-            messages=[
-                {"role": "system", "content": DELAY_PREDICTION_PROMPT},
-                {"role": "user", "content": user_prompt}
-            ],
-            temperature=0.2,
-            max_tokens=4096,
-            response_format={"type": "json_object"}
-        )
-        
-        result = json.loads(completion.choices[0].message.content)
+        target_date = _project_target_date(project, tasks)
+        
+        simulator = DeliverySimulator(company_data, trials=trials, seed=seed, distribution=distribution)
+        simulation = simulator.simulate(tasks, target_date=target_date)
+        result = summarize_delay_risk(simulation, tasks, company_data)
+        
+        if explain:
+            try:
+                client = Groq(api_key=os.getenv("GROQ_API_KEY"))
+                completion = client.chat.completions.create(
+                    model="meta-llama/llama-4-maverick-17b-128e-instruct",
+                    messages=[
+                        {"role": "system", "content": DELAY_EXPLANATION_PROMPT},
+                        {"role": "user", "content": json.dumps({
+                            "project_name": project.get("project_name"),
+                            **{k: v for k, v in result.items() if k != "simulation"},
+                            "percentiles": simulation["percentiles"],
+                            "on_time_probability": simulation["on_time_probability"],
+                            "critical_tasks": simulation["critical_tasks"][:5]
+                        }, ensure_ascii=False)}
+                    ],
+                    temperature=0.2,
+                    max_tokens=512
+                )
+                result["explanation"] = completion.choices[0].message.content
+            except Exception as e:
+                print(f"[Tool Log] Gecikme açıklaması üretilemedi: {e}")
         
         return json.dumps({
             "status": "success",
@@ -1324,18 +1385,28 @@ Lütfen bu proje için gecikme riski analizi yap. Tüm faktörleri (workload, m
             "analysis": result
         }, ensure_ascii=False)
         
+    except ValueError as e:
+        return json.dumps({"error": str(e)}, ensure_ascii=False)
     except Exception as e:
         return json.dumps({"error": f"Gecikme tahmini hatası: {str(e)}"}, ensure_ascii=False)
 
 
+SPRINT_HEALTH_NARRATIVE_PROMPT = """
+Sen, agile sprint sağlığını yöneticilere açıklayan uzman bir proje yönetim AI asistanısın.
+Sana kurallara göre hesaplanmış bir sprint sağlık analizi verilecek. Skoru, durumu veya risk
+faktörlerini DEĞİŞTİRME; sadece ne anlama geldiklerini 3-5 cümlelik Türkçe bir paragrafla açıkla.
+"""
+
+
 @tool
-def analyze_sprint_health(project_id: Optional[str] = None, sprint_id: Optional[str] = None):
+def analyze_sprint_health(project_id: Optional[str] = None, sprint_id: Optional[str] = None, narrative: bool = False):
     """
-    Sprint sağlık durumunu analiz eder.
+    Sprint sağlık durumunu analiz eder (kural tabanlı skor).
     
     Args:
         project_id: Proje ID'si (opsiyonel)
         sprint_id: Sprint ID'si (opsiyonel, belirtilmezse en son sprint)
+        narrative: True ise analiz AI tarafından açıklanır
     """
     print(f"[Tool Log] 'analyze_sprint_health' çağrıldı: project_id={project_id}, sprint_id={sprint_id}")
     
@@ -1358,88 +1429,240 @@ def analyze_sprint_health(project_id: Optional[str] = None, sprint_id: Optional[
     if not sprint:
         return json.dumps({"error": "Sprint bulunamadı."}, ensure_ascii=False)
     
-    # Görevleri al
     tasks = _db_instance.get_tasks(project_id)
-    sprint_plan = sprint.get("plan", {})
+    company_data = _db_instance.get_company_structure()
     
-    # Sprint'teki görevleri filtrele
-    sprint_task_titles = []
-    for s in sprint_plan.get("sprints", []):
-        sprint_task_titles.extend(s.get("tasks", []))
+    try:
+        result = SprintHealthCalculator(company_data).evaluate(sprint, tasks)
+        
+        # Sprint sağlık skorunu veritabanına kaydet
+        _db_instance.update_sprint_health(sprint_id, result["health_score"], result["risk_factors"])
+        
+        if narrative:
+            try:
+                client = Groq(api_key=os.getenv("GROQ_API_KEY"))
+                completion = client.chat.completions.create(
+                    model="meta-llama/llama-4-maverick-17b-128e-instruct",
+                    messages=[
+                        {"role": "system", "content": SPRINT_HEALTH_NARRATIVE_PROMPT},
+                        {"role": "user", "content": json.dumps(result, ensure_ascii=False)}
+                    ],
+                    temperature=0.2,
+                    max_tokens=512
+                )
+                result["narrative"] = completion.choices[0].message.content
+            except Exception as e:
+                print(f"[Tool Log] Sprint sağlık açıklaması üretilemedi: {e}")
+        
+        return json.dumps({
+            "status": "success",
+            "sprint_id": sprint_id,
+            "project_id": project_id,
+            "analysis": result
+        }, ensure_ascii=False)
+        
+    except Exception as e:
+        return json.dumps({"error": f"Sprint sağlık analizi hatası: {str(e)}"}, ensure_ascii=False)
+
+
+@tool
+def simulate_sprint_scenarios(scenarios: List[Dict[str, Any]], project_id: Optional[str] = None,
+                              apply_scenario: Optional[str] = None):
+    """
+    Birden fazla "ne olur?" senaryosunu mevcut sprint planı üzerinde kaydetmeden karşılaştırır.
+    Her senaryo için tahmini bitiş tarihi, aşırı yük ve gecikme riski döner.
     
-    sprint_tasks = [t for t in tasks if t.get("task_title", t.get("title")) in sprint_task_titles]
+    Args:
+        scenarios: Senaryolar, örn:
+            {"name": "Ahmet 5 gün izinli", "events": [{"type": "employee_unavailable", "employee_id": "emp_1", "start_date": "2024-03-01", "end_date": "2024-03-05"}]}
+            {"name": "Bir sprint ekle", "events": [{"type": "sprint_added", "count": 1}]}
+            {"name": "İki görevi çıkar", "events": [{"type": "scope_removed", "task_ids": ["task_1", "task_2"]}]}
+        project_id: Proje ID'si (opsiyonel, aktif proje kullanılır)
+        apply_scenario: Belirtilirse bu senaryo (adı, "Senaryo N" etiketi veya sırası) plana uygulanır ve kaydedilir
+    """
+    print(f"[Tool Log] 'simulate_sprint_scenarios' çağrıldı: project_id={project_id}, senaryo={len(scenarios or [])}")
     
-    # Çalışan bilgilerini al
-    company_data = _db_instance.get_company_structure()
-    all_employees = []
-    for dept in company_data.get("companyStructure", {}).get("departments", []):
-        for team in dept.get("teams", []):
-            for emp in team.get("employees", []):
-                all_employees.append({
-                    "id": emp.get("id"),
-                    "name": f"{emp.get('firstName')} {emp.get('lastName')}",
-                    "workload": emp.get("currentWorkload"),
-                    "availability": emp.get("availability_status", "available")
-                })
+    if not project_id:
+        project_id = _db_instance.get_active_project(_session_id)
+    
+    if not project_id:
+        return json.dumps({"error": "Aktif proje bulunamadı."}, ensure_ascii=False)
+    
+    sprints = _db_instance.get_sprints(project_id)
+    if not sprints:
+        return json.dumps({"error": "Bu proje için sprint planı bulunamadı. Önce sprint planı oluşturun."}, ensure_ascii=False)
+    
+    current_sprint = sprints[0]
+    current_plan = current_sprint.get("plan", {})
+    if current_plan.get("planner") != "deterministic":
+        return json.dumps({"error": "Senaryo simülasyonu yalnızca deterministik sprint planları için desteklenir. Planı yeniden oluşturun."}, ensure_ascii=False)
     
     try:
-        groq_api_key = os.getenv("GROQ_API_KEY")
-        client = Groq(api_key=groq_api_key)
+        project = _db_instance.get_project(project_id) or {}
+        tasks = _db_instance.get_tasks(project_id) or []
+        evaluator = ScenarioEvaluator(_db_instance.get_company_structure())
+        result = evaluator.evaluate(current_plan, tasks, scenarios or [], target_date=_project_target_date(project, tasks))
         
-        # Task durumlarını özetle
-        task_summary = [
-            {
-                "title": t.get("task_title", t.get("title")),
-                "status": t.get("status", "pending"),
-                "assigned_to": t.get("task_attended_to", "Atanmamış"),
-                "blocked_reason": t.get("blocked_reason"),
-                "priority": t.get("priority", "medium")
-            }
-            for t in sprint_tasks
-        ]
+        response = {
+            "status": "success",
+            "project_id": project_id,
+            "sprint_id": current_sprint.get("sprint_id"),
+            **result
+        }
         
-        user_prompt = f"""
-SPRINT BİLGİLERİ:
-- Sprint ID: {sprint_id}
-- Sprint Planı: {json.dumps(sprint_plan, indent=2, ensure_ascii=False)}
-- Toplam Sprint Görevi: {len(sprint_tasks)}
+        # Yalnızca seçilen senaryo kaydedilir
+        if apply_scenario:
+            chosen = find_scenario(scenarios, apply_scenario)
+            if chosen is None:
+                return json.dumps({"error": f"Uygulanacak senaryo bulunamadı: {apply_scenario}"}, ensure_ascii=False)
+            applied = json.loads(_replan_locally(
+                project_id, current_sprint,
+                chosen.get("vacation_days", 0), chosen.get("delays", 0), chosen.get("events") or []
+            ))
+            if applied.get("error"):
+                return json.dumps({"error": f"Senaryo uygulanamadı: {applied['error']}", **response}, ensure_ascii=False)
+            response["applied"] = applied
+        
+        return json.dumps(response, ensure_ascii=False)
+    
+    except ValueError as e:
+        return json.dumps({"error": str(e)}, ensure_ascii=False)
+    except Exception as e:
+        return json.dumps({"error": f"Senaryo simülasyonu hatası: {str(e)}"}, ensure_ascii=False)
 
-SPRINT GÖREVLERİ:
-{json.dumps(task_summary, indent=2, ensure_ascii=False)}
 
-ÇALIŞAN DURUMU:
-{json.dumps(all_employees, indent=2, ensure_ascii=False)}
-
-Lütfen bu sprint'in sağlık durumunu analiz et. Health score hesapla ve risk faktörlerini belirle.
-"""
-        
-        completion = client.chat.completions.create(
-            model="meta-llama/llama-4-maverick-17b-128e-instruct",
-            messages=[
-                {"role": "system", "content": SPRINT_HEALTH_ANALYSIS_PROMPT},
-                {"role": "user", "content": user_prompt}
-            ],
-            temperature=0.2,
-            max_tokens=4096,
-            response_format={"type": "json_object"}
-        )
+@tool
+def level_portfolio_resources(employee_id: Optional[str] = None):
+    """
+    Tüm projelerdeki görevlerden çalışan × gün tahsisini çıkarır, aynı kişinin birden fazla
+    projede aşırı yüklendiği dönemleri bulur ve yeniden atama/erteleme önerileri üretir.
+    Öneriler kaydedilmez.
+    
+    Args:
+        employee_id: Belirtilirse sonuçlar bu çalışana göre filtrelenir
+    """
+    print(f"[Tool Log] 'level_portfolio_resources' çağrıldı: employee={employee_id}")
+    
+    try:
+        result = portfolio_registry.get(_db_instance).analyze()
         
-        result = json.loads(completion.choices[0].message.content)
+        if employee_id:
+            result["employees"] = [e for e in result["employees"] if e["employee_id"] == employee_id]
+            result["conflicts"] = [c for c in result["conflicts"] if c["employee_id"] == employee_id]
+            result["proposals"] = [p for p in result["proposals"] if p["from_employee_id"] == employee_id]
         
-        # Sprint sağlık skorunu veritabanına kaydet
-        health_score = result.get("health_score", 0)
-        risk_factors = result.get("risk_factors", [])
-        _db_instance.update_sprint_health(sprint_id, health_score, risk_factors)
+        return json.dumps({"status": "success", **result}, ensure_ascii=False)
+    
+    except Exception as e:
+        return json.dumps({"error": f"Portföy kaynak dengeleme hatası: {str(e)}"}, ensure_ascii=False)
+
+
+@tool
+def find_available_employees(hours: float, start_date: str, end_date: str, department: Optional[str] = None):
+    """
+    Belirtilen tarih aralığında (tüm projelerdeki mevcut tahsisler düşüldükten sonra) en az
+    verilen saat kadar boş kapasitesi olan çalışanları listeler.
+    
+    Args:
+        hours: Gereken boş saat (ör. 16)
+        start_date: Aralık başlangıcı (YYYY-MM-DD)
+        end_date: Aralık bitişi (YYYY-MM-DD, dahil)
+        department: Departman filtresi (opsiyonel)
+    """
+    print(f"[Tool Log] 'find_available_employees' çağrıldı: {hours} saat, {start_date} - {end_date}")
+    
+    start, end = parse_date(start_date), parse_date(end_date)
+    if not start or not end:
+        return json.dumps({"error": "Geçersiz tarih. YYYY-MM-DD formatını kullanın."}, ensure_ascii=False)
+    if end < start:
+        return json.dumps({"error": "Bitiş tarihi başlangıç tarihinden önce olamaz."}, ensure_ascii=False)
+    
+    try:
+        scheduler = portfolio_registry.get(_db_instance)
+        employee_ids = None
+        if department:
+            employee_ids = [e for e, d in scheduler.department_of.items() if d.lower() == department.lower()]
+        
+        matches = scheduler.ledger.find_available(hours, start, end, employee_ids)
+        for match in matches:
+            employee = scheduler.planner.employees[match["employee_id"]]
+            match["name"] = f"{employee.get('firstName')} {employee.get('lastName')}"
+            match["department"] = scheduler.department_of.get(match["employee_id"], "")
+            match["techStack"] = employee.get("techStack", [])
         
         return json.dumps({
             "status": "success",
-            "sprint_id": sprint_id,
-            "project_id": project_id,
-            "analysis": result
+            "hours": hours,
+            "start_date": start.isoformat(),
+            "end_date": end.isoformat(),
+            "total_available": len(matches),
+            "available_employees": matches
         }, ensure_ascii=False)
+    
+    except Exception as e:
+        return json.dumps({"error": f"Kapasite sorgulama hatası: {str(e)}"}, ensure_ascii=False)
+
+
+@tool
+def bulk_reassign_employee_tasks(employee_id: str, start_date: str, end_date: Optional[str] = None,
+                                 reason: Optional[str] = None):
+    """
+    Bir çalışanın belirtilen tarih aralığında müsait olmayacağı durumda tüm projelerdeki
+    görevlerini tek seferde yeniden dağıtır. Kapasitesi ve yetkinliği uyan çalışanlara atama,
+    uygun kimse yoksa dönüş tarihine erteleme önerir; sprint planlarına etkisini hesaplar.
+    Değişiklikler onaydan sonra tek bir toplu yazma olarak uygulanır.
+    
+    Args:
+        employee_id: Müsait olmayacak çalışanın ID'si
+        start_date: Yokluğun başlangıcı (YYYY-MM-DD)
+        end_date: Yokluğun bitişi (YYYY-MM-DD, opsiyonel; verilmezse tek gün)
+        reason: Yokluk nedeni (opsiyonel)
+    """
+    print(f"[Tool Log] 'bulk_reassign_employee_tasks' çağrıldı: employee={employee_id}, {start_date} - {end_date}")
+    
+    start = parse_date(start_date)
+    end = parse_date(end_date) if end_date else start
+    if not start or not end:
+        return json.dumps({"error": "Geçersiz tarih. YYYY-MM-DD formatını kullanın."}, ensure_ascii=False)
+    
+    try:
+        scheduler = portfolio_registry.get(_db_instance)
+        projects = []
+        for project in _db_instance.list_projects():
+            project_id = project.get("project_id")
+            if not project_id:
+                continue
+            sprints = _db_instance.get_sprints(project_id)
+            projects.append({
+                "project_id": project_id,
+                "project_name": project.get("project_name", project_id),
+                "tasks": _db_instance.get_tasks(project_id) or [],
+                "sprint": sprints[0] if sprints else None
+            })
+        
+        planner = BulkReassignmentPlanner(scheduler, _db_instance.get_company_structure(),
+                                          workloads=_db_instance.get_employee_workloads())
+        result = planner.plan(employee_id, start, end, projects, reason)
+        
+        if not result["affected_tasks"]:
+            return json.dumps({
+                "status": "success",
+                **result,
+                "message": f"{result['employee_name']} için bu aralıkta etkilenen görev yok."
+            }, ensure_ascii=False)
         
+        return json.dumps({
+            "status": "success",
+            **result,
+            "message": f"{result['affected_tasks']} görev etkileniyor: {len(result['reassignments'])} yeniden atama, {len(result['delays'])} erteleme",
+            "requires_confirmation": True,
+            "confirmation_type": "bulk_reassignment"
+        }, ensure_ascii=False)
+    
+    except ValueError as e:
+        return json.dumps({"error": str(e)}, ensure_ascii=False)
     except Exception as e:
-        return json.dumps({"error": f"Sprint sağlık analizi hatası: {str(e)}"}, ensure_ascii=False)
+        return json.dumps({"error": f"Toplu yeniden atama hatası: {str(e)}"}, ensure_ascii=False)
 
 
 @tool
@@ -1471,7 +1694,7 @@ def get_available_employees_for_task(task_title: str, project_id: Optional[str]
         return json.dumps({"error": f"Görev bulunamadı: {task_title}"}, ensure_ascii=False)
     
     # Çalışanları al
-    company_data = _db_instance.get_company_structure()
+    company_data = _company_with_workloads()
     if not company_data:
         return json.dumps({"error": "Şirket yapısı bulunamadı."}, ensure_ascii=False)
     
@@ -1506,39 +1729,10 @@ def get_available_employees_for_task(task_title: str, project_id: Optional[str]
     
     scored_employees = []
     for emp in available_employees:
-        score = 0
-        reasons = []
-        
-        # Tech stack uyumu (en önemli - 50 puan)
-        if isinstance(task_stack, str):
-            task_techs = [t.strip() for t in task_stack.split(",")]
-        else:
-            task_techs = task_stack if isinstance(task_stack, list) else []
-        
-        emp_techs = emp.get("techStack", [])
-        matching_techs = [t for t in task_techs if t in emp_techs]
-        if matching_techs:
-            tech_score = (len(matching_techs) / len(task_techs)) * 50 if task_techs else 0
-            score += tech_score
-            reasons.append(f"Tech stack uyumu: {len(matching_techs)}/{len(task_techs)}")
-        
-        # Workload (30 puan)
-        workload = emp.get("workload", "medium")
-        if workload == "low":
-            score += 30
-            reasons.append("Düşük iş yükü")
-        elif workload == "medium":
-            score += 15
-            reasons.append("Orta iş yükü")
-        
-        # Departman uyumu (20 puan)
-        if emp.get("department") == task_dept:
-            score += 20
-            reasons.append("Aynı departman")
-        
+        score, reasons = score_employee(task, emp, emp.get("department"))
         scored_employees.append({
             **emp,
-            "assignment_score": round(score, 2),
+            "assignment_score": score,
             "reasons": reasons
         })
     
@@ -1555,6 +1749,59 @@ def get_available_employees_for_task(task_title: str, project_id: Optional[str]
     }, ensure_ascii=False)
 
 
+@tool
+def search_contract_clauses(query: str, contract_id: Optional[str] = None, project_id: Optional[str] = None, top_k: int = 5):
+    """
+    Sözleşme metinlerinde soruyla ilgili maddeleri (BM25) arar ve en uygun top_k maddeyi
+    ofsetleri ve sayfa numaralarıyla döndürür. Ödeme koşulları, teslim süreleri, cezai şartlar,
+    gizlilik gibi sözleşme sorularında tüm projeyi getirmek yerine bu aracı kullan.
+    
+    Args:
+        query: Anahtar kelimeler, sözleşmenin dilinde (ör. "ödeme koşulları taksit fatura")
+        contract_id: Belirli bir sözleşmede ara (opsiyonel)
+        project_id: Projenin sözleşmelerinde ara; verilmezse aktif proje, o da yoksa tüm sözleşmeler
+        top_k: Döndürülecek madde sayısı (varsayılan 5)
+    """
+    print(f"[Tool Log] 'search_contract_clauses' çağrıldı: query={query}, contract={contract_id}, project={project_id}")
+    
+    try:
+        if contract_id:
+            contract = _db_instance.get_contract(contract_id)
+            if not contract:
+                return json.dumps({"error": f"Sözleşme bulunamadı: {contract_id}"}, ensure_ascii=False)
+            # Yinelenen sözleşmeler asıl kaydın metnini paylaşır
+            if contract.get("duplicate_of"):
+                contract = _db_instance.get_contract(contract["duplicate_of"]) or contract
+            contracts = [contract]
+        else:
+            project_id = project_id or _db_instance.get_active_project(_session_id)
+            contracts = [
+                c for c in _db_instance.list_contracts()
+                if not c.get("duplicate_of") and not c.get("superseded_by")
+                and (not project_id or c.get("project_id") == project_id)
+            ]
+        
+        # Bu özellikten önce ayrıştırılmış sözleşmeler ilk aramada indekslenir
+        for contract in contracts:
+            clause_index.index_record(contract, reindex=False)
+        
+        top_k = max(1, min(top_k, 20))
+        clauses = clause_index.search(query, top_k, [c["contract_id"] for c in contracts])
+        
+        return json.dumps({
+            "status": "success",
+            "query": query,
+            "project_id": project_id,
+            "searched_contracts": len(contracts),
+            "total_results": len(clauses),
+            "total_tokens": sum(c["tokens"] for c in clauses),
+            "clauses": clauses
+        }, ensure_ascii=False)
+    
+    except Exception as e:
+        return json.dumps({"error": f"Sözleşme maddesi arama hatası: {str(e)}"}, ensure_ascii=False)
+
+
 # --- LangChain Tool Registry ---
 
 def get_all_tools():
@@ -1579,7 +1826,12 @@ def get_all_tools():
         update_employee_availability,
         predict_project_delays,
         analyze_sprint_health,
-        get_available_employees_for_task
+        simulate_sprint_scenarios,
+        level_portfolio_resources,
+        find_available_employees,
+        bulk_reassign_employee_tasks,
+        get_available_employees_for_task,
+        search_contract_clauses
     ]
 
 def _get_available_tools_dict():
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Toplu sözleşme aktarım scripti
+Bir klasördeki tüm PDF sözleşmeleri yükler, analiz eder, task üretir ve atar.
+
+Kullanım:
+    python ingest_contracts.py ./sozlesmeler [--no-assign] [--force] [--report rapor.json]
+"""
+
+import sys
+import os
+import argparse
+import asyncio
+import json
+
+# Add backend to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app.firebase_db import FirebaseDatabase
+from app.config import CONTRACT_PIPELINE_LIMITS
+from app.services.contract_pipeline import ContractPipeline, PIPELINE_STAGES
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Klasördeki PDF sözleşmeleri toplu olarak analiz eder")
+    parser.add_argument("directory", help="PDF sözleşmelerin bulunduğu klasör")
+    parser.add_argument("--no-assign", action="store_true", help="Taskları otomatik atama")
+    parser.add_argument("--force", action="store_true", help="Daha önce analiz edilmiş içerikleri de yeniden analiz et")
+    parser.add_argument("--report", help="Durum raporunun yazılacağı JSON dosyası")
+    for stage in PIPELINE_STAGES:
+        parser.add_argument(f"--{stage}-concurrency", type=int, default=CONTRACT_PIPELINE_LIMITS[stage],
+                            help=f"'{stage}' aşamasında aynı anda işlenen doküman sayısı")
+    return parser.parse_args()
+
+
+async def ingest(args, paths):
+    limits = {stage: getattr(args, f"{stage}_concurrency") for stage in PIPELINE_STAGES}
+    pipeline = ContractPipeline(FirebaseDatabase(), limits=limits, auto_assign=not args.no_assign, force=args.force)
+
+    documents = []
+    reports = []
+    for path in paths:
+        try:
+            documents.append(await pipeline.ingest_path(path))
+            print(f"📤 Yüklendi: {os.path.basename(path)}")
+        except Exception as e:
+            reports.append({"document": os.path.basename(path), "status": "rejected", "error": str(e)})
+            print(f"❌ Yüklenemedi: {os.path.basename(path)} ({e})")
+
+    return (await pipeline.run(documents) if documents else []) + reports
+
+
+def main():
+    """Ana toplu aktarım fonksiyonu"""
+    args = parse_args()
+
+    if not os.path.isdir(args.directory):
+        print(f"❌ Klasör bulunamadı: {args.directory}")
+        sys.exit(1)
+
+    paths = sorted(
+        os.path.join(args.directory, name)
+        for name in os.listdir(args.directory)
+        if name.lower().endswith(".pdf")
+    )
+    if not paths:
+        print(f"⚠️  Klasörde PDF bulunamadı: {args.directory}")
+        return
+
+    print("\n" + "="*60)
+    print(f"📚 TOPLU SÖZLEŞME AKTARIMI ({len(paths)} doküman)")
+    print("="*60)
+
+    reports = asyncio.run(ingest(args, paths))
+
+    print("\n" + "="*60)
+    icons = {"analyzed": "✅", "duplicate": "🔁", "failed": "❌", "rejected": "❌"}
+    for report in reports:
+        line = f"{icons.get(report['status'], '•')} {report['document']}: {report['status']}"
+        if report["status"] == "analyzed":
+            line += f" → {report['project_id']} ({report['total_tasks']} task, {report['assigned_count']} atandı)"
+        elif report["status"] == "duplicate":
+            line += f" → {report['duplicate_of']}"
+        elif report.get("error"):
+            line += f" [{report.get('stage') or 'upload'}] {report['error']}"
+        print(line)
+    print("="*60)
+
+    if args.report:
+        with open(args.report, "w", encoding="utf-8") as f:
+            json.dump(reports, f, ensure_ascii=False, indent=2)
+        print(f"📝 Rapor yazıldı: {args.report}")
+
+    if any(r["status"] in ("failed", "rejected") for r in reports):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()